@@ -0,0 +1,133 @@
+"""
+統計APIのキャッシュ
+
+統計の結果をエンドポイントとクエリパラメータごとに保存し、
+データのバージョン（DatabaseManager.data_version）が変わるまで再利用します。
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# 保存する結果の最大数（環境変数 STUDY_TRACKER_STATS_CACHE_SIZE で変更）
+DEFAULT_MAX_ENTRIES = 256
+
+# 他のプロセスの書き込みを検知できないデータベースでの有効期間の既定値（秒）
+DEFAULT_UNTRACKED_TTL = 5.0
+
+
+class StatsCache:
+    """
+    データのバージョン付きLRUキャッシュクラス
+
+    各結果は計算前に読んだデータのバージョンと一緒に保存し、
+    取り出すときのバージョンと異なれば破棄して再計算させます。
+    書き込みのコミット後にバージョンが進むため、書き込みの後に古い統計を返すことはありません。
+    ttl を指定した場合は、バージョンが同じでも ttl 秒を過ぎた結果を破棄します
+    （バージョンに反映されない書き込みがある場合の上限として使います）。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        キャッシュを初期化
+
+        Args:
+            max_entries: 保存する結果の最大数（超えたら最も長く使われていないものから破棄）
+            ttl: 結果の有効期間（秒、Noneなら無期限）
+            clock: 現在時刻（秒）を返す関数
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries は1以上を指定してください")
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl は0より大きい値を指定してください")
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        # キー -> (データのバージョン, 保存した時刻, 結果)
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls, tracks_external_writes: bool = True) -> "StatsCache":
+        """
+        環境変数の設定でキャッシュを作成
+
+        STUDY_TRACKER_STATS_CACHE_SIZE: 最大数
+        STUDY_TRACKER_STATS_CACHE_TTL: 有効期間（秒、未指定なら無期限）
+
+        Args:
+            tracks_external_writes: 他のプロセスの書き込みがデータのバージョンに
+                反映されるか（False なら有効期間が未指定でも DEFAULT_UNTRACKED_TTL 秒にする）
+        """
+        max_entries = int(
+            os.environ.get("STUDY_TRACKER_STATS_CACHE_SIZE", DEFAULT_MAX_ENTRIES)
+        )
+        ttl = os.environ.get("STUDY_TRACKER_STATS_CACHE_TTL")
+        if ttl:
+            return cls(max_entries=max_entries, ttl=float(ttl))
+        if not tracks_external_writes:
+            return cls(max_entries=max_entries, ttl=DEFAULT_UNTRACKED_TTL)
+        return cls(max_entries=max_entries)
+
+    def get(self, key: Hashable, version: int) -> Tuple[bool, Any]:
+        """
+        結果を取り出す
+
+        Returns:
+            (見つかったか, 結果) のタプル
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, stored_at, value = entry
+                if entry_version == version and not self._expired(stored_at):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: Hashable, version: int, value: Any):
+        """
+        結果を保存
+
+        Args:
+            version: 結果を計算する前に読んだデータのバージョン
+        """
+        with self._lock:
+            self._entries[key] = (version, self._clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """保存した結果をすべて破棄（ヒット数・ミス数は残す）"""
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """件数・ヒット数・ミス数・ヒット率を取得"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and self._clock() - stored_at >= self.ttl
@@ -7,7 +7,7 @@ Web APIサーバーのエントリーポイントです。
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .routes import router
+from .routes import router, async_db, stats_cache
 
 # FastAPIアプリケーションの作成
 app = FastAPI(
@@ -80,8 +80,18 @@ async def root():
 
 @app.get("/health", tags=["システム"])
 async def health_check():
-    """ヘルスチェックエンドポイント"""
-    return {"status": "healthy", "service": "StudyTracker API"}
+    """ヘルスチェックエンドポイント
+
+    ワーカースレッドを使わない値だけを返すため、遅いクエリの実行中もすぐに応答します。
+    """
+    return {
+        "status": "healthy",
+        "service": "StudyTracker API",
+        "database": async_db.db.get_storage_info(),
+        "write_coordinator": async_db.db.get_write_metrics(),
+        "read_replica": async_db.db.get_replica_metrics(),
+        "stats_cache": stats_cache.metrics(),
+    }
 
 
 if __name__ == "__main__":
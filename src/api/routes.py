@@ -5,12 +5,17 @@ Web APIのエンドポイントを定義します。
 """
 
 from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
-from datetime import datetime
+from datetime import date, datetime, timezone
 
 from ..models.study_record import StudyRecord
-from ..database.connection import DatabaseManager
+from ..database.backends import create_database_manager
+from ..database.async_manager import AsyncDatabaseManager
+from ..database.filters import RecordFilter
+from ..database.rollups import DEFAULT_HABIT_WINDOWS, DEFAULT_PERCENTS
+from .cache import StatsCache
 
 router = APIRouter(tags=["学習記録"])
 
@@ -41,6 +46,11 @@ class StudyRecordResponse(BaseModel):
 
     model_config = {"from_attributes": True}
 
+class StudyRecordSearchResult(BaseModel):
+    record: StudyRecordResponse
+    title_highlight: str = Field(..., description="一致箇所を【】で囲んだタイトル")
+    content_snippet: Optional[str] = Field(None, description="一致箇所を【】で囲んだ内容の抜粋")
+
 # ページネーション用モデル
 class PaginationInfo(BaseModel):
     page: int
@@ -54,6 +64,10 @@ class PaginatedStudyRecords(BaseModel):
     items: List[StudyRecordResponse]
     pagination: PaginationInfo
 
+class CursorStudyRecords(BaseModel):
+    items: List[StudyRecordResponse]
+    next_cursor: Optional[str] = Field(None, description="次のページのカーソル（最後のページではnull）")
+
 # 詳細統計情報用モデル
 class CategoryStats(BaseModel):
     category: str
@@ -76,45 +90,99 @@ class TimeDistributionStats(BaseModel):
     long_time: int   # 2時間以上
     total_records: int
 
+class PercentileStats(BaseModel):
+    count: int
+    percentiles: Dict[str, Optional[float]]  # パーセント -> 学習時間（分）
+
+class MovingAverageStats(BaseModel):
+    window: int  # 日数
+    total_time: int
+    average_time: float  # 1日あたり（記録のない日を含む）
+    study_days: int
+
+class HabitStats(BaseModel):
+    today: str
+    current_streak: int
+    current_streak_start: Optional[str]
+    longest_streak: int
+    longest_streak_start: Optional[str]
+    longest_streak_end: Optional[str]
+    moving_averages: List[MovingAverageStats]
+
 class TimelineStats(BaseModel):
     date: str
     total_time: int
     total_hours: float
     count: int
 
-# データベースマネージャーのインスタンス
-db = DatabaseManager()
+class AllStats(BaseModel):
+    summary: Dict[str, Any]
+    category: List[CategoryStats]
+    difficulty: List[DifficultyStats]
+    time_distribution: TimeDistributionStats
+    timeline: List[TimelineStats]
+
+# データベースマネージャーのインスタンス（環境変数 STUDY_TRACKER_DATABASE_URL で選択）
+db = create_database_manager()
+# ルートからはイベントループをブロックしないよう、ワーカースレッド経由で呼び出す
+async_db = AsyncDatabaseManager(db)
+# 統計の結果のキャッシュ（データのバージョンが変わるまで再利用する。
+# 他のプロセスの書き込みを検知できないデータベースでは有効期間も設ける）
+stats_cache = StatsCache.from_env(db.tracks_external_writes)
+
+async def cached_stats(endpoint: str, compute, **params):
+    """統計をキャッシュから返す（データが変わっていなければ再計算しない）"""
+    # 計算より先にバージョンを読む（計算中の書き込みで古い結果が残らないように）
+    version = async_db.db.data_version
+    key = (endpoint, tuple(sorted(params.items())))
+    hit, value = stats_cache.get(key, version)
+    if hit:
+        return value
+
+    value = await compute(**params)
+    stats_cache.put(key, version, value)
+    return value
 
 @router.get("/study-records", response_model=List[StudyRecordResponse], tags=["学習記録"])
 async def get_study_records():
     """学習記録一覧を取得（非推奨: ページネーション機能付きのエンドポイントを使用してください）"""
-    records = db.get_all_study_records()
+    records = await async_db.get_all_study_records()
     return records
 
 @router.get("/study-records/paginated", response_model=PaginatedStudyRecords, tags=["学習記録"])
 async def get_study_records_paginated(
     page: int = Query(1, ge=1, description="ページ番号（1から開始）"),
     limit: int = Query(10, ge=1, le=100, description="1ページあたりの件数（1-100）"),
-    offset: int = Query(0, ge=0, description="スキップする件数")
+    offset: int = Query(0, ge=0, description="スキップする件数"),
+    category: Optional[str] = Query(None, max_length=50, description="カテゴリ（完全一致）"),
+    difficulty: Optional[int] = Query(None, ge=1, le=5, description="難易度（1-5）"),
+    min_time: Optional[int] = Query(None, ge=0, description="最小学習時間（分）"),
+    max_time: Optional[int] = Query(None, ge=0, description="最大学習時間（分）"),
+    search: Optional[str] = Query(None, max_length=200, description="タイトル・内容のキーワード"),
+    days: Optional[int] = Query(None, ge=1, description="過去N日間の記録のみ")
 ):
-    """ページネーション機能付きで学習記録一覧を取得"""
+    """ページネーション機能付きで学習記録一覧を取得（条件による絞り込みも可能）"""
     # オフセットの計算
     actual_offset = (page - 1) * limit + offset
     
-    # 全件数を取得
-    all_records = db.get_all_study_records()
-    total_items = len(all_records)
+    # 絞り込み条件
+    record_filter = RecordFilter(
+        category=category,
+        difficulty=difficulty,
+        min_time=min_time,
+        max_time=max_time,
+        keyword=search,
+        days=days
+    )
+    
+    # 指定された範囲のレコードと全件数をSQLで取得
+    paginated_records, total_items = await async_db.get_study_records_page(limit, actual_offset, record_filter)
     
     # ページネーション計算
     total_pages = (total_items + limit - 1) // limit
     has_next = page < total_pages
     has_prev = page > 1
     
-    # 指定された範囲のレコードを取得
-    start_index = actual_offset
-    end_index = start_index + limit
-    paginated_records = all_records[start_index:end_index]
-    
     # ページネーション情報を作成
     pagination_info = PaginationInfo(
         page=page,
@@ -130,10 +198,63 @@ async def get_study_records_paginated(
         pagination=pagination_info
     )
 
+@router.get("/study-records/scroll", response_model=CursorStudyRecords, tags=["学習記録"])
+async def get_study_records_by_cursor(
+    cursor: Optional[str] = Query(None, description="前回のレスポンスのnext_cursor（省略時は先頭から）"),
+    limit: int = Query(20, ge=1, le=100, description="取得件数（1-100）")
+):
+    """カーソル方式で学習記録一覧を取得（無限スクロール向け）"""
+    try:
+        records, next_cursor = await async_db.list_after(cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return CursorStudyRecords(items=records, next_cursor=next_cursor)
+
+@router.get("/study-records/search", response_model=List[StudyRecordSearchResult], tags=["学習記録"])
+async def search_study_records(
+    q: str = Query(..., min_length=1, max_length=200, description="検索キーワード"),
+    fields: List[str] = Query(["title", "content"], description="検索対象（title / content）"),
+    limit: int = Query(20, ge=1, le=100, description="最大件数（1-100）"),
+    case_sensitive: bool = Query(False, description="大文字小文字を区別する")
+):
+    """学習記録を全文検索（関連度順、一致箇所を強調表示）"""
+    try:
+        return await async_db.search(q, fields=fields, limit=limit, case_sensitive=case_sensitive)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/study-records/export", tags=["学習記録"])
+async def export_study_records(
+    category: Optional[str] = Query(None, max_length=50, description="カテゴリ（完全一致）"),
+    difficulty: Optional[int] = Query(None, ge=1, le=5, description="難易度（1-5）"),
+    min_time: Optional[int] = Query(None, ge=0, description="最小学習時間（分）"),
+    max_time: Optional[int] = Query(None, ge=0, description="最大学習時間（分）"),
+    search: Optional[str] = Query(None, max_length=200, description="タイトル・内容の検索キーワード"),
+    days: Optional[int] = Query(None, ge=1, description="過去N日間の記録のみ")
+):
+    """学習記録をNDJSON（1行1件のJSON）で新しい順にストリーミング出力"""
+    record_filter = RecordFilter(
+        category=category,
+        difficulty=difficulty,
+        min_time=min_time,
+        max_time=max_time,
+        keyword=search,
+        days=days
+    )
+    
+    # 件数によらずメモリ使用量が一定になるよう、読み込みながら送信する
+    # （同期ジェネレーターはStarletteがスレッドプールで反復するためイベントループを塞がない）
+    def generate_lines():
+        for record in db.iter_study_records(record_filter):
+            yield StudyRecordResponse.model_validate(record).model_dump_json() + "\n"
+    
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
+
 @router.get("/study-records/{record_id}", response_model=StudyRecordResponse, tags=["学習記録"])
 async def get_study_record(record_id: int):
     """学習記録の詳細を取得"""
-    record = db.get_study_record(record_id)
+    record = await async_db.get_study_record(record_id)
     if not record:
         raise HTTPException(status_code=404, detail="学習記録が見つかりません")
     return record
@@ -149,8 +270,8 @@ async def create_study_record(record_data: StudyRecordCreate):
         difficulty=record_data.difficulty
     )
     
-    record_id = db.add_study_record(record)
-    created_record = db.get_study_record(record_id)
+    record_id = await async_db.add_study_record(record)
+    created_record = await async_db.get_study_record(record_id)
     return created_record
 
 @router.put("/study-records/{record_id}", response_model=StudyRecordResponse, tags=["学習記録"])
@@ -165,17 +286,17 @@ async def update_study_record(record_id: int, record_data: StudyRecordUpdate):
     if not update_data:
         raise HTTPException(status_code=400, detail="更新するデータが指定されていません")
     
-    success = db.update_study_record(record_id, **update_data)
+    success = await async_db.update_study_record(record_id, **update_data)
     if not success:
         raise HTTPException(status_code=404, detail="学習記録が見つかりません")
     
-    updated_record = db.get_study_record(record_id)
+    updated_record = await async_db.get_study_record(record_id)
     return updated_record
 
 @router.delete("/study-records/{record_id}", tags=["学習記録"])
 async def delete_study_record(record_id: int):
     """学習記録を削除"""
-    success = db.delete_study_record(record_id)
+    success = await async_db.delete_study_record(record_id)
     if not success:
         raise HTTPException(status_code=404, detail="学習記録が見つかりません")
     
@@ -184,9 +305,15 @@ async def delete_study_record(record_id: int):
 @router.get("/study-records/stats/summary", tags=["統計情報"])
 async def get_study_stats():
     """学習統計情報を取得"""
-    records = db.get_all_study_records()
-    
-    if not records:
+    return await cached_stats("summary", compute_study_stats)
+
+async def compute_study_stats():
+    """学習統計情報を集計"""
+    return build_study_stats(await async_db.get_totals(), await async_db.get_category_totals())
+
+def build_study_stats(totals, category_totals):
+    """全体・カテゴリ別の集計から学習統計情報を作成"""
+    if not totals["count"]:
         return {
             "total_records": 0,
             "total_study_time": 0,
@@ -194,20 +321,21 @@ async def get_study_stats():
             "categories": {}
         }
     
-    total_time = sum(record.study_time for record in records)
-    avg_difficulty = sum(record.difficulty for record in records) / len(records)
+    total_time = totals["total_time"]
+    avg_difficulty = totals["difficulty_sum"] / totals["count"]
     
-    # カテゴリ別統計
+    # カテゴリ別統計（カテゴリ未設定の記録は含めない）
     categories = {}
-    for record in records:
-        if record.category:
-            if record.category not in categories:
-                categories[record.category] = {"count": 0, "total_time": 0}
-            categories[record.category]["count"] += 1
-            categories[record.category]["total_time"] += record.study_time
+    for stats in category_totals:
+        if stats["category"] is None:
+            continue
+        categories[stats["category"]] = {
+            "count": stats["count"],
+            "total_time": stats["total_time"]
+        }
     
     return {
-        "total_records": len(records),
+        "total_records": totals["count"],
         "total_study_time": total_time,
         "total_study_hours": round(total_time / 60, 2),
         "average_difficulty": round(avg_difficulty, 2),
@@ -217,33 +345,24 @@ async def get_study_stats():
 @router.get("/study-records/stats/category", response_model=List[CategoryStats], tags=["統計情報"])
 async def get_category_stats():
     """カテゴリ別詳細統計情報を取得"""
-    records = db.get_all_study_records()
-    
-    if not records:
-        return []
-    
-    # カテゴリ別統計を計算
-    category_stats = {}
-    for record in records:
-        if record.category:
-            if record.category not in category_stats:
-                category_stats[record.category] = {
-                    "count": 0,
-                    "total_time": 0,
-                    "difficulties": []
-                }
-            category_stats[record.category]["count"] += 1
-            category_stats[record.category]["total_time"] += record.study_time
-            category_stats[record.category]["difficulties"].append(record.difficulty)
-    
-    # CategoryStatsオブジェクトに変換
+    return await cached_stats("category", compute_category_stats)
+
+async def compute_category_stats():
+    """カテゴリ別詳細統計情報を集計"""
+    return build_category_stats(await async_db.get_category_totals())
+
+def build_category_stats(category_totals):
+    """カテゴリ別の集計からカテゴリ別詳細統計情報を作成"""
+    # CategoryStatsオブジェクトに変換（カテゴリ未設定の記録は含めない）
     result = []
-    for category, stats in category_stats.items():
-        avg_difficulty = sum(stats["difficulties"]) / len(stats["difficulties"])
+    for stats in category_totals:
+        if stats["category"] is None:
+            continue
+        avg_difficulty = stats["difficulty_sum"] / stats["count"]
         avg_time = stats["total_time"] / stats["count"]
         
         result.append(CategoryStats(
-            category=category,
+            category=stats["category"],
             count=stats["count"],
             total_time=stats["total_time"],
             total_hours=round(stats["total_time"] / 60, 2),
@@ -256,30 +375,21 @@ async def get_category_stats():
 @router.get("/study-records/stats/difficulty", response_model=List[DifficultyStats], tags=["統計情報"])
 async def get_difficulty_stats():
     """難易度別詳細統計情報を取得"""
-    records = db.get_all_study_records()
-    
-    if not records:
-        return []
-    
-    # 難易度別統計を計算
-    difficulty_stats = {}
-    for record in records:
-        difficulty = record.difficulty
-        if difficulty not in difficulty_stats:
-            difficulty_stats[difficulty] = {
-                "count": 0,
-                "total_time": 0
-            }
-        difficulty_stats[difficulty]["count"] += 1
-        difficulty_stats[difficulty]["total_time"] += record.study_time
-    
+    return await cached_stats("difficulty", compute_difficulty_stats)
+
+async def compute_difficulty_stats():
+    """難易度別詳細統計情報を集計"""
+    return build_difficulty_stats(await async_db.get_difficulty_totals())
+
+def build_difficulty_stats(difficulty_totals):
+    """難易度別の集計から難易度別詳細統計情報を作成"""
     # DifficultyStatsオブジェクトに変換
     result = []
-    for difficulty, stats in difficulty_stats.items():
+    for stats in difficulty_totals:
         avg_time = stats["total_time"] / stats["count"]
         
         result.append(DifficultyStats(
-            difficulty=difficulty,
+            difficulty=stats["difficulty"],
             count=stats["count"],
             total_time=stats["total_time"],
             total_hours=round(stats["total_time"] / 60, 2),
@@ -291,68 +401,120 @@ async def get_difficulty_stats():
 @router.get("/study-records/stats/time-distribution", response_model=TimeDistributionStats, tags=["統計情報"])
 async def get_time_distribution_stats():
     """学習時間分布統計情報を取得"""
-    records = db.get_all_study_records()
-    
-    if not records:
-        return TimeDistributionStats(
-            short_time=0,
-            medium_time=0,
-            long_time=0,
-            total_records=0
+    return await cached_stats("time-distribution", compute_time_distribution_stats)
+
+async def compute_time_distribution_stats():
+    """学習時間分布統計情報を集計"""
+    return TimeDistributionStats(**await async_db.get_time_distribution())
+
+@router.get("/study-records/stats/percentiles", response_model=PercentileStats, tags=["統計情報"])
+async def get_percentile_stats(
+    p: Optional[List[float]] = Query(None, description="求めるパーセント（0-100、複数指定可。省略時は50, 90, 99）"),
+    category: Optional[str] = Query(None, max_length=50, description="カテゴリ（完全一致）"),
+    date_from: Optional[date] = Query(None, alias="from", description="最初の日付（UTC）"),
+    date_to: Optional[date] = Query(None, alias="to", description="最後の日付（UTC）")
+):
+    """
+    学習時間の分位点（中央値・p90など）を取得
+
+    カテゴリ別・日別の学習時間のヒストグラムから計算するため、記録の件数によらず一定の時間で返します。
+    カテゴリと期間は同時に指定できません。
+    """
+    try:
+        return await cached_stats(
+            "percentiles", compute_percentile_stats,
+            percents=tuple(p or DEFAULT_PERCENTS), category=category, start=date_from, end=date_to
         )
-    
-    # 時間分布を計算
-    short_time = 0  # 30分未満
-    medium_time = 0  # 30分-2時間
-    long_time = 0   # 2時間以上
-    
-    for record in records:
-        if record.study_time < 30:
-            short_time += 1
-        elif record.study_time < 120:
-            medium_time += 1
-        else:
-            long_time += 1
-    
-    return TimeDistributionStats(
-        short_time=short_time,
-        medium_time=medium_time,
-        long_time=long_time,
-        total_records=len(records)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def compute_percentile_stats(percents, category: Optional[str], start: Optional[date], end: Optional[date]):
+    """学習時間の分位点を集計"""
+    stats = await async_db.get_study_time_percentiles(percents, category, start, end)
+    return PercentileStats(
+        count=stats["count"],
+        percentiles={f"{percent:g}": value for percent, value in stats["percentiles"].items()}
     )
 
+@router.get("/study-records/stats/habits", response_model=HabitStats, tags=["統計情報"])
+async def get_habit_stats(
+    window: Optional[List[int]] = Query(None, description="移動平均の期間（日数、複数指定可。省略時は7, 30）")
+):
+    """
+    学習習慣の統計（現在・最長の連続学習日数と、直近の期間の1日あたりの平均学習時間）を取得
+
+    日付はUTCの日付です。今日か昨日まで続いている連続学習を現在の連続学習とします。
+    """
+    try:
+        return await cached_stats(
+            "habits", compute_habit_stats,
+            today=datetime.now(timezone.utc).date(), windows=tuple(window or DEFAULT_HABIT_WINDOWS)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def compute_habit_stats(today: date, windows):
+    """学習習慣の統計を集計"""
+    return HabitStats(**await async_db.get_habit_stats(today, windows))
+
 @router.get("/study-records/stats/timeline", response_model=List[TimelineStats], tags=["統計情報"])
-async def get_timeline_stats():
-    """時系列統計情報を取得"""
-    records = db.get_all_study_records()
-    
-    if not records:
-        return []
-    
-    # 日別統計を計算
-    timeline_stats = {}
-    for record in records:
-        # 日付を文字列に変換（YYYY-MM-DD形式）
-        date_str = record.created_at.strftime("%Y-%m-%d")
-        
-        if date_str not in timeline_stats:
-            timeline_stats[date_str] = {
-                "total_time": 0,
-                "count": 0
-            }
-        timeline_stats[date_str]["total_time"] += record.study_time
-        timeline_stats[date_str]["count"] += 1
-    
-    # TimelineStatsオブジェクトに変換
+async def get_timeline_stats(
+    bucket: Optional[str] = Query(None, pattern="^(day|week|month)$", description="集計の区間（day/week/month）"),
+    tz: Optional[str] = Query(None, max_length=64, description="日付の区切りに使うタイムゾーン（例: Asia/Tokyo, +09:00。省略時はUTC）"),
+    date_from: Optional[date] = Query(None, alias="from", description="最初の日付（省略時は最も古い記録の日付）"),
+    date_to: Optional[date] = Query(None, alias="to", description="最後の日付（省略時は最も新しい記録の日付）")
+):
+    """
+    時系列統計情報を取得
+
+    パラメータを指定しない場合は、記録のある日ごとの統計を返します。
+    いずれかを指定した場合は、from から to までの区間ごとの統計を、記録のない区間も0として返します。
+    """
+    if bucket is None and tz is None and date_from is None and date_to is None:
+        return await cached_stats("timeline", compute_timeline_stats)
+
+    try:
+        return await cached_stats(
+            "timeline", compute_timeline_range_stats,
+            bucket=bucket or "day", tz=tz, start=date_from, end=date_to
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def compute_timeline_stats():
+    """時系列統計情報を集計"""
+    return build_timeline_stats(await async_db.get_daily_totals())
+
+async def compute_timeline_range_stats(bucket: str, tz: Optional[str], start: Optional[date], end: Optional[date]):
+    """区間ごとの時系列統計情報を集計"""
+    return build_timeline_stats(await async_db.get_timeline_totals(bucket, tz, start, end))
+
+def build_timeline_stats(daily_totals):
+    """日別の集計から時系列統計情報を作成"""
+    # TimelineStatsオブジェクトに変換（日付順）
     result = []
-    for date_str, stats in timeline_stats.items():
+    for stats in daily_totals:
         result.append(TimelineStats(
-            date=date_str,
+            date=stats["date"],
             total_time=stats["total_time"],
             total_hours=round(stats["total_time"] / 60, 2),
             count=stats["count"]
         ))
     
-    # 日付順にソート
-    result.sort(key=lambda x: x.date)
-    return result
\ No newline at end of file
+    return result
+
+@router.get("/study-records/stats/all", response_model=AllStats, tags=["統計情報"])
+async def get_all_stats():
+    """全統計情報（summary・category・difficulty・time-distribution・timeline）をまとめて取得"""
+    return await cached_stats("all", compute_all_stats)
+
+async def compute_all_stats():
+    """全統計情報を1回の集計で作成"""
+    totals = await async_db.get_all_totals()
+    return AllStats(
+        summary=build_study_stats(totals["totals"], totals["categories"]),
+        category=build_category_stats(totals["categories"]),
+        difficulty=build_difficulty_stats(totals["difficulties"]),
+        time_distribution=TimeDistributionStats(**totals["time_distribution"]),
+        timeline=build_timeline_stats(totals["daily"])
+    )
\ No newline at end of file
@@ -6,10 +6,31 @@ CLIメインエントリーポイント
 
 import argparse
 import sys
+from pathlib import Path
 from typing import Optional
 
 from ..models.study_record import StudyRecord
+from ..database import revisions
+from ..database.backup import (
+    DEFAULT_PAGES_PER_STEP,
+    default_backup_path,
+    rotate_backups,
+)
+from ..database.backends import create_database_manager, get_database_url
 from ..database.connection import DatabaseManager
+from ..database.filters import RecordFilter
+from ..database.rollups import DEFAULT_PERCENTS
+
+
+def percent(value: str) -> float:
+    """--percentiles の値（0〜100のパーセント）を変換する argparse の型"""
+    try:
+        result = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"数値を指定してください: {value}")
+    if not 0 <= result <= 100:
+        raise argparse.ArgumentTypeError(f"0〜100の範囲で指定してください: {value}")
+    return result
 
 
 def main():
@@ -21,9 +42,13 @@ def main():
 使用例:
   study-tracker add "Python学習" --content "FastAPIの基礎" --time 60 --category "プログラミング"
   study-tracker list
+  study-tracker list --after
   study-tracker show 1
   study-tracker update 1 --title "新しいタイトル"
   study-tracker delete 1
+  study-tracker backup --gzip --keep 7
+  study-tracker check-rollups
+  study-tracker db upgrade
         """,
     )
 
@@ -58,6 +83,13 @@ def main():
     )
     list_parser.add_argument("--search", help="タイトル・内容でキーワード検索")
     list_parser.add_argument("--days", type=int, help="過去N日間の記録のみ表示")
+    list_parser.add_argument(
+        "--after",
+        nargs="?",
+        const="",
+        metavar="CURSOR",
+        help="カーソル方式で表示（CURSOR省略時は先頭から。表示された次のカーソルを渡す）",
+    )
 
     # show コマンド
     show_parser = subparsers.add_parser("show", help="学習記録の詳細を表示")
@@ -92,6 +124,23 @@ def main():
     stats_parser.add_argument(
         "--difficulty", action="store_true", help="難易度別統計を表示"
     )
+    stats_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="カテゴリ別・難易度別・学習時間の分布・分位点・学習習慣・日別の統計をすべて表示",
+    )
+    stats_parser.add_argument(
+        "--habits",
+        action="store_true",
+        help="学習習慣（連続学習日数・直近7日間/30日間の平均学習時間）を表示",
+    )
+    stats_parser.add_argument(
+        "--percentiles",
+        nargs="*",
+        type=percent,
+        metavar="P",
+        help="学習時間の分位点を表示（パーセントを複数指定可、省略時は50 90 99）",
+    )
 
     # search コマンド
     search_parser = subparsers.add_parser("search", help="学習記録を検索")
@@ -128,37 +177,113 @@ def main():
         "--all-fields", action="store_true", help="全フィールドをエクスポート"
     )
 
+    # backup コマンド
+    backup_parser = subparsers.add_parser("backup", help="データベースをバックアップ")
+    backup_parser.add_argument(
+        "--output",
+        "-o",
+        default="backups",
+        help="バックアップ先のファイルまたはディレクトリ（デフォルト: backups）",
+    )
+    backup_parser.add_argument("--gzip", action="store_true", help="gzipで圧縮")
+    backup_parser.add_argument(
+        "--keep", type=int, help="残すバックアップの数（古いものから削除）"
+    )
+    backup_parser.add_argument(
+        "--pages",
+        type=int,
+        default=DEFAULT_PAGES_PER_STEP,
+        help="1ステップでコピーするページ数（-1なら一度にすべて）",
+    )
+    backup_parser.add_argument(
+        "--no-verify", action="store_true", help="整合性チェックを省略"
+    )
+
+    # restore コマンド
+    restore_parser = subparsers.add_parser(
+        "restore", help="バックアップからデータベースを復元"
+    )
+    restore_parser.add_argument(
+        "file", help="バックアップファイル（.db または .db.gz）"
+    )
+    restore_parser.add_argument(
+        "--no-verify", action="store_true", help="整合性チェックを省略"
+    )
+
+    # rebuild-rollups / check-rollups コマンド
+    subparsers.add_parser(
+        "rebuild-rollups", help="統計用の集計（ロールアップ）を学習記録から作り直す"
+    )
+    subparsers.add_parser(
+        "check-rollups", help="統計用の集計（ロールアップ）が学習記録と一致するか確認"
+    )
+
+    # db コマンド
+    db_parser = subparsers.add_parser("db", help="データベースのスキーマを管理")
+    db_subparsers = db_parser.add_subparsers(dest="db_command", required=True)
+    upgrade_parser = db_subparsers.add_parser(
+        "upgrade", help="スキーマを最新のリビジョンまで更新"
+    )
+    upgrade_parser.add_argument(
+        "--revision", default="head", help="更新先のリビジョン（デフォルト: head）"
+    )
+    db_subparsers.add_parser("current", help="適用済みのリビジョンを表示")
+
     args = parser.parse_args()
 
     if not args.command:
         parser.print_help()
         return
 
-    # データベースマネージャーを初期化
-    db = DatabaseManager()
-
     try:
-        if args.command == "add":
-            handle_add(db, args)
-        elif args.command == "list":
-            handle_list(db, args)
-        elif args.command == "show":
-            handle_show(db, args)
-        elif args.command == "update":
-            handle_update(db, args)
-        elif args.command == "delete":
-            handle_delete(db, args)
-        elif args.command == "stats":
-            handle_stats(db, args)
-        elif args.command == "search":
-            handle_search(db, args)
-        elif args.command == "export":
-            handle_export(db, args)
+        # スキーマの更新は起動時のリビジョン確認より前に行う
+        if args.command == "db":
+            handle_db(args)
+            return
+
+        # データベースマネージャーを初期化（環境変数 STUDY_TRACKER_DATABASE_URL で選択）
+        # CLIは1コマンドで終了するため、起動時に全体を読み込むレプリカは使わない
+        db = create_database_manager(read_replica=False)
+
+        handlers = {
+            "add": handle_add,
+            "list": handle_list,
+            "show": handle_show,
+            "update": handle_update,
+            "delete": handle_delete,
+            "stats": handle_stats,
+            "search": handle_search,
+            "export": handle_export,
+            "backup": handle_backup,
+            "restore": handle_restore,
+            "rebuild-rollups": handle_rebuild_rollups,
+            "check-rollups": handle_check_rollups,
+        }
+        handlers[args.command](db, args)
     except Exception as e:
         print(f"エラー: {e}", file=sys.stderr)
         sys.exit(1)
 
 
+def handle_db(args):
+    """スキーマ管理処理（Alembic）"""
+    database_url = get_database_url()
+    before = revisions.current_revision(database_url)
+
+    if args.db_command == "current":
+        print(
+            f"現在のリビジョン: {before or '未管理'}（最新: {revisions.HEAD_REVISION}）"
+        )
+        return
+
+    revisions.upgrade(database_url, args.revision)
+    after = revisions.current_revision(database_url)
+    if before == after:
+        print(f"✅ スキーマは最新です（リビジョン: {after}）")
+    else:
+        print(f"✅ スキーマを更新しました（{before or '未管理'} → {after}）")
+
+
 def handle_add(db: DatabaseManager, args):
     """学習記録追加処理"""
     record = StudyRecord(
@@ -177,23 +302,47 @@ def handle_add(db: DatabaseManager, args):
 
 def handle_list(db: DatabaseManager, args):
     """学習記録一覧表示処理"""
-    records = db.get_all_study_records()
+    if args.after is not None:
+        handle_list_after(db, args)
+        return
 
-    if not records:
-        print("📝 学習記録がありません")
+    # 条件の絞り込みと件数制限はSQL側で行う
+    record_filter = build_record_filter(args)
+    total = db.count_study_records(record_filter)
+
+    if not total:
+        if db.count_study_records():
+            print("📝 条件に一致する学習記録がありません")
+        else:
+            print("📝 学習記録がありません")
         return
 
-    # フィルタリング処理
-    filtered_records = filter_records(records, args)
+    print(f"📚 学習記録一覧 (条件に一致: {total}件)")
+    print("-" * 60)
+
+    for record in db.find_study_records(record_filter.replace(limit=args.limit)):
+        print(f"ID: {record.id} | {record.title}")
+        print(
+            f"   時間: {record.study_time}分 | カテゴリ: {record.category or '未設定'}"
+        )
+        print(
+            f"   難易度: {'⭐' * record.difficulty} | 作成日: {record.created_at.strftime('%Y-%m-%d %H:%M')}"
+        )
+        print()
 
-    if not filtered_records:
-        print("📝 条件に一致する学習記録がありません")
+
+def handle_list_after(db: DatabaseManager, args):
+    """カーソル方式の学習記録一覧表示処理"""
+    records, next_cursor = db.list_after(args.after or None, args.limit)
+
+    if not records:
+        print("📝 学習記録がありません")
         return
 
-    print(f"📚 学習記録一覧 (条件に一致: {len(filtered_records)}件)")
+    print(f"📚 学習記録一覧 ({len(records)}件)")
     print("-" * 60)
 
-    for record in filtered_records[: args.limit]:
+    for record in records:
         print(f"ID: {record.id} | {record.title}")
         print(
             f"   時間: {record.study_time}分 | カテゴリ: {record.category or '未設定'}"
@@ -203,6 +352,9 @@ def handle_list(db: DatabaseManager, args):
         )
         print()
 
+    if next_cursor:
+        print(f"次のページ: study-tracker list --after {next_cursor}")
+
 
 def handle_show(db: DatabaseManager, args):
     """学習記録詳細表示処理"""
@@ -262,182 +414,209 @@ def handle_delete(db: DatabaseManager, args):
 
 def handle_stats(db: DatabaseManager, args):
     """学習統計情報表示処理"""
-    records = db.get_all_study_records()
+    # 記録を読み込まず、すべての集計を1回のクエリでまとめて読む
+    all_totals = db.get_all_totals()
+    show_all = args.all
 
-    if not records:
+    if not all_totals["totals"]["count"]:
         print("📊 学習統計")
         print("-" * 40)
         print("学習記録がありません")
         return
 
-    # 基本統計
-    total_records = len(records)
-    total_time = sum(record.study_time for record in records)
+    print_summary(all_totals)
+    if args.category or show_all:
+        print_category_stats(all_totals)
+    if args.difficulty or show_all:
+        print_difficulty_stats(all_totals)
+    if show_all:
+        print_distribution(all_totals)
+    print_percentiles(db, args)
+    if args.habits or show_all:
+        print_habits(db)
+    if show_all:
+        print_daily_stats(all_totals)
+    if args.period != "all":
+        print_period_stats(db, args.period)
+
+
+def print_summary(all_totals: dict):
+    """基本統計を表示"""
+    totals = all_totals["totals"]
+    total_records = totals["count"]
+    total_time = totals["total_time"]
     total_hours = total_time / 60
-    avg_difficulty = sum(record.difficulty for record in records) / total_records
+    avg_difficulty = totals["difficulty_sum"] / total_records
+    dates = [day["date"] for day in all_totals["daily"] if day["date"]]
 
     print("📊 学習統計サマリー")
     print("-" * 40)
     print(f"総学習記録数: {total_records}件")
     print(f"総学習時間: {total_time}分 ({total_hours:.1f}時間)")
     print(f"平均難易度: {avg_difficulty:.1f} ({'⭐' * round(avg_difficulty)})")
-    print(
-        f"学習期間: {min(record.created_at for record in records).strftime('%Y-%m-%d')} 〜 {max(record.created_at for record in records).strftime('%Y-%m-%d')}"
-    )
+    if dates:
+        print(f"学習期間: {dates[0]} 〜 {dates[-1]}")
     print()
 
-    # カテゴリ別統計
-    if args.category:
-        print("📂 カテゴリ別統計")
-        print("-" * 40)
-        categories = {}
-        for record in records:
-            category = record.category or "未分類"
-            if category not in categories:
-                categories[category] = {
-                    "count": 0,
-                    "total_time": 0,
-                    "avg_difficulty": 0,
-                }
-            categories[category]["count"] += 1
-            categories[category]["total_time"] += record.study_time
-            categories[category]["avg_difficulty"] += record.difficulty
-
-        for category, stats in categories.items():
-            avg_diff = stats["avg_difficulty"] / stats["count"]
-            print(f"{category}:")
-            print(f"  記録数: {stats['count']}件")
-            print(
-                f"  学習時間: {stats['total_time']}分 ({stats['total_time']/60:.1f}時間)"
-            )
-            print(f"  平均難易度: {avg_diff:.1f} ({'⭐' * round(avg_diff)})")
-            print()
 
-    # 難易度別統計
-    if args.difficulty:
-        print("⭐ 難易度別統計")
-        print("-" * 40)
-        difficulty_stats = {}
-        for i in range(1, 6):
-            difficulty_stats[i] = {"count": 0, "total_time": 0}
+def print_category_stats(all_totals: dict):
+    """カテゴリ別統計を表示"""
+    print("📂 カテゴリ別統計")
+    print("-" * 40)
+    for stats in all_totals["categories"]:
+        avg_diff = stats["difficulty_sum"] / stats["count"]
+        print(f"{stats['category'] or '未分類'}:")
+        print(f"  記録数: {stats['count']}件")
+        print(f"  学習時間: {stats['total_time']}分 ({stats['total_time']/60:.1f}時間)")
+        print(f"  平均難易度: {avg_diff:.1f} ({'⭐' * round(avg_diff)})")
+        print()
 
-        for record in records:
-            difficulty_stats[record.difficulty]["count"] += 1
-            difficulty_stats[record.difficulty]["total_time"] += record.study_time
-
-        for difficulty, stats in difficulty_stats.items():
-            if stats["count"] > 0:
-                print(f"難易度 {difficulty} ({'⭐' * difficulty}):")
-                print(f"  記録数: {stats['count']}件")
-                print(
-                    f"  学習時間: {stats['total_time']}分 ({stats['total_time']/60:.1f}時間)"
-                )
-                print()
 
-    # 期間別統計
-    if args.period != "all":
-        print(f"📅 {args.period.title()}統計")
-        print("-" * 40)
-        from datetime import datetime, timedelta
-
-        now = datetime.now()
-        if args.period == "daily":
-            start_date = now - timedelta(days=1)
-            period_name = "今日"
-        elif args.period == "weekly":
-            start_date = now - timedelta(days=7)
-            period_name = "過去7日間"
-        elif args.period == "monthly":
-            start_date = now - timedelta(days=30)
-            period_name = "過去30日間"
-
-        period_records = [r for r in records if r.created_at >= start_date]
-        if period_records:
-            period_time = sum(r.study_time for r in period_records)
-            print(f"{period_name}の学習記録: {len(period_records)}件")
-            print(
-                f"{period_name}の学習時間: {period_time}分 ({period_time/60:.1f}時間)"
-            )
-        else:
-            print(f"{period_name}の学習記録はありません")
+def print_difficulty_stats(all_totals: dict):
+    """難易度別統計を表示"""
+    print("⭐ 難易度別統計")
+    print("-" * 40)
+    for stats in sorted(
+        all_totals["difficulties"], key=lambda stats: stats["difficulty"] or 0
+    ):
+        difficulty = stats["difficulty"] or 0
+        print(f"難易度 {difficulty} ({'⭐' * difficulty}):")
+        print(f"  記録数: {stats['count']}件")
+        print(f"  学習時間: {stats['total_time']}分 ({stats['total_time']/60:.1f}時間)")
+        print()
 
 
-def filter_records(records, args):
-    """学習記録のフィルタリング処理"""
-    filtered = records
+def print_distribution(all_totals: dict):
+    """学習時間の分布を表示"""
+    distribution = all_totals["time_distribution"]
+    print("⏱️  学習時間の分布")
+    print("-" * 40)
+    print(f"30分未満: {distribution['short_time']}件")
+    print(f"30分-2時間: {distribution['medium_time']}件")
+    print(f"2時間以上: {distribution['long_time']}件")
+    print()
 
-    # カテゴリフィルタリング
+
+def print_percentiles(db: DatabaseManager, args):
+    """学習時間の分位点を表示（ヒストグラムから一定の時間で計算）"""
+    if args.percentiles is None and not args.all:
+        return
+
+    result = db.get_study_time_percentiles(args.percentiles or DEFAULT_PERCENTS)
+    print("📐 学習時間の分位点")
+    print("-" * 40)
+    for percent, value in result["percentiles"].items():
+        print(f"p{percent:g}: {value:g}分")
+    print()
+
+
+def print_habits(db: DatabaseManager):
+    """学習習慣を表示（連続学習の期間は書き込みのたびに更新されている）"""
+    habits = db.get_habit_stats()
+    print("🔥 学習習慣")
+    print("-" * 40)
+    if habits["current_streak"]:
+        print(
+            f"現在の連続学習: {habits['current_streak']}日"
+            f"（{habits['current_streak_start']} 〜）"
+        )
+    else:
+        print("現在の連続学習: 0日")
+    if habits["longest_streak"]:
+        print(
+            f"最長の連続学習: {habits['longest_streak']}日"
+            f"（{habits['longest_streak_start']} 〜 {habits['longest_streak_end']}）"
+        )
+    for average in habits["moving_averages"]:
+        print(
+            f"直近{average['window']}日間: 平均{average['average_time']:g}分/日"
+            f"（合計{average['total_time']}分・学習した日 {average['study_days']}日）"
+        )
+    print()
+
+
+def print_daily_stats(all_totals: dict):
+    """日別統計を表示"""
+    print("📅 日別統計")
+    print("-" * 40)
+    for day in all_totals["daily"]:
+        print(
+            f"{day['date'] or '日付なし'}: {day['count']}件 "
+            f"{day['total_time']}分 ({day['total_time']/60:.1f}時間)"
+        )
+    print()
+
+
+def print_period_stats(db: DatabaseManager, period_type: str):
+    """期間別統計を表示（daily / weekly / monthly）"""
+    print(f"📅 {period_type.title()}統計")
+    print("-" * 40)
+    from datetime import datetime, timedelta
+
+    now = datetime.now()
+    if period_type == "daily":
+        start_date = now - timedelta(days=1)
+        period_name = "今日"
+    elif period_type == "weekly":
+        start_date = now - timedelta(days=7)
+        period_name = "過去7日間"
+    elif period_type == "monthly":
+        start_date = now - timedelta(days=30)
+        period_name = "過去30日間"
+
+    period = db.get_totals_since(start_date)
+    period_count, period_time = period["count"], period["total_time"]
+    if period_count:
+        print(f"{period_name}の学習記録: {period_count}件")
+        print(f"{period_name}の学習時間: {period_time}分 ({period_time/60:.1f}時間)")
+    else:
+        print(f"{period_name}の学習記録はありません")
+
+
+def build_record_filter(args) -> RecordFilter:
+    """コマンドライン引数から検索条件を作成"""
+    record_filter = RecordFilter()
+
+    # カテゴリ（部分一致）
     if hasattr(args, "category") and args.category:
-        filtered = [
-            r
-            for r in filtered
-            if r.category and args.category.lower() in r.category.lower()
-        ]
+        record_filter.category_contains = args.category
 
-    # 難易度フィルタリング
+    # 難易度
     if hasattr(args, "difficulty") and args.difficulty:
-        filtered = [r for r in filtered if r.difficulty == args.difficulty]
+        record_filter.difficulty = args.difficulty
 
-    # 学習時間フィルタリング
+    # 学習時間
     if hasattr(args, "min_time") and args.min_time:
-        filtered = [r for r in filtered if r.study_time >= args.min_time]
+        record_filter.min_time = args.min_time
     if hasattr(args, "max_time") and args.max_time:
-        filtered = [r for r in filtered if r.study_time <= args.max_time]
+        record_filter.max_time = args.max_time
 
     # キーワード検索
     if hasattr(args, "search") and args.search:
-        search_term = args.search.lower()
-        filtered = [
-            r
-            for r in filtered
-            if search_term in r.title.lower()
-            or (r.content and search_term in r.content.lower())
-        ]
-
-    # 期間フィルタリング
-    if hasattr(args, "days") and args.days:
-        from datetime import datetime, timedelta
+        record_filter.keyword = args.search
 
-        cutoff_date = datetime.now() - timedelta(days=args.days)
-        filtered = [r for r in filtered if r.created_at >= cutoff_date]
+    # 期間
+    if hasattr(args, "days") and args.days:
+        record_filter.days = args.days
 
-    return filtered
+    return record_filter
 
 
 def handle_search(db: DatabaseManager, args):
     """学習記録検索処理"""
-    records = db.get_all_study_records()
-
-    if not records:
-        print("📝 学習記録がありません")
-        return
-
-    # 検索処理
-    search_term = args.keyword
-    if not args.case_sensitive:
-        search_term = search_term.lower()
-
-    search_results = []
-    for record in records:
-        title_match = False
-        content_match = False
-
-        # タイトル検索
-        if not args.content_only:
-            title_text = record.title
-            if not args.case_sensitive:
-                title_text = title_text.lower()
-            title_match = search_term in title_text
-
-        # 内容検索
-        if not args.title_only and record.content:
-            content_text = record.content
-            if not args.case_sensitive:
-                content_text = content_text.lower()
-            content_match = search_term in content_text
-
-        if title_match or content_match:
-            search_results.append(record)
+    # 検索対象の列
+    fields = ["title", "content"]
+    if args.title_only:
+        fields = ["title"]
+    elif args.content_only:
+        fields = ["content"]
+
+    search_results = db.search(
+        args.keyword,
+        fields=fields,
+        limit=args.limit,
+        case_sensitive=args.case_sensitive,
+    )
 
     if not search_results:
         print(f"🔍 キーワード '{args.keyword}' に一致する学習記録がありません")
@@ -446,37 +625,29 @@ def handle_search(db: DatabaseManager, args):
     print(f"🔍 検索結果: '{args.keyword}' ({len(search_results)}件)")
     print("-" * 60)
 
-    for record in search_results[: args.limit]:
-        print(f"ID: {record.id} | {record.title}")
+    for result in search_results:
+        record = result["record"]
+        print(f"ID: {record.id} | {result['title_highlight']}")
         print(
             f"   時間: {record.study_time}分 | カテゴリ: {record.category or '未設定'}"
         )
         print(
             f"   難易度: {'⭐' * record.difficulty} | 作成日: {record.created_at.strftime('%Y-%m-%d %H:%M')}"
         )
-        if record.content:
-            content_preview = (
-                record.content[:50] + "..."
-                if len(record.content) > 50
-                else record.content
-            )
-            print(f"   内容: {content_preview}")
+        if result["content_snippet"]:
+            print(f"   内容: {result['content_snippet']}")
         print()
 
 
 def handle_export(db: DatabaseManager, args):
     """学習記録エクスポート処理"""
-    records = db.get_all_study_records()
+    record_filter = build_record_filter(args)
 
-    if not records:
-        print("📝 エクスポートする学習記録がありません")
-        return
-
-    # フィルタリング処理
-    filtered_records = filter_records(records, args)
-
-    if not filtered_records:
-        print("📝 条件に一致する学習記録がありません")
+    if not db.count_study_records(record_filter):
+        if db.count_study_records():
+            print("📝 条件に一致する学習記録がありません")
+        else:
+            print("📝 エクスポートする学習記録がありません")
         return
 
     # 出力ファイル名の決定
@@ -488,26 +659,27 @@ def handle_export(db: DatabaseManager, args):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"study_records_{timestamp}.{args.format}"
 
-    # エクスポート処理
+    # エクスポート処理（全件をメモリに載せず、読み込みながら書き出す）
+    records = db.iter_study_records(record_filter)
     try:
         if args.format == "csv":
-            export_to_csv(filtered_records, filename, args.all_fields)
+            count = export_to_csv(records, filename, args.all_fields)
         elif args.format == "json":
-            export_to_json(filtered_records, filename, args.all_fields)
+            count = export_to_json(records, filename, args.all_fields)
         elif args.format == "txt":
-            export_to_txt(filtered_records, filename, args.all_fields)
+            count = export_to_txt(records, filename, args.all_fields)
 
         print(f"✅ 学習記録をエクスポートしました: {filename}")
         print(f"   形式: {args.format.upper()}")
-        print(f"   件数: {len(filtered_records)}件")
+        print(f"   件数: {count}件")
 
     except Exception as e:
         print(f"❌ エクスポートに失敗しました: {e}")
         return
 
 
-def export_to_csv(records, filename, all_fields=False):
-    """CSV形式でエクスポート"""
+def export_to_csv(records, filename, all_fields=False) -> int:
+    """CSV形式でエクスポート（書き出した件数を返す）"""
     import csv
 
     with open(filename, "w", newline="", encoding="utf-8") as csvfile:
@@ -536,6 +708,7 @@ def export_to_csv(records, filename, all_fields=False):
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         writer.writeheader()
 
+        count = 0
         for record in records:
             row = {
                 "ID": record.id,
@@ -556,43 +729,62 @@ def export_to_csv(records, filename, all_fields=False):
                 )
 
             writer.writerow(row)
+            count += 1
 
+    return count
 
-def export_to_json(records, filename, all_fields=False):
-    """JSON形式でエクスポート"""
+
+def export_to_json(records, filename, all_fields=False) -> int:
+    """JSON形式でエクスポート（書き出した件数を返す）
+
+    1件ずつ書き出しつつ、json.dump(..., indent=2) と同じ出力にします。
+    """
     import json
+    import textwrap
 
-    data = []
-    for record in records:
-        record_data = {
-            "id": record.id,
-            "title": record.title,
-            "study_time_minutes": record.study_time,
-            "study_time_hours": record.get_study_hours(),
-            "category": record.category,
-            "difficulty": record.difficulty,
-            "created_at": record.created_at.isoformat(),
-        }
+    count = 0
+    with open(filename, "w", encoding="utf-8") as jsonfile:
+        jsonfile.write("[")
+        for record in records:
+            record_data = {
+                "id": record.id,
+                "title": record.title,
+                "study_time_minutes": record.study_time,
+                "study_time_hours": record.get_study_hours(),
+                "category": record.category,
+                "difficulty": record.difficulty,
+                "created_at": record.created_at.isoformat(),
+            }
 
-        if all_fields:
-            record_data.update(
-                {"content": record.content, "updated_at": record.updated_at.isoformat()}
-            )
+            if all_fields:
+                record_data.update(
+                    {
+                        "content": record.content,
+                        "updated_at": record.updated_at.isoformat(),
+                    }
+                )
 
-        data.append(record_data)
+            jsonfile.write(",\n" if count else "\n")
+            jsonfile.write(
+                textwrap.indent(
+                    json.dumps(record_data, ensure_ascii=False, indent=2), "  "
+                )
+            )
+            count += 1
+        jsonfile.write("\n]" if count else "]")
 
-    with open(filename, "w", encoding="utf-8") as jsonfile:
-        json.dump(data, jsonfile, ensure_ascii=False, indent=2)
+    return count
 
 
-def export_to_txt(records, filename, all_fields=False):
-    """テキスト形式でエクスポート"""
+def export_to_txt(records, filename, all_fields=False) -> int:
+    """テキスト形式でエクスポート（書き出した件数を返す）"""
     with open(filename, "w", encoding="utf-8") as txtfile:
         txtfile.write("StudyTracker - 学習記録エクスポート\n")
         txtfile.write("=" * 50 + "\n\n")
 
-        for i, record in enumerate(records, 1):
-            txtfile.write(f"記録 {i}: ID {record.id}\n")
+        count = 0
+        for count, record in enumerate(records, 1):
+            txtfile.write(f"記録 {count}: ID {record.id}\n")
             txtfile.write(f"タイトル: {record.title}\n")
             txtfile.write(
                 f"学習時間: {record.study_time}分 ({record.get_study_hours():.1f}時間)\n"
@@ -606,6 +798,70 @@ def export_to_txt(records, filename, all_fields=False):
 
             txtfile.write("-" * 30 + "\n\n")
 
+    return count
+
+
+def handle_backup(db: DatabaseManager, args):
+    """バックアップ処理"""
+    output = Path(args.output)
+    if output.is_dir() or not output.suffix:
+        # ディレクトリ指定の場合は日時入りのファイル名にする
+        dest = default_backup_path(output, compress=args.gzip)
+    elif args.gzip and output.suffix != ".gz":
+        # 復元時に拡張子で圧縮の有無を判定するため .gz を付ける
+        dest = output.with_name(output.name + ".gz")
+    else:
+        dest = output
+
+    result = db.backup(
+        str(dest),
+        pages_per_step=args.pages,
+        compress=dest.suffix == ".gz",
+        verify=not args.no_verify,
+    )
+    print(
+        f"✅ バックアップを作成しました: {result['path']} "
+        f"({result['size'] / 1024 / 1024:.1f}MB, {result['pages']}ページ, "
+        f"{result['seconds']:.2f}秒)"
+    )
+
+    if args.keep:
+        removed = rotate_backups(dest.parent, args.keep)
+        if removed:
+            print(f"🗑️  古いバックアップを {len(removed)} 件削除しました")
+
+
+def handle_restore(db: DatabaseManager, args):
+    """復元処理"""
+    result = db.restore(args.file, verify=not args.no_verify)
+    print(
+        f"✅ バックアップから復元しました: {result['path']} "
+        f"({result['pages']}ページ, {result['seconds']:.2f}秒)"
+    )
+
+
+def handle_rebuild_rollups(db: DatabaseManager, args):
+    """ロールアップの作り直し処理"""
+    counts = db.rebuild_rollups()
+    print("✅ ロールアップを作り直しました")
+    for table, count in counts.items():
+        print(f"  {table}: {count}行")
+
+
+def handle_check_rollups(db: DatabaseManager, args):
+    """ロールアップの整合性確認処理"""
+    mismatches = db.check_rollups()
+    broken = {table: count for table, count in mismatches.items() if count}
+    if not broken:
+        print("✅ ロールアップは学習記録と一致しています")
+        return
+
+    print("❌ ロールアップが学習記録と一致しません")
+    for table, count in broken.items():
+        print(f"  {table}: {count}行の不一致")
+    print("study-tracker rebuild-rollups で作り直してください")
+    sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
@@ -4,6 +4,13 @@
 データベース接続、セッション管理、CRUD操作を提供します。
 """
 
+from .async_manager import AsyncDatabaseManager
+from .backends import UnsupportedBackendError, create_database_manager
 from .connection import DatabaseManager
 
-__all__ = ["DatabaseManager"]
+__all__ = [
+    "DatabaseManager",
+    "AsyncDatabaseManager",
+    "create_database_manager",
+    "UnsupportedBackendError",
+]
@@ -0,0 +1,77 @@
+"""
+Alembicの実行環境
+
+`study-tracker db upgrade` または alembic コマンドから読み込まれます。
+SQLiteでは ALTER TABLE の制限を避けるため、batch モードでマイグレーションを生成します。
+"""
+
+import os
+
+from alembic import context
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import NullPool
+
+config = context.config
+
+# 自動生成は使わない（変更は versions/ に手書きする）
+target_metadata = None
+
+
+def get_database_url() -> str:
+    """エンジンURLを取得（呼び出し元の指定 → 環境変数 → alembic.ini の順）"""
+    return (
+        config.attributes.get("database_url")
+        or os.environ.get("STUDY_TRACKER_DATABASE_URL")
+        or config.get_main_option("sqlalchemy.url")
+        or "sqlite:///study_tracker.db"
+    )
+
+
+def run_migrations_offline():
+    """DBに接続せず、SQLを出力する（alembic upgrade --sql）"""
+    context.configure(
+        url=get_database_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """DBに接続してマイグレーションを適用"""
+    engine = create_engine(get_database_url(), poolclass=NullPool)
+
+    if engine.dialect.name == "sqlite":
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            # sqlite3 はDDLの前にトランザクションを開始しないため、
+            # BEGIN を明示してリビジョンごとのDDLをまとめてロールバックできるようにする
+            dbapi_connection.isolation_level = None
+            dbapi_connection.execute("PRAGMA busy_timeout = 30000")
+
+        @event.listens_for(engine, "begin")
+        def on_begin(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    try:
+        with engine.connect() as connection:
+            context.configure(
+                connection=connection,
+                target_metadata=target_metadata,
+                render_as_batch=True,
+                # 書き込みロックをリビジョン単位で短く保つ
+                transaction_per_migration=True,
+            )
+            with context.begin_transaction():
+                context.run_migrations()
+    finally:
+        engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,76 @@
+"""学習記録テーブル・インデックス・全文検索索引（組み込みマイグレーション 1〜3）
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+Alembic導入前のスキーマと同じ内容です。既存のDBでは作成済みのものを飛ばします。
+"""
+
+import sqlalchemy as sa
+from alembic import context, op
+
+from src.database.revisions import record_schema_version, run_builtin_migrations
+
+# Alembicのリビジョン識別子
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ("idx_study_records_created_at", ["created_at"]),
+    ("idx_study_records_category_created_at", ["category", "created_at"]),
+    ("idx_study_records_difficulty_created_at", ["difficulty", "created_at"]),
+)
+FTS_TRIGGERS = (
+    "study_records_fts_insert",
+    "study_records_fts_delete",
+    "study_records_fts_update",
+)
+
+
+def upgrade():
+    if op.get_context().dialect.name == "sqlite":
+        # 全文検索索引（FTS5）などSQLite固有の定義を含むため、組み込みのSQLをそのまま使う
+        run_builtin_migrations(up_to=3)
+        return
+
+    existing = set()
+    if not context.is_offline_mode():
+        existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if "schema_version" not in existing:
+        op.create_table(
+            "schema_version",
+            sa.Column("version", sa.Integer(), primary_key=True),
+            sa.Column("description", sa.Text(), nullable=False),
+            sa.Column("applied_at", sa.DateTime(), server_default=sa.func.now()),
+        )
+    if "study_records" not in existing:
+        op.create_table(
+            "study_records",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("title", sa.Text(), nullable=False),
+            sa.Column("content", sa.Text()),
+            sa.Column("study_time", sa.Integer(), server_default="0"),
+            sa.Column("category", sa.Text()),
+            sa.Column("difficulty", sa.Integer(), server_default="1"),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()),
+        )
+    for name, columns in INDEXES:
+        op.create_index(name, "study_records", columns, if_not_exists=True)
+    for version in (1, 2, 3):
+        record_schema_version(version)
+
+
+def downgrade():
+    # 初期スキーマを削除する（学習記録もすべて失われるため、実行前にバックアップを取ること）
+    if op.get_context().dialect.name == "sqlite":
+        for trigger in FTS_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS study_records_fts")
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name="study_records", if_exists=True)
+    op.drop_table("study_records")
+    op.drop_table("schema_version")
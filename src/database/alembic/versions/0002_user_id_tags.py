@@ -0,0 +1,68 @@
+"""ユーザーID・タグ列の追加（組み込みマイグレーション 4）
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+
+列は NULL 許容で追加するため、既存の行を書き換えずに済みます。
+インデックスはPostgreSQLでは CONCURRENTLY で作成し、作成中も読み書きを止めません。
+SQLiteではWALモードにより、作成中も読み込みは止まりません。
+"""
+
+import sqlalchemy as sa
+from alembic import context, op
+
+from src.database.revisions import record_schema_version
+
+# Alembicのリビジョン識別子
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "idx_study_records_user_id_created_at"
+
+
+def upgrade():
+    columns = set()
+    if not context.is_offline_mode():
+        inspector = sa.inspect(op.get_bind())
+        columns = {column["name"] for column in inspector.get_columns("study_records")}
+
+    # SQLiteでは batch モードで、ALTER TABLE で扱えない変更だけをテーブルの作り直しにする
+    with op.batch_alter_table("study_records") as batch_op:
+        if "user_id" not in columns:
+            batch_op.add_column(sa.Column("user_id", sa.Integer(), nullable=True))
+        if "tags" not in columns:
+            batch_op.add_column(sa.Column("tags", sa.Text(), nullable=True))
+
+    if op.get_context().dialect.name == "postgresql":
+        # CONCURRENTLY はトランザクションの外でしか実行できない
+        with op.get_context().autocommit_block():
+            op.create_index(
+                INDEX_NAME,
+                "study_records",
+                ["user_id", "created_at"],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+    else:
+        op.create_index(
+            INDEX_NAME, "study_records", ["user_id", "created_at"], if_not_exists=True
+        )
+
+    record_schema_version(4)
+
+
+def downgrade():
+    op.drop_index(INDEX_NAME, table_name="study_records", if_exists=True)
+    if op.get_context().dialect.name == "sqlite":
+        # batch モードのテーブル作り直しでは全文検索のトリガーが消えるため、
+        # SQLite 3.35 以降の DROP COLUMN を直接使う
+        op.execute("ALTER TABLE study_records DROP COLUMN tags")
+        op.execute("ALTER TABLE study_records DROP COLUMN user_id")
+    else:
+        with op.batch_alter_table("study_records") as batch_op:
+            batch_op.drop_column("tags")
+            batch_op.drop_column("user_id")
+    op.execute("DELETE FROM schema_version WHERE version = 4")
@@ -0,0 +1,38 @@
+"""集計用ロールアップテーブルの追加（組み込みマイグレーション 5）
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+
+ロールアップはSQLiteのトリガーで更新するため、SQLiteだけで作成します。
+その他のデータベース（SQLAlchemy版）は統計を study_records から直接集計します。
+作成時に既存の記録を1回だけ集計するため、件数に比例した時間がかかります。
+"""
+
+from alembic import op
+
+from src.database.revisions import run_builtin_migrations
+from src.database.rollups import ROLLUP_TABLES
+
+# Alembicのリビジョン識別子
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+TRIGGERS = ("study_rollup_insert", "study_rollup_delete", "study_rollup_update")
+
+
+def upgrade():
+    if op.get_context().dialect.name == "sqlite":
+        run_builtin_migrations(up_to=5)
+
+
+def downgrade():
+    if op.get_context().dialect.name != "sqlite":
+        return
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    for table in ROLLUP_TABLES:
+        op.execute(f"DROP TABLE IF EXISTS {table}")
+    op.execute("DELETE FROM schema_version WHERE version = 5")
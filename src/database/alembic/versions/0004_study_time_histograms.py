@@ -0,0 +1,42 @@
+"""学習時間のヒストグラムの追加（組み込みマイグレーション 6）
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+
+ヒストグラムはロールアップと同じくSQLiteのトリガーで更新するため、SQLiteだけで作成します。
+その他のデータベース（SQLAlchemy版）は分位点を study_records から直接集計します。
+作成時に既存の記録を1回だけ集計するため、件数に比例した時間がかかります。
+"""
+
+from alembic import op
+
+from src.database.revisions import run_builtin_migrations
+from src.database.rollups import HISTOGRAM_TABLES
+
+# Alembicのリビジョン識別子
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+TRIGGERS = (
+    "study_time_histogram_insert",
+    "study_time_histogram_delete",
+    "study_time_histogram_update",
+)
+
+
+def upgrade():
+    if op.get_context().dialect.name == "sqlite":
+        run_builtin_migrations(up_to=6)
+
+
+def downgrade():
+    if op.get_context().dialect.name != "sqlite":
+        return
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    for table in HISTOGRAM_TABLES:
+        op.execute(f"DROP TABLE IF EXISTS {table}")
+    op.execute("DELETE FROM schema_version WHERE version = 6")
@@ -0,0 +1,38 @@
+"""連続学習の期間の追加（組み込みマイグレーション 7）
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00
+
+連続学習の期間は日別のロールアップのトリガーで更新するため、SQLiteだけで作成します。
+その他のデータベース（SQLAlchemy版）は学習習慣の統計を日別の集計から直接計算します。
+作成時は日別のロールアップ（記録のある日数）から1回だけ計算します。
+"""
+
+from alembic import op
+
+from src.database.revisions import run_builtin_migrations
+from src.database.rollups import STREAK_TABLES
+
+# Alembicのリビジョン識別子
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+TRIGGERS = ("study_streak_insert", "study_streak_delete")
+
+
+def upgrade():
+    if op.get_context().dialect.name == "sqlite":
+        run_builtin_migrations(up_to=7)
+
+
+def downgrade():
+    if op.get_context().dialect.name != "sqlite":
+        return
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    for table in STREAK_TABLES:
+        op.execute(f"DROP TABLE IF EXISTS {table}")
+    op.execute("DELETE FROM schema_version WHERE version = 7")
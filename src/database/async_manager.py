@@ -0,0 +1,110 @@
+"""
+非同期データベースアクセス
+
+DatabaseManager の操作を専用のワーカースレッドで実行し、
+イベントループをブロックせずに await できるようにします。
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from .connection import (
+    DatabaseManager,
+    _delete_record,
+    _insert_record,
+    _update_record,
+)
+
+
+def _delegate(name: str):
+    """DatabaseManager のメソッドをワーカースレッドで実行するコルーチンを作成"""
+
+    async def method(self, *args, **kwargs):
+        return await self.run(getattr(self.db, name), *args, **kwargs)
+
+    method.__name__ = name
+    method.__qualname__ = f"AsyncDatabaseManager.{name}"
+    method.__doc__ = f"DatabaseManager.{name} を非同期に実行"
+    return method
+
+
+def _delegate_write(name: str, operation: Callable[..., Any]):
+    """
+    書き込みメソッドのコルーチンを作成
+
+    ライターが有効な場合はワーカースレッドを使わず、ライターのコミットを直接待ちます。
+    """
+
+    async def method(self, *args, **kwargs):
+        writer = getattr(self.db, "write_coordinator", None)
+        if writer is None:
+            return await self.run(getattr(self.db, name), *args, **kwargs)
+        return await asyncio.wrap_future(writer.submit(operation, *args, **kwargs))
+
+    method.__name__ = name
+    method.__qualname__ = f"AsyncDatabaseManager.{name}"
+    method.__doc__ = f"DatabaseManager.{name} を非同期に実行"
+    return method
+
+
+class AsyncDatabaseManager:
+    """
+    非同期データベース管理クラス
+
+    上限付きのワーカースレッドプールで DatabaseManager の操作を実行します。
+    各ワーカースレッドは専用のコネクションを持つため、
+    遅い集計クエリの実行中も他のリクエストは別のスレッドで処理されます。
+    書き込みは、ライター（WriteCoordinator）が有効ならそのコミットを直接待ちます。
+    """
+
+    def __init__(self, db: DatabaseManager, max_workers: int = 4):
+        """
+        非同期データベースマネージャーを初期化
+
+        Args:
+            db: 操作を委譲するデータベースマネージャー
+            max_workers: ワーカースレッドの最大数（同時に実行するクエリ数の上限）
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers は1以上を指定してください")
+
+        self.db = db
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="study-tracker-db",
+            initializer=db.open_thread_connection,
+        )
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """任意の同期関数をワーカースレッドで実行して結果を待つ"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    def close(self):
+        """実行中の処理の完了を待ってワーカースレッドを停止"""
+        self._executor.shutdown(wait=True)
+
+    get_storage_info = _delegate("get_storage_info")
+    add_study_record = _delegate_write("add_study_record", _insert_record)
+    get_study_record = _delegate("get_study_record")
+    get_all_study_records = _delegate("get_all_study_records")
+    get_study_records_page = _delegate("get_study_records_page")
+    list_after = _delegate("list_after")
+    update_study_record = _delegate_write("update_study_record", _update_record)
+    delete_study_record = _delegate_write("delete_study_record", _delete_record)
+    search = _delegate("search")
+    get_totals = _delegate("get_totals")
+    get_totals_since = _delegate("get_totals_since")
+    get_category_totals = _delegate("get_category_totals")
+    get_difficulty_totals = _delegate("get_difficulty_totals")
+    get_time_distribution = _delegate("get_time_distribution")
+    get_daily_totals = _delegate("get_daily_totals")
+    get_timeline_totals = _delegate("get_timeline_totals")
+    get_all_totals = _delegate("get_all_totals")
+    get_study_time_percentiles = _delegate("get_study_time_percentiles")
+    get_habit_stats = _delegate("get_habit_stats")
@@ -0,0 +1,56 @@
+"""
+データベースバックエンドの選択
+
+設定（環境変数 STUDY_TRACKER_DATABASE_URL）に応じて、
+sqlite3 版または SQLAlchemy 版のデータベースマネージャーを作成します。
+"""
+
+import os
+from typing import Optional
+
+from .connection import DatabaseManager
+
+# SQLAlchemyのエンジンURL（例: sqlite:///study_tracker.db, postgresql://...）
+DATABASE_URL_ENV = "STUDY_TRACKER_DATABASE_URL"
+
+
+class UnsupportedBackendError(RuntimeError):
+    """選択したデータベースでは使えない機能を呼び出した場合のエラー"""
+
+
+def get_database_url(db_path: str = "study_tracker.db") -> str:
+    """
+    エンジンURLを取得
+
+    環境変数 STUDY_TRACKER_DATABASE_URL がなければ、sqlite3 版と同じファイルを指すURLを返します。
+    """
+    return os.environ.get(DATABASE_URL_ENV) or f"sqlite:///{db_path}"
+
+
+def create_database_manager(
+    database_url: Optional[str] = None, db_path: str = "study_tracker.db", **options
+):
+    """
+    データベースマネージャーを作成
+
+    エンジンURLが指定されていれば SQLAlchemy Core 版、
+    なければ sqlite3 版の DatabaseManager を返します。
+
+    Args:
+        database_url: SQLAlchemyのエンジンURL（省略時は環境変数 STUDY_TRACKER_DATABASE_URL）
+        db_path: sqlite3 版で使うデータベースファイルのパス
+        **options: pool_size, pool_timeout, storage_profile など各マネージャーの引数
+            （write_coordinator, read_replica は SQLAlchemy 版では無視）
+    """
+    database_url = database_url or os.environ.get(DATABASE_URL_ENV)
+    if not database_url:
+        return DatabaseManager(db_path, **options)
+
+    # SQLAlchemyは使う場合にだけ読み込む
+    from .sqlalchemy_backend import SQLAlchemyDatabaseManager
+
+    # 書き込みのライターと読み込みレプリカは sqlite3 版だけの機能
+    for option in ("write_coordinator", "read_replica"):
+        options.pop(option, None)
+
+    return SQLAlchemyDatabaseManager(database_url, **options)
@@ -0,0 +1,246 @@
+"""
+データベースのバックアップと復元
+
+sqlite3 のバックアップAPIでページ単位にコピーするため、
+コピー中もアプリケーションは通常どおり読み書きできます。
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+# 1ステップでコピーするページ数（4KiBページで16MiB）
+DEFAULT_PAGES_PER_STEP = 4096
+
+# gzipの圧縮レベル（ディスクの書き込み速度に近い速さで圧縮できる程度）
+GZIP_LEVEL = 1
+
+# ファイルコピーのバッファサイズ
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+BACKUP_PREFIX = "study_tracker_"
+
+
+class BackupError(RuntimeError):
+    """バックアップ・復元に失敗した場合のエラー"""
+
+
+def default_backup_path(
+    directory: Union[str, Path], compress: bool = False, now: Optional[datetime] = None
+) -> Path:
+    """日時入りのバックアップファイル名を作成（例: study_tracker_20250801_120000.db.gz）"""
+    stamp = (now or datetime.now()).strftime("%Y%m%d_%H%M%S")
+    suffix = ".db.gz" if compress else ".db"
+    return Path(directory) / f"{BACKUP_PREFIX}{stamp}{suffix}"
+
+
+def verify_database(path: Union[str, Path]):
+    """
+    データベースファイルの整合性を確認
+
+    Raises:
+        BackupError: PRAGMA integrity_check が ok 以外を返した場合
+    """
+    conn = sqlite3.connect(f"file:{Path(path).resolve()}?mode=ro", uri=True)
+    try:
+        problems = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f"整合性チェックに失敗しました: {e}") from e
+    finally:
+        conn.close()
+
+    if problems != ["ok"]:
+        raise BackupError(f"整合性チェックに失敗しました: {'; '.join(problems[:5])}")
+
+
+def backup_connection(
+    conn: sqlite3.Connection,
+    dest: Union[str, Path],
+    pages_per_step: int = DEFAULT_PAGES_PER_STEP,
+    compress: Optional[bool] = None,
+    verify: bool = True,
+    progress: Optional[Callable[[int, int, int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    コネクションのデータベースをファイルにバックアップ
+
+    一時ファイルにコピーしてから置き換えるため、途中で失敗しても
+    既存のバックアップファイルは壊れません。
+
+    Args:
+        conn: バックアップ元のコネクション
+        dest: バックアップ先のファイルパス
+        pages_per_step: 1ステップでコピーするページ数（-1なら一度にすべて）
+        compress: gzipで圧縮するか（省略時は dest が .gz で終わる場合に圧縮）
+        verify: コピー後に PRAGMA integrity_check で確認するか
+        progress: ステップごとに (status, remaining, total) で呼ばれる関数
+
+    Returns:
+        {"path", "pages", "size", "compressed", "seconds"} の辞書
+    """
+    if pages_per_step == 0 or pages_per_step < -1:
+        raise ValueError("pages_per_step は1以上または-1を指定してください")
+
+    dest = Path(dest)
+    if compress is None:
+        compress = dest.suffix == ".gz"
+    dest.parent.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    temp_path = dest.with_name(f".{dest.name}.tmp")
+    try:
+        pages = _copy_pages(conn, temp_path, pages_per_step, progress)
+        if verify:
+            verify_database(temp_path)
+        if compress:
+            temp_path = _compress(temp_path)
+        os.replace(temp_path, dest)
+    except BaseException:
+        for path in temp_path.parent.glob(f".{dest.name}.tmp*"):
+            if path.exists():
+                path.unlink()
+        raise
+
+    return {
+        "path": str(dest),
+        "pages": pages,
+        "size": dest.stat().st_size,
+        "compressed": compress,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _copy_pages(
+    conn: sqlite3.Connection,
+    path: Path,
+    pages_per_step: int,
+    progress: Optional[Callable[[int, int, int], None]],
+) -> int:
+    """
+    バックアップAPIでページ単位にコピー
+
+    Returns:
+        コピーしたデータベースの総ページ数
+    """
+    pages = 0
+
+    def on_progress(status: int, remaining: int, total: int):
+        nonlocal pages
+        pages = total
+        if progress is not None:
+            progress(status, remaining, total)
+
+    target = sqlite3.connect(str(path))
+    try:
+        conn.backup(target, pages=pages_per_step, progress=on_progress)
+        # コピーはWALモードを引き継ぐため、-wal/-shm のない単一ファイルに戻す
+        target.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        target.close()
+    return pages
+
+
+def _compress(path: Path) -> Path:
+    """ファイルをgzipで圧縮して元のファイルを削除し、圧縮後のパスを返す"""
+    compressed_path = path.with_name(path.name + ".gz")
+    with (
+        open(path, "rb") as src,
+        gzip.open(compressed_path, "wb", compresslevel=GZIP_LEVEL) as out,
+    ):
+        shutil.copyfileobj(src, out, _COPY_BUFFER_SIZE)
+    os.remove(path)
+    return compressed_path
+
+
+def restore_connection(
+    conn: sqlite3.Connection, source: Union[str, Path], verify: bool = True
+) -> Dict[str, Any]:
+    """
+    バックアップファイルの内容でコネクションのデータベースを置き換え
+
+    置き換えは1ステップ（1トランザクション）で行うため、
+    他のコネクションから途中の状態が見えることはありません。
+
+    Args:
+        conn: 復元先のコネクション
+        source: バックアップファイルのパス（.gz なら展開してから復元）
+        verify: 復元前に PRAGMA integrity_check で確認するか
+
+    Returns:
+        {"path", "pages", "seconds"} の辞書
+    """
+    source = Path(source)
+    if not source.exists():
+        raise FileNotFoundError(f"バックアップファイルが見つかりません: {source}")
+
+    started = time.perf_counter()
+    temp_path = None
+    if source.suffix == ".gz":
+        temp_path = source.with_name(f".{source.stem}.restore.tmp")
+        with gzip.open(source, "rb") as src, open(temp_path, "wb") as out:
+            shutil.copyfileobj(src, out, _COPY_BUFFER_SIZE)
+
+    try:
+        db_path = temp_path or source
+        if verify:
+            verify_database(db_path)
+
+        pages = 0
+
+        def on_progress(status: int, remaining: int, total: int):
+            nonlocal pages
+            pages = total
+
+        backup_conn = sqlite3.connect(f"file:{db_path.resolve()}?mode=ro", uri=True)
+        try:
+            backup_conn.backup(conn, progress=on_progress)
+        finally:
+            backup_conn.close()
+    finally:
+        if temp_path is not None and temp_path.exists():
+            temp_path.unlink()
+
+    return {
+        "path": str(source),
+        "pages": pages,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def rotate_backups(directory: Union[str, Path], keep: int) -> List[Path]:
+    """
+    古いバックアップを削除して新しいものから keep 個だけ残す
+
+    対象は default_backup_path の命名規則に一致するファイルだけです。
+
+    Returns:
+        削除したファイルの一覧
+    """
+    if keep < 1:
+        raise ValueError("keep は1以上を指定してください")
+
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+
+    backups = sorted(
+        (
+            path
+            for path in directory.iterdir()
+            if path.is_file()
+            and path.name.startswith(BACKUP_PREFIX)
+            and path.name.endswith((".db", ".db.gz"))
+        ),
+        # ファイル名の日時で並べる（同じ日時なら更新時刻）
+        key=lambda path: (path.name.split(".", 1)[0], path.stat().st_mtime),
+        reverse=True,
+    )
+    removed = backups[keep:]
+    for path in removed:
+        path.unlink()
+    return removed
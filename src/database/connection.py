@@ -4,12 +4,183 @@
 SQLiteデータベースへの接続、セッション管理、CRUD操作を提供します。
 """
 
+import base64
+import itertools
+import json
+import os
+import re
 import sqlite3
+import threading
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional
-from datetime import datetime
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from datetime import date, datetime, timedelta, timezone
 
+from ..models.record_batch import RecordBatch
 from ..models.study_record import StudyRecord
+from .backup import DEFAULT_PAGES_PER_STEP, backup_connection, restore_connection
+from .filters import TIMESTAMP_FORMAT, RecordFilter, escape_like
+from .migrations import apply_migrations, get_alembic_revision, get_schema_version
+from .pool import ConnectionPool
+from .profiles import (
+    DEFAULT_STORAGE_PROFILE,
+    apply_storage_profile,
+    get_storage_profile,
+)
+from .replica import ReadReplica
+from .revisions import HEAD_REVISION, check_revision
+from .rollups import (
+    DEFAULT_HABIT_WINDOWS,
+    DEFAULT_PERCENTS,
+    check_habit_windows,
+    check_rollups,
+    habit_stats,
+    histogram_percentiles,
+    rebuild_rollups,
+)
+from .timeline import parse_timezone, timeline_buckets, to_local_date
+from .write_coordinator import WriteCoordinator
+
+# データのバージョンの採番（マネージャーをまたいで重複しないようモジュールで共有する）
+_data_versions = itertools.count(1)
+
+# 全文検索の対象列と、一致箇所を囲む記号
+SEARCH_FIELDS = ("title", "content")
+HIGHLIGHT_MARKS = ("【", "】")
+
+
+def _highlight(text: Optional[str], query: str, case_sensitive: bool) -> Optional[str]:
+    """全件走査で検索した場合の一致箇所の強調表示"""
+    if text is None:
+        return None
+    flags = 0 if case_sensitive else re.IGNORECASE
+    start, end = HIGHLIGHT_MARKS
+    return re.sub(
+        re.escape(query), lambda m: f"{start}{m.group(0)}{end}", text, flags=flags
+    )
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    """SQLiteのTIMESTAMP文字列をdatetimeに変換（変換できない場合はNone）"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _decode_row(row: Sequence) -> StudyRecord:
+    """
+    (id, title, content, study_time, category, difficulty, created_at, updated_at)
+    の行をStudyRecordに変換
+    """
+    created_at = _parse_timestamp(row[6])
+    # 更新されていない記録は作成日時と同じ文字列なので、変換を1回で済ませる
+    # （datetimeは不変なので、同じオブジェクトを共有しても安全）
+    updated_at = created_at if row[7] == row[6] else _parse_timestamp(row[7])
+    # 変換に失敗した日時だけを現在時刻で補う
+    if created_at is None or updated_at is None:
+        now = datetime.now()
+        created_at = created_at or now
+        updated_at = updated_at or now
+    return StudyRecord(
+        row[1], row[2], row[3], row[4], row[5], row[0], created_at, updated_at
+    )
+
+
+def _study_record_factory(cursor: sqlite3.Cursor, row: tuple) -> StudyRecord:
+    """カーソルから直接StudyRecordを返す row_factory"""
+    return _decode_row(row)
+
+
+def _insert_record(conn: sqlite3.Connection, record: StudyRecord) -> int:
+    """学習記録を追加して採番されたIDを返す（コミットは呼び出し元で行う）"""
+    cursor = conn.execute(
+        """
+        INSERT INTO study_records (title, content, study_time, category, difficulty)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (
+            record.title,
+            record.content,
+            record.study_time,
+            record.category,
+            record.difficulty,
+        ),
+    )
+    return cursor.lastrowid
+
+
+def _update_record(conn: sqlite3.Connection, record_id: int, **kwargs) -> bool:
+    """学習記録を更新（コミットは呼び出し元で行う）"""
+    # 更新可能なフィールド
+    allowed_fields = [
+        "title",
+        "content",
+        "study_time",
+        "category",
+        "difficulty",
+    ]
+    update_fields = []
+    values = []
+
+    for key, value in kwargs.items():
+        if key in allowed_fields:
+            update_fields.append(f"{key} = ?")
+            values.append(value)
+
+    if not update_fields:
+        return False
+
+    update_fields.append("updated_at = ?")
+    values.append(datetime.now())
+    values.append(record_id)
+
+    cursor = conn.execute(
+        f"""
+        UPDATE study_records
+        SET {', '.join(update_fields)}
+        WHERE id = ?
+        """,
+        values,
+    )
+    return cursor.rowcount > 0
+
+
+def _delete_record(conn: sqlite3.Connection, record_id: int) -> bool:
+    """学習記録を削除（コミットは呼び出し元で行う）"""
+    cursor = conn.execute("DELETE FROM study_records WHERE id = ?", (record_id,))
+    return cursor.rowcount > 0
+
+
+def encode_cursor(created_at: str, record_id: int) -> str:
+    """ページングカーソルを不透明な文字列にエンコード"""
+    payload = json.dumps([created_at, record_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """ページングカーソルをデコード"""
+    try:
+        created_at, record_id = json.loads(base64.urlsafe_b64decode(cursor))
+    except (ValueError, TypeError):
+        raise ValueError("不正なカーソルです") from None
+
+    if not isinstance(created_at, str) or not isinstance(record_id, int):
+        raise ValueError("不正なカーソルです")
+    return created_at, record_id
 
 
 class DatabaseManager:
@@ -19,63 +190,415 @@ class DatabaseManager:
     SQLiteデータベースとの接続、テーブル作成、CRUD操作を管理します。
     """
 
-    def __init__(self, db_path: str = "study_tracker.db"):
+    def __init__(
+        self,
+        db_path: str = "study_tracker.db",
+        pool_size: int = 5,
+        pool_timeout: float = 30.0,
+        storage_profile: Optional[str] = None,
+        write_coordinator: Optional[bool] = None,
+        write_batch_size: int = 100,
+        write_latency: float = 0.0,
+        read_replica: Optional[bool] = None,
+    ):
         """
         データベースマネージャーを初期化
 
         Args:
             db_path: データベースファイルのパス
+            pool_size: コネクションプールの最大コネクション数
+            pool_timeout: コネクション取得の待ち時間（秒）
+            storage_profile: ストレージプロファイル名
+                （未指定時は環境変数 STUDY_TRACKER_STORAGE_PROFILE、
+                それもなければ "balanced"）
+            write_coordinator: 書き込みを単一のライタースレッドでまとめてコミットするか
+                （未指定時は環境変数 STUDY_TRACKER_WRITE_COORDINATOR が "1" なら有効）
+            write_batch_size: ライターが1トランザクションにまとめる最大件数
+            write_latency: ライターが後続の書き込みを待つ最大時間（秒、0なら待たない）
+            read_replica: 一覧・検索・集計をインメモリのレプリカで処理するか
+                （未指定時は環境変数 STUDY_TRACKER_READ_REPLICA が "1" なら有効、
+                インメモリDBでは常に無効）
         """
         self.db_path = db_path
+        self.storage_profile = storage_profile or os.environ.get(
+            "STUDY_TRACKER_STORAGE_PROFILE", DEFAULT_STORAGE_PROFILE
+        )
+        # 不明なプロファイル名はコネクションを開く前にエラーにする
+        get_storage_profile(self.storage_profile)
+
+        # インメモリDBはコネクションごとに別のDBになるため、1接続を共有する
+        if db_path == ":memory:":
+            pool_size = 1
+
+        self._pool = ConnectionPool(
+            db_path,
+            max_size=pool_size,
+            timeout=pool_timeout,
+            on_connect=self._configure_connection,
+        )
+        # 特定のスレッド専用のコネクション（open_thread_connection 参照）
+        self._local = threading.local()
+        self._thread_connections: List[sqlite3.Connection] = []
+        self._thread_lock = threading.Lock()
         self.init_database()
+        # ストレージ設定は起動時に固定されるため1回だけ読む（get_storage_info 参照）
+        self._storage_info = self._read_storage_info()
 
-    def init_database(self):
-        """データベースとテーブルを初期化"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        # データのバージョン（data_version 参照）。他のコネクションのコミットは
+        # 監視用のコネクションの PRAGMA data_version の変化で検知する
+        self._data_version = next(_data_versions)
+        self._version_lock = threading.Lock()
+        self._version_watch: Optional[sqlite3.Connection] = None
+        if db_path != ":memory:":
+            self._version_watch = sqlite3.connect(db_path, check_same_thread=False)
+            self._watched_version = self._version_watch.execute(
+                "PRAGMA data_version"
+            ).fetchone()[0]
+        # 他のプロセスの書き込みもバージョンに反映される（インメモリDBは他から書き込めない）
+        self.tracks_external_writes = True
 
-            # 学習記録テーブルの作成
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS study_records (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    content TEXT,
-                    study_time INTEGER DEFAULT 0,
-                    category TEXT,
-                    difficulty INTEGER DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """
+        if read_replica is None:
+            read_replica = os.environ.get("STUDY_TRACKER_READ_REPLICA") == "1"
+        # 読み込み専用のインメモリレプリカ（_read_connection / _write_connection 参照）
+        self.read_replica: Optional[ReadReplica] = None
+        if read_replica and db_path != ":memory:":
+            self.read_replica = ReadReplica(
+                db_path, timeout=pool_timeout, on_connect=self._configure_connection
             )
 
-            conn.commit()
+        if write_coordinator is None:
+            write_coordinator = os.environ.get("STUDY_TRACKER_WRITE_COORDINATOR") == "1"
+        # 追加・更新・削除をまとめてコミットするライター（_write 参照）
+        self.write_coordinator: Optional[WriteCoordinator] = None
+        if write_coordinator:
+            self.write_coordinator = WriteCoordinator(
+                self._write_connection,
+                max_batch_size=write_batch_size,
+                max_latency=write_latency,
+                initializer=self.open_thread_connection,
+            )
+
+    def __enter__(self) -> "DatabaseManager":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """ライターを停止し、コネクションプールとスレッド専用のコネクションをクローズ"""
+        if self.write_coordinator is not None:
+            self.write_coordinator.close()
+        if self.read_replica is not None:
+            self.read_replica.close()
+        if self._version_watch is not None:
+            self._version_watch.close()
+        self._pool.close()
+        with self._thread_lock:
+            connections, self._thread_connections = self._thread_connections, []
+        for conn in connections:
+            conn.close()
+
+    def open_thread_connection(self):
+        """
+        呼び出し元スレッド専用のコネクションを開く
+
+        以降このスレッドからの操作はプールを経由せずにこのコネクションを使います。
+        ワーカースレッドの初期化処理として呼ぶことを想定しています。
+        インメモリDBはコネクションごとに別のDBになるため、プールを使い続けます。
+        """
+        if self.db_path == ":memory:" or getattr(self._local, "conn", None):
+            return
+
+        conn = sqlite3.connect(
+            self.db_path, timeout=self._pool.timeout, check_same_thread=False
+        )
+        try:
+            self._configure_connection(conn)
+        except BaseException:
+            conn.close()
+            raise
+
+        with self._thread_lock:
+            self._thread_connections.append(conn)
+        self._local.conn = conn
+
+    def _configure_connection(self, conn: sqlite3.Connection):
+        """新しいコネクションにストレージプロファイルを適用"""
+        apply_storage_profile(conn, self.storage_profile)
+
+    def get_storage_info(self) -> Dict[str, Any]:
+        """
+        適用中のストレージ設定を取得
+
+        起動時に読んだ値を返すため、コネクションを使わずにすぐ返ります
+        （ヘルスチェックが実行中のクエリを待たないように）。
+        """
+        return dict(self._storage_info)
+
+    def _read_storage_info(self) -> Dict[str, Any]:
+        """ストレージ設定をデータベースから読む"""
+        with self._connection() as conn:
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+
+        return {
+            "profile": self.storage_profile,
+            "journal_mode": journal_mode,
+            "synchronous": synchronous,
+        }
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """プールからコネクションを借りるコンテキストマネージャー
+
+        正常終了時はコミット、例外発生時はロールバックしてから返却します。
+        スレッド専用のコネクションが開かれている場合はそちらを使います。
+        """
+        thread_conn = getattr(self._local, "conn", None)
+        if thread_conn is not None:
+            with thread_conn:
+                yield thread_conn
+            return
+
+        conn = self._pool.acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._pool.release(conn)
+
+    @contextmanager
+    def _read_connection(self) -> Iterator[sqlite3.Connection]:
+        """一覧・検索・集計用のコネクションを借りる（レプリカが有効ならメモリ上のDB）"""
+        if self.read_replica is None:
+            with self._connection() as conn:
+                yield conn
+            return
+
+        with self.read_replica.read() as conn:
+            yield conn
+
+    @contextmanager
+    def _write_connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        書き込み用のコネクションを借りる
+
+        レプリカが有効な場合はレプリカ専用のディスク接続を使い、
+        コミット後に変更をレプリカへ反映してから返却します。
+        コミットに成功した場合はデータのバージョンを進めます。
+        """
+        if self.read_replica is None:
+            with self._connection() as conn:
+                yield conn
+        else:
+            with self.read_replica.write() as conn:
+                yield conn
+        # コミットの後に進める（先に進めると、コミット前の集計が新しいバージョンで
+        # キャッシュされることがある）
+        self.bump_data_version()
+
+    @property
+    def data_version(self) -> int:
+        """
+        データのバージョン（統計キャッシュの無効化に使う）
+
+        このマネージャー経由の書き込みに加え、他のコネクション・プロセスのコミットも
+        PRAGMA data_version で検知して進めます。値はマネージャーをまたいで重複しません。
+        """
+        if self._version_watch is not None:
+            with self._version_lock:
+                row = self._version_watch.execute("PRAGMA data_version").fetchone()
+                if row[0] != self._watched_version:
+                    self._watched_version = row[0]
+                    self.bump_data_version()
+        return self._data_version
+
+    def bump_data_version(self):
+        """データのバージョンを進める（書き込みのコミット後に呼ぶ）"""
+        self._data_version = next(_data_versions)
+
+    def init_database(self):
+        """
+        データベースを初期化し、スキーマのリビジョンを確認
+
+        Alembicで管理されているDBはリビジョンの確認だけを行い、DDLは実行しません
+        （スキーマの変更は study-tracker db upgrade で適用します）。
+        新規作成・Alembic導入前のDBは組み込みのマイグレーションで最新にし、
+        最新のリビジョンとして記録します。
+
+        Raises:
+            SchemaRevisionError: リビジョンがこのバージョンのコードと合わない場合
+        """
+        with self._connection() as conn:
+            revision = get_alembic_revision(conn)
+            if revision is None:
+                apply_migrations(conn, stamp_revision=HEAD_REVISION)
+            else:
+                check_revision(revision)
+
+    def backup(
+        self,
+        dest: str,
+        pages_per_step: int = DEFAULT_PAGES_PER_STEP,
+        compress: Optional[bool] = None,
+        verify: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        データベースをファイルにバックアップ
+
+        sqlite3 のバックアップAPIでページ単位にコピーするため、
+        コピー中も他のコネクションから読み書きできます。
+        コピー中に別のコネクションから書き込まれた場合、コピーは最初からやり直しになります。
+
+        Args:
+            dest: バックアップ先のファイルパス
+            pages_per_step: 1ステップでコピーするページ数（-1なら一度にすべて）
+            compress: gzipで圧縮するか（省略時は dest が .gz で終わる場合に圧縮）
+            verify: コピー後に PRAGMA integrity_check で確認するか
+
+        Returns:
+            {"path", "pages", "size", "compressed", "seconds"} の辞書
+        """
+        with self._connection() as conn:
+            return backup_connection(conn, dest, pages_per_step, compress, verify)
+
+    def restore(self, source: str, verify: bool = True) -> Dict[str, Any]:
+        """
+        バックアップファイルからデータベースを復元
+
+        現在の内容はすべて置き換えられます。復元後にスキーマのリビジョンを確認します。
+
+        Args:
+            source: バックアップファイルのパス（.gz なら展開してから復元）
+            verify: 復元前に PRAGMA integrity_check で確認するか
+
+        Returns:
+            {"path", "pages", "seconds"} の辞書
+        """
+        with self._connection() as conn:
+            result = restore_connection(conn, source, verify)
+        self.bump_data_version()
+        self.init_database()
+        if self.read_replica is not None:
+            self.read_replica.reload()
+        return result
+
+    def get_schema_version(self) -> int:
+        """適用済みのスキーマバージョンを取得"""
+        with self._connection() as conn:
+            return get_schema_version(conn)
 
     def add_study_record(self, record: StudyRecord) -> int:
         """学習記録を追加"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                INSERT INTO study_records (title, content, study_time, category, difficulty)
+        return self._write(_insert_record, record)
+
+    def add_study_records_many(
+        self,
+        records: Iterable[StudyRecord],
+        chunk_size: int = 500,
+        skip_invalid: bool = False,
+        keep_timestamps: bool = False,
+    ) -> List[Optional[int]]:
+        """
+        学習記録を1トランザクションでまとめて追加
+
+        Args:
+            records: 追加する学習記録（ジェネレーターも可）
+            chunk_size: executemany 1回あたりの件数
+            skip_invalid: Trueなら不正な行をスキップ、Falseなら全件ロールバック
+            keep_timestamps: Trueなら各記録の created_at/updated_at をそのまま保存
+
+        Returns:
+            入力順に並んだ採番済みID（スキップした行は None）
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size は1以上を指定してください")
+
+        if keep_timestamps:
+            sql = """
+                INSERT INTO study_records
+                    (title, content, study_time, category, difficulty,
+                     created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """
+        else:
+            sql = """
+                INSERT INTO study_records
+                    (title, content, study_time, category, difficulty)
                 VALUES (?, ?, ?, ?, ?)
-            """,
-                (
-                    record.title,
-                    record.content,
-                    record.study_time,
-                    record.category,
-                    record.difficulty,
-                ),
-            )
+            """
+
+        record_ids: List[Optional[int]] = []
+        iterator = iter(records)
+
+        with self._write_connection() as conn:
+            # 最初に書き込みロックを取り、ID採番が他の書き込みと混ざらないようにする
+            conn.execute("BEGIN IMMEDIATE")
+
+            while True:
+                chunk = [
+                    self._record_to_params(record, keep_timestamps)
+                    for record in islice(iterator, chunk_size)
+                ]
+                if not chunk:
+                    break
 
-            conn.commit()
-            return cursor.lastrowid
+                conn.execute("SAVEPOINT bulk_chunk")
+                try:
+                    conn.executemany(sql, chunk)
+                except sqlite3.Error:
+                    # 途中まで入った行を取り消す
+                    conn.execute("ROLLBACK TO bulk_chunk")
+                    conn.execute("RELEASE bulk_chunk")
+                    if not skip_invalid:
+                        raise
+                    record_ids.extend(
+                        self._insert_rows_skipping_invalid(conn, sql, chunk)
+                    )
+                else:
+                    conn.execute("RELEASE bulk_chunk")
+                    last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                    record_ids.extend(range(last_id - len(chunk) + 1, last_id + 1))
+
+        return record_ids
+
+    @staticmethod
+    def _insert_rows_skipping_invalid(
+        conn: sqlite3.Connection, sql: str, rows: List[tuple]
+    ) -> List[Optional[int]]:
+        """1行ずつ挿入し、失敗した行は None として読み飛ばす"""
+        record_ids: List[Optional[int]] = []
+        for row in rows:
+            try:
+                cursor = conn.execute(sql, row)
+            except sqlite3.Error:
+                # 失敗した文の変更だけが取り消され、トランザクションは継続する
+                record_ids.append(None)
+            else:
+                record_ids.append(cursor.lastrowid)
+        return record_ids
+
+    @staticmethod
+    def _record_to_params(record: StudyRecord, keep_timestamps: bool) -> tuple:
+        """StudyRecordをINSERT用のパラメータに変換"""
+        params = (
+            record.title,
+            record.content,
+            record.study_time,
+            record.category,
+            record.difficulty,
+        )
+        if keep_timestamps:
+            # CURRENT_TIMESTAMP と同じ形式で保存し、文字列比較での並び順を揃える
+            params += (
+                record.created_at.strftime(TIMESTAMP_FORMAT),
+                record.updated_at.strftime(TIMESTAMP_FORMAT),
+            )
+        return params
 
     def get_study_record(self, record_id: int) -> Optional[StudyRecord]:
         """学習記録を取得"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 """
@@ -92,87 +615,742 @@ class DatabaseManager:
 
     def get_all_study_records(self) -> List[StudyRecord]:
         """全ての学習記録を取得"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._read_connection() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = _study_record_factory
             cursor.execute(
                 """
                 SELECT id, title, content, study_time, category, difficulty, created_at, updated_at
-                FROM study_records ORDER BY created_at DESC
+                FROM study_records ORDER BY created_at DESC, id DESC
             """
             )
 
-            return [self._row_to_study_record(row) for row in cursor.fetchall()]
+            return cursor.fetchall()
 
-    def update_study_record(self, record_id: int, **kwargs) -> bool:
-        """学習記録を更新"""
-        with sqlite3.connect(self.db_path) as conn:
+    def get_study_records_page(
+        self, limit: int, offset: int = 0, record_filter: Optional[RecordFilter] = None
+    ) -> Tuple[List[StudyRecord], int]:
+        """
+        学習記録を1ページ分だけ取得
+
+        Args:
+            limit: 取得件数
+            offset: スキップする件数
+            record_filter: 検索条件（limit/offset は引数の値を使用）
+
+        Returns:
+            (新しい順に並んだ学習記録, 条件に一致する全件数)
+        """
+        record_filter = (record_filter or RecordFilter()).replace(
+            limit=limit, offset=offset
+        )
+        return (
+            self.find_study_records(record_filter),
+            self.count_study_records(record_filter),
+        )
+
+    def find_study_records(self, record_filter: RecordFilter) -> List[StudyRecord]:
+        """検索条件に一致する学習記録を新しい順に取得"""
+        sql, params = self._filtered_select(record_filter)
+
+        with self._read_connection() as conn:
             cursor = conn.cursor()
+            cursor.row_factory = _study_record_factory
+            return cursor.execute(sql, params).fetchall()
 
-            # 更新可能なフィールド
-            allowed_fields = [
-                "title",
-                "content",
-                "study_time",
-                "category",
-                "difficulty",
-            ]
-            update_fields = []
-            values = []
+    def iter_study_records(
+        self, record_filter: Optional[RecordFilter] = None, batch_size: int = 500
+    ) -> Iterator[StudyRecord]:
+        """
+        検索条件に一致する学習記録を新しい順に1件ずつ返すジェネレーター
 
-            for key, value in kwargs.items():
-                if key in allowed_fields:
-                    update_fields.append(f"{key} = ?")
-                    values.append(value)
+        fetchmany で batch_size 件ずつ読み込むため、
+        メモリ使用量は件数によらず一定です。
+        コネクションは反復の間だけ借り、最後まで読むか close() した時点で返却します。
 
-            if not update_fields:
-                return False
+        Args:
+            record_filter: 検索条件（省略時は全件）
+            batch_size: 1回に読み込む件数
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size は1以上を指定してください")
 
-            update_fields.append("updated_at = ?")
-            values.append(datetime.now())
-            values.append(record_id)
+        sql, params = self._filtered_select(record_filter or RecordFilter())
 
-            cursor.execute(
-                f"""
-                UPDATE study_records 
-                SET {', '.join(update_fields)}
-                WHERE id = ?
-            """,
-                values,
-            )
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = _study_record_factory
+            cursor.execute(sql, params)
+            while True:
+                records = cursor.fetchmany(batch_size)
+                if not records:
+                    break
+                yield from records
+
+    def load_record_batch(
+        self, record_filter: Optional[RecordFilter] = None, batch_size: int = 500
+    ) -> RecordBatch:
+        """
+        検索条件に一致する学習記録を列指向の RecordBatch として新しい順に取得
+
+        記録ごとの StudyRecord を作らずに列へ直接追加するため、
+        大量の記録を集計・エクスポートする場合のメモリ使用量を抑えられます。
+
+        Args:
+            record_filter: 検索条件（省略時は全件）
+            batch_size: 1回に読み込む件数
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size は1以上を指定してください")
+
+        sql, params = self._filtered_select(record_filter or RecordFilter())
+        batch = RecordBatch()
+        now = datetime.now()
+
+        with self._read_connection() as conn:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    batch.append_values(
+                        row[0],
+                        row[1],
+                        row[2],
+                        row[3],
+                        row[4],
+                        row[5],
+                        _parse_timestamp(row[6]) or now,
+                        _parse_timestamp(row[7]) or now,
+                    )
+
+        return batch
+
+    @staticmethod
+    def _filtered_select(record_filter: RecordFilter) -> Tuple[str, List]:
+        """検索条件からSELECT文とパラメータを作成"""
+        where, params = record_filter.where_clause()
+        limit, limit_params = record_filter.limit_clause()
+        sql = f"""
+            SELECT id, title, content, study_time, category, difficulty, created_at, updated_at
+            FROM study_records {where}
+            ORDER BY created_at DESC, id DESC {limit}
+        """  # nosec B608 - 条件はプレースホルダで渡している
+        return sql, params + limit_params
+
+    def count_study_records(self, record_filter: Optional[RecordFilter] = None) -> int:
+        """検索条件に一致する学習記録の件数を取得（limit/offset は無視）"""
+        where, params = (record_filter or RecordFilter()).where_clause()
+
+        with self._read_connection() as conn:
+            return conn.execute(
+                f"SELECT COUNT(*) FROM study_records {where}",  # nosec B608
+                params,
+            ).fetchone()[0]
+
+    def list_after(
+        self, cursor: Optional[str] = None, limit: int = 20
+    ) -> Tuple[List[StudyRecord], Optional[str]]:
+        """
+        カーソル（キーセット）方式で学習記録を取得
+
+        (created_at, id) の降順で、カーソルが指す記録より後ろを取得します。
+        OFFSETと違い深いページでも読み飛ばしが発生せず、
+        途中で記録が追加されても重複・欠落しません。
+
+        Args:
+            cursor: 前回の next_cursor（None なら先頭から）
+            limit: 取得件数
+
+        Returns:
+            (学習記録, 次ページのカーソル。最後のページなら None)
+        """
+        if limit < 1:
+            raise ValueError("limit は1以上を指定してください")
+
+        sql = """
+            SELECT id, title, content, study_time, category, difficulty, created_at, updated_at
+            FROM study_records
+        """
+        params: list = []
+        if cursor is not None:
+            sql += " WHERE (created_at, id) < (?, ?)"
+            params.extend(decode_cursor(cursor))
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        # 1件多く取得して次のページの有無を判定する
+        params.append(limit + 1)
+
+        with self._read_connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][6], rows[-1][0])
 
-            conn.commit()
-            return cursor.rowcount > 0
+        return [self._row_to_study_record(row) for row in rows], next_cursor
+
+    def update_study_record(self, record_id: int, **kwargs) -> bool:
+        """学習記録を更新"""
+        return self._write(_update_record, record_id, **kwargs)
 
     def delete_study_record(self, record_id: int) -> bool:
         """学習記録を削除"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM study_records WHERE id = ?", (record_id,))
-            conn.commit()
-            return cursor.rowcount > 0
+        return self._write(_delete_record, record_id)
 
-    def _row_to_study_record(self, row) -> StudyRecord:
-        """データベース行をStudyRecordオブジェクトに変換"""
-        record = StudyRecord(
-            id=row[0],
-            title=row[1],
-            content=row[2],
-            study_time=row[3],
-            category=row[4],
-            difficulty=row[5],
-        )
+    def _write(self, operation: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        書き込み処理を実行
 
-        # SQLiteのTIMESTAMPをdatetimeオブジェクトに変換
-        try:
-            record.created_at = (
-                datetime.fromisoformat(row[6]) if row[6] else datetime.now()
+        ライターが有効な場合は他のスレッドの書き込みとまとめてコミットし、
+        コミットの完了を待って結果を返します。
+        """
+        if self.write_coordinator is not None:
+            return self.write_coordinator.execute(operation, *args, **kwargs)
+        with self._write_connection() as conn:
+            return operation(conn, *args, **kwargs)
+
+    def get_replica_metrics(self) -> Optional[Dict[str, Any]]:
+        """レプリカのメトリクスを取得（レプリカが無効ならNone）"""
+        if self.read_replica is None:
+            return None
+        return self.read_replica.metrics()
+
+    def get_write_metrics(self) -> Optional[Dict[str, Any]]:
+        """ライターのメトリクスを取得（ライターが無効ならNone）"""
+        if self.write_coordinator is None:
+            return None
+        return self.write_coordinator.metrics()
+
+    def search(
+        self,
+        query: str,
+        fields: Optional[Sequence[str]] = None,
+        limit: int = 20,
+        case_sensitive: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        タイトル・内容を全文検索
+
+        FTS5（trigram）の索引を使い、関連度の高い順に返します。
+        trigramは3文字未満の語を索引から引けないため、その場合のみ全件走査します。
+
+        Args:
+            query: 検索キーワード
+            fields: 検索対象の列（"title" / "content"、省略時は両方）
+            limit: 最大件数
+            case_sensitive: 大文字小文字を区別するかどうか
+
+        Returns:
+            {"record", "title_highlight", "content_snippet"} の辞書のリスト。
+            一致箇所は【】で囲まれます。
+        """
+        fields = list(fields or SEARCH_FIELDS)
+        unknown = set(fields) - set(SEARCH_FIELDS)
+        if unknown:
+            raise ValueError(f"検索できない列です: {', '.join(sorted(unknown))}")
+        if not query:
+            return []
+
+        # 大文字小文字の区別は instr()（バイナリ比較）で後段フィルタする
+        params: list = []
+        case_filter = ""
+        if case_sensitive:
+            case_filter = (
+                " AND ("
+                + " OR ".join(f"instr(r.{field}, ?) > 0" for field in fields)
+                + ")"
             )
-            record.updated_at = (
-                datetime.fromisoformat(row[7]) if row[7] else datetime.now()
+            params = [query] * len(fields)
+
+        if len(query) >= 3:
+            sql = f"""
+                SELECT r.id, r.title, r.content, r.study_time, r.category,
+                       r.difficulty, r.created_at, r.updated_at,
+                       highlight(study_records_fts, 0, ?, ?),
+                       snippet(study_records_fts, 1, ?, ?, '…', 32)
+                FROM study_records_fts
+                JOIN study_records AS r ON r.id = study_records_fts.rowid
+                WHERE study_records_fts MATCH ?{case_filter}
+                ORDER BY rank
+                LIMIT ?
+            """
+            phrase = '"' + query.replace('"', '""') + '"'
+            params = [
+                *HIGHLIGHT_MARKS,
+                *HIGHLIGHT_MARKS,
+                f"{{{' '.join(fields)}}} : {phrase}",
+                *params,
+                limit,
+            ]
+        else:
+            pattern = f"%{escape_like(query)}%"
+            like_filter = " OR ".join(
+                f"r.{field} LIKE ? ESCAPE '\\'" for field in fields
+            )
+            sql = f"""
+                SELECT r.id, r.title, r.content, r.study_time, r.category,
+                       r.difficulty, r.created_at, r.updated_at
+                FROM study_records AS r
+                WHERE ({like_filter}){case_filter}
+                ORDER BY r.created_at DESC, r.id DESC
+                LIMIT ?
+            """
+            params = [pattern] * len(fields) + params + [limit]
+
+        with self._read_connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        results = []
+        for row in rows:
+            record = self._row_to_study_record(row)
+            if len(row) > 8:
+                title_highlight, content_snippet = row[8], row[9]
+            else:
+                title_highlight = _highlight(record.title, query, case_sensitive)
+                content_snippet = _highlight(record.content, query, case_sensitive)
+            results.append(
+                {
+                    "record": record,
+                    "title_highlight": title_highlight,
+                    "content_snippet": content_snippet,
+                }
             )
-        except (ValueError, TypeError):
-            # 変換に失敗した場合は現在時刻を使用
-            record.created_at = datetime.now()
-            record.updated_at = datetime.now()
+        return results
+
+    # ---- 集計 ----
+    # 件数・学習時間・難易度の合計はトリガーで更新されるロールアップ（rollups.py）から読み、
+    # グループ数に比例する時間で返す。
+    # グループの並び順は、従来の「新しい順の一覧で最初に現れた順」と一致させる。
+
+    def get_totals(self) -> Dict[str, int]:
+        """全体の件数・合計学習時間・難易度の合計を取得"""
+        with self._read_connection() as conn:
+            count, total_time, difficulty_sum = conn.execute(
+                """
+                SELECT COALESCE(SUM(count), 0), COALESCE(SUM(total_time), 0),
+                       COALESCE(SUM(difficulty_sum), 0)
+                FROM study_rollup_daily
+            """
+            ).fetchone()
+
+        return {
+            "count": count,
+            "total_time": total_time,
+            "difficulty_sum": difficulty_sum,
+        }
+
+    def get_totals_since(self, since: datetime) -> Dict[str, int]:
+        """
+        since 以降に作成された記録の件数・合計学習時間を取得
+
+        翌日以降は日別のロールアップから、since の当日分だけは記録から集計します。
+        """
+        next_day = (since + timedelta(days=1)).strftime("%Y-%m-%d")
+        with self._read_connection() as conn:
+            count, total_time = conn.execute(
+                """
+                SELECT
+                    (SELECT COALESCE(SUM(count), 0) FROM study_rollup_daily
+                     WHERE date >= :next_day)
+                  + (SELECT COUNT(*) FROM study_records
+                     WHERE created_at >= :since AND created_at < :next_day),
+                    (SELECT COALESCE(SUM(total_time), 0) FROM study_rollup_daily
+                     WHERE date >= :next_day)
+                  + (SELECT COALESCE(SUM(study_time), 0) FROM study_records
+                     WHERE created_at >= :since AND created_at < :next_day)
+            """,
+                {"since": since.strftime(TIMESTAMP_FORMAT), "next_day": next_day},
+            ).fetchone()
+
+        return {"count": count, "total_time": total_time}
+
+    def get_category_totals(
+        self, include_uncategorized: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        カテゴリ別の件数・合計学習時間・難易度の合計を取得
+
+        Args:
+            include_uncategorized: カテゴリ未設定の記録を category=None として含めるか
+        """
+        with self._read_connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT NULLIF(category, ''), count, total_time, difficulty_sum
+                FROM study_rollup_category
+                WHERE category != '' OR ?
+                ORDER BY latest_created_at DESC, latest_id DESC
+            """,
+                (include_uncategorized,),
+            ).fetchall()
+
+        return [
+            {
+                "category": category,
+                "count": count,
+                "total_time": total_time,
+                "difficulty_sum": difficulty_sum,
+            }
+            for category, count, total_time, difficulty_sum in rows
+        ]
+
+    def get_difficulty_totals(self) -> List[Dict[str, int]]:
+        """難易度別の件数・合計学習時間を取得"""
+        with self._read_connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT NULLIF(difficulty, 0), count, total_time
+                FROM study_rollup_difficulty
+                ORDER BY latest_created_at DESC, latest_id DESC
+            """
+            ).fetchall()
+
+        return [
+            {"difficulty": difficulty, "count": count, "total_time": total_time}
+            for difficulty, count, total_time in rows
+        ]
 
-        return record
+    def get_time_distribution(self) -> Dict[str, int]:
+        """学習時間の分布（30分未満・30分-2時間・2時間以上）を取得"""
+        with self._read_connection() as conn:
+            short_time, medium_time, long_time, total = conn.execute(
+                """
+                SELECT
+                    COALESCE(SUM(CASE WHEN study_time < 30 THEN 1 ELSE 0 END), 0),
+                    COALESCE(SUM(CASE WHEN study_time >= 30 AND study_time < 120
+                                      THEN 1 ELSE 0 END), 0),
+                    COALESCE(SUM(CASE WHEN study_time >= 120 THEN 1 ELSE 0 END), 0),
+                    COUNT(*)
+                FROM study_records
+            """
+            ).fetchone()
+
+        return {
+            "short_time": short_time,
+            "medium_time": medium_time,
+            "long_time": long_time,
+            "total_records": total,
+        }
+
+    def get_daily_totals(self) -> List[Dict[str, Any]]:
+        """日別（YYYY-MM-DD）の件数・合計学習時間を日付順に取得"""
+        with self._read_connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT NULLIF(date, ''), count, total_time
+                FROM study_rollup_daily
+                ORDER BY date
+            """
+            ).fetchall()
+
+        return [
+            {"date": date, "count": count, "total_time": total_time}
+            for date, count, total_time in rows
+        ]
+
+    def get_timeline_totals(
+        self,
+        bucket: str = "day",
+        tz: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        日・週・月の区間ごとの件数・合計学習時間を取得（記録のない区間は0）
+
+        区間の境界をUTCに変換し、境界がすべてUTCの0時なら日別のロールアップを、
+        そうでなければ created_at のインデックスで範囲内の記録だけを読んで集計します。
+
+        Args:
+            bucket: 区間の種類（"day", "week", "month"）
+            tz: 日付の区切りに使うタイムゾーン（省略時はUTC）
+            start: 最初の日付（省略時は最も古い記録の日付）
+            end: 最後の日付（省略時は最も新しい記録の日付）
+
+        Returns:
+            [{"date", "count", "total_time"}]（date は区間のラベル、古い順）
+
+        Raises:
+            ValueError: 区間の種類・タイムゾーン・範囲が不正な場合
+        """
+        zone = parse_timezone(tz)
+
+        with self._read_connection() as conn:
+            if start is None or end is None:
+                # created_at のインデックスの両端だけを読む
+                first, last = conn.execute(
+                    "SELECT MIN(created_at), MAX(created_at) FROM study_records"
+                ).fetchone()
+                first, last = _parse_timestamp(first), _parse_timestamp(last)
+                if first is None:
+                    if start is None and end is None:
+                        return []
+                    start = end = start or end
+                start = start or to_local_date(first, zone)
+                end = end or to_local_date(last, zone)
+
+            buckets = timeline_buckets(bucket, zone, start, end)
+            midnight = datetime.min.time()
+            if all(s.time() == e.time() == midnight for _, s, e in buckets):
+                # 日単位の境界なら、範囲内の日別ロールアップだけを読む
+                source, column = "study_rollup_daily", "date"
+                bounds = [
+                    [s.date().isoformat(), e.date().isoformat()] for _, s, e in buckets
+                ]
+                sums = "COALESCE(SUM(d.count), 0), COALESCE(SUM(d.total_time), 0)"
+            else:
+                source, column = "study_records", "created_at"
+                bounds = [
+                    [s.strftime(TIMESTAMP_FORMAT), e.strftime(TIMESTAMP_FORMAT)]
+                    for _, s, e in buckets
+                ]
+                sums = "COUNT(d.created_at), COALESCE(SUM(d.study_time), 0)"
+
+            # 区間の一覧を左にして結合するため、記録のない区間も0で返る
+            rows = conn.execute(
+                f"""
+                SELECT b.key, {sums}
+                FROM json_each(?) AS b
+                LEFT JOIN {source} AS d
+                    ON d.{column} >= json_extract(b.value, '$[0]')
+                   AND d.{column} < json_extract(b.value, '$[1]')
+                GROUP BY b.key
+                ORDER BY b.key
+            """,  # nosec B608 - 表名と列名は固定の文字列
+                (json.dumps(bounds),),
+            ).fetchall()
+
+        return [
+            {"date": buckets[index][0], "count": count, "total_time": total_time}
+            for index, count, total_time in rows
+        ]
+
+    def get_all_totals(self) -> Dict[str, Any]:
+        """
+        全体・カテゴリ別・難易度別・学習時間の分布・日別の集計を1回のクエリでまとめて取得
+
+        ロールアップと学習時間の分布（記録の1回の走査）を UNION ALL でつなぎ、
+        1つのスナップショットから読みます。各値は個別のメソッド（get_totals など）と同じ形式です。
+
+        Returns:
+            {"totals", "categories", "difficulties", "time_distribution", "daily"} の辞書
+            （categories にはカテゴリ未設定の記録を category=None として含む）
+        """
+        with self._read_connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT kind, key, a, b, c FROM (
+                    SELECT 1 AS kind, NULLIF(date, '') AS key, count AS a,
+                           total_time AS b, difficulty_sum AS c,
+                           date AS day, NULL AS latest_created_at, NULL AS latest_id
+                    FROM study_rollup_daily
+                    UNION ALL
+                    SELECT 2, NULLIF(category, ''), count, total_time, difficulty_sum,
+                           NULL, latest_created_at, latest_id
+                    FROM study_rollup_category
+                    UNION ALL
+                    SELECT 3, NULLIF(difficulty, 0), count, total_time, difficulty_sum,
+                           NULL, latest_created_at, latest_id
+                    FROM study_rollup_difficulty
+                    UNION ALL
+                    SELECT 4, NULL, COALESCE(SUM(study_time < 30), 0),
+                           COALESCE(SUM(study_time >= 30 AND study_time < 120), 0),
+                           COALESCE(SUM(study_time >= 120), 0), NULL, NULL, NULL
+                    FROM study_records
+                )
+                ORDER BY kind, day, latest_created_at DESC, latest_id DESC
+            """
+            ).fetchall()
+
+        daily, categories, difficulties = [], [], []
+        totals = {"count": 0, "total_time": 0, "difficulty_sum": 0}
+        short_time = medium_time = long_time = 0
+        for kind, key, a, b, c in rows:
+            if kind == 1:
+                daily.append({"date": key, "count": a, "total_time": b})
+                totals["count"] += a
+                totals["total_time"] += b
+                totals["difficulty_sum"] += c
+            elif kind == 2:
+                categories.append(
+                    {"category": key, "count": a, "total_time": b, "difficulty_sum": c}
+                )
+            elif kind == 3:
+                difficulties.append({"difficulty": key, "count": a, "total_time": b})
+            else:
+                short_time, medium_time, long_time = a, b, c
+
+        return {
+            "totals": totals,
+            "categories": categories,
+            "difficulties": difficulties,
+            "time_distribution": {
+                "short_time": short_time,
+                "medium_time": medium_time,
+                "long_time": long_time,
+                "total_records": totals["count"],
+            },
+            "daily": daily,
+        }
+
+    def get_study_time_percentiles(
+        self,
+        percents: Iterable[float] = DEFAULT_PERCENTS,
+        category: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """
+        学習時間の分位点を取得
+
+        トリガーで更新される学習時間のヒストグラム（カテゴリ別・日別）を学習時間ごとに足し合わせ、
+        その行（学習時間の種類の数）だけから計算します。値は全記録を並べ替えた場合と同じです。
+
+        Args:
+            percents: 求めるパーセント（0〜100）
+            category: 対象のカテゴリ（省略時はすべて）
+            start: 最初の日付（UTC、省略時は制限なし）
+            end: 最後の日付（UTC、省略時は制限なし）
+
+        Returns:
+            {"count": 対象の件数, "percentiles": パーセント -> 学習時間（分、記録がなければNone）}
+
+        Raises:
+            ValueError: パーセントが範囲外の場合、カテゴリと期間を同時に指定した場合
+        """
+        if category is not None and (start is not None or end is not None):
+            raise ValueError("カテゴリと期間は同時に指定できません")
+
+        if category is not None:
+            sql = """
+                SELECT minutes, count FROM study_time_histogram_category
+                WHERE category = ?
+                ORDER BY minutes
+            """
+            params = [category]
+        elif start is not None or end is not None:
+            conditions, params = ["date != ''"], []
+            if start is not None:
+                conditions.append("date >= ?")
+                params.append(start.isoformat())
+            if end is not None:
+                conditions.append("date <= ?")
+                params.append(end.isoformat())
+            sql = f"""
+                SELECT minutes, SUM(count) FROM study_time_histogram_daily
+                WHERE {" AND ".join(conditions)}
+                GROUP BY minutes
+                ORDER BY minutes
+            """  # nosec B608 - 条件は固定の文字列
+        else:
+            sql = """
+                SELECT minutes, SUM(count) FROM study_time_histogram_category
+                GROUP BY minutes
+                ORDER BY minutes
+            """
+            params = []
+
+        with self._read_connection() as conn:
+            histogram = conn.execute(sql, params).fetchall()
+
+        return {
+            "count": sum(count for _, count in histogram),
+            "percentiles": histogram_percentiles(histogram, percents),
+        }
+
+    def get_habit_stats(
+        self,
+        today: Optional[date] = None,
+        windows: Iterable[int] = DEFAULT_HABIT_WINDOWS,
+    ) -> Dict[str, Any]:
+        """
+        学習習慣の統計（連続学習日数・移動平均）を取得
+
+        連続学習の期間（study_streaks）は日別のロールアップのトリガーで書き込みのたびに更新されるため、
+        現在・最長の期間はインデックスで1行ずつ読み、移動平均は日別のロールアップの直近 window 行を読みます。
+        日付は日別のロールアップと同じUTCの日付です。
+
+        Args:
+            today: 基準の日付（省略時はUTCの今日）。今日か前日まで続く期間を現在の連続学習とする
+            windows: 移動平均の期間（日数）
+
+        Returns:
+            {"today", "current_streak", "current_streak_start", "longest_streak",
+             "longest_streak_start", "longest_streak_end",
+             "moving_averages": [{"window", "total_time", "average_time", "study_days"}]}
+
+        Raises:
+            ValueError: 移動平均の期間が1日未満の場合
+        """
+        today = today or datetime.now(timezone.utc).date()
+        windows = check_habit_windows(windows)
+
+        with self._read_connection() as conn:
+            # today 以前に始まった最後の期間が前日以降まで続いていれば、現在の連続学習
+            current = conn.execute(
+                """
+                SELECT first_date, MIN(last_date, :today) FROM (
+                    SELECT first_date, last_date FROM study_streaks
+                    WHERE first_date <= :today
+                    ORDER BY first_date DESC LIMIT 1
+                )
+                WHERE last_date >= :yesterday
+            """,
+                {
+                    "today": today.isoformat(),
+                    "yesterday": (today - timedelta(days=1)).isoformat(),
+                },
+            ).fetchone()
+            longest = conn.execute(
+                """
+                SELECT first_date, last_date FROM study_streaks
+                ORDER BY days DESC, first_date DESC LIMIT 1
+            """
+            ).fetchone()
+            window_totals = [
+                (window,)
+                + conn.execute(
+                    """
+                    SELECT COALESCE(SUM(total_time), 0), COUNT(*)
+                    FROM study_rollup_daily
+                    WHERE date > ? AND date <= ?
+                """,
+                    (
+                        (today - timedelta(days=window)).isoformat(),
+                        today.isoformat(),
+                    ),
+                ).fetchone()
+                for window in windows
+            ]
+
+        return habit_stats(today, current, longest, window_totals)
+
+    def rebuild_rollups(self) -> Dict[str, int]:
+        """
+        ロールアップを学習記録から作り直す（トリガーを経由せずに変更された場合の復旧用）
+
+        Returns:
+            テーブル名 -> 作成した行数
+        """
+        with self._write_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            counts = rebuild_rollups(conn)
+        if self.read_replica is not None:
+            self.read_replica.reload()
+        return counts
+
+    def check_rollups(self) -> Dict[str, int]:
+        """
+        ロールアップが学習記録と一致しているかを確認
+
+        Returns:
+            テーブル名 -> 一致しない行数（0なら一致）
+        """
+        with self._connection() as conn:
+            return check_rollups(conn)
+
+    def _row_to_study_record(self, row) -> StudyRecord:
+        """データベース行をStudyRecordオブジェクトに変換"""
+        return _decode_row(row)
@@ -0,0 +1,140 @@
+"""
+学習記録の検索条件
+
+一覧・エクスポート・APIで共通に使う検索条件と、そのSQLへの変換を提供します。
+"""
+
+import copy
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+# SQLiteの CURRENT_TIMESTAMP と同じ書式（created_at との文字列比較に使う）
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def escape_like(text: str) -> str:
+    """LIKE のワイルドカードをエスケープ（ESCAPE '\\' と組み合わせて使う）"""
+    return re.sub(r"([\\%_])", r"\\\1", text)
+
+
+class RecordFilter:
+    """
+    学習記録の検索条件クラス
+
+    指定された条件だけをAND条件として組み合わせ、
+    パラメータ化された WHERE 句に変換します。
+    """
+
+    def __init__(
+        self,
+        category: Optional[str] = None,
+        category_contains: Optional[str] = None,
+        difficulty: Optional[int] = None,
+        min_time: Optional[int] = None,
+        max_time: Optional[int] = None,
+        keyword: Optional[str] = None,
+        days: Optional[int] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ):
+        """
+        検索条件を初期化
+
+        Args:
+            category: カテゴリ（完全一致、インデックスを使用）
+            category_contains: カテゴリ（部分一致、大文字小文字を区別しない）
+            difficulty: 難易度
+            min_time: 最小学習時間（分）
+            max_time: 最大学習時間（分）
+            keyword: タイトル・内容に含まれるキーワード
+            days: 過去N日間に作成された記録に限定
+            limit: 最大件数（None なら全件）
+            offset: スキップする件数
+        """
+        self.category = category
+        self.category_contains = category_contains
+        self.difficulty = difficulty
+        self.min_time = min_time
+        self.max_time = max_time
+        self.keyword = keyword
+        self.days = days
+        self.limit = limit
+        self.offset = offset
+
+    def replace(self, **changes) -> "RecordFilter":
+        """一部の条件だけを変更した新しい検索条件を作成"""
+        new = copy.copy(self)
+        for key, value in changes.items():
+            if not hasattr(new, key):
+                raise AttributeError(f"不明な検索条件です: {key}")
+            setattr(new, key, value)
+        return new
+
+    def where_clause(self, now: Optional[datetime] = None) -> Tuple[str, List]:
+        """
+        WHERE 句とパラメータに変換
+
+        Args:
+            now: 期間条件の基準時刻（テスト用、省略時は現在時刻）
+
+        Returns:
+            ("WHERE ..." または空文字, パラメータ)
+        """
+        conditions = []
+        params: List = []
+
+        if self.category is not None:
+            conditions.append("category = ?")
+            params.append(self.category)
+        if self.category_contains:
+            conditions.append("category LIKE ? ESCAPE '\\'")
+            params.append(f"%{escape_like(self.category_contains)}%")
+        if self.difficulty is not None:
+            conditions.append("difficulty = ?")
+            params.append(self.difficulty)
+        if self.min_time is not None:
+            conditions.append("study_time >= ?")
+            params.append(self.min_time)
+        if self.max_time is not None:
+            conditions.append("study_time <= ?")
+            params.append(self.max_time)
+        if self.keyword:
+            if len(self.keyword) >= 3:
+                # 3文字以上は全文検索索引（trigram）で候補を絞る
+                conditions.append(
+                    "id IN (SELECT rowid FROM study_records_fts"
+                    " WHERE study_records_fts MATCH ?)"
+                )
+                params.append('"' + self.keyword.replace('"', '""') + '"')
+            else:
+                conditions.append(
+                    "(title LIKE ? ESCAPE '\\' OR content LIKE ? ESCAPE '\\')"
+                )
+                pattern = f"%{escape_like(self.keyword)}%"
+                params.extend([pattern, pattern])
+        if self.days is not None:
+            cutoff = (now or datetime.now()) - timedelta(days=self.days)
+            conditions.append("created_at >= ?")
+            params.append(cutoff.strftime(TIMESTAMP_FORMAT))
+
+        if not conditions:
+            return "", params
+        return "WHERE " + " AND ".join(conditions), params
+
+    def limit_clause(self) -> Tuple[str, List]:
+        """LIMIT/OFFSET 句とパラメータに変換"""
+        if self.limit is None:
+            if not self.offset:
+                return "", []
+            # SQLiteは OFFSET 単独を受け付けないため LIMIT -1（無制限）を付ける
+            return "LIMIT -1 OFFSET ?", [self.offset]
+        return "LIMIT ? OFFSET ?", [self.limit, self.offset]
+
+    def __repr__(self) -> str:
+        conditions = ", ".join(
+            f"{key}={value!r}"
+            for key, value in vars(self).items()
+            if value is not None and not (key == "offset" and value == 0)
+        )
+        return f"RecordFilter({conditions})"
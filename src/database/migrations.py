@@ -0,0 +1,231 @@
+"""
+スキーママイグレーション
+
+バージョン番号付きのスキーマ変更を定義し、未適用のものだけを順番に適用します。
+"""
+
+import sqlite3
+from typing import List, Optional, Tuple
+
+from .rollups import (
+    HISTOGRAM_MIGRATION_SQL,
+    ROLLUP_MIGRATION_SQL,
+    STREAK_MIGRATION_SQL,
+)
+
+# (バージョン, 説明, 実行するSQL)
+# 既存のDBにも安全に適用できるよう、各SQLは可能な限り冪等に書くこと
+# Alembicのリビジョン（src/database/alembic/versions）と1対1で対応させる
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (
+        1,
+        "学習記録テーブルの作成",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS study_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                content TEXT,
+                study_time INTEGER DEFAULT 0,
+                category TEXT,
+                difficulty INTEGER DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+        ],
+    ),
+    (
+        2,
+        "一覧・フィルタ用インデックスの追加",
+        [
+            # 新しい順の一覧（ORDER BY created_at DESC, id DESC）
+            """
+            CREATE INDEX IF NOT EXISTS idx_study_records_created_at
+            ON study_records (created_at)
+            """,
+            # カテゴリ・難易度で絞り込んだ上での新しい順の一覧
+            """
+            CREATE INDEX IF NOT EXISTS idx_study_records_category_created_at
+            ON study_records (category, created_at)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_study_records_difficulty_created_at
+            ON study_records (difficulty, created_at)
+            """,
+        ],
+    ),
+    (
+        3,
+        "全文検索インデックス（FTS5・trigram）の追加",
+        [
+            # trigramトークナイザーは空白で区切られない日本語も部分一致で検索できる
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS study_records_fts USING fts5(
+                title, content,
+                content = 'study_records', content_rowid = 'id',
+                tokenize = 'trigram'
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS study_records_fts_insert
+            AFTER INSERT ON study_records BEGIN
+                INSERT INTO study_records_fts (rowid, title, content)
+                VALUES (new.id, new.title, new.content);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS study_records_fts_delete
+            AFTER DELETE ON study_records BEGIN
+                INSERT INTO study_records_fts
+                    (study_records_fts, rowid, title, content)
+                VALUES ('delete', old.id, old.title, old.content);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS study_records_fts_update
+            AFTER UPDATE OF title, content ON study_records BEGIN
+                INSERT INTO study_records_fts
+                    (study_records_fts, rowid, title, content)
+                VALUES ('delete', old.id, old.title, old.content);
+                INSERT INTO study_records_fts (rowid, title, content)
+                VALUES (new.id, new.title, new.content);
+            END
+            """,
+            # 既存の記録を索引に取り込む
+            "INSERT INTO study_records_fts (study_records_fts) VALUES ('rebuild')",
+        ],
+    ),
+    (
+        4,
+        "ユーザーID・タグ列の追加",
+        [
+            # ADD COLUMN はテーブルを書き換えないため、件数によらずすぐに終わる
+            "ALTER TABLE study_records ADD COLUMN user_id INTEGER",
+            "ALTER TABLE study_records ADD COLUMN tags TEXT",
+            """
+            CREATE INDEX IF NOT EXISTS idx_study_records_user_id_created_at
+            ON study_records (user_id, created_at)
+            """,
+        ],
+    ),
+    (
+        5,
+        "集計用ロールアップテーブルの追加",
+        # テーブル・トリガーの作成と、既存の記録からの集計（src/database/rollups.py）
+        ROLLUP_MIGRATION_SQL,
+    ),
+    (
+        6,
+        "学習時間のヒストグラムの追加",
+        # 分位点用のテーブル・トリガーの作成と、既存の記録からの集計（src/database/rollups.py）
+        HISTOGRAM_MIGRATION_SQL,
+    ),
+    (
+        7,
+        "連続学習の期間の追加",
+        # 日別のロールアップのトリガーと、既存のロールアップからの作成（src/database/rollups.py）
+        STREAK_MIGRATION_SQL,
+    ),
+]
+
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# 適用済みのバージョンを記録するテーブル
+SCHEMA_VERSION_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """適用済みのスキーマバージョンを取得（未管理のDBは0）"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()
+    if not exists:
+        return 0
+
+    version = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0]
+    return version or 0
+
+
+def get_alembic_revision(conn: sqlite3.Connection) -> Optional[str]:
+    """Alembicのリビジョンを取得（Alembicで管理されていないDBはNone）"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'alembic_version'"
+    ).fetchone()
+    if not exists:
+        return None
+
+    row = conn.execute("SELECT version_num FROM alembic_version").fetchone()
+    return row[0] if row else None
+
+
+def stamp_alembic_revision(conn: sqlite3.Connection, revision: str):
+    """
+    Alembicのリビジョンを記録（alembic stamp と同じ）
+
+    呼び出し元のトランザクション内で実行します。
+    """
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS alembic_version (
+            version_num VARCHAR(32) NOT NULL PRIMARY KEY
+        )
+        """
+    )
+    conn.execute("DELETE FROM alembic_version")
+    conn.execute("INSERT INTO alembic_version (version_num) VALUES (?)", (revision,))
+
+
+def apply_migrations(
+    conn: sqlite3.Connection, stamp_revision: Optional[str] = None
+) -> List[int]:
+    """
+    未適用のマイグレーションを適用
+
+    各マイグレーションはバージョンの記録と同じトランザクションで実行されるため、
+    途中で失敗しても中途半端な状態は残りません。
+
+    Args:
+        conn: SQLiteコネクション
+        stamp_revision: 指定した場合、同じトランザクションで
+            Alembicのリビジョンとして記録する
+
+    Returns:
+        今回適用したバージョンの一覧
+    """
+    # 最新であれば書き込みロックを取らずに終了する
+    if get_schema_version(conn) >= LATEST_SCHEMA_VERSION and not stamp_revision:
+        return []
+
+    applied = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(SCHEMA_VERSION_TABLE_SQL)
+
+        # ロック取得までの間に別プロセスが適用している可能性があるため読み直す
+        current = get_schema_version(conn)
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description),
+            )
+            applied.append(version)
+
+        if stamp_revision:
+            stamp_alembic_revision(conn, stamp_revision)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+    return applied
@@ -0,0 +1,159 @@
+"""
+コネクションプール
+
+SQLiteコネクションを再利用するための上限付きプールを提供します。
+"""
+
+import queue
+import sqlite3
+import threading
+from typing import Callable, Optional, Set
+
+
+class ConnectionPool:
+    """
+    SQLiteコネクションプールクラス
+
+    チェックアウト/返却方式でコネクションを再利用します。
+    同時に貸し出せるコネクション数は max_size までに制限され、
+    取得時にはヘルスチェックを行って壊れたコネクションを作り直します。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_size: int = 5,
+        timeout: float = 30.0,
+        pre_ping: bool = True,
+        on_connect: Optional[Callable[[sqlite3.Connection], None]] = None,
+    ):
+        """
+        コネクションプールを初期化
+
+        Args:
+            db_path: データベースファイルのパス
+            max_size: 同時に保持できるコネクションの最大数
+            timeout: コネクション取得の待ち時間（秒）
+            pre_ping: 取得時にヘルスチェックを行うかどうか
+            on_connect: 新しいコネクション作成時に呼ばれるフック
+        """
+        if max_size < 1:
+            raise ValueError("max_size は1以上を指定してください")
+
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self._on_connect = on_connect
+
+        # 最後に返却されたコネクションから再利用する（キャッシュが温まっているため）
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._connections: Set[sqlite3.Connection] = set()
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        """現在開いているコネクション数"""
+        with self._lock:
+            return len(self._connections)
+
+    @property
+    def idle_count(self) -> int:
+        """プール内で待機中のコネクション数"""
+        return self._idle.qsize()
+
+    @property
+    def closed(self) -> bool:
+        """プールがクローズ済みかどうか"""
+        return self._closed
+
+    def acquire(self) -> sqlite3.Connection:
+        """コネクションをチェックアウト"""
+        if self._closed:
+            raise RuntimeError("コネクションプールは既にクローズされています")
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(
+                f"コネクションを取得できませんでした（最大 {self.max_size} 接続）"
+            )
+
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+
+            if self.pre_ping and not self._is_healthy(conn):
+                self._discard(conn)
+                return self._connect()
+            return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn: sqlite3.Connection):
+        """コネクションをプールに返却"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # 状態が不明なコネクションは再利用しない
+            self._discard(conn)
+        else:
+            if self._closed:
+                self._discard(conn)
+            else:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """待機中のコネクションを全てクローズ
+
+        貸し出し中のコネクションは返却時にクローズされます。
+        """
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        """新しいコネクションを作成"""
+        # プール経由で複数スレッドに貸し出すため、スレッドチェックを無効化する
+        # （同時に1スレッドからしか使われないことはプールが保証する）
+        conn = sqlite3.connect(
+            self.db_path, timeout=self.timeout, check_same_thread=False
+        )
+        try:
+            if self._on_connect:
+                self._on_connect(conn)
+        except BaseException:
+            conn.close()
+            raise
+
+        with self._lock:
+            self._connections.add(conn)
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection):
+        """コネクションをクローズしてプールの管理対象から外す"""
+        with self._lock:
+            self._connections.discard(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        """コネクションが利用可能かどうかを確認"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
@@ -0,0 +1,299 @@
+"""
+インメモリの読み込みレプリカ
+
+ディスク上のDBをバックアップAPIで共有キャッシュのインメモリDBに読み込み、
+一覧・検索・集計をスレッドごとのコネクションでメモリ上で並行に処理します。
+"""
+
+import itertools
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# 1回の IN 句に並べるIDの数
+_SYNC_CHUNK_SIZE = 500
+
+# 共有キャッシュのインメモリDBに付ける名前の通し番号（プロセス内で一意にする）
+_MEMORY_DB_IDS = itertools.count()
+
+# レプリカ用のディスク接続でだけ有効な一時トリガー（変更された記録のIDを集める）
+_CHANGE_TRACKING_SQL = [
+    "CREATE TEMP TABLE IF NOT EXISTS replica_changes (id INTEGER PRIMARY KEY)",
+    """
+    CREATE TEMP TRIGGER IF NOT EXISTS replica_track_insert
+    AFTER INSERT ON main.study_records BEGIN
+        INSERT OR IGNORE INTO replica_changes (id) VALUES (new.id);
+    END
+    """,
+    """
+    CREATE TEMP TRIGGER IF NOT EXISTS replica_track_update
+    AFTER UPDATE ON main.study_records BEGIN
+        INSERT OR IGNORE INTO replica_changes (id) VALUES (old.id);
+        INSERT OR IGNORE INTO replica_changes (id) VALUES (new.id);
+    END
+    """,
+    """
+    CREATE TEMP TRIGGER IF NOT EXISTS replica_track_delete
+    AFTER DELETE ON main.study_records BEGIN
+        INSERT OR IGNORE INTO replica_changes (id) VALUES (old.id);
+    END
+    """,
+]
+
+
+class _ReadWriteLock:
+    """
+    読み込みは並行、メモリ上のDBの更新は排他にするロック
+
+    更新を待っている間は新しい読み込みを待たせるため、読み込みが続いても
+    更新が止まり続けることはありません。
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        with self._cond:
+            while self._writing or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writing or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+
+class ReadReplica:
+    """
+    インメモリ読み込みレプリカクラス
+
+    メモリ上のDBは共有キャッシュ（file:...?mode=memory&cache=shared）に置き、
+    読み込みはスレッドごとのコネクションで並行に処理します。
+
+    書き込みはレプリカ専用のディスク接続で行い、コミット後に変更された記録だけを
+    メモリ上のDBへ反映してから呼び出し元に戻ります。反映の間だけ読み込みを止めるため、
+    書き込んだ内容は直後の読み込みから必ず見えます（read-your-writes）。
+    他のコネクション・プロセスによる書き込みは PRAGMA data_version で検知し、
+    新しいインメモリDBに読み込み直してから差し替えます。読み込み直している間も、
+    読み込みは差し替え前のDBで処理を続けます。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        timeout: float = 30.0,
+        on_connect: Optional[Callable[[sqlite3.Connection], None]] = None,
+    ):
+        """
+        レプリカを作成してディスク上のDBを読み込む
+
+        Args:
+            db_path: ディスク上のデータベースファイルのパス
+            timeout: 書き込みロックの待ち時間（秒）
+            on_connect: ディスク接続の作成時に呼ばれるフック
+        """
+        self.db_path = db_path
+        self.closed = False
+        self.reloads = 0
+        self.synced_records = 0
+        # ディスク接続（書き込み・変更の検知・読み込み直し）を直列化するロック
+        self._disk_lock = threading.Lock()
+        # メモリ上のDBの読み込みと更新・差し替えのロック
+        self._memory_lock = _ReadWriteLock()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._generation = 0
+        self._memory: Optional[sqlite3.Connection] = None
+        self._disk = sqlite3.connect(db_path, timeout=timeout, check_same_thread=False)
+        try:
+            if on_connect is not None:
+                on_connect(self._disk)
+            for statement in _CHANGE_TRACKING_SQL:
+                self._disk.execute(statement)
+            self._disk.commit()
+            with self._disk_lock:
+                self._load()
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        """ディスク接続とメモリ上のDBをクローズ"""
+        self.closed = True
+        self._disk.close()
+        with self._memory_lock.exclusive():
+            self._close_memory()
+
+    def reload(self):
+        """ディスク上のDB全体を読み込み直す"""
+        with self._disk_lock:
+            self._load()
+            self.reloads += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """読み込み直しと差分反映の回数を取得"""
+        return {"reloads": self.reloads, "synced_records": self.synced_records}
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        """
+        メモリ上のDBのコネクションを借りる（スレッドごとのコネクション）
+
+        他のコネクションの書き込みがあれば先に反映します。書き込み中の場合は
+        確認を書き込みの側に任せ、待たずに現在の内容を読みます。
+        """
+        if self._disk_lock.acquire(blocking=False):
+            try:
+                self._reload_if_changed()
+            finally:
+                self._disk_lock.release()
+        with self._memory_lock.shared():
+            if self._memory is None:
+                raise RuntimeError("レプリカは既にクローズされています")
+            yield self._reader()
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """
+        ディスク接続を借りる
+
+        正常終了時はコミットし、変更された記録をメモリ上のDBに反映してから返却します。
+        例外発生時はロールバックします。ディスクへのコミットの間も読み込みは止まりません。
+        """
+        with self._disk_lock:
+            self._reload_if_changed()
+            try:
+                with self._disk:
+                    yield self._disk
+            except BaseException:
+                self._clear_changes()
+                raise
+            self._apply_changes()
+
+    def _reader(self) -> sqlite3.Connection:
+        """このスレッドの読み込み用コネクション（差し替え後は作り直す）"""
+        local = self._local
+        if getattr(local, "generation", None) != self._generation:
+            conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+            with self._readers_lock:
+                self._readers.append(conn)
+            local.conn, local.generation = conn, self._generation
+        return local.conn
+
+    def _load(self):
+        """
+        ディスク上のDBを新しいインメモリDBにコピーして差し替える（_disk_lock を取得して呼ぶ）
+
+        コピーの間は読み込みを止めず、差し替えの間だけ排他にします。
+        """
+        uri = f"file:study_tracker_replica_{next(_MEMORY_DB_IDS)}?mode=memory&cache=shared"
+        memory = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        try:
+            self._disk.backup(memory)
+            columns = [
+                row[1] for row in memory.execute("PRAGMA table_info(study_records)")
+            ]
+            data_version = self._read_data_version()
+        except BaseException:
+            memory.close()
+            raise
+
+        with self._memory_lock.exclusive():
+            self._close_memory()
+            self._memory, self._uri = memory, uri
+            self._columns = columns
+            self._data_version = data_version
+            self._generation += 1
+
+    def _close_memory(self):
+        """メモリ上のDBと読み込み用コネクションをクローズ（排他ロックを取得して呼ぶ）"""
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for conn in readers:
+            conn.close()
+        if self._memory is not None:
+            self._memory.close()
+            self._memory = None
+        self._generation += 1
+
+    def _read_data_version(self) -> int:
+        return self._disk.execute("PRAGMA data_version").fetchone()[0]
+
+    def _reload_if_changed(self):
+        """他のコネクションがコミットしていれば読み込み直す（_disk_lock を取得して呼ぶ）"""
+        if self.closed:
+            raise RuntimeError("レプリカは既にクローズされています")
+        if self._read_data_version() != self._data_version:
+            self._load()
+            self.reloads += 1
+
+    def _clear_changes(self):
+        with self._disk:
+            self._disk.execute("DELETE FROM replica_changes")
+
+    def _apply_changes(self):
+        """コミット済みの変更をメモリ上のDBに反映（_disk_lock を取得して呼ぶ）"""
+        ids = [row[0] for row in self._disk.execute("SELECT id FROM replica_changes")]
+        if not ids:
+            return
+
+        columns = ", ".join(self._columns)
+        placeholders = ", ".join("?" for _ in self._columns)
+        assignments = ", ".join(
+            f"{column} = excluded.{column}"
+            for column in self._columns
+            if column != "id"
+        )
+        upsert = (
+            f"INSERT INTO study_records ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT(id) DO UPDATE SET {assignments}"
+        )
+
+        # ディスクからの読み出しは読み込みを止めずに済ませる
+        chunks = []
+        for start in range(0, len(ids), _SYNC_CHUNK_SIZE):
+            chunk = ids[start : start + _SYNC_CHUNK_SIZE]
+            marks = ", ".join("?" for _ in chunk)
+            rows = self._disk.execute(
+                f"SELECT {columns} FROM study_records WHERE id IN ({marks})", chunk
+            ).fetchall()
+            # ディスクに残っていない記録は削除された
+            remaining = {row[0] for row in rows}
+            chunks.append((rows, [(i,) for i in chunk if i not in remaining]))
+
+        with self._memory_lock.exclusive(), self._memory:
+            for rows, deleted in chunks:
+                self._memory.executemany(upsert, rows)
+                self._memory.executemany(
+                    "DELETE FROM study_records WHERE id = ?", deleted
+                )
+
+        self._clear_changes()
+        self.synced_records += len(ids)
@@ -0,0 +1,144 @@
+"""
+Alembicによるスキーマのリビジョン管理
+
+スキーマの変更は `study-tracker db upgrade`（Alembic）で適用し、
+アプリケーションの起動時にはリビジョンの確認だけを行います。
+Alembic自体は、マイグレーションを実行する場合にだけ読み込みます。
+"""
+
+from pathlib import Path
+from typing import Optional
+
+from .migrations import MIGRATIONS, SCHEMA_VERSION_TABLE_SQL
+
+# マイグレーションスクリプト（env.py, versions/）の場所
+ALEMBIC_DIR = Path(__file__).with_name("alembic")
+
+# Alembicのリビジョンと、対応する組み込みマイグレーションのバージョン
+REVISIONS = {
+    "0001": 3,
+    "0002": 4,
+    "0003": 5,
+    "0004": 6,
+    "0005": 7,
+}
+HEAD_REVISION = "0005"
+
+
+class SchemaRevisionError(RuntimeError):
+    """データベースのスキーマがこのバージョンのコードと合わない場合のエラー"""
+
+
+def check_revision(revision: str):
+    """
+    起動時のリビジョン確認
+
+    Args:
+        revision: データベースに記録されているAlembicのリビジョン
+
+    Raises:
+        SchemaRevisionError: 最新でない、またはコードより新しいリビジョンの場合
+    """
+    if revision == HEAD_REVISION:
+        return
+    if revision in REVISIONS:
+        raise SchemaRevisionError(
+            f"データベースのスキーマが古いままです（{revision} → {HEAD_REVISION}）。"
+            "study-tracker db upgrade を実行してください"
+        )
+    raise SchemaRevisionError(
+        f"データベースのスキーマ（リビジョン {revision}）が"
+        "このバージョンのアプリケーションより新しいです"
+    )
+
+
+def run_builtin_migrations(up_to: int):
+    """
+    組み込みマイグレーションを指定したバージョンまで適用（SQLite用のリビジョンから使う）
+
+    Alembic導入前に組み込みの手順で作成したDBでは、適用済みのバージョンを飛ばします。
+
+    Args:
+        up_to: 適用する最後のバージョン
+    """
+    from alembic import op
+
+    op.execute(SCHEMA_VERSION_TABLE_SQL)
+    for version, _, statements in MIGRATIONS:
+        if version > up_to or _has_schema_version(version):
+            continue
+        for statement in statements:
+            op.execute(statement)
+        record_schema_version(version)
+
+
+def record_schema_version(version: int):
+    """組み込みマイグレーションのバージョンを適用済みとして記録（記録済みなら何もしない）"""
+    from alembic import op
+    from sqlalchemy import text
+
+    if _has_schema_version(version):
+        return
+
+    description = next(desc for ver, desc, _ in MIGRATIONS if ver == version)
+    op.execute(
+        text(
+            "INSERT INTO schema_version (version, description)"
+            " VALUES (:version, :description)"
+        ).bindparams(version=version, description=description)
+    )
+
+
+def _has_schema_version(version: int) -> bool:
+    from alembic import context, op
+    from sqlalchemy import text
+
+    # SQLの出力（--sql）ではDBを確認できないため、すべて未適用として扱う
+    if context.is_offline_mode():
+        return False
+
+    row = (
+        op.get_bind()
+        .execute(
+            text("SELECT 1 FROM schema_version WHERE version = :version"),
+            {"version": version},
+        )
+        .first()
+    )
+    return row is not None
+
+
+def alembic_config(database_url: str):
+    """
+    Alembicの設定を作成
+
+    alembic.ini を使わずに、パッケージ内のスクリプトとエンジンURLを指定します。
+    """
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", str(ALEMBIC_DIR))
+    # URLはパスワードに % を含むことがあるため、iniの補間を通さずに渡す
+    config.attributes["database_url"] = database_url
+    return config
+
+
+def upgrade(database_url: str, revision: str = "head"):
+    """指定したリビジョンまでスキーマを更新"""
+    from alembic import command
+
+    command.upgrade(alembic_config(database_url), revision)
+
+
+def current_revision(database_url: str) -> Optional[str]:
+    """データベースに記録されているリビジョンを取得"""
+    from alembic.runtime.migration import MigrationContext
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import NullPool
+
+    engine = create_engine(database_url, poolclass=NullPool)
+    try:
+        with engine.connect() as conn:
+            return MigrationContext.configure(conn).get_current_revision()
+    finally:
+        engine.dispose()
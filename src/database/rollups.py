@@ -0,0 +1,612 @@
+"""
+集計用のロールアップテーブル
+
+日別・カテゴリ別・難易度別の件数・学習時間・難易度の合計を、
+study_records のトリガーで書き込みのたびに更新します。
+統計はロールアップの行（グループ数）だけを読めばよく、記録の件数によらず一定の速さで返せます。
+
+学習時間の分位点のために、日別・カテゴリ別の学習時間（分）ごとの件数（ヒストグラム）も
+同じようにトリガーで更新します。学習時間は分単位の整数のため、
+ヒストグラムは誤差のない分位点の要約で、日・カテゴリをまたいで足し合わせられます。
+
+学習習慣の分析のために、記録のある日が続く期間（連続学習）の一覧も、
+日別のロールアップの行の追加・削除のトリガーで前後の期間とつなぐ・分けることで更新します。
+"""
+
+import math
+import sqlite3
+from bisect import bisect_left
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# グループのキー（NULL は主キーにできないため空文字列・0 に置き換える）
+_DAY_KEY = "COALESCE(substr({row}.created_at, 1, 10), '')"
+_CATEGORY_KEY = "COALESCE({row}.category, '')"
+_DIFFICULTY_KEY = "COALESCE({row}.difficulty, 0)"
+
+ROLLUP_TABLES = (
+    "study_rollup_daily",
+    "study_rollup_category",
+    "study_rollup_difficulty",
+)
+
+_SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS study_rollup_daily (
+        date TEXT PRIMARY KEY,
+        count INTEGER NOT NULL,
+        total_time INTEGER NOT NULL,
+        difficulty_sum INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    # latest_created_at, latest_id はグループの最新の記録（一覧での初出順に並べるため）
+    """
+    CREATE TABLE IF NOT EXISTS study_rollup_category (
+        category TEXT PRIMARY KEY,
+        count INTEGER NOT NULL,
+        total_time INTEGER NOT NULL,
+        difficulty_sum INTEGER NOT NULL,
+        latest_created_at TEXT,
+        latest_id INTEGER
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS study_rollup_difficulty (
+        difficulty INTEGER PRIMARY KEY,
+        count INTEGER NOT NULL,
+        total_time INTEGER NOT NULL,
+        difficulty_sum INTEGER NOT NULL,
+        latest_created_at TEXT,
+        latest_id INTEGER
+    ) WITHOUT ROWID
+    """,
+]
+
+
+def _add_sql(row: str) -> str:
+    """row（new/old）の記録を各ロールアップに加えるSQL"""
+    day = _DAY_KEY.format(row=row)
+    totals = f"1, COALESCE({row}.study_time, 0), COALESCE({row}.difficulty, 0)"
+    # 作成日時のない記録はグループの最新にしない（再計算の結果と揃える）
+    latest = (
+        f"{row}.created_at,"
+        f" CASE WHEN {row}.created_at IS NULL THEN NULL ELSE {row}.id END"
+    )
+    newer = (
+        "latest_created_at IS NULL OR (excluded.latest_created_at, excluded.latest_id)"
+        " > (latest_created_at, latest_id)"
+    )
+    sql = f"""
+        INSERT INTO study_rollup_daily (date, count, total_time, difficulty_sum)
+        VALUES ({day}, {totals})
+        ON CONFLICT (date) DO UPDATE SET
+            count = count + 1,
+            total_time = total_time + excluded.total_time,
+            difficulty_sum = difficulty_sum + excluded.difficulty_sum;
+    """
+    for table, column, key in (
+        ("study_rollup_category", "category", _CATEGORY_KEY),
+        ("study_rollup_difficulty", "difficulty", _DIFFICULTY_KEY),
+    ):
+        sql += f"""
+        INSERT INTO {table} (
+            {column}, count, total_time, difficulty_sum, latest_created_at, latest_id
+        )
+        VALUES ({key.format(row=row)}, {totals}, {latest})
+        ON CONFLICT ({column}) DO UPDATE SET
+            count = count + 1,
+            total_time = total_time + excluded.total_time,
+            difficulty_sum = difficulty_sum + excluded.difficulty_sum,
+            latest_created_at = CASE WHEN {newer}
+                THEN excluded.latest_created_at ELSE latest_created_at END,
+            latest_id = CASE WHEN {newer}
+                THEN excluded.latest_id ELSE latest_id END;
+        """
+    return sql
+
+
+def _remove_sql(row: str) -> str:
+    """row（new/old）の記録を各ロールアップから除くSQL"""
+    sql = ""
+    for table, column, key, empty in (
+        ("study_rollup_daily", "date", _DAY_KEY, None),
+        ("study_rollup_category", "category", _CATEGORY_KEY, "''"),
+        ("study_rollup_difficulty", "difficulty", _DIFFICULTY_KEY, "0"),
+    ):
+        key = key.format(row=row)
+        sql += f"""
+        UPDATE {table} SET
+            count = count - 1,
+            total_time = total_time - COALESCE({row}.study_time, 0),
+            difficulty_sum = difficulty_sum - COALESCE({row}.difficulty, 0)
+        WHERE {column} = {key};
+        DELETE FROM {table} WHERE {column} = {key} AND count <= 0;
+        """
+        if empty is None:
+            continue
+        # 最新の記録が除かれた場合だけ、(列, created_at) のインデックスで最新を探し直す
+        # （NULL は空文字列・0 と同じグループのため別に探す）
+        sql += f"""
+        UPDATE {table} SET (latest_created_at, latest_id) = (
+            SELECT created_at, id FROM (
+                SELECT * FROM (
+                    SELECT created_at, id FROM study_records
+                    WHERE {column} = {key} AND created_at IS NOT NULL
+                    ORDER BY created_at DESC, id DESC LIMIT 1
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT created_at, id FROM study_records
+                    WHERE {key} = {empty} AND {column} IS NULL
+                      AND created_at IS NOT NULL
+                    ORDER BY created_at DESC, id DESC LIMIT 1
+                )
+            )
+            ORDER BY created_at DESC, id DESC LIMIT 1
+        )
+        WHERE {column} = {key} AND latest_id = {row}.id;
+        """
+    return sql
+
+
+_TRIGGER_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS study_rollup_insert
+    AFTER INSERT ON study_records BEGIN
+        {_add_sql("new")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS study_rollup_delete
+    AFTER DELETE ON study_records BEGIN
+        {_remove_sql("old")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS study_rollup_update
+    AFTER UPDATE OF created_at, study_time, category, difficulty
+    ON study_records BEGIN
+        {_remove_sql("old")}
+        {_add_sql("new")}
+    END
+    """,
+]
+
+
+def _grouped_with_latest(column: str, key: str) -> str:
+    """カテゴリ・難易度別のロールアップを study_records から計算するSELECT"""
+    key = key.format(row="study_records")
+    return f"""
+        SELECT {column}, COUNT(*), COALESCE(SUM(study_time), 0),
+               COALESCE(SUM(difficulty), 0),
+               MAX(CASE WHEN position = 1 THEN created_at END),
+               MAX(CASE WHEN position = 1 AND created_at IS NOT NULL THEN id END)
+        FROM (
+            SELECT {key} AS {column}, study_time, difficulty, created_at, id,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY {key} ORDER BY created_at DESC, id DESC
+                   ) AS position
+            FROM study_records
+        )
+        GROUP BY {column}
+    """
+
+
+# 各ロールアップの正しい内容（テーブルと同じ列順）
+_EXPECTED_SQL = {
+    "study_rollup_daily": f"""
+        SELECT {_DAY_KEY.format(row="study_records")} AS date, COUNT(*),
+               COALESCE(SUM(study_time), 0), COALESCE(SUM(difficulty), 0)
+        FROM study_records
+        GROUP BY date
+    """,
+    "study_rollup_category": _grouped_with_latest("category", _CATEGORY_KEY),
+    "study_rollup_difficulty": _grouped_with_latest("difficulty", _DIFFICULTY_KEY),
+}
+
+REBUILD_SQL = [
+    statement
+    for table in ROLLUP_TABLES
+    for statement in (
+        f"DELETE FROM {table}",
+        f"INSERT INTO {table} {_EXPECTED_SQL[table]}",
+    )
+]
+
+# マイグレーションで実行するSQL（既存の記録からロールアップを作成する）
+ROLLUP_MIGRATION_SQL = _SCHEMA_SQL + _TRIGGER_SQL + REBUILD_SQL
+
+
+# ---- 学習時間のヒストグラム（組み込みマイグレーション 6） ----
+
+HISTOGRAM_TABLES = (
+    "study_time_histogram_daily",
+    "study_time_histogram_category",
+)
+
+# 分位点の既定のパーセント（中央値・p90・p99）
+DEFAULT_PERCENTS = (50, 90, 99)
+
+_MINUTES_KEY = "COALESCE({row}.study_time, 0)"
+
+# (テーブル, グループの列, グループのキー)
+_HISTOGRAM_GROUPS = (
+    ("study_time_histogram_daily", "date", _DAY_KEY),
+    ("study_time_histogram_category", "category", _CATEGORY_KEY),
+)
+
+_HISTOGRAM_SCHEMA_SQL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {table} (
+        {column} TEXT NOT NULL,
+        minutes INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY ({column}, minutes)
+    ) WITHOUT ROWID
+    """
+    for table, column, _ in _HISTOGRAM_GROUPS
+]
+
+
+def _histogram_add_sql(row: str) -> str:
+    """row（new/old）の記録を各ヒストグラムに加えるSQL"""
+    minutes = _MINUTES_KEY.format(row=row)
+    return "".join(
+        f"""
+        INSERT INTO {table} ({column}, minutes, count)
+        VALUES ({key.format(row=row)}, {minutes}, 1)
+        ON CONFLICT ({column}, minutes) DO UPDATE SET count = count + 1;
+        """
+        for table, column, key in _HISTOGRAM_GROUPS
+    )
+
+
+def _histogram_remove_sql(row: str) -> str:
+    """row（new/old）の記録を各ヒストグラムから除くSQL"""
+    minutes = _MINUTES_KEY.format(row=row)
+    sql = ""
+    for table, column, key in _HISTOGRAM_GROUPS:
+        where = f"{column} = {key.format(row=row)} AND minutes = {minutes}"
+        sql += f"""
+        UPDATE {table} SET count = count - 1 WHERE {where};
+        DELETE FROM {table} WHERE {where} AND count <= 0;
+        """
+    return sql
+
+
+_HISTOGRAM_TRIGGER_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS study_time_histogram_insert
+    AFTER INSERT ON study_records BEGIN
+        {_histogram_add_sql("new")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS study_time_histogram_delete
+    AFTER DELETE ON study_records BEGIN
+        {_histogram_remove_sql("old")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS study_time_histogram_update
+    AFTER UPDATE OF created_at, study_time, category ON study_records BEGIN
+        {_histogram_remove_sql("old")}
+        {_histogram_add_sql("new")}
+    END
+    """,
+]
+
+_EXPECTED_SQL.update(
+    {
+        table: f"""
+        SELECT {key.format(row="study_records")} AS {column},
+               {_MINUTES_KEY.format(row="study_records")} AS minutes, COUNT(*)
+        FROM study_records
+        GROUP BY 1, 2
+    """
+        for table, column, key in _HISTOGRAM_GROUPS
+    }
+)
+
+HISTOGRAM_REBUILD_SQL = [
+    statement
+    for table in HISTOGRAM_TABLES
+    for statement in (
+        f"DELETE FROM {table}",
+        f"INSERT INTO {table} {_EXPECTED_SQL[table]}",
+    )
+]
+
+HISTOGRAM_MIGRATION_SQL = (
+    _HISTOGRAM_SCHEMA_SQL + _HISTOGRAM_TRIGGER_SQL + HISTOGRAM_REBUILD_SQL
+)
+
+
+def histogram_percentiles(
+    histogram: Sequence[Tuple[int, int]], percents: Iterable[float]
+) -> Dict[float, Optional[float]]:
+    """
+    学習時間のヒストグラムから分位点（線形補間）を計算
+
+    記録を学習時間順に並べたときの位置 (件数 - 1) * p / 100 の値を、
+    前後の値の線形補間で求めます（numpy.percentile の既定の方法と同じ）。
+    計算量はヒストグラムの行数（学習時間の種類の数）に比例し、記録の件数によりません。
+
+    Args:
+        histogram: 学習時間（分）の昇順の (学習時間, 件数) の並び
+        percents: 求めるパーセント（0〜100）
+
+    Returns:
+        パーセント -> 学習時間（分、小数第2位で丸める。記録がなければNone）
+
+    Raises:
+        ValueError: パーセントが0〜100の範囲外の場合
+    """
+    percents = list(percents)
+    for percent in percents:
+        if not 0 <= percent <= 100:
+            raise ValueError("パーセントは0〜100の範囲で指定してください")
+
+    # 各学習時間の最後の記録の位置（累積件数 - 1）
+    values, last_positions = [], []
+    position = -1
+    for minutes, count in histogram:
+        position += count
+        values.append(minutes)
+        last_positions.append(position)
+    if position < 0:
+        return {percent: None for percent in percents}
+
+    def value_at(index: int) -> int:
+        # 最後の位置が index 以上になる最初の学習時間
+        return values[bisect_left(last_positions, index)]
+
+    result = {}
+    for percent in percents:
+        rank = position * percent / 100
+        lower = math.floor(rank)
+        below = value_at(lower)
+        above = value_at(min(lower + 1, position))
+        result[percent] = round(below + (above - below) * (rank - lower), 2)
+    return result
+
+
+# ---- 連続学習の期間（組み込みマイグレーション 7） ----
+
+STREAK_TABLES = ("study_streaks",)
+
+# 移動平均の既定の期間（日数）
+DEFAULT_HABIT_WINDOWS = (7, 30)
+
+# 記録のある日（UTCの日付）が続く期間ごとに1行（first_date から last_date までの days 日）
+_STREAK_SCHEMA_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS study_streaks (
+        first_date TEXT PRIMARY KEY,
+        last_date TEXT NOT NULL,
+        days INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_study_streaks_last_date "
+    "ON study_streaks(last_date)",
+    "CREATE INDEX IF NOT EXISTS idx_study_streaks_days "
+    "ON study_streaks(days, first_date)",
+]
+
+
+def _days_between(first: str, last: str) -> str:
+    """first から last までの日数（両端を含む）を求めるSQL式"""
+    return f"CAST(julianday({last}) - julianday({first}) AS INTEGER) + 1"
+
+
+# 日別のロールアップに行が増えた（その日の最初の記録）場合は前日・翌日の期間とつなぎ、
+# 行がなくなった（その日の最後の記録が除かれた）場合はその日を含む期間を分ける。
+# どちらも前後の期間を主キー・インデックスで引くだけのため、期間の数にほぼよらない。
+# 日付として読めない行（作成日時のない記録など）は対象にしない
+_PREVIOUS_DAY = "date({row}.date, '-1 day')"
+_NEXT_DAY = "date({row}.date, '+1 day')"
+_STREAK_END = (
+    "COALESCE((SELECT later.last_date FROM study_streaks AS later"
+    f" WHERE later.first_date = {_NEXT_DAY.format(row='new')}), new.date)"
+)
+_CONTAINING_STREAK = (
+    "(SELECT MAX(first_date) FROM study_streaks WHERE first_date <= old.date)"
+)
+
+_STREAK_TRIGGER_SQL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS study_streak_insert
+    AFTER INSERT ON study_rollup_daily WHEN date(new.date) IS new.date BEGIN
+        INSERT INTO study_streaks (first_date, last_date, days)
+        SELECT new.date, {_STREAK_END}, {_days_between("new.date", _STREAK_END)}
+        WHERE NOT EXISTS (
+            SELECT 1 FROM study_streaks
+            WHERE last_date = {_PREVIOUS_DAY.format(row="new")}
+        );
+        UPDATE study_streaks SET
+            last_date = {_STREAK_END},
+            days = {_days_between("first_date", _STREAK_END)}
+        WHERE last_date = {_PREVIOUS_DAY.format(row="new")};
+        DELETE FROM study_streaks WHERE first_date = {_NEXT_DAY.format(row="new")};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS study_streak_delete
+    AFTER DELETE ON study_rollup_daily WHEN date(old.date) IS old.date BEGIN
+        INSERT INTO study_streaks (first_date, last_date, days)
+        SELECT {_NEXT_DAY.format(row="old")}, last_date,
+               {_days_between(_NEXT_DAY.format(row="old"), "last_date")}
+        FROM study_streaks
+        WHERE first_date = {_CONTAINING_STREAK} AND last_date > old.date;
+        UPDATE study_streaks SET
+            last_date = {_PREVIOUS_DAY.format(row="old")},
+            days = {_days_between("first_date", _PREVIOUS_DAY.format(row="old"))}
+        WHERE first_date = {_CONTAINING_STREAK} AND first_date < old.date;
+        DELETE FROM study_streaks WHERE first_date = old.date;
+    END
+    """,
+]
+
+# 記録のある日を「日付 - 順位」が同じもの同士でまとめると、連続する期間になる
+_STREAK_EXPECTED_SQL = f"""
+    SELECT MIN(date), MAX(date), COUNT(*)
+    FROM (
+        SELECT date, julianday(date) - ROW_NUMBER() OVER (ORDER BY date) AS island
+        FROM ({_EXPECTED_SQL["study_rollup_daily"]})
+        WHERE date(date) IS date
+    )
+    GROUP BY island
+"""
+_EXPECTED_SQL["study_streaks"] = _STREAK_EXPECTED_SQL
+
+STREAK_REBUILD_SQL = [
+    "DELETE FROM study_streaks",
+    f"INSERT INTO study_streaks {_EXPECTED_SQL['study_streaks']}",
+]
+
+STREAK_MIGRATION_SQL = _STREAK_SCHEMA_SQL + _STREAK_TRIGGER_SQL + STREAK_REBUILD_SQL
+
+
+def check_habit_windows(windows: Iterable[int]) -> List[int]:
+    """
+    移動平均の期間を確認
+
+    Raises:
+        ValueError: 期間が1日未満の場合
+    """
+    windows = list(windows)
+    for window in windows:
+        if window < 1:
+            raise ValueError("移動平均の期間は1日以上を指定してください")
+    return windows
+
+
+def habit_stats(
+    today: date,
+    current: Optional[Tuple[str, str]],
+    longest: Optional[Tuple[str, str]],
+    window_totals: Iterable[Tuple[int, int, int]],
+) -> Dict[str, Any]:
+    """
+    学習習慣の統計の辞書を作成
+
+    Args:
+        today: 基準の日付
+        current: 現在の連続学習の (最初の日, 基準の日までの最後の日)（なければNone）
+        longest: 最長の連続学習の (最初の日, 最後の日)（なければNone）
+        window_totals: 移動平均の (期間の日数, 合計学習時間, 記録のある日数) の並び
+    """
+
+    def length(streak) -> int:
+        if not streak:
+            return 0
+        first, last = map(date.fromisoformat, streak)
+        return (last - first).days + 1
+
+    return {
+        "today": today.isoformat(),
+        "current_streak": length(current),
+        "current_streak_start": current[0] if current else None,
+        "longest_streak": length(longest),
+        "longest_streak_start": longest[0] if longest else None,
+        "longest_streak_end": longest[1] if longest else None,
+        "moving_averages": [
+            {
+                "window": window,
+                "total_time": total_time,
+                "average_time": round(total_time / window, 2),
+                "study_days": study_days,
+            }
+            for window, total_time, study_days in window_totals
+        ],
+    }
+
+
+def habit_stats_from_daily(
+    daily_totals: Iterable[Dict[str, Any]],
+    today: date,
+    windows: Iterable[int] = DEFAULT_HABIT_WINDOWS,
+) -> Dict[str, Any]:
+    """
+    日別の集計から学習習慣の統計を計算（連続学習の期間のテーブルがないデータベース用）
+
+    戻り値は DatabaseManager.get_habit_stats と同じです。
+    計算量は記録のある日数に比例します。
+    """
+    windows = check_habit_windows(windows)
+    days = {}
+    for day in daily_totals:
+        try:
+            days[date.fromisoformat(str(day["date"]))] = day["total_time"]
+        except ValueError:  # 日付として読めない行は連続学習の期間と同じく除く
+            continue
+
+    streaks: List[List[date]] = []
+    for day in sorted(days):
+        if streaks and streaks[-1][1] == day - timedelta(days=1):
+            streaks[-1][1] = day
+        else:
+            streaks.append([day, day])
+
+    current = None
+    started = [streak for streak in streaks if streak[0] <= today]
+    if started and started[-1][1] >= today - timedelta(days=1):
+        first, last = started[-1]
+        current = (first.isoformat(), min(last, today).isoformat())
+    # 同じ長さの期間が複数あれば新しいほう
+    longest = max(
+        reversed(streaks), key=lambda streak: streak[1] - streak[0], default=None
+    )
+
+    window_totals = []
+    for window in windows:
+        recent = [
+            total
+            for day, total in days.items()
+            if today - timedelta(days=window) < day <= today
+        ]
+        window_totals.append((window, sum(recent), len(recent)))
+
+    return habit_stats(
+        today,
+        current,
+        longest and (longest[0].isoformat(), longest[1].isoformat()),
+        window_totals,
+    )
+
+
+def rebuild_rollups(conn: sqlite3.Connection) -> Dict[str, int]:
+    """
+    study_records からロールアップ（ヒストグラム・連続学習の期間を含む）を作り直す
+
+    呼び出し元のトランザクション内で実行します。
+
+    Returns:
+        テーブル名 -> 作成した行数
+    """
+    for statement in REBUILD_SQL + HISTOGRAM_REBUILD_SQL + STREAK_REBUILD_SQL:
+        conn.execute(statement)
+    return {
+        table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        for table in ROLLUP_TABLES + HISTOGRAM_TABLES + STREAK_TABLES
+    }
+
+
+def check_rollups(conn: sqlite3.Connection) -> Dict[str, int]:
+    """
+    ロールアップ（ヒストグラム・連続学習の期間を含む）が study_records と一致しているかを確認
+
+    Returns:
+        テーブル名 -> 一致しない行数（余分な行と足りない行の合計。0なら一致）
+    """
+    mismatches = {}
+    for table in ROLLUP_TABLES + HISTOGRAM_TABLES + STREAK_TABLES:
+        expected = _EXPECTED_SQL[table]
+        mismatches[table] = conn.execute(
+            f"""
+            SELECT
+                (SELECT COUNT(*) FROM ({expected} EXCEPT SELECT * FROM {table}))
+              + (SELECT COUNT(*) FROM (SELECT * FROM {table} EXCEPT {expected}))
+            """
+        ).fetchone()[0]
+    return mismatches
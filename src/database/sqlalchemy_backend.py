@@ -0,0 +1,1061 @@
+"""
+SQLAlchemy Coreによるデータベース接続管理
+
+DatabaseManager と同じAPIを、SQLAlchemy Core のテーブル定義とエンジンで提供します。
+エンジンURLを変えるだけで、SQLite以外のデータベースでも同じコードで動作します。
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    bindparam,
+    case,
+    create_engine,
+    delete,
+    event,
+    func,
+    insert,
+    inspect,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.pool import QueuePool, StaticPool
+from sqlalchemy.types import TypeDecorator
+
+from ..models.record_batch import RecordBatch
+from ..models.study_record import StudyRecord
+from .connection import (
+    SEARCH_FIELDS,
+    _data_versions,
+    _highlight,
+    _parse_timestamp,
+    decode_cursor,
+    encode_cursor,
+)
+from .backends import UnsupportedBackendError
+from .backup import DEFAULT_PAGES_PER_STEP, backup_connection, restore_connection
+from .filters import RecordFilter, escape_like
+from .migrations import apply_migrations
+from .profiles import (
+    DEFAULT_STORAGE_PROFILE,
+    apply_storage_profile,
+    get_storage_profile,
+)
+from .revisions import HEAD_REVISION, check_revision, upgrade as upgrade_schema
+from .rollups import (
+    DEFAULT_HABIT_WINDOWS,
+    DEFAULT_PERCENTS,
+    check_rollups,
+    habit_stats_from_daily,
+    histogram_percentiles,
+    rebuild_rollups,
+)
+from .timeline import parse_timezone, timeline_buckets, to_local_date
+
+
+class Timestamp(TypeDecorator):
+    """
+    日時型
+
+    SQLiteでは sqlite3 版の DatabaseManager と同じ文字列形式
+    （CURRENT_TIMESTAMP と同じ "YYYY-MM-DD HH:MM:SS"）で保存し、
+    両方の実装で同じDBファイルを読み書きできるようにします。
+    その他のデータベースではネイティブの日時型を使います。
+    """
+
+    impl = DateTime
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(String())
+        return dialect.type_descriptor(DateTime())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if dialect.name == "sqlite":
+            # sqlite3 の datetime アダプタと同じ形式（マイクロ秒が0なら省略）
+            return value if isinstance(value, str) else value.isoformat(" ")
+        return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, str):
+            return _parse_timestamp(value)
+        return value
+
+
+metadata = MetaData()
+
+study_records = Table(
+    "study_records",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("title", Text, nullable=False),
+    Column("content", Text),
+    Column("study_time", Integer, server_default="0"),
+    Column("category", Text),
+    Column("difficulty", Integer, server_default="1"),
+    Column("created_at", Timestamp, server_default=func.current_timestamp()),
+    Column("updated_at", Timestamp, server_default=func.current_timestamp()),
+    Column("user_id", Integer),
+    Column("tags", Text),
+    Index("idx_study_records_created_at", "created_at"),
+    Index("idx_study_records_category_created_at", "category", "created_at"),
+    Index("idx_study_records_difficulty_created_at", "difficulty", "created_at"),
+    Index("idx_study_records_user_id_created_at", "user_id", "created_at"),
+)
+
+schema_version = Table(
+    "schema_version",
+    metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", Text, nullable=False),
+    Column("applied_at", Timestamp, server_default=func.current_timestamp()),
+)
+
+# Alembicが管理するリビジョンの記録
+alembic_version = Table(
+    "alembic_version",
+    metadata,
+    Column("version_num", String(32), primary_key=True),
+)
+
+_c = study_records.c
+_RECORD_COLUMNS = (
+    _c.id,
+    _c.title,
+    _c.content,
+    _c.study_time,
+    _c.category,
+    _c.difficulty,
+    _c.created_at,
+    _c.updated_at,
+)
+_NEWEST_FIRST = (_c.created_at.desc(), _c.id.desc())
+
+# よく使う文はあらかじめ組み立てておき、コンパイル結果をエンジンのキャッシュで再利用する
+_SELECT_BY_ID = select(*_RECORD_COLUMNS).where(_c.id == bindparam("record_id"))
+_INSERT_RECORD = insert(study_records)
+_DELETE_BY_ID = delete(study_records).where(_c.id == bindparam("record_id"))
+
+
+def _row_to_record(row: Sequence) -> StudyRecord:
+    """SELECT結果の行をStudyRecordに変換"""
+    created_at, updated_at = row[6], row[7]
+    # 変換に失敗した日時だけを現在時刻で補う
+    if created_at is None or updated_at is None:
+        now = datetime.now()
+        created_at = created_at or now
+        updated_at = updated_at or now
+    return StudyRecord(
+        row[1], row[2], row[3], row[4], row[5], row[0], created_at, updated_at
+    )
+
+
+class SQLAlchemyDatabaseManager:
+    """
+    SQLAlchemy Coreによるデータベース管理クラス
+
+    DatabaseManager と同じ公開APIを持ち、エンジンURLでデータベースを選択します。
+    SQLiteのファイルDBは QueuePool、インメモリDBは StaticPool で接続を共有します。
+    """
+
+    def __init__(
+        self,
+        database_url: str = "sqlite:///study_tracker.db",
+        pool_size: int = 5,
+        pool_timeout: float = 30.0,
+        storage_profile: Optional[str] = None,
+        echo: bool = False,
+    ):
+        """
+        データベースマネージャーを初期化
+
+        Args:
+            database_url: SQLAlchemyのエンジンURL
+            pool_size: コネクションプールの最大コネクション数
+            pool_timeout: コネクション取得の待ち時間（秒）
+            storage_profile: ストレージプロファイル名（SQLiteのみ有効）
+            echo: 実行したSQLをログに出力するかどうか
+        """
+        url = make_url(database_url)
+        self.database_url = database_url
+        self.dialect_name = url.get_backend_name()
+        self.storage_profile = None
+
+        if self.dialect_name == "sqlite":
+            self.storage_profile = storage_profile or os.environ.get(
+                "STUDY_TRACKER_STORAGE_PROFILE", DEFAULT_STORAGE_PROFILE
+            )
+            get_storage_profile(self.storage_profile)
+            self.engine = self._create_sqlite_engine(url, pool_size, pool_timeout, echo)
+        else:
+            self.engine = create_engine(
+                url,
+                pool_size=pool_size,
+                max_overflow=0,
+                pool_timeout=pool_timeout,
+                pool_pre_ping=True,
+                echo=echo,
+            )
+
+        self._data_version = next(_data_versions)
+        self.init_database()
+        self._storage_info = self._read_storage_info()
+
+        # 他のコネクション・プロセスのコミットは、SQLiteのファイルなら DatabaseManager と
+        # 同じく監視用のコネクションの PRAGMA data_version の変化で検知する
+        # （インメモリDBは他から書き込まれないため監視しない）
+        self._version_lock = threading.Lock()
+        self._version_watch: Optional[sqlite3.Connection] = None
+        if self.dialect_name == "sqlite" and url.database not in (None, "", ":memory:"):
+            self._version_watch = sqlite3.connect(url.database, check_same_thread=False)
+            self._watched_version = self._version_watch.execute(
+                "PRAGMA data_version"
+            ).fetchone()[0]
+        # その他のデータベースでは他のプロセスの書き込みを検知できない
+        # （統計キャッシュは有効期間を必ず設定する、StatsCache.from_env 参照）
+        self.tracks_external_writes = self.dialect_name == "sqlite"
+
+    def _create_sqlite_engine(
+        self, url, pool_size: int, pool_timeout: float, echo: bool
+    ) -> Engine:
+        """SQLite用のエンジンを作成"""
+        connect_args = {"check_same_thread": False, "timeout": pool_timeout}
+        if url.database in (None, "", ":memory:"):
+            # インメモリDBはコネクションごとに別のDBになるため、1接続を共有する
+            engine = create_engine(
+                url, poolclass=StaticPool, connect_args=connect_args, echo=echo
+            )
+        else:
+            engine = create_engine(
+                url,
+                poolclass=QueuePool,
+                pool_size=pool_size,
+                max_overflow=0,
+                pool_timeout=pool_timeout,
+                pool_pre_ping=True,
+                connect_args=connect_args,
+                echo=echo,
+            )
+
+        @event.listens_for(engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            # sqlite3 の暗黙のトランザクション開始を止め、BEGIN はSQLAlchemyに任せる
+            # （SAVEPOINT を正しく扱うため）
+            dbapi_connection.isolation_level = None
+            apply_storage_profile(dbapi_connection, self.storage_profile)
+
+        @event.listens_for(engine, "begin")
+        def on_begin(conn):
+            conn.exec_driver_sql("BEGIN")
+
+        return engine
+
+    def __enter__(self) -> "SQLAlchemyDatabaseManager":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """エンジンのコネクションプールと監視用のコネクションをクローズ"""
+        if self._version_watch is not None:
+            self._version_watch.close()
+        self.engine.dispose()
+
+    def open_thread_connection(self):
+        """何もしない（エンジンのプールがスレッドごとの接続を管理する）"""
+
+    def get_replica_metrics(self) -> Optional[Dict[str, Any]]:
+        """レプリカのメトリクスを取得（SQLAlchemy版にはレプリカがないため常にNone）"""
+        return None
+
+    def get_write_metrics(self) -> Optional[Dict[str, Any]]:
+        """ライターのメトリクスを取得（SQLAlchemy版にはライターがないため常にNone）"""
+        return None
+
+    @contextmanager
+    def _connection(self) -> Iterator[Connection]:
+        """トランザクション付きのコネクションを借りるコンテキストマネージャー
+
+        正常終了時はコミット、例外発生時はロールバックしてから返却します。
+        """
+        with self.engine.begin() as conn:
+            yield conn
+
+    @contextmanager
+    def _write_connection(self) -> Iterator[Connection]:
+        """書き込み用のコネクションを借りる（コミット後にデータのバージョンを進める）"""
+        with self._connection() as conn:
+            yield conn
+        self.bump_data_version()
+
+    @property
+    def data_version(self) -> int:
+        """
+        データのバージョン（DatabaseManager.data_version と同じ）
+
+        このマネージャー経由の書き込みに加え、SQLiteでは他のコネクション・プロセスの
+        コミットも PRAGMA data_version で検知して進めます（tracks_external_writes 参照）。
+        """
+        if self._version_watch is not None:
+            with self._version_lock:
+                row = self._version_watch.execute("PRAGMA data_version").fetchone()
+                if row[0] != self._watched_version:
+                    self._watched_version = row[0]
+                    self.bump_data_version()
+        return self._data_version
+
+    def bump_data_version(self):
+        """データのバージョンを進める（書き込みのコミット後に呼ぶ）"""
+        self._data_version = next(_data_versions)
+
+    def get_storage_info(self) -> Dict[str, Any]:
+        """適用中のストレージ設定を取得（DatabaseManager.get_storage_info と同じく起動時の値）"""
+        return dict(self._storage_info)
+
+    def _read_storage_info(self) -> Dict[str, Any]:
+        """ストレージ設定をデータベースから読む"""
+        journal_mode = synchronous = None
+        if self.dialect_name == "sqlite":
+            with self._connection() as conn:
+                journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+                synchronous = conn.exec_driver_sql("PRAGMA synchronous").scalar()
+
+        return {
+            "profile": self.storage_profile,
+            "journal_mode": journal_mode,
+            "synchronous": synchronous,
+        }
+
+    def init_database(self):
+        """
+        データベースを初期化し、スキーマのリビジョンを確認
+
+        Alembicで管理されているDBはリビジョンの確認だけを行い、DDLは実行しません。
+        新規作成・Alembic導入前のDBは最新のスキーマにしてから使います。
+
+        Raises:
+            SchemaRevisionError: リビジョンがこのバージョンのコードと合わない場合
+        """
+        with self._connection() as conn:
+            revision = None
+            if inspect(conn).has_table("alembic_version"):
+                revision = conn.scalar(select(alembic_version.c.version_num))
+        if revision is not None:
+            check_revision(revision)
+            return
+
+        if self.dialect_name == "sqlite":
+            # 全文検索索引などSQLite固有の定義を含むため、sqlite3 版と同じ手順で適用する
+            raw = self.engine.raw_connection()
+            try:
+                apply_migrations(raw.driver_connection, stamp_revision=HEAD_REVISION)
+            finally:
+                raw.close()
+            return
+
+        # その他のデータベースはAlembicのマイグレーションで作成する
+        upgrade_schema(self.database_url)
+
+    def backup(
+        self,
+        dest: str,
+        pages_per_step: int = DEFAULT_PAGES_PER_STEP,
+        compress: Optional[bool] = None,
+        verify: bool = True,
+    ) -> Dict[str, Any]:
+        """データベースをファイルにバックアップ（SQLiteのみ、DatabaseManager.backup と同じ）"""
+        with self._raw_sqlite_connection() as conn:
+            return backup_connection(conn, dest, pages_per_step, compress, verify)
+
+    def restore(self, source: str, verify: bool = True) -> Dict[str, Any]:
+        """バックアップファイルからデータベースを復元（SQLiteのみ、DatabaseManager.restore と同じ）"""
+        with self._raw_sqlite_connection() as conn:
+            result = restore_connection(conn, source, verify)
+        self.bump_data_version()
+        self.init_database()
+        return result
+
+    def rebuild_rollups(self) -> Dict[str, int]:
+        """ロールアップを作り直す（SQLiteのみ、DatabaseManager.rebuild_rollups と同じ）"""
+        with self._rollup_connection() as conn:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                counts = rebuild_rollups(conn)
+        self.bump_data_version()
+        return counts
+
+    def check_rollups(self) -> Dict[str, int]:
+        """ロールアップを確認（SQLiteのみ、DatabaseManager.check_rollups と同じ）"""
+        with self._rollup_connection() as conn:
+            return check_rollups(conn)
+
+    @contextmanager
+    def _rollup_connection(self) -> Iterator[Any]:
+        """ロールアップの保守用に sqlite3 のコネクションを借りる（SQLite以外はエラー）"""
+        if self.dialect_name != "sqlite":
+            raise UnsupportedBackendError(
+                "ロールアップはSQLiteのみ対応しています"
+                "（その他のデータベースでは統計を学習記録から直接集計します）"
+            )
+        with self._raw_sqlite_connection() as conn:
+            yield conn
+
+    @contextmanager
+    def _raw_sqlite_connection(self) -> Iterator[Any]:
+        """プールから sqlite3 のコネクションを借りる（SQLite以外はエラー）"""
+        if self.dialect_name != "sqlite":
+            raise UnsupportedBackendError(
+                "バックアップ・復元はSQLiteのみ対応しています"
+                "（他のデータベースは各製品のバックアップ機能を使ってください）"
+            )
+        raw = self.engine.raw_connection()
+        try:
+            yield raw.driver_connection
+        finally:
+            raw.close()
+
+    def get_schema_version(self) -> int:
+        """適用済みのスキーマバージョンを取得"""
+        with self._connection() as conn:
+            return conn.scalar(select(func.max(schema_version.c.version))) or 0
+
+    def add_study_record(self, record: StudyRecord) -> int:
+        """学習記録を追加"""
+        with self._write_connection() as conn:
+            result = conn.execute(
+                _INSERT_RECORD,
+                self._record_to_params(record, keep_timestamps=False),
+            )
+            return result.inserted_primary_key[0]
+
+    def add_study_records_many(
+        self,
+        records: Iterable[StudyRecord],
+        chunk_size: int = 500,
+        skip_invalid: bool = False,
+        keep_timestamps: bool = False,
+    ) -> List[Optional[int]]:
+        """
+        学習記録を1トランザクションでまとめて追加
+
+        複数行の INSERT ... RETURNING（insertmanyvalues）で採番済みIDを受け取ります。
+
+        Args:
+            records: 追加する学習記録（ジェネレーターも可）
+            chunk_size: 1回の実行で追加する件数
+            skip_invalid: Trueなら不正な行をスキップ、Falseなら全件ロールバック
+            keep_timestamps: Trueなら各記録の created_at/updated_at をそのまま保存
+
+        Returns:
+            入力順に並んだ採番済みID（スキップした行は None）
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size は1以上を指定してください")
+
+        stmt = insert(study_records).returning(_c.id, sort_by_parameter_order=True)
+        record_ids: List[Optional[int]] = []
+        iterator = iter(records)
+
+        with self._write_connection() as conn:
+            while True:
+                chunk = [
+                    self._record_to_params(record, keep_timestamps)
+                    for record in islice(iterator, chunk_size)
+                ]
+                if not chunk:
+                    break
+
+                savepoint = conn.begin_nested()
+                try:
+                    ids = conn.scalars(stmt, chunk).all()
+                except DBAPIError:
+                    # 途中まで入った行を取り消す
+                    savepoint.rollback()
+                    if not skip_invalid:
+                        raise
+                    record_ids.extend(self._insert_rows_skipping_invalid(conn, chunk))
+                else:
+                    savepoint.commit()
+                    record_ids.extend(ids)
+
+        return record_ids
+
+    @staticmethod
+    def _insert_rows_skipping_invalid(
+        conn: Connection, rows: List[Dict[str, Any]]
+    ) -> List[Optional[int]]:
+        """1行ずつ挿入し、失敗した行は None として読み飛ばす"""
+        record_ids: List[Optional[int]] = []
+        for row in rows:
+            savepoint = conn.begin_nested()
+            try:
+                result = conn.execute(_INSERT_RECORD, row)
+            except DBAPIError:
+                savepoint.rollback()
+                record_ids.append(None)
+            else:
+                savepoint.commit()
+                record_ids.append(result.inserted_primary_key[0])
+        return record_ids
+
+    @staticmethod
+    def _record_to_params(record: StudyRecord, keep_timestamps: bool) -> dict:
+        """StudyRecordをINSERT用のパラメータに変換"""
+        params = {
+            "title": record.title,
+            "content": record.content,
+            "study_time": record.study_time,
+            "category": record.category,
+            "difficulty": record.difficulty,
+        }
+        if keep_timestamps:
+            # CURRENT_TIMESTAMP と同じく秒単位で保存し、並び順を揃える
+            params["created_at"] = record.created_at.replace(microsecond=0)
+            params["updated_at"] = record.updated_at.replace(microsecond=0)
+        return params
+
+    def get_study_record(self, record_id: int) -> Optional[StudyRecord]:
+        """学習記録を取得"""
+        with self._connection() as conn:
+            row = conn.execute(_SELECT_BY_ID, {"record_id": record_id}).first()
+        return _row_to_record(row) if row else None
+
+    def get_all_study_records(self) -> List[StudyRecord]:
+        """全ての学習記録を取得"""
+        return self.find_study_records(RecordFilter())
+
+    def get_study_records_page(
+        self, limit: int, offset: int = 0, record_filter: Optional[RecordFilter] = None
+    ) -> Tuple[List[StudyRecord], int]:
+        """
+        学習記録を1ページ分だけ取得
+
+        Args:
+            limit: 取得件数
+            offset: スキップする件数
+            record_filter: 検索条件（limit/offset は引数の値を使用）
+
+        Returns:
+            (新しい順に並んだ学習記録, 条件に一致する全件数)
+        """
+        record_filter = (record_filter or RecordFilter()).replace(
+            limit=limit, offset=offset
+        )
+        return (
+            self.find_study_records(record_filter),
+            self.count_study_records(record_filter),
+        )
+
+    def find_study_records(self, record_filter: RecordFilter) -> List[StudyRecord]:
+        """検索条件に一致する学習記録を新しい順に取得"""
+        with self._connection() as conn:
+            rows = conn.execute(self._filtered_select(record_filter)).all()
+        return [_row_to_record(row) for row in rows]
+
+    def iter_study_records(
+        self, record_filter: Optional[RecordFilter] = None, batch_size: int = 500
+    ) -> Iterator[StudyRecord]:
+        """
+        検索条件に一致する学習記録を新しい順に1件ずつ返すジェネレーター
+
+        Args:
+            record_filter: 検索条件（省略時は全件）
+            batch_size: 1回に読み込む件数
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size は1以上を指定してください")
+
+        stmt = self._filtered_select(record_filter or RecordFilter())
+        with self.engine.connect() as conn:
+            result = conn.execution_options(yield_per=batch_size).execute(stmt)
+            for row in result:
+                yield _row_to_record(row)
+
+    def load_record_batch(
+        self, record_filter: Optional[RecordFilter] = None, batch_size: int = 500
+    ) -> RecordBatch:
+        """
+        検索条件に一致する学習記録を列指向の RecordBatch として新しい順に取得
+
+        Args:
+            record_filter: 検索条件（省略時は全件）
+            batch_size: 1回に読み込む件数
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size は1以上を指定してください")
+
+        stmt = self._filtered_select(record_filter or RecordFilter())
+        batch = RecordBatch()
+        now = datetime.now()
+
+        with self.engine.connect() as conn:
+            result = conn.execution_options(yield_per=batch_size).execute(stmt)
+            for row in result:
+                batch.append_values(
+                    row[0],
+                    row[1],
+                    row[2],
+                    row[3],
+                    row[4],
+                    row[5],
+                    row[6] or now,
+                    row[7] or now,
+                )
+
+        return batch
+
+    def _filter_conditions(self, record_filter: RecordFilter, now=None) -> list:
+        """検索条件をSQLAlchemyの条件式に変換"""
+        conditions = []
+        if record_filter.category is not None:
+            conditions.append(_c.category == record_filter.category)
+        if record_filter.category_contains:
+            pattern = f"%{escape_like(record_filter.category_contains)}%"
+            conditions.append(_c.category.ilike(pattern, escape="\\"))
+        if record_filter.difficulty is not None:
+            conditions.append(_c.difficulty == record_filter.difficulty)
+        if record_filter.min_time is not None:
+            conditions.append(_c.study_time >= record_filter.min_time)
+        if record_filter.max_time is not None:
+            conditions.append(_c.study_time <= record_filter.max_time)
+        if record_filter.keyword:
+            pattern = f"%{escape_like(record_filter.keyword)}%"
+            conditions.append(
+                or_(
+                    _c.title.ilike(pattern, escape="\\"),
+                    _c.content.ilike(pattern, escape="\\"),
+                )
+            )
+        if record_filter.days is not None:
+            cutoff = (now or datetime.now()) - timedelta(days=record_filter.days)
+            conditions.append(_c.created_at >= cutoff.replace(microsecond=0))
+        return conditions
+
+    def _filtered_select(self, record_filter: RecordFilter):
+        """検索条件からSELECT文を作成"""
+        stmt = (
+            select(*_RECORD_COLUMNS)
+            .where(*self._filter_conditions(record_filter))
+            .order_by(*_NEWEST_FIRST)
+        )
+        if record_filter.limit is not None:
+            stmt = stmt.limit(record_filter.limit)
+        if record_filter.offset:
+            stmt = stmt.offset(record_filter.offset)
+        return stmt
+
+    def count_study_records(self, record_filter: Optional[RecordFilter] = None) -> int:
+        """検索条件に一致する学習記録の件数を取得（limit/offset は無視）"""
+        conditions = self._filter_conditions(record_filter or RecordFilter())
+        stmt = select(func.count()).select_from(study_records).where(*conditions)
+        with self._connection() as conn:
+            return conn.scalar(stmt)
+
+    def list_after(
+        self, cursor: Optional[str] = None, limit: int = 20
+    ) -> Tuple[List[StudyRecord], Optional[str]]:
+        """
+        カーソル（キーセット）方式で学習記録を取得
+
+        Args:
+            cursor: 前回の next_cursor（None なら先頭から）
+            limit: 取得件数
+
+        Returns:
+            (学習記録, 次ページのカーソル。最後のページなら None)
+        """
+        if limit < 1:
+            raise ValueError("limit は1以上を指定してください")
+
+        stmt = select(*_RECORD_COLUMNS)
+        if cursor is not None:
+            created_at, record_id = decode_cursor(cursor)
+            stmt = stmt.where(
+                tuple_(_c.created_at, _c.id)
+                < tuple_(
+                    bindparam("cursor_created_at", created_at, type_=Timestamp),
+                    bindparam("cursor_id", record_id),
+                )
+            )
+        # 1件多く取得して次のページの有無を判定する
+        stmt = stmt.order_by(*_NEWEST_FIRST).limit(limit + 1)
+
+        with self._connection() as conn:
+            rows = conn.execute(stmt).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][6].isoformat(" "), rows[-1][0])
+
+        return [_row_to_record(row) for row in rows], next_cursor
+
+    def update_study_record(self, record_id: int, **kwargs) -> bool:
+        """学習記録を更新"""
+        allowed_fields = ["title", "content", "study_time", "category", "difficulty"]
+        values = {key: value for key, value in kwargs.items() if key in allowed_fields}
+        if not values:
+            return False
+
+        values["updated_at"] = datetime.now()
+        stmt = update(study_records).where(_c.id == record_id).values(**values)
+        with self._write_connection() as conn:
+            return conn.execute(stmt).rowcount > 0
+
+    def delete_study_record(self, record_id: int) -> bool:
+        """学習記録を削除"""
+        with self._write_connection() as conn:
+            return conn.execute(_DELETE_BY_ID, {"record_id": record_id}).rowcount > 0
+
+    def search(
+        self,
+        query: str,
+        fields: Optional[Sequence[str]] = None,
+        limit: int = 20,
+        case_sensitive: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        タイトル・内容を検索
+
+        全文検索索引はデータベースごとに異なるため、どのDBでも動く部分一致検索で
+        新しい順に返します（結果の形式は DatabaseManager.search と同じ）。
+
+        Args:
+            query: 検索キーワード
+            fields: 検索対象の列（"title" / "content"、省略時は両方）
+            limit: 最大件数
+            case_sensitive: 大文字小文字を区別するかどうか
+        """
+        fields = list(fields or SEARCH_FIELDS)
+        unknown = set(fields) - set(SEARCH_FIELDS)
+        if unknown:
+            raise ValueError(f"検索できない列です: {', '.join(sorted(unknown))}")
+        if not query:
+            return []
+
+        pattern = f"%{escape_like(query)}%"
+        matches = []
+        for field in fields:
+            column = _c[field]
+            if not case_sensitive:
+                matches.append(column.ilike(pattern, escape="\\"))
+            elif self.dialect_name == "sqlite":
+                # SQLiteの LIKE は大文字小文字を区別しないため instr() で比較する
+                matches.append(func.instr(column, query) > 0)
+            else:
+                matches.append(column.like(pattern, escape="\\"))
+
+        stmt = (
+            select(*_RECORD_COLUMNS)
+            .where(or_(*matches))
+            .order_by(*_NEWEST_FIRST)
+            .limit(limit)
+        )
+        with self._connection() as conn:
+            rows = conn.execute(stmt).all()
+
+        results = []
+        for row in rows:
+            record = _row_to_record(row)
+            results.append(
+                {
+                    "record": record,
+                    "title_highlight": _highlight(record.title, query, case_sensitive),
+                    "content_snippet": _highlight(
+                        record.content, query, case_sensitive
+                    ),
+                }
+            )
+        return results
+
+    # ---- 集計 ----
+    # どのデータベースでも動くよう、ロールアップは使わず study_records から直接集計する。
+    # グループの並び順は DatabaseManager と同じく「新しい順の一覧で最初に現れた順」。
+
+    def get_totals(self) -> Dict[str, int]:
+        """全体の件数・合計学習時間・難易度の合計を取得"""
+        stmt = select(
+            func.count(),
+            func.coalesce(func.sum(_c.study_time), 0),
+            func.coalesce(func.sum(_c.difficulty), 0),
+        )
+        with self._connection() as conn:
+            count, total_time, difficulty_sum = conn.execute(stmt).one()
+
+        return {
+            "count": count,
+            "total_time": total_time,
+            "difficulty_sum": difficulty_sum,
+        }
+
+    def get_totals_since(self, since: datetime) -> Dict[str, int]:
+        """since 以降に作成された記録の件数・合計学習時間を取得"""
+        stmt = select(func.count(), func.coalesce(func.sum(_c.study_time), 0)).where(
+            _c.created_at >= since
+        )
+        with self._connection() as conn:
+            count, total_time = conn.execute(stmt).one()
+
+        return {"count": count, "total_time": total_time}
+
+    @staticmethod
+    def _first_appearance_order(groups, key: str, group_key=None):
+        """
+        グループを「新しい順の一覧で最初に現れた順」に並べる ORDER BY 句
+
+        Args:
+            group_key: テーブルから記録のグループを求める式を作る関数（省略時は key の列）
+        """
+        r = study_records.alias("r")
+        group_key = group_key or (lambda table: table.c[key])
+        newest_id = (
+            select(func.max(r.c.id))
+            .where(group_key(r) == groups.c[key], r.c.created_at == groups.c.latest)
+            .scalar_subquery()
+        )
+        return groups.c.latest.desc(), newest_id.desc()
+
+    def get_category_totals(
+        self, include_uncategorized: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        カテゴリ別の件数・合計学習時間・難易度の合計を取得
+
+        Args:
+            include_uncategorized: カテゴリ未設定の記録を category=None として含めるか
+        """
+
+        # 未設定（NULL と空文字列）は1つのグループにまとめる
+        def category_key(table):
+            return func.coalesce(table.c.category, "")
+
+        groups = select(
+            category_key(study_records).label("category"),
+            func.count().label("count"),
+            func.sum(_c.study_time).label("total_time"),
+            func.sum(_c.difficulty).label("difficulty_sum"),
+            func.max(_c.created_at).label("latest"),
+        )
+        if not include_uncategorized:
+            groups = groups.where(_c.category.is_not(None), _c.category != "")
+        groups = groups.group_by(category_key(study_records)).cte("groups")
+        stmt = select(
+            func.nullif(groups.c.category, ""),
+            groups.c.count,
+            groups.c.total_time,
+            groups.c.difficulty_sum,
+        ).order_by(*self._first_appearance_order(groups, "category", category_key))
+
+        with self._connection() as conn:
+            rows = conn.execute(stmt).all()
+
+        return [
+            {
+                "category": category,
+                "count": count,
+                "total_time": total_time,
+                "difficulty_sum": difficulty_sum,
+            }
+            for category, count, total_time, difficulty_sum in rows
+        ]
+
+    def get_difficulty_totals(self) -> List[Dict[str, int]]:
+        """難易度別の件数・合計学習時間を取得"""
+        groups = (
+            select(
+                _c.difficulty,
+                func.count().label("count"),
+                func.sum(_c.study_time).label("total_time"),
+                func.max(_c.created_at).label("latest"),
+            )
+            .group_by(_c.difficulty)
+            .cte("groups")
+        )
+        stmt = select(
+            groups.c.difficulty, groups.c.count, groups.c.total_time
+        ).order_by(*self._first_appearance_order(groups, "difficulty"))
+
+        with self._connection() as conn:
+            rows = conn.execute(stmt).all()
+
+        return [
+            {"difficulty": difficulty, "count": count, "total_time": total_time}
+            for difficulty, count, total_time in rows
+        ]
+
+    def get_time_distribution(self) -> Dict[str, int]:
+        """学習時間の分布（30分未満・30分-2時間・2時間以上）を取得"""
+
+        def count_when(condition):
+            return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+        stmt = select(
+            count_when(_c.study_time < 30),
+            count_when((_c.study_time >= 30) & (_c.study_time < 120)),
+            count_when(_c.study_time >= 120),
+            func.count(),
+        )
+        with self._connection() as conn:
+            short_time, medium_time, long_time, total = conn.execute(stmt).one()
+
+        return {
+            "short_time": short_time,
+            "medium_time": medium_time,
+            "long_time": long_time,
+            "total_records": total,
+        }
+
+    def get_daily_totals(self) -> List[Dict[str, Any]]:
+        """日別（YYYY-MM-DD）の件数・合計学習時間を日付順に取得"""
+        date = func.date(_c.created_at).label("date")
+        stmt = (
+            select(date, func.count(), func.sum(_c.study_time))
+            .group_by(date)
+            .order_by(date)
+        )
+        with self._connection() as conn:
+            rows = conn.execute(stmt).all()
+
+        # SQLiteは文字列、その他のDBは date 型で返るため文字列に揃える
+        return [
+            {"date": str(date), "count": count, "total_time": total_time}
+            for date, count, total_time in rows
+        ]
+
+    def get_timeline_totals(
+        self,
+        bucket: str = "day",
+        tz: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        日・週・月の区間ごとの件数・合計学習時間を取得（記録のない区間は0）
+
+        範囲内の記録を区間の境界の CASE 式でグループ化して集計します。
+        引数と戻り値は DatabaseManager.get_timeline_totals と同じです。
+        """
+        zone = parse_timezone(tz)
+
+        with self._connection() as conn:
+            if start is None or end is None:
+                first, last = conn.execute(
+                    select(func.min(_c.created_at), func.max(_c.created_at))
+                ).one()
+                if first is None:
+                    if start is None and end is None:
+                        return []
+                    start = end = start or end
+                start = start or to_local_date(first, zone)
+                end = end or to_local_date(last, zone)
+
+            buckets = timeline_buckets(bucket, zone, start, end)
+            key = case(
+                *[
+                    (
+                        (_c.created_at >= bucket_start) & (_c.created_at < bucket_end),
+                        index,
+                    )
+                    for index, (_, bucket_start, bucket_end) in enumerate(buckets)
+                ]
+            ).label("bucket")
+            stmt = (
+                select(key, func.count(), func.coalesce(func.sum(_c.study_time), 0))
+                .where(_c.created_at >= buckets[0][1], _c.created_at < buckets[-1][2])
+                .group_by(key)
+            )
+            totals = {
+                index: (count, total) for index, count, total in conn.execute(stmt)
+            }
+
+        result = []
+        for index, (label, _, _) in enumerate(buckets):
+            count, total_time = totals.get(index, (0, 0))
+            result.append({"date": label, "count": count, "total_time": total_time})
+        return result
+
+    def get_all_totals(self) -> Dict[str, Any]:
+        """
+        全体・カテゴリ別・難易度別・学習時間の分布・日別の集計をまとめて取得
+
+        ロールアップのないデータベースでも動くよう、各集計を順に実行します。
+        """
+        return {
+            "totals": self.get_totals(),
+            "categories": self.get_category_totals(include_uncategorized=True),
+            "difficulties": self.get_difficulty_totals(),
+            "time_distribution": self.get_time_distribution(),
+            "daily": self.get_daily_totals(),
+        }
+
+    def get_study_time_percentiles(
+        self,
+        percents: Iterable[float] = DEFAULT_PERCENTS,
+        category: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """
+        学習時間の分位点を取得
+
+        対象の記録を学習時間ごとに数えたヒストグラムから計算します。
+        引数と戻り値は DatabaseManager.get_study_time_percentiles と同じです。
+        """
+        if category is not None and (start is not None or end is not None):
+            raise ValueError("カテゴリと期間は同時に指定できません")
+
+        minutes = func.coalesce(_c.study_time, 0).label("minutes")
+        stmt = select(minutes, func.count()).group_by(minutes).order_by(minutes)
+        if category is not None:
+            stmt = stmt.where(func.coalesce(_c.category, "") == category)
+        if start is not None:
+            stmt = stmt.where(
+                _c.created_at >= datetime.combine(start, datetime.min.time())
+            )
+        if end is not None:
+            stmt = stmt.where(
+                _c.created_at
+                < datetime.combine(end + timedelta(days=1), datetime.min.time())
+            )
+        with self._connection() as conn:
+            histogram = conn.execute(stmt).all()
+
+        return {
+            "count": sum(count for _, count in histogram),
+            "percentiles": histogram_percentiles(histogram, percents),
+        }
+
+    def get_habit_stats(
+        self,
+        today: Optional[date] = None,
+        windows: Iterable[int] = DEFAULT_HABIT_WINDOWS,
+    ) -> Dict[str, Any]:
+        """
+        学習習慣の統計（連続学習日数・移動平均）を取得
+
+        日別の集計から計算します。引数と戻り値は DatabaseManager.get_habit_stats と同じです。
+        """
+        today = today or datetime.now(timezone.utc).date()
+        return habit_stats_from_daily(self.get_daily_totals(), today, windows)
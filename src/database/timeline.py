@@ -0,0 +1,111 @@
+"""
+時系列統計の区間
+
+日・週・月の区間をタイムゾーンの日付で作り、各区間の境界をUTCに変換します。
+created_at は CURRENT_TIMESTAMP と同じUTCで保存されているため、
+境界の範囲条件で created_at のインデックス（または日別のロールアップ）を読めば集計できます。
+"""
+
+import re
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+TIMELINE_BUCKETS = ("day", "week", "month")
+
+# 1回に返す区間の最大数（範囲の指定ミスで巨大なレスポンスを作らないため）
+MAX_TIMELINE_BUCKETS = 1000
+
+_OFFSET_PATTERN = re.compile(r"([+-])(\d{2}):?(\d{2})")
+
+# (ラベル, UTCの開始日時, UTCの終了日時) 。開始を含み終了を含まない
+TimelineBucket = Tuple[str, datetime, datetime]
+
+
+def parse_timezone(name: Optional[str]) -> tzinfo:
+    """
+    タイムゾーンを取得
+
+    Args:
+        name: IANAの名前（例: Asia/Tokyo）、UTCからの差（例: +09:00）、省略時はUTC
+
+    Raises:
+        ValueError: 不明なタイムゾーンの場合
+    """
+    if not name or name.upper() in ("UTC", "Z"):
+        return timezone.utc
+
+    match = _OFFSET_PATTERN.fullmatch(name)
+    if match:
+        sign, hours, minutes = match.groups()
+        offset = timedelta(hours=int(hours), minutes=int(minutes))
+        if offset >= timedelta(hours=24):
+            raise ValueError(f"不明なタイムゾーンです: {name}")
+        return timezone(-offset if sign == "-" else offset)
+
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"不明なタイムゾーンです: {name}") from None
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    """day を含む区間の最初の日（週は月曜日始まり）"""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(start: date, bucket: str) -> date:
+    if bucket == "week":
+        return start + timedelta(days=7)
+    if bucket == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def _to_utc(day: date, tz: tzinfo) -> datetime:
+    """タイムゾーンでの day の0時をUTC（タイムゾーンなし）に変換"""
+    local = datetime.combine(day, time(), tzinfo=tz)
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def to_local_date(value: datetime, tz: tzinfo) -> date:
+    """UTC（タイムゾーンなし）の日時をタイムゾーンでの日付に変換"""
+    return value.replace(tzinfo=timezone.utc).astimezone(tz).date()
+
+
+def timeline_buckets(
+    bucket: str, tz: tzinfo, start: date, end: date
+) -> List[TimelineBucket]:
+    """
+    start から end までを含む区間の一覧を作成
+
+    区間は start と end を含む区間全体です（例: 月単位なら start の月初から end の月末まで）。
+    ラベルは日・週なら最初の日（YYYY-MM-DD）、月なら YYYY-MM です。
+
+    Raises:
+        ValueError: 区間の種類・範囲が不正な場合、区間が MAX_TIMELINE_BUCKETS を超える場合
+    """
+    if bucket not in TIMELINE_BUCKETS:
+        raise ValueError(
+            f"bucket は {', '.join(TIMELINE_BUCKETS)} のいずれかを指定してください"
+        )
+    if end < start:
+        raise ValueError("to は from 以降の日付を指定してください")
+
+    buckets = []
+    current = bucket_start(start, bucket)
+    while current <= end:
+        if len(buckets) == MAX_TIMELINE_BUCKETS:
+            raise ValueError(
+                f"区間が多すぎます（最大 {MAX_TIMELINE_BUCKETS} 区間）。"
+                "範囲を狭めるか、より長い区間を指定してください"
+            )
+        following = _next_bucket(current, bucket)
+        label = current.strftime("%Y-%m") if bucket == "month" else current.isoformat()
+        buckets.append((label, _to_utc(current, tz), _to_utc(following, tz)))
+        current = following
+    return buckets
@@ -0,0 +1,233 @@
+"""
+書き込みのグループコミット
+
+複数スレッドからの書き込みを1つのライタースレッドに集め、
+まとめて1トランザクションでコミットします。
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+# キューに積む書き込み（Future, 処理, 位置引数, キーワード引数）
+_WriteItem = Tuple[Future, Callable[..., Any], tuple, dict]
+
+# ライタースレッドに停止を伝える目印
+_STOP = object()
+
+
+class WriteCoordinator:
+    """
+    単一ライターによるグループコミットクラス
+
+    書き込みはキューに積まれ、ライタースレッドが取り出した順に実行します。
+    最初の書き込みから max_latency 秒以内に届いたもの（最大 max_batch_size 件）を
+    1トランザクションにまとめるため、競合による "database is locked" を避けつつ、
+    コミット（fsync）の回数を減らせます。
+    max_latency が0の場合は待たずに、その時点でキューにある書き込みだけをまとめます
+    （コミット中に届いた書き込みが次のバッチになります）。
+    各書き込みはセーブポイントで区切られ、失敗した書き込みだけが取り消されます。
+    呼び出し元の Future にはコミットの完了後に結果が設定されます。
+    """
+
+    def __init__(
+        self,
+        connection: Callable[[], ContextManager[sqlite3.Connection]],
+        max_batch_size: int = 100,
+        max_latency: float = 0.0,
+        initializer: Optional[Callable[[], None]] = None,
+    ):
+        """
+        ライターを初期化してライタースレッドを開始
+
+        Args:
+            connection: トランザクション付きのコネクションを返すコンテキストマネージャー
+                （正常終了でコミット、例外でロールバックするもの）
+            max_batch_size: 1トランザクションにまとめる書き込みの最大件数
+            max_latency: 後続の書き込みを待つ最大時間（秒）
+            initializer: ライタースレッドの開始時に呼ぶ関数
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size は1以上を指定してください")
+        if max_latency < 0:
+            raise ValueError("max_latency は0以上を指定してください")
+
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self._connection = connection
+        self._initializer = initializer
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+
+        # メトリクス（ライタースレッドだけが更新する）
+        self._batches = 0
+        self._writes = 0
+        self._last_batch_size = 0
+        self._largest_batch_size = 0
+
+        self._thread = threading.Thread(
+            target=self._run, name="study-tracker-writer", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def closed(self) -> bool:
+        """ライターが停止済みかどうか"""
+        return self._closed
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        書き込みをキューに積む
+
+        Args:
+            func: コネクションを第1引数に受け取る書き込み処理
+
+        Returns:
+            コミット後に func の戻り値（例外の場合はその例外）が設定される Future
+        """
+        future: Future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("ライターは既に停止しています")
+            self._queue.put((future, func, args, kwargs))
+        return future
+
+    def execute(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """書き込みをキューに積み、コミットされるまで待って結果を返す"""
+        return self.submit(func, *args, **kwargs).result()
+
+    def metrics(self) -> Dict[str, Any]:
+        """キューの深さとバッチサイズのメトリクスを取得"""
+        batches = self._batches
+        return {
+            "queue_depth": self._queue.qsize(),
+            "batches": batches,
+            "writes": self._writes,
+            "last_batch_size": self._last_batch_size,
+            "max_batch_size": self._largest_batch_size,
+            "average_batch_size": round(self._writes / batches, 2) if batches else 0.0,
+        }
+
+    def close(self):
+        """キューに残った書き込みをコミットしてからライタースレッドを停止"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        """ライタースレッドの本体"""
+        try:
+            if self._initializer is not None:
+                self._initializer()
+        except Exception as e:
+            self._fail_pending(e)
+            return
+
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            stopping = self._collect(batch)
+            self._commit(batch)
+
+    def _fail_pending(self, error: Exception):
+        """ライターを停止し、キューに残った書き込みを失敗にする"""
+        with self._close_lock:
+            self._closed = True
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP and item[0].set_running_or_notify_cancel():
+                item[0].set_exception(error)
+
+    def _collect(self, batch: List[_WriteItem]) -> bool:
+        """
+        後続の書き込みを max_latency 秒まで待ってバッチに加える
+
+        Returns:
+            停止の目印を受け取った場合はTrue
+        """
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    # 待ち時間を過ぎても、既に届いている書き込みはまとめる
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return True
+            batch.append(item)
+        return False
+
+    def _commit(self, batch: List[_WriteItem]):
+        """バッチを1トランザクションで実行し、コミット後に各 Future を完了させる"""
+        # キャンセル済みの書き込みは実行しない
+        batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            with self._connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                results = [self._apply(conn, item) for item in batch]
+        except BaseException as e:
+            # コミットできなかった場合はバッチ全体を失敗にする
+            for future, _, _, _ in batch:
+                future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        self._batches += 1
+        self._writes += len(batch)
+        self._last_batch_size = len(batch)
+        self._largest_batch_size = max(self._largest_batch_size, len(batch))
+
+        for future, result, error in results:
+            self._resolve(future, result, error)
+
+    @staticmethod
+    def _apply(
+        conn: sqlite3.Connection, item: _WriteItem
+    ) -> Tuple[Future, Any, Optional[Exception]]:
+        """
+        1件の書き込みをセーブポイントの中で実行する
+
+        Returns:
+            (Future, 結果, 例外) のタプル。失敗した書き込みの変更だけを取り消す
+        """
+        future, func, args, kwargs = item
+        conn.execute("SAVEPOINT grouped_write")
+        try:
+            result = func(conn, *args, **kwargs)
+        except Exception as e:
+            # この書き込みの変更だけを取り消して続ける
+            conn.execute("ROLLBACK TO grouped_write")
+            conn.execute("RELEASE grouped_write")
+            return future, None, e
+        conn.execute("RELEASE grouped_write")
+        return future, result, None
+
+    @staticmethod
+    def _resolve(future: Future, result: Any, error: Optional[Exception]):
+        """コミット後に Future へ結果か例外を設定する"""
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
@@ -4,6 +4,8 @@
 学習記録、ユーザー、カテゴリなどのデータモデルを定義します。
 """
 
+from .analytics import StudyAnalytics
+from .record_batch import RecordBatch
 from .study_record import StudyRecord
 
-__all__ = ["StudyRecord"]
+__all__ = ["StudyRecord", "RecordBatch", "StudyAnalytics"]
@@ -0,0 +1,277 @@
+"""
+NumPyによる学習記録の集計
+
+RecordBatch の数値列をNumPy配列として一度だけ読み込み、
+グループ別の合計・分位点・ヒストグラム・移動合計を記録ごとのループなしで計算します。
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import numpy
+except ImportError:  # NumPyは任意の依存関係
+    numpy = None
+
+from .record_batch import RecordBatch
+
+# 1日のマイクロ秒数（作成日時のUNIX時刻から日付を求める）
+US_PER_DAY = 86_400 * 1_000_000
+
+# 学習時間の分布の境界（30分未満・30分-2時間・2時間以上）
+TIME_DISTRIBUTION_BOUNDS = (30, 120)
+
+
+class StudyAnalytics:
+    """
+    NumPy配列による学習記録の集計クラス
+
+    学習時間・難易度・カテゴリコード・作成日（UNIX時刻の日数）を配列で保持し、
+    bincount・searchsorted・cumsum で集計します。
+    集計結果は DatabaseManager の同名のメソッド（get_category_totals など）と同じ形式・並び順です。
+    記録は新しい順（load_record_batch の順）に並んでいるものとし、
+    グループは「新しい順の一覧で最初に現れた順」に並べます。
+    """
+
+    def __init__(
+        self,
+        study_time: Sequence[int],
+        difficulty: Sequence[int],
+        category_code: Sequence[int],
+        categories: List[Optional[str]],
+        day: Sequence[int],
+    ):
+        """
+        集計対象の列を指定して作成
+
+        Args:
+            study_time: 学習時間（分）
+            difficulty: 難易度
+            category_code: categories の添字
+            categories: カテゴリ（カテゴリ未設定は None）
+            day: 作成日（1970-01-01 からの日数）
+
+        Raises:
+            ImportError: NumPyがインストールされていない場合
+        """
+        if numpy is None:
+            raise ImportError("StudyAnalytics には NumPy が必要です: pip install numpy")
+
+        self.study_time = numpy.asarray(study_time, dtype=numpy.int64)
+        self.difficulty = numpy.asarray(difficulty, dtype=numpy.int64)
+        self.category_code = numpy.asarray(category_code, dtype=numpy.int64)
+        self.categories = list(categories)
+        self.day = numpy.asarray(day, dtype=numpy.int64)
+
+    @classmethod
+    def from_batch(cls, batch: RecordBatch) -> "StudyAnalytics":
+        """RecordBatch の数値列から作成"""
+        columns = batch.to_numpy()
+
+        # カテゴリ未設定（None と空文字列）は1つのグループにまとめる（ロールアップと同じ）
+        merged: Dict[Optional[str], int] = {}
+        remap = [
+            merged.setdefault(category or None, len(merged))
+            for category in batch.categories
+        ]
+        category_code = numpy.asarray(remap, dtype=numpy.int64)[
+            columns["category_code"]
+        ]
+
+        return cls(
+            columns["study_time"],
+            columns["difficulty"],
+            category_code,
+            list(merged),
+            columns["created_at"] // US_PER_DAY,
+        )
+
+    def __len__(self) -> int:
+        return len(self.study_time)
+
+    def _sums(self, codes, size: int, weights) -> List[int]:
+        """グループ（codes）ごとの weights の合計"""
+        # 分単位の整数の合計は float64 で誤差なく表せる
+        return (
+            numpy.bincount(codes, weights=weights, minlength=size)
+            .astype(numpy.int64)
+            .tolist()
+        )
+
+    # ---- DatabaseManager と同じ形式の集計 ----
+
+    def get_totals(self) -> Dict[str, int]:
+        """全体の件数・合計学習時間・難易度の合計を取得"""
+        return {
+            "count": len(self),
+            "total_time": int(self.study_time.sum()),
+            "difficulty_sum": int(self.difficulty.sum()),
+        }
+
+    def get_category_totals(
+        self, include_uncategorized: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        カテゴリ別の件数・合計学習時間・難易度の合計を取得
+
+        Args:
+            include_uncategorized: カテゴリ未設定の記録を category=None として含めるか
+        """
+        size = len(self.categories)
+        counts = numpy.bincount(self.category_code, minlength=size).tolist()
+        times = self._sums(self.category_code, size, self.study_time)
+        difficulties = self._sums(self.category_code, size, self.difficulty)
+
+        return [
+            {
+                "category": category,
+                "count": counts[code],
+                "total_time": times[code],
+                "difficulty_sum": difficulties[code],
+            }
+            for code, category in enumerate(self.categories)
+            if counts[code] and (category is not None or include_uncategorized)
+        ]
+
+    def get_difficulty_totals(self) -> List[Dict[str, int]]:
+        """難易度別の件数・合計学習時間を取得"""
+        if not len(self):
+            return []
+
+        codes = self.difficulty - self.difficulty.min()
+        counts = numpy.bincount(codes)
+        times = self._sums(codes, len(counts), self.study_time)
+        # 各難易度が最初に現れる位置（逆順に書き込み、最初の位置を最後に残す）
+        first_index = numpy.full(len(counts), len(self))
+        first_index[codes[::-1]] = numpy.arange(len(self) - 1, -1, -1)
+        present = numpy.flatnonzero(counts)
+
+        return [
+            {
+                "difficulty": int(self.difficulty.min()) + code,
+                "count": int(counts[code]),
+                "total_time": times[code],
+            }
+            for code in present[numpy.argsort(first_index[present])].tolist()
+        ]
+
+    def get_time_distribution(self) -> Dict[str, int]:
+        """学習時間の分布（30分未満・30分-2時間・2時間以上）を取得"""
+        buckets = numpy.searchsorted(
+            TIME_DISTRIBUTION_BOUNDS, self.study_time, side="right"
+        )
+        short_time, medium_time, long_time = numpy.bincount(
+            buckets, minlength=len(TIME_DISTRIBUTION_BOUNDS) + 1
+        ).tolist()
+
+        return {
+            "short_time": short_time,
+            "medium_time": medium_time,
+            "long_time": long_time,
+            "total_records": len(self),
+        }
+
+    def get_daily_totals(self) -> List[Dict[str, Any]]:
+        """日別（YYYY-MM-DD）の件数・合計学習時間を日付順に取得"""
+        if not len(self):
+            return []
+
+        first_day = int(self.day.min())
+        offsets = self.day - first_day
+        counts = numpy.bincount(offsets)
+        times = self._sums(offsets, len(counts), self.study_time)
+        present = numpy.flatnonzero(counts)
+        dates = numpy.datetime_as_string(
+            (present + first_day).astype("datetime64[D]")
+        ).tolist()
+
+        return [
+            {"date": date, "count": int(counts[offset]), "total_time": times[offset]}
+            for date, offset in zip(dates, present.tolist())
+        ]
+
+    def get_all_totals(self) -> Dict[str, Any]:
+        """全体・カテゴリ別・難易度別・学習時間の分布・日別の集計をまとめて取得"""
+        return {
+            "totals": self.get_totals(),
+            "categories": self.get_category_totals(include_uncategorized=True),
+            "difficulties": self.get_difficulty_totals(),
+            "time_distribution": self.get_time_distribution(),
+            "daily": self.get_daily_totals(),
+        }
+
+    # ---- 分布・移動合計 ----
+
+    def percentiles(
+        self, percents: Iterable[float] = (50, 90, 99)
+    ) -> Dict[float, Optional[float]]:
+        """
+        学習時間の分位点（線形補間）を取得
+
+        Returns:
+            パーセント -> 学習時間（分、記録がなければNone）
+        """
+        percents = list(percents)
+        if not len(self):
+            return {percent: None for percent in percents}
+
+        values = numpy.percentile(self.study_time, percents)
+        return {
+            percent: round(float(value), 2) for percent, value in zip(percents, values)
+        }
+
+    def histogram(self, bin_width: int = 30) -> List[Dict[str, int]]:
+        """
+        学習時間のヒストグラムを取得
+
+        Args:
+            bin_width: 階級の幅（分）
+
+        Returns:
+            [{"start", "end", "count"}]（start 以上 end 未満、最後の記録のある階級まで）
+        """
+        if bin_width < 1:
+            raise ValueError("bin_width は1以上を指定してください")
+
+        counts = numpy.bincount(self.study_time // bin_width).tolist()
+        return [
+            {"start": index * bin_width, "end": (index + 1) * bin_width, "count": count}
+            for index, count in enumerate(counts)
+        ]
+
+    def rolling_totals(self, window: int = 7) -> List[Dict[str, Any]]:
+        """
+        日別の学習時間と window 日間の移動合計・移動平均を取得
+
+        最初の記録の日から最後の記録の日まで、記録のない日も0として含めます。
+
+        Returns:
+            [{"date", "total_time", "rolling_total", "rolling_average"}]（日付順）
+        """
+        if window < 1:
+            raise ValueError("window は1以上を指定してください")
+        if not len(self):
+            return []
+
+        first_day = int(self.day.min())
+        offsets = self.day - first_day
+        daily = numpy.bincount(offsets, weights=self.study_time).astype(numpy.int64)
+
+        # 累積和の差で window 日間の合計を求める
+        cumulative = numpy.concatenate(([0], numpy.cumsum(daily)))
+        ends = numpy.arange(1, len(daily) + 1)
+        rolling = cumulative[ends] - cumulative[numpy.maximum(ends - window, 0)]
+        dates = numpy.datetime_as_string(
+            numpy.arange(first_day, first_day + len(daily)).astype("datetime64[D]")
+        ).tolist()
+
+        return [
+            {
+                "date": date,
+                "total_time": total_time,
+                "rolling_total": rolling_total,
+                "rolling_average": round(rolling_total / window, 2),
+            }
+            for date, total_time, rolling_total in zip(
+                dates, daily.tolist(), rolling.tolist()
+            )
+        ]
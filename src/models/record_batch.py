@@ -0,0 +1,218 @@
+"""
+列指向の学習記録コンテナ
+
+大量の学習記録を、記録ごとのオブジェクトではなく列ごとの配列で保持します。
+"""
+
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .study_record import StudyRecord
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_epoch_us(value: datetime) -> int:
+    """datetimeをUNIX時刻（マイクロ秒）に変換（タイムゾーンなしはUTCとみなす）"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def from_epoch_us(value: int) -> datetime:
+    """UNIX時刻（マイクロ秒）をタイムゾーンなしのdatetimeに変換"""
+    return _EPOCH + timedelta(microseconds=value)
+
+
+class RecordBatch:
+    """
+    学習記録の列指向コンテナ
+
+    ID・学習時間・難易度・カテゴリコード・作成/更新日時（UNIX時刻）を
+    array の列で保持し、StudyRecord は参照されたときに作成します。
+    カテゴリは categories の添字（カテゴリコード）として保持します。
+    """
+
+    def __init__(self):
+        """空のコンテナを作成"""
+        self.ids = array("q")
+        self.study_times = array("q")
+        self.difficulties = array("b")
+        self.category_codes = array("l")
+        self.created_at = array("q")
+        self.updated_at = array("q")
+        self.titles: List[str] = []
+        self.contents: List[Optional[str]] = []
+        self.categories: List[Optional[str]] = []
+        self._category_codes: Dict[Optional[str], int] = {}
+
+    @classmethod
+    def from_records(cls, records: Iterable[StudyRecord]) -> "RecordBatch":
+        """StudyRecordの列から作成"""
+        batch = cls()
+        for record in records:
+            batch.append(record)
+        return batch
+
+    def append(self, record: StudyRecord):
+        """StudyRecordを1件追加"""
+        self.append_values(
+            record.id,
+            record.title,
+            record.content,
+            record.study_time,
+            record.category,
+            record.difficulty,
+            record.created_at,
+            record.updated_at,
+        )
+
+    def append_values(
+        self,
+        id: int,
+        title: str,
+        content: Optional[str],
+        study_time: int,
+        category: Optional[str],
+        difficulty: int,
+        created_at: datetime,
+        updated_at: datetime,
+    ):
+        """各列の値を指定して1件追加"""
+        code = self._category_codes.get(category)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(category)
+            self._category_codes[category] = code
+
+        self.ids.append(id)
+        self.titles.append(title)
+        self.contents.append(content)
+        self.study_times.append(study_time or 0)
+        self.category_codes.append(code)
+        self.difficulties.append(max(1, min(5, difficulty)))
+        self.created_at.append(to_epoch_us(created_at))
+        self.updated_at.append(to_epoch_us(updated_at))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> StudyRecord:
+        """index 番目の記録をStudyRecordとして取得"""
+        return StudyRecord(
+            self.titles[index],
+            self.contents[index],
+            self.study_times[index],
+            self.categories[self.category_codes[index]],
+            self.difficulties[index],
+            self.ids[index],
+            from_epoch_us(self.created_at[index]),
+            from_epoch_us(self.updated_at[index]),
+        )
+
+    def __iter__(self) -> Iterator[StudyRecord]:
+        """記録を1件ずつStudyRecordとして返す（エクスポート処理などでそのまま使える）"""
+        for index in range(len(self)):
+            yield self[index]
+
+    def total_study_time(self) -> int:
+        """学習時間の合計（分）"""
+        return sum(self.study_times)
+
+    def difficulty_sum(self) -> int:
+        """難易度の合計"""
+        return sum(self.difficulties)
+
+    def created_at_range(self) -> Optional[Tuple[datetime, datetime]]:
+        """最も古い作成日時と最も新しい作成日時（記録がなければNone）"""
+        if not self:
+            return None
+        return from_epoch_us(min(self.created_at)), from_epoch_us(max(self.created_at))
+
+    def category_totals(self) -> Dict[Optional[str], Dict[str, int]]:
+        """
+        カテゴリ別の件数・学習時間・難易度の合計
+
+        Returns:
+            カテゴリ（初出順） -> {"count", "total_time", "difficulty_sum"}
+        """
+        size = len(self.categories)
+        counts = [0] * size
+        times = [0] * size
+        difficulties = [0] * size
+        for code, study_time, difficulty in zip(
+            self.category_codes, self.study_times, self.difficulties
+        ):
+            counts[code] += 1
+            times[code] += study_time
+            difficulties[code] += difficulty
+
+        return {
+            category: {
+                "count": counts[code],
+                "total_time": times[code],
+                "difficulty_sum": difficulties[code],
+            }
+            for code, category in enumerate(self.categories)
+            if counts[code]
+        }
+
+    def difficulty_totals(self) -> Dict[int, Dict[str, int]]:
+        """
+        難易度別の件数・学習時間の合計
+
+        Returns:
+            難易度（1-5） -> {"count", "total_time"}（記録のない難易度は含まない）
+        """
+        counts = [0] * 6
+        times = [0] * 6
+        for difficulty, study_time in zip(self.difficulties, self.study_times):
+            counts[difficulty] += 1
+            times[difficulty] += study_time
+
+        return {
+            difficulty: {"count": counts[difficulty], "total_time": times[difficulty]}
+            for difficulty in range(1, 6)
+            if counts[difficulty]
+        }
+
+    def totals_since(self, start: datetime) -> Tuple[int, int]:
+        """start 以降に作成された記録の (件数, 学習時間の合計)"""
+        threshold = to_epoch_us(start)
+        count = 0
+        total_time = 0
+        for created_at, study_time in zip(self.created_at, self.study_times):
+            if created_at >= threshold:
+                count += 1
+                total_time += study_time
+        return count, total_time
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """
+        数値列をNumPy配列として取得（コピーせずに同じメモリを参照）
+
+        Raises:
+            ImportError: NumPyがインストールされていない場合
+        """
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError(
+                "to_numpy() には NumPy が必要です: pip install numpy"
+            ) from None
+
+        return {
+            "id": numpy.frombuffer(self.ids, dtype=numpy.int64),
+            "study_time": numpy.frombuffer(self.study_times, dtype=numpy.int64),
+            "difficulty": numpy.frombuffer(self.difficulties, dtype=numpy.int8),
+            "category_code": numpy.frombuffer(
+                self.category_codes, dtype=numpy.dtype("l")
+            ),
+            "created_at": numpy.frombuffer(self.created_at, dtype=numpy.int64),
+            "updated_at": numpy.frombuffer(self.updated_at, dtype=numpy.int64),
+        }
+
+    def __repr__(self) -> str:
+        return f"RecordBatch(records={len(self)}, categories={len(self.categories)})"
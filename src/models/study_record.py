@@ -13,8 +13,20 @@ class StudyRecord:
     学習記録クラス
 
     学習のタイトル、内容、時間、カテゴリ、難易度などを管理します。
+    大量の記録を保持してもメモリを圧迫しないよう、__slots__ で属性を固定しています。
     """
 
+    __slots__ = (
+        "id",
+        "title",
+        "content",
+        "study_time",
+        "category",
+        "difficulty",
+        "created_at",
+        "updated_at",
+    )
+
     def __init__(
         self,
         title: str,
@@ -23,6 +35,8 @@ class StudyRecord:
         category: Optional[str] = None,
         difficulty: int = 1,
         id: Optional[int] = None,
+        created_at: Optional[datetime] = None,
+        updated_at: Optional[datetime] = None,
     ):
         """
         学習記録を初期化
@@ -34,6 +48,8 @@ class StudyRecord:
             category: カテゴリ（オプション）
             difficulty: 難易度（1-5）
             id: レコードID（オプション）
+            created_at: 作成日時（省略時は現在時刻）
+            updated_at: 更新日時（省略時は現在時刻）
         """
         self.id = id
         self.title = title
@@ -41,8 +57,13 @@ class StudyRecord:
         self.study_time = study_time
         self.category = category
         self.difficulty = max(1, min(5, difficulty))  # 1-5の範囲に制限
-        self.created_at = datetime.now()
-        self.updated_at = datetime.now()
+        # 両方指定された場合（DBからの読み込み時）は時計を参照しない
+        if created_at is None or updated_at is None:
+            now = datetime.now()
+            created_at = created_at or now
+            updated_at = updated_at or now
+        self.created_at = created_at
+        self.updated_at = updated_at
 
     def get_study_hours(self) -> float:
         """学習時間を時間単位で取得"""
@@ -80,6 +80,33 @@ export class ApiService {
     }
   }
 
+  // 学習記録一覧取得（カーソル方式・無限スクロール用）
+  async getStudyRecordsAfter(cursor: string | null = null, limit: number = 20): Promise<{
+    records: StudyRecord[];
+    nextCursor: string | null;
+  }> {
+    try {
+      const params = new URLSearchParams({ limit: String(limit) });
+      if (cursor) {
+        params.set('cursor', cursor);
+      }
+      const response = await fetch(`${this.baseUrl}/study-records/scroll?${params}`);
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+
+      const data = await response.json();
+      return {
+        records: data.items,
+        nextCursor: data.next_cursor
+      };
+    } catch (error) {
+      console.error('学習記録取得エラー:', error);
+      throw error;
+    }
+  }
+
   // 学習記録詳細取得
   async getStudyRecord(id: number): Promise<StudyRecord> {
     try {
@@ -0,0 +1,142 @@
+"""
+StudyAnalyticsのテスト
+
+NumPyによる集計がデータベース・APIの集計と一致するかを検証するテストスイートです。
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from src.api import routes  # noqa: E402
+from src.database.connection import DatabaseManager  # noqa: E402
+from src.models.analytics import StudyAnalytics  # noqa: E402
+from src.models.record_batch import RecordBatch  # noqa: E402
+from src.models.study_record import StudyRecord  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """ランダムな学習記録を投入したデータベース"""
+    rng = random.Random(0)
+    base = datetime(2025, 7, 1, 9, 0)
+    manager = DatabaseManager(str(tmp_path / "analytics.db"))
+    manager.add_study_records_many(
+        [
+            StudyRecord(
+                title=f"記録{i}",
+                study_time=rng.choice([0, 15, 29, 30, 45, 119, 120, 240]),
+                category=rng.choice(["英語", "数学", "", None]),
+                difficulty=rng.randint(1, 5),
+                # 同じ作成日時の記録も含める
+                created_at=base + timedelta(hours=rng.randint(0, 24 * 10) // 3 * 3),
+            )
+            for i in range(200)
+        ],
+        keep_timestamps=True,
+    )
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def analytics(db):
+    return StudyAnalytics.from_batch(db.load_record_batch())
+
+
+class TestStudyAnalytics:
+    """StudyAnalyticsクラスのテストクラス"""
+
+    @pytest.mark.parametrize(
+        "method, kwargs",
+        [
+            ("get_totals", {}),
+            ("get_category_totals", {}),
+            ("get_category_totals", {"include_uncategorized": True}),
+            ("get_difficulty_totals", {}),
+            ("get_time_distribution", {}),
+            ("get_daily_totals", {}),
+            ("get_all_totals", {}),
+        ],
+    )
+    def test_matches_database(self, db, analytics, method, kwargs):
+        """集計結果（並び順を含む）がデータベースの集計と一致するかのテスト"""
+        assert getattr(analytics, method)(**kwargs) == getattr(db, method)(**kwargs)
+
+    def test_matches_endpoints(self, db, analytics):
+        """APIのレスポンスを同じ内容で作成できるかのテスト"""
+        expected = routes.build_study_stats(db.get_totals(), db.get_category_totals())
+        assert (
+            routes.build_study_stats(
+                analytics.get_totals(), analytics.get_category_totals()
+            )
+            == expected
+        )
+        assert routes.build_timeline_stats(
+            analytics.get_daily_totals()
+        ) == routes.build_timeline_stats(db.get_daily_totals())
+
+    def test_percentiles(self, db, analytics):
+        """分位点がソートした学習時間の線形補間と一致するかのテスト"""
+        times = sorted(record.study_time for record in db.get_all_study_records())
+
+        result = analytics.percentiles([0, 50, 90, 100])
+
+        assert result[0] == times[0]
+        assert result[100] == times[-1]
+        position = (len(times) - 1) * 0.9
+        lower = times[int(position)]
+        upper = times[min(int(position) + 1, len(times) - 1)]
+        assert result[90] == round(lower + (upper - lower) * (position % 1), 2)
+
+    def test_histogram(self, db, analytics):
+        """ヒストグラムが各階級の件数と一致するかのテスト"""
+        times = [record.study_time for record in db.get_all_study_records()]
+
+        histogram = analytics.histogram(bin_width=60)
+
+        assert histogram[-1]["end"] > max(times)
+        for bin in histogram:
+            assert bin["count"] == sum(bin["start"] <= t < bin["end"] for t in times)
+        with pytest.raises(ValueError):
+            analytics.histogram(bin_width=0)
+
+    def test_rolling_totals(self):
+        """移動合計が記録のない日を0として計算されるかのテスト"""
+        batch = RecordBatch.from_records(
+            StudyRecord(id=i, title="記録", study_time=minutes, created_at=created_at)
+            for i, (minutes, created_at) in enumerate(
+                [
+                    (40, datetime(2025, 7, 5, 21)),
+                    (20, datetime(2025, 7, 3, 8)),
+                    (10, datetime(2025, 7, 1, 9)),
+                    (30, datetime(2025, 7, 1, 18)),
+                ]
+            )
+        )
+
+        rolling = StudyAnalytics.from_batch(batch).rolling_totals(window=3)
+
+        assert [day["date"] for day in rolling] == [
+            f"2025-07-0{day}" for day in range(1, 6)
+        ]
+        assert [day["total_time"] for day in rolling] == [40, 0, 20, 0, 40]
+        assert [day["rolling_total"] for day in rolling] == [40, 40, 60, 20, 60]
+        assert rolling[2]["rolling_average"] == 20.0
+
+    def test_empty(self):
+        """記録がない場合のテスト"""
+        analytics = StudyAnalytics.from_batch(RecordBatch())
+
+        assert analytics.get_totals() == {
+            "count": 0,
+            "total_time": 0,
+            "difficulty_sum": 0,
+        }
+        assert analytics.get_category_totals() == []
+        assert analytics.get_daily_totals() == []
+        assert analytics.percentiles([50]) == {50: None}
+        assert analytics.rolling_totals() == []
@@ -1,7 +1,16 @@
+import asyncio
+import json
+import threading
+
 import pytest
 from fastapi.testclient import TestClient
+from src.api import routes
+from src.api.cache import DEFAULT_UNTRACKED_TTL, StatsCache
+from src.api import main
 from src.api.main import app
+from src.database.async_manager import AsyncDatabaseManager
 from src.database.connection import DatabaseManager
+from src.models.study_record import StudyRecord
 from datetime import datetime
 
 # テストクライアントの作成
@@ -179,6 +188,100 @@ class TestPaginationAPI:
         assert pagination["total_items"] >= 0
         assert pagination["total_pages"] >= 0
 
+    def test_get_study_records_paginated_matches_listing(self):
+        """ページネーションの結果が一覧取得の先頭と一致するかのテスト"""
+        client.post("/api/v1/study-records/", json={"title": "ページ確認用"})
+
+        response = client.get("/api/v1/study-records/paginated?page=1&limit=2")
+        assert response.status_code == 200
+        data = response.json()
+        all_records = client.get("/api/v1/study-records/").json()
+
+        assert data["pagination"]["total_items"] == len(all_records)
+        assert [item["id"] for item in data["items"]] == [
+            record["id"] for record in all_records[:2]
+        ]
+
+    def test_get_study_records_paginated_with_filters(self):
+        """絞り込み条件付きページネーションのテスト"""
+        client.post(
+            "/api/v1/study-records/",
+            json={"title": "絞り込み確認", "category": "フィルタAPI", "difficulty": 5},
+        )
+
+        response = client.get(
+            "/api/v1/study-records/paginated",
+            params={"category": "フィルタAPI", "difficulty": 5, "limit": 100},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["items"]
+        assert all(item["category"] == "フィルタAPI" for item in data["items"])
+        assert data["pagination"]["total_items"] == len(data["items"])
+
+    def test_get_study_records_by_cursor(self):
+        """カーソル方式の一覧取得のテスト"""
+        for i in range(3):
+            client.post("/api/v1/study-records/", json={"title": f"カーソル{i}"})
+
+        first = client.get("/api/v1/study-records/scroll?limit=2")
+        assert first.status_code == 200
+        data = first.json()
+        assert len(data["items"]) == 2
+        assert data["next_cursor"]
+
+        second = client.get(
+            "/api/v1/study-records/scroll",
+            params={"cursor": data["next_cursor"], "limit": 2},
+        )
+        assert second.status_code == 200
+        first_ids = {item["id"] for item in data["items"]}
+        assert not first_ids & {item["id"] for item in second.json()["items"]}
+
+    def test_get_study_records_by_invalid_cursor(self):
+        """不正なカーソルのテスト"""
+        response = client.get("/api/v1/study-records/scroll?cursor=invalid")
+        assert response.status_code == 400
+
+    def test_search_study_records(self):
+        """全文検索APIのテスト"""
+        client.post(
+            "/api/v1/study-records/",
+            json={"title": "全文検索テスト", "content": "トライグラムで検索"},
+        )
+
+        response = client.get(
+            "/api/v1/study-records/search", params={"q": "トライグラム"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data[0]["record"]["title"] == "全文検索テスト"
+        assert "【トライグラム】" in data[0]["content_snippet"]
+
+    def test_search_study_records_invalid_field(self):
+        """検索対象に不正な列を指定した場合のテスト"""
+        response = client.get(
+            "/api/v1/study-records/search", params={"q": "検索", "fields": "category"}
+        )
+        assert response.status_code == 400
+
+    def test_export_study_records_ndjson(self):
+        """NDJSON形式のエクスポートAPIのテスト"""
+        import json
+
+        client.post(
+            "/api/v1/study-records/",
+            json={"title": "エクスポートテスト", "difficulty": 5},
+        )
+
+        response = client.get("/api/v1/study-records/export", params={"difficulty": 5})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines
+        assert all(line["difficulty"] == 5 for line in lines)
+        assert "エクスポートテスト" in {line["title"] for line in lines}
+
     def test_get_study_records_paginated_with_offset(self):
         """オフセット付きページネーションのテスト"""
         response = client.get("/api/v1/study-records/paginated?page=1&limit=3&offset=0")
@@ -254,6 +357,509 @@ class TestStatisticsAPI:
             assert "count" in item
 
 
+class TestSystemAPI:
+    """システムAPIのテストクラス"""
+
+    def test_health_check_reports_storage_profile(self):
+        """ヘルスチェックでストレージプロファイルが返るかのテスト"""
+        response = client.get("/health")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "healthy"
+        assert data["database"]["profile"] in ("durable", "balanced", "throughput")
+        assert data["database"]["journal_mode"] == "wal"
+        assert "write_coordinator" in data
+
+
+def legacy_stats(records):
+    """SQL集計導入前のPython実装による統計（互換性確認用）"""
+    summary_categories = {}
+    categories = {}
+    difficulties = {}
+    timeline = {}
+    distribution = {"short_time": 0, "medium_time": 0, "long_time": 0}
+    for record in records:
+        if record.category:
+            stats = categories.setdefault(
+                record.category, {"count": 0, "total_time": 0, "difficulties": []}
+            )
+            stats["count"] += 1
+            stats["total_time"] += record.study_time
+            stats["difficulties"].append(record.difficulty)
+            summary = summary_categories.setdefault(
+                record.category, {"count": 0, "total_time": 0}
+            )
+            summary["count"] += 1
+            summary["total_time"] += record.study_time
+        stats = difficulties.setdefault(
+            record.difficulty, {"count": 0, "total_time": 0}
+        )
+        stats["count"] += 1
+        stats["total_time"] += record.study_time
+        stats = timeline.setdefault(
+            record.created_at.strftime("%Y-%m-%d"), {"total_time": 0, "count": 0}
+        )
+        stats["total_time"] += record.study_time
+        stats["count"] += 1
+        if record.study_time < 30:
+            distribution["short_time"] += 1
+        elif record.study_time < 120:
+            distribution["medium_time"] += 1
+        else:
+            distribution["long_time"] += 1
+
+    total_time = sum(r.study_time for r in records)
+    return {
+        "summary": {
+            "total_records": len(records),
+            "total_study_time": total_time,
+            "total_study_hours": round(total_time / 60, 2),
+            "average_difficulty": round(
+                sum(r.difficulty for r in records) / len(records), 2
+            ),
+            "categories": summary_categories,
+        },
+        "category": [
+            {
+                "category": category,
+                "count": stats["count"],
+                "total_time": stats["total_time"],
+                "total_hours": round(stats["total_time"] / 60, 2),
+                "average_difficulty": round(
+                    sum(stats["difficulties"]) / len(stats["difficulties"]), 2
+                ),
+                "average_time": round(stats["total_time"] / stats["count"], 2),
+            }
+            for category, stats in categories.items()
+        ],
+        "difficulty": [
+            {
+                "difficulty": difficulty,
+                "count": stats["count"],
+                "total_time": stats["total_time"],
+                "total_hours": round(stats["total_time"] / 60, 2),
+                "average_time": round(stats["total_time"] / stats["count"], 2),
+            }
+            for difficulty, stats in difficulties.items()
+        ],
+        "time-distribution": {**distribution, "total_records": len(records)},
+        "timeline": sorted(
+            (
+                {
+                    "date": date,
+                    "total_time": stats["total_time"],
+                    "total_hours": round(stats["total_time"] / 60, 2),
+                    "count": stats["count"],
+                }
+                for date, stats in timeline.items()
+            ),
+            key=lambda x: x["date"],
+        ),
+    }
+
+
+def use_database(monkeypatch, manager):
+    """APIの参照先データベースを差し替える"""
+    facade = AsyncDatabaseManager(manager)
+    monkeypatch.setattr(routes, "db", manager)
+    monkeypatch.setattr(routes, "async_db", facade)
+    return facade
+
+
+@pytest.fixture
+def stats_db(tmp_path, monkeypatch):
+    """統計テスト用のデータベース（APIの参照先を差し替える）"""
+    manager = DatabaseManager(str(tmp_path / "stats.db"))
+    samples = [
+        ("Python", "プログラミング", 45, 3, datetime(2025, 7, 1, 9, 0)),
+        ("SQL", "データベース", 120, 4, datetime(2025, 7, 1, 9, 0)),
+        ("英単語", "英語", 20, 1, datetime(2025, 7, 2, 21, 30)),
+        ("FastAPI", "プログラミング", 90, 2, datetime(2025, 7, 3, 10, 0)),
+        ("メモ", None, 10, 1, datetime(2025, 7, 3, 10, 0)),
+        ("空カテゴリ", "", 200, 5, datetime(2025, 7, 4, 8, 15)),
+        ("インデックス", "データベース", 33, 3, datetime(2025, 7, 4, 8, 15)),
+    ]
+    records = []
+    for title, category, study_time, difficulty, created_at in samples:
+        record = StudyRecord(
+            title=title,
+            category=category,
+            study_time=study_time,
+            difficulty=difficulty,
+        )
+        record.created_at = record.updated_at = created_at
+        records.append(record)
+    manager.add_study_records_many(records, keep_timestamps=True)
+
+    facade = use_database(monkeypatch, manager)
+    yield manager
+    facade.close()
+    manager.close()
+
+
+class TestStatisticsCompatibility:
+    """SQL集計の結果が従来のPython集計と一致するかのテストクラス"""
+
+    @pytest.mark.parametrize(
+        "endpoint",
+        ["summary", "category", "difficulty", "time-distribution", "timeline"],
+    )
+    def test_matches_legacy_implementation(self, stats_db, endpoint):
+        """各統計エンドポイントのレスポンスが従来実装と同一かのテスト"""
+        expected = legacy_stats(stats_db.get_all_study_records())[endpoint]
+
+        response = client.get(f"/api/v1/study-records/stats/{endpoint}")
+
+        assert response.status_code == 200
+        assert response.content == json.dumps(
+            expected, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    def test_all_stats_matches_endpoints(self, stats_db):
+        """まとめた統計が各統計エンドポイントのレスポンスと一致するかのテスト"""
+        expected = {
+            key: client.get(f"/api/v1/study-records/stats/{endpoint}").json()
+            for key, endpoint in [
+                ("summary", "summary"),
+                ("category", "category"),
+                ("difficulty", "difficulty"),
+                ("time_distribution", "time-distribution"),
+                ("timeline", "timeline"),
+            ]
+        }
+
+        response = client.get("/api/v1/study-records/stats/all")
+
+        assert response.status_code == 200
+        assert response.json() == expected
+
+    def test_timeline_buckets(self, stats_db):
+        """区間・範囲を指定した時系列統計が記録のない区間も返すかのテスト"""
+        response = client.get(
+            "/api/v1/study-records/stats/timeline",
+            params={"bucket": "week", "from": "2025-06-25", "to": "2025-07-10"},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"date": "2025-06-23", "total_time": 0, "total_hours": 0.0, "count": 0},
+            {"date": "2025-06-30", "total_time": 518, "total_hours": 8.63, "count": 7},
+            {"date": "2025-07-07", "total_time": 0, "total_hours": 0.0, "count": 0},
+        ]
+
+    def test_timeline_time_zone(self, stats_db):
+        """タイムゾーンの日付で区切られるかのテスト"""
+        # 2025-07-02 21:30 UTC は東京では7月3日
+        days = client.get(
+            "/api/v1/study-records/stats/timeline",
+            params={"tz": "Asia/Tokyo", "from": "2025-07-02", "to": "2025-07-03"},
+        ).json()
+
+        assert [(day["date"], day["count"]) for day in days] == [
+            ("2025-07-02", 0),
+            ("2025-07-03", 3),
+        ]
+
+    @pytest.mark.parametrize(
+        "params, status",
+        [
+            ({"bucket": "year"}, 422),
+            ({"from": "2025-13-01"}, 422),
+            ({"tz": "Mars/Olympus"}, 400),
+            ({"from": "2025-07-10", "to": "2025-07-01"}, 400),
+        ],
+    )
+    def test_timeline_invalid_parameters(self, stats_db, params, status):
+        """不正な区間・日付・タイムゾーンのテスト"""
+        response = client.get("/api/v1/study-records/stats/timeline", params=params)
+        assert response.status_code == status
+
+    def test_percentiles(self, stats_db):
+        """学習時間の分位点（全体・カテゴリ別・期間指定）のテスト"""
+        url = "/api/v1/study-records/stats/percentiles"
+
+        assert client.get(url).json() == {
+            "count": 7,
+            "percentiles": {"50": 45.0, "90": 152.0, "99": 195.2},
+        }
+        assert client.get(
+            url, params={"p": [25, 100], "category": "データベース"}
+        ).json() == {"count": 2, "percentiles": {"25": 54.75, "100": 120.0}}
+        assert client.get(
+            url, params={"p": 50, "from": "2025-07-03", "to": "2025-07-04"}
+        ).json() == {"count": 4, "percentiles": {"50": 61.5}}
+
+    @pytest.mark.parametrize(
+        "params, status",
+        [
+            ({"p": "median"}, 422),
+            ({"p": 101}, 400),
+            ({"category": "英語", "from": "2025-07-01"}, 400),
+        ],
+    )
+    def test_percentiles_invalid_parameters(self, stats_db, params, status):
+        """不正なパーセント・条件の組み合わせのテスト"""
+        response = client.get("/api/v1/study-records/stats/percentiles", params=params)
+        assert response.status_code == status
+
+    def test_habits(self, stats_db):
+        """学習習慣の統計のテスト（記録は過去の日付のみ）"""
+        response = client.get(
+            "/api/v1/study-records/stats/habits", params={"window": [7, 3650]}
+        )
+
+        assert response.status_code == 200
+        habits = response.json()
+        assert habits["current_streak"] == 0
+        assert habits["current_streak_start"] is None
+        assert (
+            habits["longest_streak"],
+            habits["longest_streak_start"],
+            habits["longest_streak_end"],
+        ) == (4, "2025-07-01", "2025-07-04")
+        assert habits["moving_averages"] == [
+            {"window": 7, "total_time": 0, "average_time": 0.0, "study_days": 0},
+            {
+                "window": 3650,
+                "total_time": 518,
+                "average_time": 0.14,
+                "study_days": 4,
+            },
+        ]
+        assert habits == stats_db.get_habit_stats(windows=(7, 3650))
+
+    def test_habits_invalid_window(self, stats_db):
+        """不正な移動平均の期間のテスト"""
+        response = client.get(
+            "/api/v1/study-records/stats/habits", params={"window": 0}
+        )
+        assert response.status_code == 400
+
+    def test_empty_database(self, tmp_path, monkeypatch):
+        """記録がない場合のレスポンスのテスト"""
+        with DatabaseManager(str(tmp_path / "empty.db")) as manager:
+            facade = use_database(monkeypatch, manager)
+
+            summary = client.get("/api/v1/study-records/stats/summary").json()
+            category = client.get("/api/v1/study-records/stats/category").json()
+            distribution = client.get(
+                "/api/v1/study-records/stats/time-distribution"
+            ).json()
+            facade.close()
+
+        assert summary == {
+            "total_records": 0,
+            "total_study_time": 0,
+            "average_difficulty": 0,
+            "categories": {},
+        }
+        assert category == []
+        assert distribution["total_records"] == 0
+
+
+class TestWorkerThreads:
+    """ワーカースレッドでのクエリ実行のテストクラス"""
+
+    def run_with_client(self, scenario):
+        """同時リクエストを送れる非同期クライアントでシナリオを実行"""
+        httpx = pytest.importorskip("httpx")
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as async_client:
+                await scenario(async_client)
+
+        asyncio.run(run())
+
+    def test_slow_stats_do_not_block_crud(self, stats_db, monkeypatch):
+        """統計の集計が止まっている間も詳細取得・ヘルスチェックが応答するかのテスト"""
+        started, release = threading.Event(), threading.Event()
+        get_totals = stats_db.get_totals
+
+        def blocking_get_totals():
+            started.set()
+            release.wait(10)
+            return get_totals()
+
+        monkeypatch.setattr(stats_db, "get_totals", blocking_get_totals)
+        routes.stats_cache.clear()
+
+        async def scenario(async_client):
+            stats = asyncio.create_task(
+                async_client.get("/api/v1/study-records/stats/summary")
+            )
+            assert await asyncio.to_thread(started.wait, 5)
+            try:
+                responses = await asyncio.wait_for(
+                    asyncio.gather(
+                        *(
+                            async_client.get(f"/api/v1/study-records/{record_id}")
+                            for record_id in range(1, 8)
+                        ),
+                        async_client.get("/health"),
+                    ),
+                    timeout=5,
+                )
+                assert [response.status_code for response in responses] == [200] * 8
+                assert not stats.done()
+            finally:
+                release.set()
+            assert (await stats).json()["total_records"] == 7
+
+        self.run_with_client(scenario)
+
+    def test_health_does_not_use_workers(self, stats_db, monkeypatch):
+        """すべてのワーカースレッドが埋まっていてもヘルスチェックが応答するかのテスト"""
+        facade = routes.async_db
+        monkeypatch.setattr(main, "async_db", facade)
+        release = threading.Event()
+
+        async def scenario(async_client):
+            busy = [
+                asyncio.ensure_future(facade.run(release.wait, 10))
+                for _ in range(facade.max_workers)
+            ]
+            try:
+                response = await asyncio.wait_for(
+                    async_client.get("/health"), timeout=5
+                )
+                assert response.json()["database"] == stats_db.get_storage_info()
+                assert not any(task.done() for task in busy)
+            finally:
+                release.set()
+            await asyncio.gather(*busy)
+
+        self.run_with_client(scenario)
+
+
+class TestStatsCache:
+    """統計キャッシュのテストクラス"""
+
+    def test_version_change_is_miss(self):
+        """データのバージョンが変わった結果を返さないかのテスト"""
+        cache = StatsCache()
+        cache.put("summary", 1, {"total": 1})
+
+        assert cache.get("summary", 1) == (True, {"total": 1})
+        assert cache.get("summary", 2) == (False, None)
+        # 古いバージョンの結果は破棄される
+        assert cache.get("summary", 1) == (False, None)
+        assert cache.metrics()["hits"] == 1
+        assert cache.metrics()["misses"] == 2
+
+    def test_lru_eviction(self):
+        """最大数を超えたら最も長く使われていない結果から破棄するかのテスト"""
+        cache = StatsCache(max_entries=2)
+        cache.put("a", 1, "A")
+        cache.put("b", 1, "B")
+        cache.get("a", 1)
+        cache.put("c", 1, "C")
+
+        assert cache.get("b", 1) == (False, None)
+        assert cache.get("a", 1) == (True, "A")
+        assert cache.get("c", 1) == (True, "C")
+        assert cache.metrics()["entries"] == 2
+
+    def test_ttl_expiry(self):
+        """有効期間を過ぎた結果を返さないかのテスト"""
+        now = [100.0]
+        cache = StatsCache(ttl=5, clock=lambda: now[0])
+        cache.put("summary", 1, "value")
+
+        now[0] = 104.9
+        assert cache.get("summary", 1) == (True, "value")
+        now[0] = 105.0
+        assert cache.get("summary", 1) == (False, None)
+
+    def test_invalid_settings(self):
+        """不正な設定を拒否するかのテスト"""
+        with pytest.raises(ValueError):
+            StatsCache(max_entries=0)
+        with pytest.raises(ValueError):
+            StatsCache(ttl=0)
+
+    def test_from_env(self, monkeypatch):
+        """環境変数の設定が反映されるかのテスト"""
+        monkeypatch.setenv("STUDY_TRACKER_STATS_CACHE_SIZE", "8")
+        monkeypatch.setenv("STUDY_TRACKER_STATS_CACHE_TTL", "2.5")
+
+        cache = StatsCache.from_env()
+
+        assert cache.max_entries == 8
+        assert cache.ttl == 2.5
+
+    def test_from_env_untracked_writes(self, monkeypatch):
+        """他のプロセスの書き込みを検知できない場合は有効期間を設けるかのテスト"""
+        monkeypatch.delenv("STUDY_TRACKER_STATS_CACHE_TTL", raising=False)
+
+        assert StatsCache.from_env().ttl is None
+        assert StatsCache.from_env(tracks_external_writes=False).ttl == (
+            DEFAULT_UNTRACKED_TTL
+        )
+
+        monkeypatch.setenv("STUDY_TRACKER_STATS_CACHE_TTL", "60")
+        assert StatsCache.from_env(tracks_external_writes=False).ttl == 60
+
+    def test_repeated_requests_hit(self, stats_db, monkeypatch):
+        """同じ統計の2回目以降がキャッシュから返るかのテスト"""
+        cache = StatsCache()
+        monkeypatch.setattr(routes, "stats_cache", cache)
+
+        first = client.get("/api/v1/study-records/stats/summary").json()
+        second = client.get("/api/v1/study-records/stats/summary").json()
+
+        assert first == second
+        assert cache.metrics()["hits"] == 1
+        assert cache.metrics()["misses"] == 1
+
+    def test_write_invalidates(self, stats_db, monkeypatch, sample_study_record):
+        """APIからの書き込みの直後に新しい統計を返すかのテスト"""
+        monkeypatch.setattr(routes, "stats_cache", StatsCache())
+        before = client.get("/api/v1/study-records/stats/summary").json()
+
+        created = client.post("/api/v1/study-records/", json=sample_study_record)
+        after_create = client.get("/api/v1/study-records/stats/summary").json()
+        client.delete(f"/api/v1/study-records/{created.json()['id']}")
+        after_delete = client.get("/api/v1/study-records/stats/summary").json()
+
+        assert after_create["total_records"] == before["total_records"] + 1
+        assert after_delete == before
+
+    def test_external_write_invalidates(self, stats_db, monkeypatch):
+        """他のコネクションの書き込みの後に新しい統計を返すかのテスト"""
+        monkeypatch.setattr(routes, "stats_cache", StatsCache())
+        before = client.get("/api/v1/study-records/stats/category").json()
+
+        with DatabaseManager(stats_db.db_path) as other:
+            other.add_study_record(
+                StudyRecord(title="外部", category="外部", study_time=5, difficulty=1)
+            )
+        after = client.get("/api/v1/study-records/stats/category").json()
+
+        assert len(after) == len(before) + 1
+        assert "外部" in [item["category"] for item in after]
+
+    def test_switching_database(self, stats_db, tmp_path, monkeypatch):
+        """参照先を差し替えた場合に別のデータベースの結果を返さないかのテスト"""
+        monkeypatch.setattr(routes, "stats_cache", StatsCache())
+        client.get("/api/v1/study-records/stats/summary")
+
+        with DatabaseManager(str(tmp_path / "other.db")) as manager:
+            facade = use_database(monkeypatch, manager)
+            summary = client.get("/api/v1/study-records/stats/summary").json()
+            facade.close()
+
+        assert summary["total_records"] == 0
+
+    def test_health_reports_cache(self):
+        """ヘルスチェックでキャッシュのメトリクスが返るかのテスト"""
+        data = client.get("/health").json()
+
+        assert {"entries", "hits", "misses", "hit_rate"} <= set(data["stats_cache"])
+
+
 class TestErrorHandling:
     """エラーハンドリングのテストクラス"""
 
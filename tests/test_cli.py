@@ -2,6 +2,7 @@
 CLI機能のテスト
 """
 
+import argparse
 import pytest
 import sys
 from unittest.mock import patch, MagicMock
@@ -19,11 +20,15 @@ from src.cli.main import (
     handle_stats,
     handle_search,
     handle_export,
-    filter_records,
+    handle_backup,
+    handle_check_rollups,
+    handle_rebuild_rollups,
+    build_record_filter,
     export_to_csv,
     export_to_json,
     export_to_txt,
 )
+from src.models.record_batch import RecordBatch
 from src.models.study_record import StudyRecord
 from src.database.connection import DatabaseManager
 
@@ -91,10 +96,11 @@ class TestCLICommands:
 
     def test_handle_list_empty(self, mock_db):
         """空の学習記録一覧のテスト"""
-        mock_db.get_all_study_records.return_value = []
+        mock_db.count_study_records.return_value = 0
 
         args = MagicMock()
         args.limit = 10
+        args.after = None
 
         with patch("sys.stdout", new=StringIO()) as mock_stdout:
             handle_list(mock_db, args)
@@ -104,7 +110,8 @@ class TestCLICommands:
 
     def test_handle_list_with_records(self, mock_db, sample_records):
         """学習記録一覧のテスト"""
-        mock_db.get_all_study_records.return_value = sample_records
+        mock_db.count_study_records.return_value = len(sample_records)
+        mock_db.find_study_records.return_value = sample_records
 
         args = MagicMock()
         args.limit = 10
@@ -114,14 +121,70 @@ class TestCLICommands:
         args.max_time = None
         args.search = None
         args.days = None
+        args.after = None
 
         with patch("sys.stdout", new=StringIO()) as mock_stdout:
             handle_list(mock_db, args)
             output = mock_stdout.getvalue()
 
-        assert "📚 学習記録一覧" in output
+        assert "📚 学習記録一覧 (条件に一致: 2件)" in output
         assert "Python学習" in output
         assert "Git学習" in output
+        (record_filter,) = mock_db.find_study_records.call_args.args
+        assert record_filter.limit == 10
+
+    def test_handle_list_no_match(self, mock_db):
+        """条件に一致する記録がない場合のテスト"""
+        mock_db.count_study_records.side_effect = [0, 5]
+
+        args = MagicMock()
+        args.limit = 10
+        args.category = "存在しないカテゴリ"
+        args.difficulty = None
+        args.min_time = None
+        args.max_time = None
+        args.search = None
+        args.days = None
+        args.after = None
+
+        with patch("sys.stdout", new=StringIO()) as mock_stdout:
+            handle_list(mock_db, args)
+            output = mock_stdout.getvalue()
+
+        assert "📝 条件に一致する学習記録がありません" in output
+        mock_db.find_study_records.assert_not_called()
+
+    def test_handle_list_after(self, mock_db, sample_records):
+        """カーソル方式の学習記録一覧のテスト"""
+        mock_db.list_after.return_value = (sample_records, "next-cursor")
+
+        args = MagicMock()
+        args.limit = 2
+        args.after = ""
+
+        with patch("sys.stdout", new=StringIO()) as mock_stdout:
+            handle_list(mock_db, args)
+            output = mock_stdout.getvalue()
+
+        mock_db.list_after.assert_called_once_with(None, 2)
+        mock_db.get_all_study_records.assert_not_called()
+        assert "Python学習" in output
+        assert "次のページ: study-tracker list --after next-cursor" in output
+
+    def test_handle_list_after_last_page(self, mock_db, sample_records):
+        """カーソル方式の最終ページのテスト"""
+        mock_db.list_after.return_value = (sample_records[:1], None)
+
+        args = MagicMock()
+        args.limit = 2
+        args.after = "cursor"
+
+        with patch("sys.stdout", new=StringIO()) as mock_stdout:
+            handle_list(mock_db, args)
+            output = mock_stdout.getvalue()
+
+        mock_db.list_after.assert_called_once_with("cursor", 2)
+        assert "次のページ" not in output
 
     def test_handle_show_found(self, mock_db, sample_records):
         """学習記録詳細表示のテスト（存在する場合）"""
@@ -216,11 +279,17 @@ class TestCLICommands:
 
     def test_handle_stats_empty(self, mock_db):
         """統計情報のテスト（空の場合）"""
-        mock_db.get_all_study_records.return_value = []
+        mock_db.get_all_totals.return_value = {
+            "totals": {"count": 0, "total_time": 0, "difficulty_sum": 0},
+            "daily": [],
+        }
 
         args = MagicMock()
         args.category = False
         args.difficulty = False
+        args.all = False
+        args.percentiles = None
+        args.habits = False
         args.period = "all"
 
         with patch("sys.stdout", new=StringIO()) as mock_stdout:
@@ -230,13 +299,19 @@ class TestCLICommands:
         assert "📊 学習統計" in output
         assert "学習記録がありません" in output
 
-    def test_handle_stats_with_records(self, mock_db, sample_records):
+    def test_handle_stats_with_records(self, mock_db):
         """統計情報のテスト（記録がある場合）"""
-        mock_db.get_all_study_records.return_value = sample_records
+        mock_db.get_all_totals.return_value = {
+            "totals": {"count": 2, "total_time": 150, "difficulty_sum": 5},
+            "daily": [{"date": "2024-01-01", "count": 2, "total_time": 150}],
+        }
 
         args = MagicMock()
         args.category = False
         args.difficulty = False
+        args.all = False
+        args.percentiles = None
+        args.habits = False
         args.period = "all"
 
         with patch("sys.stdout", new=StringIO()) as mock_stdout:
@@ -246,10 +321,152 @@ class TestCLICommands:
         assert "📊 学習統計サマリー" in output
         assert "総学習記録数: 2件" in output
         assert "総学習時間: 150分" in output
+        assert "学習期間: 2024-01-01 〜 2024-01-01" in output
+        mock_db.load_record_batch.assert_not_called()
+
+    def test_handle_stats_breakdown(self, tmp_path):
+        """カテゴリ別・難易度別・期間別の統計のテスト"""
+        with DatabaseManager(str(tmp_path / "stats.db")) as db:
+            db.add_study_records_many(
+                [
+                    StudyRecord(
+                        title="A", study_time=30, category="英語", difficulty=2
+                    ),
+                    StudyRecord(title="B", study_time=60, category=None, difficulty=4),
+                    StudyRecord(
+                        title="C", study_time=90, category="英語", difficulty=4
+                    ),
+                    StudyRecord(title="D", study_time=20, category="", difficulty=1),
+                ]
+            )
+            args = argparse.Namespace(
+                category=True,
+                difficulty=True,
+                all=False,
+                percentiles=None,
+                habits=False,
+                period="weekly",
+            )
+
+            with patch("sys.stdout", new=StringIO()) as mock_stdout:
+                handle_stats(db, args)
+                output = mock_stdout.getvalue()
+
+        assert "総学習記録数: 4件" in output
+        assert "総学習時間: 200分" in output
+        # カテゴリ未設定と空文字はまとめて「未分類」として集計する
+        assert "未分類:\n  記録数: 2件\n  学習時間: 80分" in output
+        assert "英語:\n  記録数: 2件\n  学習時間: 120分" in output
+        assert output.index("未分類:") < output.index("英語:")
+        assert "難易度 4 (⭐⭐⭐⭐):\n  記録数: 2件\n  学習時間: 150分" in output
+        assert "難易度 3" not in output
+        assert "過去7日間の学習記録: 4件" in output
+
+    def test_handle_stats_all(self, tmp_path):
+        """--all ですべての統計を1回の集計から表示するかのテスト"""
+        with DatabaseManager(str(tmp_path / "stats.db")) as db:
+            db.add_study_records_many(
+                [
+                    StudyRecord(title="A", study_time=20, category="英語"),
+                    StudyRecord(title="B", study_time=60, category="数学"),
+                    StudyRecord(title="C", study_time=150, category="英語"),
+                ]
+            )
+            today = db.get_daily_totals()[0]["date"]
+            args = argparse.Namespace(
+                category=False,
+                difficulty=False,
+                all=True,
+                percentiles=None,
+                habits=False,
+                period="all",
+            )
+
+            with (
+                patch.object(db, "get_totals") as get_totals,
+                patch("sys.stdout", new=StringIO()) as mock_stdout,
+            ):
+                handle_stats(db, args)
+                output = mock_stdout.getvalue()
+
+        get_totals.assert_not_called()
+        assert "総学習記録数: 3件" in output
+        assert "英語:\n  記録数: 2件\n  学習時間: 170分" in output
+        assert "難易度 1 (⭐):\n  記録数: 3件" in output
+        assert "30分未満: 1件\n30分-2時間: 1件\n2時間以上: 1件" in output
+        assert "p50: 60分\np90: 132分\np99: 148.2分" in output
+        assert f"現在の連続学習: 1日（{today} 〜）" in output
+        assert "直近7日間: 平均32.86分/日（合計230分・学習した日 1日）" in output
+        assert f"{today}: 3件 230分" in output
+
+    def test_handle_stats_percentiles(self, tmp_path):
+        """--percentiles で指定した分位点だけを表示するかのテスト"""
+        with DatabaseManager(str(tmp_path / "stats.db")) as db:
+            db.add_study_records_many(
+                [
+                    StudyRecord(title=f"記録{minutes}", study_time=minutes)
+                    for minutes in (10, 20, 30, 40)
+                ]
+            )
+            args = argparse.Namespace(
+                category=False,
+                difficulty=False,
+                all=False,
+                percentiles=[25, 75],
+                habits=False,
+                period="all",
+            )
+
+            with patch("sys.stdout", new=StringIO()) as mock_stdout:
+                handle_stats(db, args)
+                output = mock_stdout.getvalue()
+
+        assert "📐 学習時間の分位点" in output
+        assert "p25: 17.5分\np75: 32.5分" in output
+        assert "p50" not in output
+        assert "学習時間の分布" not in output
+
+    def test_handle_stats_habits(self, tmp_path):
+        """--habits で連続学習日数と移動平均を表示するかのテスト"""
+        with DatabaseManager(str(tmp_path / "stats.db")) as db:
+            db.add_study_records_many(
+                [
+                    StudyRecord(
+                        title="A", study_time=30, created_at=datetime(2025, 7, 1, 9)
+                    ),
+                    StudyRecord(
+                        title="B", study_time=60, created_at=datetime(2025, 7, 2, 9)
+                    ),
+                ],
+                keep_timestamps=True,
+            )
+            args = argparse.Namespace(
+                category=False,
+                difficulty=False,
+                all=False,
+                percentiles=None,
+                habits=True,
+                period="all",
+            )
+
+            with patch("sys.stdout", new=StringIO()) as mock_stdout:
+                handle_stats(db, args)
+                output = mock_stdout.getvalue()
+
+        assert "🔥 学習習慣" in output
+        assert "現在の連続学習: 0日" in output
+        assert "最長の連続学習: 2日（2025-07-01 〜 2025-07-02）" in output
+        assert "直近30日間: 平均0分/日" in output
 
     def test_handle_search_found(self, mock_db, sample_records):
         """検索のテスト（結果あり）"""
-        mock_db.get_all_study_records.return_value = sample_records
+        mock_db.search.return_value = [
+            {
+                "record": sample_records[0],
+                "title_highlight": "【Python】学習",
+                "content_snippet": "FastAPIの基礎",
+            }
+        ]
 
         args = MagicMock()
         args.keyword = "Python"
@@ -263,11 +480,33 @@ class TestCLICommands:
             output = mock_stdout.getvalue()
 
         assert "🔍 検索結果: 'Python'" in output
-        assert "Python学習" in output
+        assert "【Python】学習" in output
+        assert "内容: FastAPIの基礎" in output
+        mock_db.search.assert_called_once_with(
+            "Python", fields=["title", "content"], limit=10, case_sensitive=False
+        )
+
+    def test_handle_search_title_only(self, mock_db):
+        """タイトルのみの検索のテスト"""
+        mock_db.search.return_value = []
+
+        args = MagicMock()
+        args.keyword = "Python"
+        args.title_only = True
+        args.content_only = False
+        args.case_sensitive = True
+        args.limit = 5
+
+        with patch("sys.stdout", new=StringIO()):
+            handle_search(mock_db, args)
+
+        mock_db.search.assert_called_once_with(
+            "Python", fields=["title"], limit=5, case_sensitive=True
+        )
 
     def test_handle_search_not_found(self, mock_db, sample_records):
         """検索のテスト（結果なし）"""
-        mock_db.get_all_study_records.return_value = sample_records
+        mock_db.search.return_value = []
 
         args = MagicMock()
         args.keyword = "存在しないキーワード"
@@ -287,92 +526,105 @@ class TestCLICommands:
 
 
 class TestFilterRecords:
-    """フィルタリング機能のテスト"""
+    """フィルタリング機能のテスト（条件はSQLで評価される）"""
 
     @pytest.fixture
-    def sample_records(self):
-        """サンプル学習記録"""
-        records = [
-            StudyRecord(
-                id=1,
-                title="Python学習",
-                content="FastAPIの基礎",
-                study_time=60,
-                category="プログラミング",
-                difficulty=3,
-            ),
-            StudyRecord(
-                id=2,
-                title="Git学習",
-                content="Git Flow",
-                study_time=90,
-                category="バックエンド",
-                difficulty=2,
-            ),
-        ]
-        # 手動で日時を設定
-        records[0].created_at = datetime.now()
-        records[0].updated_at = datetime.now()
-        records[1].created_at = datetime.now()
-        records[1].updated_at = datetime.now()
-        return records
+    def db(self, tmp_path):
+        """サンプル学習記録を登録したデータベース"""
+        manager = DatabaseManager(str(tmp_path / "filter.db"))
+        manager.add_study_records_many(
+            [
+                StudyRecord(
+                    title="Python学習",
+                    content="FastAPIの基礎",
+                    study_time=60,
+                    category="プログラミング",
+                    difficulty=3,
+                ),
+                StudyRecord(
+                    title="Git学習",
+                    content="Git Flow",
+                    study_time=90,
+                    category="バックエンド",
+                    difficulty=2,
+                ),
+            ]
+        )
+        yield manager
+        manager.close()
 
-    def test_filter_by_category(self, sample_records):
-        """カテゴリフィルタリングのテスト"""
+    @pytest.fixture
+    def args(self):
+        """条件を何も指定していない引数"""
         args = MagicMock()
-        args.category = "プログラミング"
+        args.category = None
         args.difficulty = None
         args.min_time = None
         args.max_time = None
         args.search = None
         args.days = None
+        return args
 
-        filtered = filter_records(sample_records, args)
+    def test_filter_by_category(self, db, args):
+        """カテゴリフィルタリングのテスト"""
+        args.category = "プログラミング"
+
+        filtered = db.find_study_records(build_record_filter(args))
         assert len(filtered) == 1
         assert filtered[0].category == "プログラミング"
 
-    def test_filter_by_difficulty(self, sample_records):
+    def test_filter_by_category_partial_match(self, db, args):
+        """カテゴリの部分一致のテスト"""
+        args.category = "バック"
+
+        filtered = db.find_study_records(build_record_filter(args))
+        assert [r.category for r in filtered] == ["バックエンド"]
+
+    def test_filter_by_difficulty(self, db, args):
         """難易度フィルタリングのテスト"""
-        args = MagicMock()
-        args.category = None
         args.difficulty = 2
-        args.min_time = None
-        args.max_time = None
-        args.search = None
-        args.days = None
 
-        filtered = filter_records(sample_records, args)
+        filtered = db.find_study_records(build_record_filter(args))
         assert len(filtered) == 1
         assert filtered[0].difficulty == 2
 
-    def test_filter_by_time_range(self, sample_records):
+    def test_filter_by_time_range(self, db, args):
         """時間範囲フィルタリングのテスト"""
-        args = MagicMock()
-        args.category = None
-        args.difficulty = None
         args.min_time = 70
         args.max_time = 100
-        args.search = None
-        args.days = None
 
-        filtered = filter_records(sample_records, args)
+        filtered = db.find_study_records(build_record_filter(args))
         assert len(filtered) == 1
         assert filtered[0].study_time == 90
 
-    def test_filter_by_search(self, sample_records):
+    def test_filter_by_search(self, db, args):
         """検索フィルタリングのテスト"""
-        args = MagicMock()
-        args.category = None
-        args.difficulty = None
-        args.min_time = None
-        args.max_time = None
         args.search = "Python"
-        args.days = None
 
-        filtered = filter_records(sample_records, args)
+        filtered = db.find_study_records(build_record_filter(args))
         assert len(filtered) == 1
         assert "Python" in filtered[0].title
 
+    def test_filter_by_short_search(self, db, args):
+        """3文字未満のキーワード検索のテスト"""
+        args.search = "基礎"
+
+        filtered = db.find_study_records(build_record_filter(args))
+        assert [r.title for r in filtered] == ["Python学習"]
+
+    def test_filter_by_days(self, db, args):
+        """期間フィルタリングのテスト"""
+        args.days = 1
+
+        assert len(db.find_study_records(build_record_filter(args))) == 2
+
+    def test_zero_values_are_ignored(self, args):
+        """0を指定した条件は従来通り無視されるかのテスト"""
+        args.min_time = 0
+        args.days = 0
+
+        assert build_record_filter(args).where_clause() == ("", [])
+
 
 class TestExportFunctions:
     """エクスポート機能のテスト"""
@@ -424,14 +676,175 @@ class TestExportFunctions:
         assert "テスト学習" in content
 
 
+class TestExportCommand:
+    """exportコマンドのテスト"""
+
+    def test_export_with_filter(self, tmp_path):
+        """条件に一致する記録だけがエクスポートされるかのテスト"""
+        with DatabaseManager(str(tmp_path / "export.db")) as db:
+            db.add_study_records_many(
+                [
+                    StudyRecord(title="対象", category="テスト", difficulty=3),
+                    StudyRecord(title="対象外", category="その他", difficulty=3),
+                ]
+            )
+            filename = tmp_path / "export.json"
+            args = argparse.Namespace(
+                format="json",
+                output=str(filename),
+                category="テスト",
+                difficulty=None,
+                min_time=None,
+                max_time=None,
+                days=None,
+                all_fields=False,
+            )
+
+            with patch("sys.stdout", new=StringIO()) as mock_stdout:
+                handle_export(db, args)
+                output = mock_stdout.getvalue()
+
+        assert "件数: 1件" in output
+        content = filename.read_text(encoding="utf-8")
+        assert '"title": "対象"' in content
+        assert "対象外" not in content
+
+    def test_export_json_matches_json_dump(self, tmp_path):
+        """逐次書き出したJSONが json.dump と同じ内容になるかのテスト"""
+        import json
+
+        with DatabaseManager(str(tmp_path / "export.db")) as db:
+            db.add_study_records_many(
+                [StudyRecord(title=f"記録{i}", content="内容") for i in range(3)]
+            )
+            records = db.get_all_study_records()
+
+            filename = tmp_path / "export.json"
+            count = export_to_json(iter(records), str(filename), all_fields=True)
+
+        assert count == 3
+        content = filename.read_text(encoding="utf-8")
+        data = json.loads(content)
+        assert [item["id"] for item in data] == [r.id for r in records]
+        assert content == json.dumps(data, indent=2, ensure_ascii=False)
+
+    def test_export_record_batch(self, tmp_path):
+        """RecordBatchをそのままエクスポートできるかのテスト"""
+        with DatabaseManager(str(tmp_path / "export.db")) as db:
+            db.add_study_records_many(
+                [StudyRecord(title=f"記録{i}", study_time=i) for i in range(3)]
+            )
+            batch = db.load_record_batch()
+
+        filename = tmp_path / "batch.csv"
+        assert export_to_csv(batch, str(filename)) == 3
+        assert "記録2,2," in filename.read_text(encoding="utf-8")
+
+    def test_export_json_empty(self, tmp_path):
+        """0件のときに空の配列が書き出されるかのテスト"""
+        filename = tmp_path / "empty.json"
+
+        assert export_to_json(iter([]), str(filename)) == 0
+        assert filename.read_text(encoding="utf-8") == "[]"
+
+
+class TestBackupCommand:
+    """backupコマンドのテスト"""
+
+    def test_backup_to_directory_with_rotation(self, tmp_path):
+        """ディレクトリ指定で日時入りのファイルを作り、古いものを削除するかのテスト"""
+        old_backup = tmp_path / "study_tracker_20250101_000000.db.gz"
+        old_backup.write_bytes(b"")
+        db = DatabaseManager(str(tmp_path / "test.db"))
+        db.add_study_record(StudyRecord(title="バックアップ対象"))
+        args = argparse.Namespace(
+            output=str(tmp_path), gzip=True, keep=1, pages=-1, no_verify=False
+        )
+
+        try:
+            with patch("sys.stdout", new=StringIO()) as mock_stdout:
+                handle_backup(db, args)
+                output = mock_stdout.getvalue()
+        finally:
+            db.close()
+
+        backups = sorted(tmp_path.glob("study_tracker_*.db.gz"))
+        assert len(backups) == 1 and backups[0] != old_backup
+        assert "✅ バックアップを作成しました" in output
+        assert "古いバックアップを 1 件削除しました" in output
+
+    def test_gzip_adds_extension(self, mock_db_with_backup, tmp_path):
+        """--gzip 指定時にファイル名へ .gz を付けるかのテスト"""
+        args = argparse.Namespace(
+            output=str(tmp_path / "backup.db"),
+            gzip=True,
+            keep=None,
+            pages=100,
+            no_verify=True,
+        )
+
+        with patch("sys.stdout", new=StringIO()):
+            handle_backup(mock_db_with_backup, args)
+
+        mock_db_with_backup.backup.assert_called_once_with(
+            str(tmp_path / "backup.db.gz"),
+            pages_per_step=100,
+            compress=True,
+            verify=False,
+        )
+
+    @pytest.fixture
+    def mock_db_with_backup(self):
+        """バックアップ結果を返すモックデータベース"""
+        db = MagicMock(spec=DatabaseManager)
+        db.backup.return_value = {
+            "path": "backup.db.gz",
+            "pages": 10,
+            "size": 4096,
+            "compressed": True,
+            "seconds": 0.01,
+        }
+        return db
+
+
+class TestRollupCommands:
+    """rebuild-rollups / check-rollups コマンドのテスト"""
+
+    def test_check_detects_drift_and_rebuild_repairs(self, tmp_path):
+        """ずれたロールアップを検出し、作り直しで一致するかのテスト"""
+        db = DatabaseManager(str(tmp_path / "test.db"))
+        db.add_study_record(StudyRecord(title="A", study_time=30, category="英語"))
+        with db._connection() as conn:
+            conn.execute("UPDATE study_rollup_category SET total_time = 999")
+        args = argparse.Namespace()
+
+        try:
+            with patch("sys.stdout", new=StringIO()) as mock_stdout:
+                with pytest.raises(SystemExit) as exc_info:
+                    handle_check_rollups(db, args)
+                output = mock_stdout.getvalue()
+            assert exc_info.value.code == 1
+            assert "study_rollup_category: 2行の不一致" in output
+
+            with patch("sys.stdout", new=StringIO()) as mock_stdout:
+                handle_rebuild_rollups(db, args)
+                handle_check_rollups(db, args)
+                output = mock_stdout.getvalue()
+        finally:
+            db.close()
+
+        assert "study_rollup_daily: 1行" in output
+        assert "✅ ロールアップは学習記録と一致しています" in output
+
+
 class TestMainFunction:
     """メイン関数のテスト"""
 
-    @patch("src.cli.main.DatabaseManager")
-    def test_main_with_add_command(self, mock_db_class):
+    @patch("src.cli.main.create_database_manager")
+    def test_main_with_add_command(self, mock_create_db):
         """addコマンドのテスト"""
         mock_db = MagicMock()
-        mock_db_class.return_value = mock_db
+        mock_create_db.return_value = mock_db
         mock_db.add_study_record.return_value = 1
 
         # コマンドライン引数をモック
@@ -442,12 +855,12 @@ class TestMainFunction:
 
         assert "✅ 学習記録を追加しました" in output
 
-    @patch("src.cli.main.DatabaseManager")
-    def test_main_with_list_command(self, mock_db_class):
+    @patch("src.cli.main.create_database_manager")
+    def test_main_with_list_command(self, mock_create_db):
         """listコマンドのテスト"""
         mock_db = MagicMock()
-        mock_db_class.return_value = mock_db
-        mock_db.get_all_study_records.return_value = []
+        mock_create_db.return_value = mock_db
+        mock_db.count_study_records.return_value = 0
 
         # コマンドライン引数をモック
         with patch("sys.argv", ["study-tracker", "list"]):
@@ -457,11 +870,11 @@ class TestMainFunction:
 
         assert "📝 学習記録がありません" in output
 
-    @patch("src.cli.main.DatabaseManager")
-    def test_main_with_invalid_command(self, mock_db_class):
+    @patch("src.cli.main.create_database_manager")
+    def test_main_with_invalid_command(self, mock_create_db):
         """無効なコマンドのテスト"""
         mock_db = MagicMock()
-        mock_db_class.return_value = mock_db
+        mock_create_db.return_value = mock_db
 
         # 存在しないコマンド
         with patch("sys.argv", ["study-tracker", "invalid"]):
@@ -475,6 +888,20 @@ class TestMainFunction:
         assert "study-tracker" in output
         assert "invalid choice" in output
 
+    @pytest.mark.parametrize("value", ["150", "-5", "nan", "abc"])
+    @patch("src.cli.main.create_database_manager")
+    def test_main_rejects_invalid_percentiles(self, mock_create_db, value):
+        """範囲外の --percentiles は統計を表示する前にエラーになるかのテスト"""
+        with patch("sys.argv", ["study-tracker", "stats", "--percentiles", value]):
+            with patch("sys.stdout", new=StringIO()) as mock_stdout:
+                with patch("sys.stderr", new=StringIO()) as mock_stderr:
+                    with pytest.raises(SystemExit):
+                        main()
+
+        assert mock_stdout.getvalue() == ""
+        assert value in mock_stderr.getvalue()
+        mock_create_db.assert_not_called()
+
     def test_main_help(self):
         """ヘルプ表示のテスト"""
         with patch("sys.argv", ["study-tracker"]):
@@ -484,3 +911,26 @@ class TestMainFunction:
 
         assert "usage:" in output
         assert "study-tracker" in output
+
+    @patch("src.cli.main.create_database_manager")
+    def test_main_with_db_upgrade_command(self, mock_create_db, tmp_path, monkeypatch):
+        """db upgradeコマンドがマネージャーを作らずにスキーマを更新するかのテスト"""
+        pytest.importorskip("alembic")
+        monkeypatch.setenv(
+            "STUDY_TRACKER_DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}"
+        )
+
+        with patch("sys.argv", ["study-tracker", "db", "upgrade"]):
+            with patch("sys.stdout", new=StringIO()) as mock_stdout:
+                main()
+                output = mock_stdout.getvalue()
+
+        assert "✅ スキーマを更新しました（未管理 → 0005）" in output
+        mock_create_db.assert_not_called()
+
+        with patch("sys.argv", ["study-tracker", "db", "current"]):
+            with patch("sys.stdout", new=StringIO()) as mock_stdout:
+                main()
+                output = mock_stdout.getvalue()
+
+        assert "現在のリビジョン: 0005" in output
@@ -0,0 +1,1616 @@
+"""
+DatabaseManagerのテスト
+
+コネクション管理とCRUD操作の動作を検証するテストスイートです。
+"""
+
+import asyncio
+import random
+import sqlite3
+import threading
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from src.database.async_manager import AsyncDatabaseManager
+from src.database.backup import (
+    BackupError,
+    backup_connection,
+    default_backup_path,
+    rotate_backups,
+)
+from src.database.connection import DatabaseManager, decode_cursor, encode_cursor
+from src.database.filters import RecordFilter
+from src.database.migrations import (
+    LATEST_SCHEMA_VERSION,
+    MIGRATIONS,
+    apply_migrations,
+)
+from src.database.pool import ConnectionPool
+from src.database.profiles import STORAGE_PROFILES
+from src.database.rollups import check_rollups, habit_stats_from_daily
+from src.database.write_coordinator import WriteCoordinator
+from src.models.study_record import StudyRecord
+
+
+@pytest.fixture
+def db(tmp_path):
+    """テスト用データベース"""
+    manager = DatabaseManager(str(tmp_path / "test.db"), pool_size=2)
+    yield manager
+    manager.close()
+
+
+class TestConnectionPool:
+    """ConnectionPoolクラスのテストクラス"""
+
+    def test_connection_is_reused(self, tmp_path):
+        """返却したコネクションが再利用されるかのテスト"""
+        pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=2)
+
+        conn = pool.acquire()
+        pool.release(conn)
+
+        assert pool.acquire() is conn
+        assert pool.size == 1
+        pool.close()
+
+    def test_pool_is_bounded(self, tmp_path):
+        """最大数を超えて取得しようとするとタイムアウトするかのテスト"""
+        pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=1, timeout=0.05)
+
+        conn = pool.acquire()
+        with pytest.raises(TimeoutError):
+            pool.acquire()
+
+        pool.release(conn)
+        assert pool.acquire() is conn
+        pool.close()
+
+    def test_waiting_thread_gets_released_connection(self, tmp_path):
+        """返却待ちのスレッドが返却されたコネクションを受け取れるかのテスト"""
+        pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=1, timeout=5)
+        conn = pool.acquire()
+        acquired = []
+
+        worker = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+        worker.start()
+        pool.release(conn)
+        worker.join(timeout=5)
+
+        assert acquired == [conn]
+        pool.close()
+
+    def test_unhealthy_connection_is_replaced(self, tmp_path):
+        """壊れたコネクションが作り直されるかのテスト"""
+        pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=1)
+
+        conn = pool.acquire()
+        conn.close()
+        pool.release(conn)
+
+        replacement = pool.acquire()
+        assert replacement is not conn
+        assert replacement.execute("SELECT 1").fetchone() == (1,)
+        assert pool.size == 1
+        pool.close()
+
+    def test_open_transaction_is_rolled_back_on_release(self, tmp_path):
+        """未確定のトランザクションが返却時にロールバックされるかのテスト"""
+        pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=1)
+        conn = pool.acquire()
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)")
+        pool.release(conn)
+
+        conn = pool.acquire()
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone() == (0,)
+        pool.close()
+
+    def test_acquire_after_close(self, tmp_path):
+        """クローズ後の取得がエラーになるかのテスト"""
+        pool = ConnectionPool(str(tmp_path / "pool.db"))
+        pool.close()
+
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+
+    def test_invalid_size(self, tmp_path):
+        """不正なプールサイズのテスト"""
+        with pytest.raises(ValueError):
+            ConnectionPool(str(tmp_path / "pool.db"), max_size=0)
+
+
+class TestDatabaseManager:
+    """DatabaseManagerクラスのテストクラス"""
+
+    def test_crud_operations(self, db):
+        """CRUD操作の基本テスト"""
+        record_id = db.add_study_record(
+            StudyRecord(title="SQLite学習", study_time=30, category="DB")
+        )
+
+        record = db.get_study_record(record_id)
+        assert record.title == "SQLite学習"
+        assert record.study_time == 30
+
+        assert db.update_study_record(record_id, study_time=45)
+        assert db.get_study_record(record_id).study_time == 45
+
+        assert db.delete_study_record(record_id)
+        assert db.get_study_record(record_id) is None
+
+    def test_connections_are_pooled(self, db):
+        """操作ごとに新しいコネクションを開かないかのテスト"""
+        for i in range(20):
+            db.add_study_record(StudyRecord(title=f"記録{i}"))
+        db.get_all_study_records()
+
+        assert db._pool.size == 1
+
+    def test_failed_operation_rolls_back(self, db):
+        """例外発生時にロールバックされるかのテスト"""
+        with pytest.raises(RuntimeError):
+            with db._connection() as conn:
+                conn.execute("INSERT INTO study_records (title) VALUES ('途中')")
+                raise RuntimeError("失敗")
+
+        assert db.get_all_study_records() == []
+
+    def test_context_manager_closes_pool(self, tmp_path):
+        """コンテキストマネージャーでプールがクローズされるかのテスト"""
+        with DatabaseManager(str(tmp_path / "ctx.db")) as manager:
+            manager.add_study_record(StudyRecord(title="テスト"))
+
+        assert manager._pool.closed
+        with pytest.raises(RuntimeError):
+            manager.get_all_study_records()
+
+    @pytest.mark.parametrize(
+        "profile, synchronous", [("durable", 2), ("balanced", 1), ("throughput", 0)]
+    )
+    def test_storage_profile_is_applied(self, tmp_path, profile, synchronous):
+        """ストレージプロファイルのPRAGMAが適用されるかのテスト"""
+        with DatabaseManager(
+            str(tmp_path / "profile.db"), storage_profile=profile
+        ) as manager:
+            info = manager.get_storage_info()
+            with manager._connection() as conn:
+                busy_timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+
+        assert info == {
+            "profile": profile,
+            "journal_mode": "wal",
+            "synchronous": synchronous,
+        }
+        assert busy_timeout == STORAGE_PROFILES[profile]["busy_timeout"]
+
+    def test_storage_profile_from_environment(self, tmp_path, monkeypatch):
+        """環境変数でストレージプロファイルを指定できるかのテスト"""
+        monkeypatch.setenv("STUDY_TRACKER_STORAGE_PROFILE", "durable")
+        with DatabaseManager(str(tmp_path / "env.db")) as manager:
+            assert manager.storage_profile == "durable"
+
+    def test_unknown_storage_profile(self, tmp_path):
+        """不明なストレージプロファイルのテスト"""
+        with pytest.raises(ValueError):
+            DatabaseManager(str(tmp_path / "bad.db"), storage_profile="fast")
+
+    def test_in_memory_database(self):
+        """インメモリDBでデータが共有されるかのテスト"""
+        with DatabaseManager(":memory:") as manager:
+            record_id = manager.add_study_record(StudyRecord(title="メモリ"))
+            assert manager.get_study_record(record_id).title == "メモリ"
+
+    def test_timestamps_are_decoded(self, db):
+        """作成日時がDBの値のまま読み込まれるかのテスト"""
+        record_id = db.add_study_record(StudyRecord(title="日時"))
+        with db._connection() as conn:
+            conn.execute(
+                "UPDATE study_records SET created_at = ? WHERE id = ?",
+                ("2024-01-01 09:00:00", record_id),
+            )
+
+        record = db.get_study_record(record_id)
+        assert record.created_at == datetime(2024, 1, 1, 9, 0, 0)
+        assert db.get_all_study_records()[0].created_at == record.created_at
+
+    def test_invalid_timestamp_falls_back_to_now(self, db):
+        """変換できない日時は現在時刻で補われるかのテスト"""
+        record_id = db.add_study_record(StudyRecord(title="日時"))
+        with db._connection() as conn:
+            conn.execute(
+                "UPDATE study_records SET created_at = 'invalid' WHERE id = ?",
+                (record_id,),
+            )
+
+        record = db.get_study_record(record_id)
+        assert isinstance(record.created_at, datetime)
+        assert record.updated_at.year >= 2024
+
+    def test_data_version_follows_writes(self, db, tmp_path):
+        """書き込みのたびにデータのバージョンが進み、読み込みでは変わらないかのテスト"""
+        versions = [db.data_version]
+
+        def changed() -> bool:
+            versions.append(db.data_version)
+            return versions[-1] != versions[-2]
+
+        record_id = db.add_study_record(StudyRecord(title="追加", study_time=10))
+        assert changed()
+        db.get_all_study_records()
+        db.get_totals()
+        assert not changed()
+        db.add_study_records_many([StudyRecord(title="A"), StudyRecord(title="B")])
+        assert changed()
+        db.update_study_record(record_id, study_time=20)
+        assert changed()
+        db.delete_study_record(record_id)
+        assert changed()
+
+        # 他のコネクションのコミットも検知する
+        with sqlite3.connect(db.db_path) as conn:
+            conn.execute("DELETE FROM study_records")
+        assert changed()
+        assert not changed()
+
+        # 別のマネージャーとバージョンが重複しない
+        with DatabaseManager(str(tmp_path / "other.db")) as other:
+            assert other.data_version not in versions
+
+
+class TestBulkInsert:
+    """一括追加のテストクラス"""
+
+    def test_returns_ids_in_order(self, db):
+        """採番済みIDが入力順に返るかのテスト"""
+        records = (StudyRecord(title=f"記録{i}", study_time=i) for i in range(25))
+
+        record_ids = db.add_study_records_many(records, chunk_size=10)
+
+        assert len(record_ids) == 25
+        assert record_ids == sorted(record_ids)
+        for i, record_id in enumerate(record_ids):
+            assert db.get_study_record(record_id).title == f"記録{i}"
+
+    def test_bad_row_rolls_back_whole_batch(self, db):
+        """不正な行があると全件ロールバックされるかのテスト"""
+        records = [StudyRecord(title=f"記録{i}") for i in range(15)]
+        records[12].title = None  # NOT NULL制約違反
+
+        with pytest.raises(sqlite3.IntegrityError):
+            db.add_study_records_many(records, chunk_size=5)
+
+        assert db.get_all_study_records() == []
+
+    def test_bad_row_is_skipped(self, db):
+        """skip_invalid指定時に不正な行だけ読み飛ばすかのテスト"""
+        records = [StudyRecord(title=f"記録{i}") for i in range(15)]
+        records[7].title = None
+
+        record_ids = db.add_study_records_many(records, chunk_size=5, skip_invalid=True)
+
+        assert record_ids[7] is None
+        assert len([i for i in record_ids if i is not None]) == 14
+        assert len(db.get_all_study_records()) == 14
+        assert db.get_study_record(record_ids[8]).title == "記録8"
+
+    def test_keep_timestamps(self, db):
+        """keep_timestamps指定時に作成日時が保存されるかのテスト"""
+        record = StudyRecord(title="過去の記録")
+        record.created_at = datetime(2024, 4, 1, 9, 30)
+        record.updated_at = datetime(2024, 4, 2, 10, 0)
+
+        (record_id,) = db.add_study_records_many([record], keep_timestamps=True)
+
+        stored = db.get_study_record(record_id)
+        assert stored.created_at == datetime(2024, 4, 1, 9, 30)
+        assert stored.updated_at == datetime(2024, 4, 2, 10, 0)
+
+    def test_empty_input(self, db):
+        """空の入力のテスト"""
+        assert db.add_study_records_many([]) == []
+
+    def test_invalid_chunk_size(self, db):
+        """不正なチャンクサイズのテスト"""
+        with pytest.raises(ValueError):
+            db.add_study_records_many([], chunk_size=0)
+
+
+class TestPagination:
+    """ページ取得のテストクラス"""
+
+    def test_page_and_total(self, db):
+        """指定ページの記録と全件数が返るかのテスト"""
+        db.add_study_records_many(StudyRecord(title=f"記録{i}") for i in range(12))
+
+        first, total = db.get_study_records_page(limit=5, offset=0)
+        last, _ = db.get_study_records_page(limit=5, offset=10)
+
+        assert total == 12
+        # 作成日時が同じ場合はIDの降順
+        assert [r.title for r in first] == [f"記録{i}" for i in range(11, 6, -1)]
+        assert [r.title for r in last] == ["記録1", "記録0"]
+
+    def test_page_matches_full_listing(self, db):
+        """ページ取得の並び順が全件取得と一致するかのテスト"""
+        db.add_study_records_many(StudyRecord(title=f"記録{i}") for i in range(7))
+
+        pages = []
+        for offset in range(0, 7, 3):
+            records, _ = db.get_study_records_page(limit=3, offset=offset)
+            pages.extend(r.id for r in records)
+
+        assert pages == [r.id for r in db.get_all_study_records()]
+
+    def test_page_beyond_end(self, db):
+        """範囲外のページのテスト"""
+        db.add_study_record(StudyRecord(title="記録"))
+
+        records, total = db.get_study_records_page(limit=10, offset=10)
+        assert records == []
+        assert total == 1
+
+
+class TestStreamingIterator:
+    """逐次読み込みのテストクラス"""
+
+    def test_iter_matches_full_listing(self, db):
+        """バッチをまたいでも並び順が全件取得と一致するかのテスト"""
+        db.add_study_records_many(StudyRecord(title=f"記録{i}") for i in range(7))
+
+        records = list(db.iter_study_records(batch_size=3))
+
+        assert [r.id for r in records] == [r.id for r in db.get_all_study_records()]
+
+    def test_iter_with_filter(self, db):
+        """検索条件が適用されるかのテスト"""
+        db.add_study_records_many(
+            StudyRecord(title=f"記録{i}", difficulty=i % 2 + 1) for i in range(6)
+        )
+
+        records = db.iter_study_records(RecordFilter(difficulty=2, limit=2))
+
+        assert [r.title for r in records] == ["記録5", "記録3"]
+
+    def test_connection_held_only_while_iterating(self, db):
+        """途中で打ち切ったときにコネクションが返却されるかのテスト"""
+        db.add_study_records_many(StudyRecord(title=f"記録{i}") for i in range(5))
+        idle = db._pool.idle_count
+
+        records = db.iter_study_records(batch_size=2)
+        next(records)
+        assert db._pool.idle_count == idle - 1
+
+        records.close()
+        assert db._pool.idle_count == idle
+
+    def test_invalid_batch_size(self, db):
+        """batch_size が0以下の場合のテスト"""
+        with pytest.raises(ValueError):
+            next(db.iter_study_records(batch_size=0))
+
+    def test_load_record_batch(self, db):
+        """列指向で読み込んだ記録が全件取得と一致するかのテスト"""
+        db.add_study_records_many(
+            StudyRecord(title=f"記録{i}", category="英語" if i % 2 else None)
+            for i in range(5)
+        )
+
+        batch = db.load_record_batch(batch_size=2)
+        expected = db.get_all_study_records()
+
+        assert [r.id for r in batch] == [r.id for r in expected]
+        assert [r.created_at for r in batch] == [r.created_at for r in expected]
+        assert len(db.load_record_batch(RecordFilter(category="英語"))) == 2
+
+
+class TestCursorPagination:
+    """カーソル方式のページ取得のテストクラス"""
+
+    def test_walk_all_pages(self, db):
+        """カーソルをたどって全件を重複なく取得できるかのテスト"""
+        db.add_study_records_many(StudyRecord(title=f"記録{i}") for i in range(10))
+
+        seen = []
+        cursor = None
+        while True:
+            records, cursor = db.list_after(cursor, limit=3)
+            seen.extend(r.id for r in records)
+            if cursor is None:
+                break
+
+        assert seen == [r.id for r in db.get_all_study_records()]
+
+    def test_insert_between_pages(self, db):
+        """ページ間に追加された記録で結果がずれないかのテスト"""
+        db.add_study_records_many(StudyRecord(title=f"記録{i}") for i in range(6))
+
+        first, cursor = db.list_after(None, limit=3)
+        db.add_study_record(StudyRecord(title="新しい記録"))
+        second, cursor = db.list_after(cursor, limit=3)
+
+        assert [r.title for r in first] == ["記録5", "記録4", "記録3"]
+        assert [r.title for r in second] == ["記録2", "記録1", "記録0"]
+        assert cursor is None
+
+    def test_cursor_order_by_created_at(self, db):
+        """作成日時の降順に並ぶかのテスト"""
+        old = StudyRecord(title="古い記録")
+        old.created_at = old.updated_at = datetime(2024, 1, 1)
+        new = StudyRecord(title="新しい記録")
+        new.created_at = new.updated_at = datetime(2024, 6, 1)
+        db.add_study_records_many([new, old], keep_timestamps=True)
+
+        records, cursor = db.list_after(None, limit=1)
+        assert records[0].title == "新しい記録"
+        records, cursor = db.list_after(cursor, limit=1)
+        assert records[0].title == "古い記録"
+        assert cursor is None
+
+    def test_invalid_cursor(self, db):
+        """不正なカーソルのテスト"""
+        with pytest.raises(ValueError):
+            db.list_after("invalid-cursor")
+
+    def test_cursor_round_trip(self):
+        """カーソルのエンコード・デコードのテスト"""
+        cursor = encode_cursor("2025-08-01 12:00:00", 42)
+        assert decode_cursor(cursor) == ("2025-08-01 12:00:00", 42)
+
+
+class TestSchemaMigrations:
+    """スキーママイグレーションのテストクラス"""
+
+    def test_fresh_database_is_latest(self, db):
+        """新規DBが最新バージョンになるかのテスト"""
+        assert db.get_schema_version() == LATEST_SCHEMA_VERSION
+
+    def test_legacy_database_is_upgraded(self, tmp_path):
+        """バージョン管理導入前のDBがデータを保ったまま移行されるかのテスト"""
+        db_path = str(tmp_path / "legacy.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(MIGRATIONS[0][2][0])
+        conn.execute("INSERT INTO study_records (title) VALUES ('既存の記録')")
+        conn.commit()
+        conn.close()
+
+        with DatabaseManager(db_path) as manager:
+            assert manager.get_schema_version() == LATEST_SCHEMA_VERSION
+            assert [r.title for r in manager.get_all_study_records()] == ["既存の記録"]
+
+    def test_migrations_are_idempotent(self, db):
+        """適用済みのマイグレーションが再実行されないかのテスト"""
+        with db._connection() as conn:
+            assert apply_migrations(conn) == []
+            count = conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()
+        assert count == (len(MIGRATIONS),)
+
+    @pytest.mark.parametrize(
+        "sql, params, index",
+        [
+            (
+                "SELECT id FROM study_records ORDER BY created_at DESC, id DESC "
+                "LIMIT 10",
+                (),
+                "idx_study_records_created_at",
+            ),
+            (
+                "SELECT id FROM study_records WHERE (created_at, id) < (?, ?) "
+                "ORDER BY created_at DESC, id DESC LIMIT 10",
+                ("2025-01-01 00:00:00", 1),
+                "idx_study_records_created_at",
+            ),
+            (
+                "SELECT id FROM study_records WHERE category = ? "
+                "ORDER BY created_at DESC",
+                ("プログラミング",),
+                "idx_study_records_category_created_at",
+            ),
+            (
+                "SELECT id FROM study_records WHERE difficulty = ? "
+                "ORDER BY created_at DESC",
+                (3,),
+                "idx_study_records_difficulty_created_at",
+            ),
+        ],
+    )
+    def test_hot_queries_use_indexes(self, db, sql, params, index):
+        """主要なクエリがインデックスを使い、一時B-treeでソートしないかのテスト"""
+        with db._connection() as conn:
+            plan = " ".join(
+                row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            )
+
+        assert index in plan
+        assert "TEMP B-TREE" not in plan
+
+
+class TestRollups:
+    """集計用ロールアップのテストクラス"""
+
+    def test_triggers_keep_rollups_consistent(self, db):
+        """追加・更新・削除を繰り返してもロールアップが一致し続けるかのテスト"""
+        rng = random.Random(0)
+        categories = ["英語", "数学", "", None]
+        days = [
+            f"2025-07-0{day} 1{hour}:00:00" for day in range(1, 4) for hour in (0, 5)
+        ]
+        db.add_study_records_many(
+            [
+                StudyRecord(
+                    title=f"記録{i}",
+                    study_time=rng.randint(0, 200),
+                    category=rng.choice(categories),
+                    difficulty=rng.randint(1, 5),
+                    created_at=datetime.strptime(rng.choice(days), "%Y-%m-%d %H:%M:%S"),
+                )
+                for i in range(60)
+            ],
+            keep_timestamps=True,
+        )
+        for _ in range(80):
+            record_id = rng.randint(1, 60)
+            if rng.random() < 0.3:
+                db.delete_study_record(record_id)
+            else:
+                db.update_study_record(
+                    record_id,
+                    category=rng.choice(categories),
+                    difficulty=rng.randint(1, 5),
+                    study_time=rng.randint(0, 200),
+                )
+            # 最新の記録の削除・移動でも並び順の基準が正しく更新されること
+            assert set(db.check_rollups().values()) == {0}
+
+        records = db.get_all_study_records()
+        assert db.get_totals() == {
+            "count": len(records),
+            "total_time": sum(r.study_time for r in records),
+            "difficulty_sum": sum(r.difficulty for r in records),
+        }
+        first_seen = list(dict.fromkeys(r.category or None for r in records))
+        assert [
+            t["category"] for t in db.get_category_totals(include_uncategorized=True)
+        ] == first_seen
+        assert [t["category"] for t in db.get_category_totals()] == [
+            category for category in first_seen if category
+        ]
+
+    def test_stats_do_not_scan_records(self, db, monkeypatch):
+        """統計がロールアップだけを読み、学習記録を走査しないかのテスト"""
+        queries = []
+        with db._connection() as conn:
+            conn.set_trace_callback(queries.append)
+            monkeypatch.setattr(db, "_read_connection", lambda: nullcontext(conn))
+            try:
+                db.get_totals()
+                db.get_category_totals()
+                db.get_difficulty_totals()
+                db.get_daily_totals()
+                db.get_study_time_percentiles()
+                db.get_study_time_percentiles(category="英語")
+                db.get_study_time_percentiles(start=date(2025, 7, 1))
+            finally:
+                conn.set_trace_callback(None)
+
+        assert queries and all("study_records" not in sql for sql in queries)
+
+    def test_all_totals_in_one_query(self, db, monkeypatch):
+        """まとめた集計が1回のクエリで個別のメソッドと同じ結果を返すかのテスト"""
+        db.add_study_records_many(
+            [
+                StudyRecord(
+                    title=f"記録{i}",
+                    study_time=i * 25,
+                    category=["英語", "数学", "", None][i % 4],
+                    difficulty=i % 5 + 1,
+                    created_at=datetime(2025, 7, i % 3 + 1, 9),
+                )
+                for i in range(12)
+            ],
+            keep_timestamps=True,
+        )
+        queries = []
+        with db._connection() as conn:
+            conn.set_trace_callback(queries.append)
+            monkeypatch.setattr(db, "_read_connection", lambda: nullcontext(conn))
+            try:
+                all_totals = db.get_all_totals()
+            finally:
+                conn.set_trace_callback(None)
+
+        assert len(queries) == 1
+        assert all_totals == {
+            "totals": db.get_totals(),
+            "categories": db.get_category_totals(include_uncategorized=True),
+            "difficulties": db.get_difficulty_totals(),
+            "time_distribution": db.get_time_distribution(),
+            "daily": db.get_daily_totals(),
+        }
+
+    def test_totals_since_uses_partial_day(self, db):
+        """期間の集計が当日分を時刻で絞り込むかのテスト"""
+        db.add_study_records_many(
+            [
+                StudyRecord(
+                    title="前日", study_time=10, created_at=datetime(2025, 7, 1, 23)
+                ),
+                StudyRecord(
+                    title="朝", study_time=20, created_at=datetime(2025, 7, 2, 8)
+                ),
+                StudyRecord(
+                    title="夜", study_time=40, created_at=datetime(2025, 7, 2, 20)
+                ),
+                StudyRecord(
+                    title="翌日", study_time=80, created_at=datetime(2025, 7, 3, 9)
+                ),
+            ],
+            keep_timestamps=True,
+        )
+
+        assert db.get_totals_since(datetime(2025, 7, 2, 12)) == {
+            "count": 2,
+            "total_time": 120,
+        }
+        assert db.get_totals_since(datetime(2025, 7, 4)) == {
+            "count": 0,
+            "total_time": 0,
+        }
+
+    def test_percentiles_follow_writes(self, db):
+        """追加・更新・削除の後も分位点が全記録を並べ替えた値と一致するかのテスト"""
+        numpy = pytest.importorskip("numpy")
+        rng = random.Random(1)
+        categories = ["英語", "数学", None]
+        db.add_study_records_many(
+            [
+                StudyRecord(
+                    title=f"記録{i}",
+                    study_time=rng.randint(0, 300),
+                    category=rng.choice(categories),
+                    created_at=datetime(2025, 7, rng.randint(1, 5), 12),
+                )
+                for i in range(80)
+            ],
+            keep_timestamps=True,
+        )
+        for _ in range(40):
+            record_id = rng.randint(1, 80)
+            if rng.random() < 0.3:
+                db.delete_study_record(record_id)
+            else:
+                db.update_study_record(
+                    record_id,
+                    category=rng.choice(categories),
+                    study_time=rng.randint(0, 300),
+                )
+
+        percents = (0, 10, 25, 50, 90, 99, 100)
+
+        def expected(records):
+            values = numpy.percentile([r.study_time for r in records], percents)
+            return {
+                "count": len(records),
+                "percentiles": {
+                    percent: round(float(value), 2)
+                    for percent, value in zip(percents, values)
+                },
+            }
+
+        records = db.get_all_study_records()
+        assert db.get_study_time_percentiles(percents) == expected(records)
+        assert db.get_study_time_percentiles(percents, category="数学") == expected(
+            [r for r in records if r.category == "数学"]
+        )
+        assert db.get_study_time_percentiles(
+            percents, start=date(2025, 7, 2), end=date(2025, 7, 3)
+        ) == expected([r for r in records if 2 <= r.created_at.day <= 3])
+        assert set(db.check_rollups().values()) == {0}
+
+    def test_percentiles_arguments(self, db):
+        """記録がない場合・不正な引数の場合の分位点のテスト"""
+        assert db.get_study_time_percentiles() == {
+            "count": 0,
+            "percentiles": {50: None, 90: None, 99: None},
+        }
+        with pytest.raises(ValueError):
+            db.get_study_time_percentiles([101])
+        with pytest.raises(ValueError):
+            db.get_study_time_percentiles(category="英語", start=date(2025, 7, 1))
+
+    def test_streaks_follow_writes(self, db):
+        """追加・削除・日付の変更の後も連続学習の期間と学習習慣の統計が一致するかのテスト"""
+        rng = random.Random(2)
+
+        def random_day():
+            return datetime(2025, 7, 1, 12) + timedelta(days=rng.randint(0, 20))
+
+        db.add_study_records_many(
+            [
+                StudyRecord(
+                    title=f"記録{i}",
+                    study_time=rng.randint(0, 120),
+                    created_at=random_day(),
+                )
+                for i in range(15)
+            ],
+            keep_timestamps=True,
+        )
+        today = date(2025, 7, 15)
+        for step in range(60):
+            operation = rng.random()
+            if operation < 0.3:
+                db.add_study_records_many(
+                    [StudyRecord(title="追加", study_time=30, created_at=random_day())],
+                    keep_timestamps=True,
+                )
+            elif operation < 0.6:
+                db.delete_study_record(rng.randint(1, 15 + step))
+            else:
+                with db._connection() as conn:
+                    conn.execute(
+                        "UPDATE study_records SET created_at = ? WHERE id = ?",
+                        (random_day(), rng.randint(1, 15 + step)),
+                    )
+
+            assert set(db.check_rollups().values()) == {0}
+            assert db.get_habit_stats(today, (3, 7)) == habit_stats_from_daily(
+                db.get_daily_totals(), today, (3, 7)
+            )
+
+    def test_habit_stats(self, db):
+        """現在・最長の連続学習日数と移動平均のテスト"""
+        db.add_study_records_many(
+            [
+                StudyRecord(
+                    title=f"記録{day}",
+                    study_time=day * 10,
+                    created_at=datetime(2025, 7, day, 9),
+                )
+                for day in (1, 2, 3, 5, 6, 7, 10)
+            ],
+            keep_timestamps=True,
+        )
+
+        stats = db.get_habit_stats(date(2025, 7, 8), windows=[7])
+        assert stats == {
+            "today": "2025-07-08",
+            "current_streak": 3,
+            "current_streak_start": "2025-07-05",
+            # 同じ長さの期間は新しいほう
+            "longest_streak": 3,
+            "longest_streak_start": "2025-07-05",
+            "longest_streak_end": "2025-07-07",
+            "moving_averages": [
+                {"window": 7, "total_time": 230, "average_time": 32.86, "study_days": 5}
+            ],
+        }
+        # 2日空くと現在の連続学習は途切れる
+        assert db.get_habit_stats(date(2025, 7, 9))["current_streak"] == 0
+        # 基準の日より後の記録は数えない
+        assert db.get_habit_stats(date(2025, 7, 6))["current_streak"] == 2
+
+        db.add_study_record(StudyRecord(title="記録4", study_time=40))
+        with db._connection() as conn:
+            conn.execute(
+                "UPDATE study_records SET created_at = '2025-07-04 09:00:00' "
+                "WHERE title = '記録4'"
+            )
+        stats = db.get_habit_stats(date(2025, 7, 10))
+        assert (stats["current_streak"], stats["current_streak_start"]) == (
+            1,
+            "2025-07-10",
+        )
+        assert stats["longest_streak"] == 7
+
+    def test_habit_stats_arguments(self, db):
+        """記録がない場合・不正な期間の場合の学習習慣の統計のテスト"""
+        stats = db.get_habit_stats(date(2025, 7, 1), windows=[1])
+        assert stats["current_streak"] == stats["longest_streak"] == 0
+        assert stats["longest_streak_start"] is None
+        assert stats["moving_averages"] == [
+            {"window": 1, "total_time": 0, "average_time": 0.0, "study_days": 0}
+        ]
+        with pytest.raises(ValueError):
+            db.get_habit_stats(windows=[0])
+
+    def test_rebuild_repairs_drift(self, db):
+        """トリガーを経由しない変更でずれたロールアップを作り直せるかのテスト"""
+        db.add_study_record(StudyRecord(title="記録", study_time=30, category="英語"))
+        with db._connection() as conn:
+            conn.execute("DELETE FROM study_rollup_daily")
+
+        assert db.check_rollups()["study_rollup_daily"] == 1
+        assert db.rebuild_rollups() == {
+            "study_rollup_daily": 1,
+            "study_rollup_category": 1,
+            "study_rollup_difficulty": 1,
+            "study_time_histogram_daily": 1,
+            "study_time_histogram_category": 1,
+            "study_streaks": 1,
+        }
+        assert set(db.check_rollups().values()) == {0}
+        assert db.get_totals()["total_time"] == 30
+
+    def test_replica_rollups_follow_writes(self, tmp_path):
+        """レプリカのロールアップも書き込みに合わせて更新されるかのテスト"""
+        with DatabaseManager(str(tmp_path / "replica.db"), read_replica=True) as db:
+            record_id = db.add_study_record(
+                StudyRecord(title="記録", study_time=30, category="英語")
+            )
+            db.update_study_record(record_id, category="数学", study_time=45)
+
+            assert db.get_category_totals() == [
+                {
+                    "category": "数学",
+                    "count": 1,
+                    "total_time": 45,
+                    "difficulty_sum": 1,
+                }
+            ]
+            with db.read_replica.read() as conn:
+                assert set(check_rollups(conn).values()) == {0}
+
+
+class TestTimelineTotals:
+    """区間ごとの時系列統計のテストクラス"""
+
+    @pytest.fixture
+    def timeline_db(self, db):
+        """月・週・タイムゾーンの境界付近の記録を投入したデータベース（UTC）"""
+        db.add_study_records_many(
+            [
+                StudyRecord(
+                    title=f"記録{i}", study_time=study_time, created_at=created_at
+                )
+                for i, (study_time, created_at) in enumerate(
+                    [
+                        (10, datetime(2025, 1, 31, 20, 0)),
+                        (20, datetime(2025, 3, 2, 1, 0)),
+                        (30, datetime(2025, 3, 2, 16, 0)),
+                        (40, datetime(2025, 3, 9, 6, 30)),
+                    ]
+                )
+            ],
+            keep_timestamps=True,
+        )
+        return db
+
+    def test_zero_filled_months(self, timeline_db):
+        """記録のない月も0として返るかのテスト"""
+        assert timeline_db.get_timeline_totals("month") == [
+            {"date": "2025-01", "count": 1, "total_time": 10},
+            {"date": "2025-02", "count": 0, "total_time": 0},
+            {"date": "2025-03", "count": 3, "total_time": 90},
+        ]
+
+    def test_weeks_in_range(self, timeline_db):
+        """週（月曜日始まり）の区間が from/to を含む範囲だけ返るかのテスト"""
+        assert timeline_db.get_timeline_totals(
+            "week", start=date(2025, 2, 26), end=date(2025, 3, 4)
+        ) == [
+            {"date": "2025-02-24", "count": 2, "total_time": 50},
+            {"date": "2025-03-03", "count": 1, "total_time": 40},
+        ]
+
+    def test_time_zone(self, timeline_db):
+        """タイムゾーンの日付で区切られるかのテスト"""
+        # 2025-01-31 20:00 UTC は東京では2月1日
+        assert timeline_db.get_timeline_totals("month", tz="Asia/Tokyo") == [
+            {"date": "2025-02", "count": 1, "total_time": 10},
+            {"date": "2025-03", "count": 3, "total_time": 90},
+        ]
+        assert timeline_db.get_timeline_totals(
+            "day", tz="-05:00", start=date(2025, 3, 1), end=date(2025, 3, 2)
+        ) == [
+            {"date": "2025-03-01", "count": 1, "total_time": 20},
+            {"date": "2025-03-02", "count": 1, "total_time": 30},
+        ]
+        # 夏時間の始まり（2025-03-09 02:00 EST -> 03:00 EDT）をまたいでも日付で区切る
+        assert timeline_db.get_timeline_totals(
+            "day",
+            tz="America/New_York",
+            start=date(2025, 3, 8),
+            end=date(2025, 3, 9),
+        ) == [
+            {"date": "2025-03-08", "count": 0, "total_time": 0},
+            {"date": "2025-03-09", "count": 1, "total_time": 40},
+        ]
+
+    def test_reads_only_range(self, timeline_db, monkeypatch):
+        """UTCではロールアップ、その他は範囲内の記録だけを読むかのテスト"""
+        queries = []
+        with timeline_db._connection() as conn:
+            conn.set_trace_callback(queries.append)
+            monkeypatch.setattr(
+                timeline_db, "_read_connection", lambda: nullcontext(conn)
+            )
+            try:
+                timeline_db.get_timeline_totals(
+                    "month", start=date(2025, 1, 1), end=date(2025, 12, 31)
+                )
+                utc_queries = list(queries)
+                queries.clear()
+                timeline_db.get_timeline_totals(
+                    "month",
+                    tz="Asia/Tokyo",
+                    start=date(2025, 1, 1),
+                    end=date(2025, 12, 31),
+                )
+                plan = conn.execute("EXPLAIN QUERY PLAN " + queries[-1], ()).fetchall()
+            finally:
+                conn.set_trace_callback(None)
+
+        assert len(utc_queries) == 1
+        assert "study_records" not in utc_queries[0]
+        assert any("idx_study_records_created_at" in row[-1] for row in plan), plan
+
+    def test_empty_database(self, db):
+        """記録がない場合のテスト"""
+        assert db.get_timeline_totals("month") == []
+        assert db.get_timeline_totals("month", start=date(2025, 1, 15)) == [
+            {"date": "2025-01", "count": 0, "total_time": 0}
+        ]
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {"bucket": "year"},
+            {"tz": "Mars/Olympus"},
+            {"tz": "+25:00"},
+            {"start": date(2025, 2, 1), "end": date(2025, 1, 1)},
+            {"start": date(2000, 1, 1), "end": date(2025, 1, 1)},
+        ],
+    )
+    def test_invalid_arguments(self, timeline_db, kwargs):
+        """不正な区間・タイムゾーン・範囲を拒否するかのテスト"""
+        with pytest.raises(ValueError):
+            timeline_db.get_timeline_totals(**kwargs)
+
+
+class TestFullTextSearch:
+    """全文検索のテストクラス"""
+
+    @pytest.fixture
+    def search_db(self, db):
+        """検索用の記録を登録したデータベース"""
+        db.add_study_records_many(
+            [
+                StudyRecord(title="Python学習", content="FastAPIの基礎を学習した"),
+                StudyRecord(title="英語の勉強", content="TOEIC対策の単語帳"),
+                StudyRecord(title="SQL入門", content="python から sqlite3 を使う"),
+                StudyRecord(title="データベース設計", content=None),
+            ]
+        )
+        return db
+
+    def test_japanese_without_spaces(self, search_db):
+        """空白で区切られない日本語を部分一致で検索できるかのテスト"""
+        results = search_db.search("基礎を学")
+
+        assert [r["record"].title for r in results] == ["Python学習"]
+        assert "【基礎を学】" in results[0]["content_snippet"]
+
+    def test_highlight_and_case_insensitive(self, search_db):
+        """大文字小文字を区別せず、一致箇所が強調されるかのテスト"""
+        results = search_db.search("PYTHON")
+
+        titles = {r["record"].title: r for r in results}
+        assert set(titles) == {"Python学習", "SQL入門"}
+        assert titles["Python学習"]["title_highlight"] == "【Python】学習"
+
+    def test_case_sensitive(self, search_db):
+        """大文字小文字を区別した検索のテスト"""
+        results = search_db.search("python", case_sensitive=True)
+
+        assert [r["record"].title for r in results] == ["SQL入門"]
+
+    def test_fields(self, search_db):
+        """検索対象の列を限定できるかのテスト"""
+        assert search_db.search("Python", fields=["content"])[0]["record"].title == (
+            "SQL入門"
+        )
+        with pytest.raises(ValueError):
+            search_db.search("Python", fields=["category"])
+
+    def test_short_query_falls_back_to_scan(self, search_db):
+        """3文字未満の語でも検索できるかのテスト"""
+        results = search_db.search("英語")
+
+        assert [r["record"].title for r in results] == ["英語の勉強"]
+        assert results[0]["title_highlight"] == "【英語】の勉強"
+
+    def test_short_query_escapes_wildcards(self, search_db):
+        """LIKEのワイルドカードがそのまま検索されるかのテスト"""
+        assert search_db.search("%") == []
+
+    def test_index_follows_updates_and_deletes(self, search_db):
+        """更新・削除が検索索引に反映されるかのテスト"""
+        record = search_db.search("データベース設計")[0]["record"]
+
+        search_db.update_study_record(record.id, title="テーブル設計")
+        assert search_db.search("データベース設計") == []
+        assert search_db.search("テーブル設計")[0]["record"].id == record.id
+
+        search_db.delete_study_record(record.id)
+        assert search_db.search("テーブル設計") == []
+
+    def test_existing_records_are_indexed_on_upgrade(self, tmp_path):
+        """全文検索導入前の記録が移行時に索引へ取り込まれるかのテスト"""
+        db_path = str(tmp_path / "legacy.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(MIGRATIONS[0][2][0])
+        conn.execute("INSERT INTO study_records (title) VALUES ('既存の学習記録')")
+        conn.commit()
+        conn.close()
+
+        with DatabaseManager(db_path) as manager:
+            assert len(manager.search("学習記録")) == 1
+
+
+class TestRecordFilter:
+    """検索条件（SQLへの絞り込み）のテストクラス"""
+
+    @pytest.fixture
+    def filter_db(self, db):
+        """絞り込み用の記録を登録したデータベース"""
+        samples = [
+            ("Python基礎", "プログラミング", 30, 2, datetime(2025, 7, 1)),
+            ("Python応用", "プログラミング", 120, 4, datetime(2025, 7, 20)),
+            ("SQL入門", "データベース", 45, 2, datetime(2025, 7, 25)),
+            ("100%理解", "データベース", 90, 3, datetime(2025, 7, 30)),
+        ]
+        records = []
+        for title, category, study_time, difficulty, created_at in samples:
+            record = StudyRecord(
+                title=title,
+                category=category,
+                study_time=study_time,
+                difficulty=difficulty,
+            )
+            record.created_at = record.updated_at = created_at
+            records.append(record)
+        db.add_study_records_many(records, keep_timestamps=True)
+        return db
+
+    def titles(self, db, record_filter):
+        return [r.title for r in db.find_study_records(record_filter)]
+
+    def test_no_conditions(self, filter_db):
+        """条件なしで全件が新しい順に返るかのテスト"""
+        assert self.titles(filter_db, RecordFilter()) == [
+            "100%理解",
+            "SQL入門",
+            "Python応用",
+            "Python基礎",
+        ]
+
+    def test_combined_conditions(self, filter_db):
+        """複数条件がANDで組み合わされるかのテスト"""
+        record_filter = RecordFilter(category="プログラミング", min_time=60)
+        assert self.titles(filter_db, record_filter) == ["Python応用"]
+        assert filter_db.count_study_records(record_filter) == 1
+
+    def test_keyword_wildcards_are_literal(self, filter_db):
+        """キーワード中の%がワイルドカードとして扱われないかのテスト"""
+        assert self.titles(filter_db, RecordFilter(keyword="0%")) == ["100%理解"]
+        assert self.titles(filter_db, RecordFilter(keyword="%")) == ["100%理解"]
+
+    def test_days(self, filter_db):
+        """期間条件が基準時刻から計算されるかのテスト"""
+        where, params = RecordFilter(days=7).where_clause(now=datetime(2025, 7, 31))
+        assert where == "WHERE created_at >= ?"
+        assert params == ["2025-07-24 00:00:00"]
+
+    def test_limit_and_offset(self, filter_db):
+        """件数制限とオフセットのテスト"""
+        record_filter = RecordFilter(difficulty=2, limit=1)
+        assert self.titles(filter_db, record_filter) == ["SQL入門"]
+        assert self.titles(filter_db, record_filter.replace(offset=1)) == ["Python基礎"]
+        assert self.titles(filter_db, RecordFilter(offset=3)) == ["Python基礎"]
+        # 件数は limit/offset の影響を受けない
+        assert filter_db.count_study_records(record_filter) == 2
+
+    def test_page_with_filter(self, filter_db):
+        """ページ取得に検索条件を渡せるかのテスト"""
+        records, total = filter_db.get_study_records_page(
+            limit=1, offset=0, record_filter=RecordFilter(category="データベース")
+        )
+        assert [r.title for r in records] == ["100%理解"]
+        assert total == 2
+
+    def test_replace_rejects_unknown_condition(self):
+        """存在しない条件を指定した場合のテスト"""
+        with pytest.raises(AttributeError):
+            RecordFilter().replace(tag="python")
+
+    def test_exact_category_uses_index(self, filter_db):
+        """カテゴリの完全一致がインデックスを使うかのテスト"""
+        where, params = RecordFilter(category="データベース").where_clause()
+        with filter_db._connection() as conn:
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM study_records "
+                f"{where} ORDER BY created_at DESC, id DESC",
+                params,
+            ).fetchall()
+
+        assert "idx_study_records_category_created_at" in plan[0][3]
+
+
+class TestBackup:
+    """バックアップ・復元のテストクラス"""
+
+    @pytest.mark.parametrize("filename", ["backup.db", "backup.db.gz"])
+    def test_backup_and_restore(self, db, tmp_path, filename):
+        """バックアップから元の内容が復元されるかのテスト"""
+        for i in range(3):
+            db.add_study_record(StudyRecord(title=f"Python学習{i}", study_time=30))
+        dest = tmp_path / "backups" / filename
+
+        result = db.backup(str(dest), pages_per_step=1)
+
+        assert result["path"] == str(dest)
+        assert result["compressed"] is filename.endswith(".gz")
+        assert result["pages"] > 1
+        assert result["size"] == dest.stat().st_size
+        assert [p.name for p in dest.parent.iterdir()] == [filename]
+
+        db.delete_study_record(1)
+        db.add_study_record(StudyRecord(title="バックアップ後"))
+        db.restore(str(dest))
+
+        assert [r.title for r in db.get_all_study_records()] == [
+            "Python学習2",
+            "Python学習1",
+            "Python学習0",
+        ]
+        assert len(db.search("Python学習")) == 3
+
+    def test_database_is_writable_during_backup(self, db, tmp_path):
+        """バックアップのステップの合間に他のコネクションから書き込めるかのテスト"""
+        db.add_study_records_many(
+            [StudyRecord(title=f"記録{i}", content="x" * 500) for i in range(200)]
+        )
+        writer = sqlite3.connect(db.db_path, timeout=0)
+        written = []
+
+        def progress(status, remaining, total):
+            if not written:
+                with writer:
+                    writer.execute("INSERT INTO study_records (title) VALUES ('途中')")
+                written.append(remaining)
+
+        try:
+            with db._connection() as conn:
+                backup_connection(
+                    conn, tmp_path / "live.db", pages_per_step=5, progress=progress
+                )
+        finally:
+            writer.close()
+
+        assert written and written[0] > 0
+        backup = sqlite3.connect(str(tmp_path / "live.db"))
+        count = backup.execute("SELECT COUNT(*) FROM study_records").fetchone()[0]
+        backup.close()
+        # 書き込みを検知してコピーがやり直されるため、途中の書き込みも含まれる
+        assert count == 201
+
+    def test_restore_rejects_corrupt_file(self, db, tmp_path):
+        """壊れたファイルからは復元しないかのテスト"""
+        db.add_study_record(StudyRecord(title="現在の記録"))
+        corrupt = tmp_path / "corrupt.db"
+        corrupt.write_bytes(b"not a database" * 100)
+
+        with pytest.raises(BackupError):
+            db.restore(str(corrupt))
+        with pytest.raises(FileNotFoundError):
+            db.restore(str(tmp_path / "missing.db"))
+
+        assert [r.title for r in db.get_all_study_records()] == ["現在の記録"]
+
+    def test_rotate_backups(self, tmp_path):
+        """新しいバックアップだけが残るかのテスト"""
+        for day in range(1, 6):
+            path = default_backup_path(
+                tmp_path, compress=day % 2 == 0, now=datetime(2025, 8, day)
+            )
+            path.write_bytes(b"")
+        (tmp_path / "other.db").write_bytes(b"")
+
+        removed = rotate_backups(tmp_path, keep=2)
+
+        assert len(removed) == 3
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "other.db",
+            "study_tracker_20250804_000000.db.gz",
+            "study_tracker_20250805_000000.db",
+        ]
+
+    def test_invalid_pages_per_step(self, db, tmp_path):
+        """pages_per_step が不正な場合のテスト"""
+        with pytest.raises(ValueError):
+            db.backup(str(tmp_path / "backup.db"), pages_per_step=0)
+
+
+class TestReadReplica:
+    """インメモリ読み込みレプリカのテストクラス"""
+
+    @pytest.fixture
+    def replica_db(self, tmp_path):
+        """レプリカを有効にしたデータベース"""
+        manager = DatabaseManager(str(tmp_path / "replica.db"), read_replica=True)
+        yield manager
+        manager.close()
+
+    def test_reads_are_served_from_memory(self, replica_db):
+        """一覧・集計がメモリ上のDBで処理されるかのテスト"""
+        with replica_db._read_connection() as conn:
+            databases = conn.execute("PRAGMA database_list").fetchall()
+        assert databases[0][2] == ""
+
+    def test_read_your_writes(self, replica_db):
+        """書き込んだ内容が直後の読み込みから見えるかのテスト"""
+        record_id = replica_db.add_study_record(
+            StudyRecord(title="Python学習", study_time=30, category="プログラミング")
+        )
+        assert replica_db.get_study_record(record_id).title == "Python学習"
+        assert replica_db.get_totals()["total_time"] == 30
+
+        replica_db.update_study_record(record_id, title="SQL学習", study_time=45)
+        assert [hit["record"].title for hit in replica_db.search("SQL学習")] == [
+            "SQL学習"
+        ]
+        assert replica_db.search("Python学習") == []
+        assert replica_db.get_totals()["total_time"] == 45
+
+        replica_db.delete_study_record(record_id)
+        assert replica_db.get_study_record(record_id) is None
+        assert replica_db.count_study_records() == 0
+        assert replica_db.get_replica_metrics() == {"reloads": 0, "synced_records": 3}
+
+    def test_matches_disk(self, replica_db):
+        """レプリカの一覧・集計がディスク上のDBと一致するかのテスト"""
+        replica_db.add_study_records_many(
+            [
+                StudyRecord(
+                    title=f"記録{i}",
+                    study_time=i * 10,
+                    category=["A", "B", None][i % 3],
+                    difficulty=i % 5 + 1,
+                )
+                for i in range(30)
+            ]
+        )
+        replica_db.delete_study_record(3)
+        replica_db.update_study_record(5, category="C")
+
+        with DatabaseManager(replica_db.db_path, read_replica=False) as disk_db:
+            for method in (
+                "get_all_study_records",
+                "get_totals",
+                "get_category_totals",
+                "get_difficulty_totals",
+                "get_time_distribution",
+            ):
+                replica_result = getattr(replica_db, method)()
+                disk_result = getattr(disk_db, method)()
+                if method == "get_all_study_records":
+                    replica_result = [
+                        (r.id, r.title, r.category, r.created_at)
+                        for r in replica_result
+                    ]
+                    disk_result = [
+                        (r.id, r.title, r.category, r.created_at) for r in disk_result
+                    ]
+                assert replica_result == disk_result, method
+
+    def test_external_writes_are_detected(self, replica_db):
+        """他のコネクションの書き込みを検知して読み込み直すかのテスト"""
+        replica_db.add_study_record(StudyRecord(title="レプリカから"))
+
+        with DatabaseManager(replica_db.db_path, read_replica=False) as other:
+            other.add_study_record(StudyRecord(title="別プロセスから"))
+
+        assert [r.title for r in replica_db.get_all_study_records()] == [
+            "別プロセスから",
+            "レプリカから",
+        ]
+        assert replica_db.get_replica_metrics()["reloads"] == 1
+
+    def test_reads_run_concurrently(self, replica_db):
+        """読み込み中でも他のスレッドの読み込みが待たされないかのテスト"""
+        replica_db.add_study_record(StudyRecord(title="並行読み込み"))
+        results = []
+
+        with replica_db.read_replica.read() as conn:
+            reader = threading.Thread(
+                target=lambda: results.append(replica_db.count_study_records())
+            )
+            reader.start()
+            reader.join(5)
+            assert not reader.is_alive()
+            assert conn.execute("SELECT COUNT(*) FROM study_records").fetchone()[0] == 1
+        assert results == [1]
+
+    def test_reads_continue_during_write(self, replica_db):
+        """ディスクへの書き込み中も読み込みが待たされないかのテスト"""
+        replica_db.add_study_record(StudyRecord(title="既存の記録"))
+        results = []
+
+        with replica_db.read_replica.write() as conn:
+            conn.execute("INSERT INTO study_records (title) VALUES ('書き込み中')")
+            reader = threading.Thread(
+                target=lambda: results.append(replica_db.count_study_records())
+            )
+            reader.start()
+            reader.join(5)
+            assert not reader.is_alive()
+
+        # コミット前の内容は見えず、コミット後は直後の読み込みから見える
+        assert results == [1]
+        assert replica_db.count_study_records() == 2
+
+    def test_closed_replica_rejects_reads(self, tmp_path):
+        """クローズ後の読み込みがエラーになるかのテスト"""
+        manager = DatabaseManager(str(tmp_path / "closed.db"), read_replica=True)
+        replica = manager.read_replica
+        manager.close()
+        with pytest.raises(RuntimeError):
+            with replica.read():
+                pass
+
+    def test_failed_write_is_not_applied(self, replica_db):
+        """ロールバックされた書き込みがレプリカに反映されないかのテスト"""
+        with pytest.raises(sqlite3.IntegrityError):
+            replica_db.add_study_records_many(
+                [StudyRecord(title="成功"), StudyRecord(title=None)]
+            )
+
+        assert replica_db.count_study_records() == 0
+        replica_db.add_study_record(StudyRecord(title="次の書き込み"))
+        assert [r.title for r in replica_db.get_all_study_records()] == ["次の書き込み"]
+        assert replica_db.get_replica_metrics()["synced_records"] == 1
+
+    def test_with_write_coordinator(self, tmp_path):
+        """ライターと組み合わせた場合も同時の書き込みが反映されるかのテスト"""
+        manager = DatabaseManager(
+            str(tmp_path / "both.db"), read_replica=True, write_coordinator=True
+        )
+
+        def add(i):
+            manager.add_study_record(StudyRecord(title=f"記録{i}", study_time=1))
+
+        try:
+            threads = [threading.Thread(target=add, args=(i,)) for i in range(20)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert manager.get_totals()["count"] == 20
+            assert manager.get_replica_metrics()["reloads"] == 0
+        finally:
+            manager.close()
+
+    def test_restore_reloads_replica(self, replica_db, tmp_path):
+        """復元後にレプリカが読み込み直されるかのテスト"""
+        replica_db.add_study_record(StudyRecord(title="バックアップ前"))
+        replica_db.backup(str(tmp_path / "backup.db"))
+        replica_db.add_study_record(StudyRecord(title="バックアップ後"))
+
+        replica_db.restore(str(tmp_path / "backup.db"))
+
+        assert [r.title for r in replica_db.get_all_study_records()] == [
+            "バックアップ前"
+        ]
+
+    def test_disabled_by_default_and_in_memory(self, tmp_path, monkeypatch):
+        """既定ではレプリカが無効で、インメモリDBでは常に無効かのテスト"""
+        monkeypatch.delenv("STUDY_TRACKER_READ_REPLICA", raising=False)
+        with DatabaseManager(str(tmp_path / "default.db")) as manager:
+            assert manager.read_replica is None
+            assert manager.get_replica_metrics() is None
+        with DatabaseManager(":memory:", read_replica=True) as manager:
+            assert manager.read_replica is None
+
+
+class TestWriteCoordinator:
+    """書き込みのグループコミットのテストクラス"""
+
+    @pytest.fixture
+    def writer_db(self, tmp_path):
+        """ライターを有効にしたデータベース"""
+        manager = DatabaseManager(
+            str(tmp_path / "writer.db"), write_coordinator=True, write_latency=0.05
+        )
+        yield manager
+        manager.close()
+
+    def test_concurrent_writes_are_grouped(self, writer_db):
+        """同時の書き込みが1トランザクションにまとめられるかのテスト"""
+        barrier = threading.Barrier(10)
+        record_ids = []
+
+        def add(i):
+            barrier.wait(timeout=5)
+            record_ids.append(writer_db.add_study_record(StudyRecord(title=f"記録{i}")))
+
+        threads = [threading.Thread(target=add, args=(i,)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(record_ids) == list(range(1, 11))
+        assert writer_db.count_study_records() == 10
+        metrics = writer_db.get_write_metrics()
+        assert metrics["writes"] == 10
+        assert metrics["batches"] < 10
+        assert metrics["max_batch_size"] > 1
+        assert metrics["queue_depth"] == 0
+
+    def test_update_and_delete(self, writer_db):
+        """ライター経由の更新・削除の結果が返るかのテスト"""
+        record_id = writer_db.add_study_record(StudyRecord(title="更新前"))
+
+        assert writer_db.update_study_record(record_id, title="更新後") is True
+        assert writer_db.get_study_record(record_id).title == "更新後"
+        assert writer_db.update_study_record(record_id) is False
+        assert writer_db.delete_study_record(record_id) is True
+        assert writer_db.delete_study_record(record_id) is False
+
+    def test_failed_write_does_not_affect_batch(self, db):
+        """失敗した書き込みだけが取り消されるかのテスト"""
+        writer = WriteCoordinator(db._connection, max_latency=0.05)
+
+        def insert(conn, title):
+            return conn.execute(
+                "INSERT INTO study_records (title) VALUES (?)", (title,)
+            ).lastrowid
+
+        try:
+            futures = [
+                writer.submit(insert, "成功1"),
+                writer.submit(insert, None),
+                writer.submit(insert, "成功2"),
+            ]
+            assert futures[0].result(timeout=5) == 1
+            with pytest.raises(sqlite3.IntegrityError):
+                futures[1].result(timeout=5)
+            assert futures[2].result(timeout=5) == 2
+        finally:
+            writer.close()
+
+        assert [r.title for r in db.get_all_study_records()] == ["成功2", "成功1"]
+        assert writer.metrics()["batches"] == 1
+
+    def test_close_commits_pending_writes(self, db):
+        """停止時にキューに残った書き込みがコミットされるかのテスト"""
+        writer = WriteCoordinator(db._connection, max_latency=1.0)
+        future = writer.submit(
+            lambda conn: conn.execute(
+                "INSERT INTO study_records (title) VALUES ('停止前')"
+            ).lastrowid
+        )
+
+        writer.close()
+
+        assert future.result(timeout=5) == 1
+        with pytest.raises(RuntimeError):
+            writer.submit(lambda conn: None)
+
+    def test_async_writes_bypass_worker_threads(self, writer_db):
+        """非同期の書き込みがワーカー数を超えてまとめられるかのテスト"""
+        async_db = AsyncDatabaseManager(writer_db, max_workers=1)
+
+        async def scenario():
+            return await asyncio.gather(
+                *(
+                    async_db.add_study_record(StudyRecord(title=f"非同期{i}"))
+                    for i in range(20)
+                )
+            )
+
+        try:
+            record_ids = asyncio.run(scenario())
+        finally:
+            async_db.close()
+
+        assert sorted(record_ids) == list(range(1, 21))
+        assert writer_db.get_write_metrics()["max_batch_size"] > 1
+
+    def test_disabled_by_default(self, tmp_path, monkeypatch):
+        """ライターが既定では無効かのテスト"""
+        monkeypatch.delenv("STUDY_TRACKER_WRITE_COORDINATOR", raising=False)
+        with DatabaseManager(str(tmp_path / "default.db")) as manager:
+            assert manager.write_coordinator is None
+            assert manager.get_write_metrics() is None
+
+    def test_invalid_batch_size(self, db):
+        """max_batch_size が0以下の場合のテスト"""
+        with pytest.raises(ValueError):
+            WriteCoordinator(db._connection, max_batch_size=0)
+
+
+class TestAsyncDatabaseManager:
+    """非同期データベースマネージャーのテストクラス"""
+
+    def test_operations(self, db):
+        """ワーカースレッド経由の操作結果が同期呼び出しと一致するかのテスト"""
+        async_db = AsyncDatabaseManager(db, max_workers=2)
+
+        async def scenario():
+            record_id = await async_db.add_study_record(
+                StudyRecord(title="非同期", study_time=30)
+            )
+            record = await async_db.get_study_record(record_id)
+            totals = await async_db.get_totals()
+            return record, totals
+
+        try:
+            record, totals = asyncio.run(scenario())
+        finally:
+            async_db.close()
+
+        assert record.title == "非同期"
+        assert totals == db.get_totals()
+
+    def test_worker_threads_use_own_connections(self, db):
+        """各ワーカースレッドが専用のコネクションを使うかのテスト"""
+        async_db = AsyncDatabaseManager(db, max_workers=3)
+        barrier = threading.Barrier(3)
+
+        def connection_of_worker():
+            # 3スレッドが同時に実行中であることを保証する
+            barrier.wait(timeout=5)
+            with db._connection() as conn:
+                return threading.get_ident(), conn
+
+        async def scenario():
+            return await asyncio.gather(
+                *(async_db.run(connection_of_worker) for _ in range(3))
+            )
+
+        try:
+            results = asyncio.run(scenario())
+        finally:
+            async_db.close()
+
+        assert len({ident for ident, _ in results}) == 3
+        assert len({id(conn) for _, conn in results}) == 3
+        # スレッド専用のコネクションはプールから借りない
+        assert all(conn not in db._pool._connections for _, conn in results)
+
+    def test_close_closes_thread_connections(self, tmp_path):
+        """クローズ時にスレッド専用のコネクションも閉じられるかのテスト"""
+        manager = DatabaseManager(str(tmp_path / "close.db"))
+        async_db = AsyncDatabaseManager(manager, max_workers=1)
+        asyncio.run(async_db.get_totals())
+        conn = manager._thread_connections[0]
+
+        async_db.close()
+        manager.close()
+
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+    def test_in_memory_database(self):
+        """インメモリDBではプールのコネクションを共有するかのテスト"""
+        with DatabaseManager(":memory:") as manager:
+            async_db = AsyncDatabaseManager(manager, max_workers=2)
+            try:
+                record_id = asyncio.run(
+                    async_db.add_study_record(StudyRecord(title="メモリ"))
+                )
+                record = asyncio.run(async_db.get_study_record(record_id))
+            finally:
+                async_db.close()
+
+        assert record.title == "メモリ"
+
+    def test_invalid_max_workers(self, db):
+        """max_workers が0以下の場合のテスト"""
+        with pytest.raises(ValueError):
+            AsyncDatabaseManager(db, max_workers=0)
@@ -0,0 +1,917 @@
+"""
+パフォーマンスベンチマーク
+
+データベース層の処理時間を計測するベンチマークです。
+時間がかかるため slow マーカーを付けています。
+
+    pytest tests/test_performance.py -m slow -s
+"""
+
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.database.async_manager import AsyncDatabaseManager
+from src.database.connection import DatabaseManager
+from src.database.filters import RecordFilter
+from src.database.rollups import habit_stats_from_daily
+from src.models.record_batch import RecordBatch
+from src.models.study_record import StudyRecord
+
+SELECT_ONE = """
+    SELECT id, title, content, study_time, category, difficulty, created_at, updated_at
+    FROM study_records WHERE id = ?
+"""
+
+
+def seed_records(db_path: str, rows: int):
+    """ベンチマーク用の学習記録を高速に投入"""
+    categories = ["プログラミング", "データベース", "インフラ", "英語", None]
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO study_records (title, content, study_time, category, difficulty)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (
+                (
+                    f"学習記録 {i}",
+                    f"ベンチマーク用の内容 {i}",
+                    i % 240,
+                    categories[i % len(categories)],
+                    i % 5 + 1,
+                )
+                for i in range(rows)
+            ),
+        )
+    conn.close()
+
+
+def per_operation_ms(func, args_list) -> float:
+    """1操作あたりの平均処理時間（ミリ秒）"""
+    start = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1000
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("rows", [10_000, 100_000])
+def test_pooled_connection_latency(tmp_path, rows):
+    """コネクションプール導入前後の1操作あたりのレイテンシ比較"""
+    db_path = str(tmp_path / "bench.db")
+    with DatabaseManager(db_path) as db:
+        seed_records(db_path, rows)
+        ids = [(random.randint(1, rows),) for _ in range(1000)]
+
+        def connect_per_call(record_id):
+            # 導入前の実装と同じく、呼び出しごとに接続を開く
+            conn = sqlite3.connect(db_path)
+            try:
+                row = conn.execute(SELECT_ONE, (record_id,)).fetchone()
+                return db._row_to_study_record(row)
+            finally:
+                conn.close()
+
+        before = per_operation_ms(connect_per_call, ids)
+        after = per_operation_ms(db.get_study_record, ids)
+
+    print(
+        f"\n[get_study_record rows={rows}] "
+        f"接続毎: {before:.3f}ms/op, プール: {after:.3f}ms/op "
+        f"({before / after:.1f}x)"
+    )
+    assert after < before
+
+
+@pytest.mark.slow
+def test_bulk_insert_throughput(tmp_path):
+    """1件ずつの追加と一括追加の比較（10,000件）"""
+    rows = 10_000
+    records = [
+        StudyRecord(title=f"学習記録 {i}", study_time=i % 240, difficulty=i % 5 + 1)
+        for i in range(rows)
+    ]
+
+    with DatabaseManager(str(tmp_path / "single.db")) as db:
+        start = time.perf_counter()
+        for record in records:
+            db.add_study_record(record)
+        single = time.perf_counter() - start
+
+    with DatabaseManager(str(tmp_path / "bulk.db")) as db:
+        start = time.perf_counter()
+        record_ids = db.add_study_records_many(records)
+        bulk = time.perf_counter() - start
+
+    print(
+        f"\n[insert rows={rows}] 1件ずつ: {single:.2f}s, 一括: {bulk:.3f}s "
+        f"({single / bulk:.1f}x)"
+    )
+    assert len(record_ids) == rows
+    assert bulk < single
+
+
+@pytest.mark.slow
+def test_first_page_latency(tmp_path):
+    """全件取得してスライスする方式とSQLページングの比較（100,000件）"""
+    rows = 100_000
+    db_path = str(tmp_path / "page.db")
+    with DatabaseManager(db_path) as db:
+        seed_records(db_path, rows)
+
+        start = time.perf_counter()
+        expected = db.get_all_study_records()[:20]
+        sliced = time.perf_counter() - start
+
+        start = time.perf_counter()
+        records, total = db.get_study_records_page(limit=20)
+        paged = time.perf_counter() - start
+
+    print(
+        f"\n[page 1 rows={rows}] 全件スライス: {sliced * 1000:.1f}ms, "
+        f"LIMIT/OFFSET: {paged * 1000:.1f}ms ({sliced / paged:.0f}x)"
+    )
+    assert [r.id for r in records] == [r.id for r in expected]
+    assert total == rows
+    assert paged < sliced
+
+
+@pytest.mark.slow
+def test_aggregate_pushdown(tmp_path):
+    """全件読み込み＋Python集計とSQL集計の比較（100,000件）"""
+    rows = 100_000
+    db_path = str(tmp_path / "stats.db")
+    with DatabaseManager(db_path) as db:
+        seed_records(db_path, rows)
+
+        start = time.perf_counter()
+        categories = {}
+        for record in db.get_all_study_records():
+            if record.category:
+                stats = categories.setdefault(
+                    record.category, {"count": 0, "total_time": 0}
+                )
+                stats["count"] += 1
+                stats["total_time"] += record.study_time
+        in_python = time.perf_counter() - start
+
+        start = time.perf_counter()
+        totals = db.get_category_totals()
+        in_sql = time.perf_counter() - start
+
+    print(
+        f"\n[category stats rows={rows}] Python集計: {in_python * 1000:.0f}ms, "
+        f"SQL集計: {in_sql * 1000:.1f}ms ({in_python / in_sql:.0f}x)"
+    )
+    assert {t["category"]: t["count"] for t in totals} == {
+        category: stats["count"] for category, stats in categories.items()
+    }
+    assert in_sql < in_python
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("rows", [10_000, 100_000])
+def test_full_text_search_latency(tmp_path, rows):
+    """全件走査による検索と全文検索索引の比較"""
+    db_path = str(tmp_path / "search.db")
+    with DatabaseManager(db_path) as db:
+        seed_records(db_path, rows)
+        keyword = f"内容 {rows // 2}"
+
+        start = time.perf_counter()
+        scanned = [
+            r for r in db.get_all_study_records() if r.content and keyword in r.content
+        ]
+        scan = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = db.search(keyword, fields=["content"], limit=10)
+        indexed = time.perf_counter() - start
+
+    print(
+        f"\n[search rows={rows}] 全件走査: {scan * 1000:.0f}ms, "
+        f"FTS5: {indexed * 1000:.2f}ms ({scan / indexed:.0f}x)"
+    )
+    assert {r["record"].id for r in results} <= {r.id for r in scanned}
+    assert indexed < scan
+
+
+@pytest.mark.slow
+def test_streaming_iteration_memory(tmp_path):
+    """全件取得と逐次読み込みのピークメモリ比較（100,000件）"""
+    rows = 100_000
+    db_path = str(tmp_path / "stream.db")
+    with DatabaseManager(db_path) as db:
+        seed_records(db_path, rows)
+
+        tracemalloc.start()
+        total_time = sum(r.study_time for r in db.get_all_study_records())
+        _, materialized = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        streamed_time = sum(r.study_time for r in db.iter_study_records())
+        _, streamed = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(
+        f"\n[iterate rows={rows}] 全件取得: {materialized / 2**20:.1f}MiB, "
+        f"逐次読み込み: {streamed / 2**20:.2f}MiB ({materialized / streamed:.0f}x)"
+    )
+    assert streamed_time == total_time
+    assert streamed < materialized
+
+
+@pytest.mark.slow
+def test_row_decoding_throughput(tmp_path):
+    """行からStudyRecordへの変換速度（1秒あたりの行数、100,000件）"""
+    rows = 100_000
+    db_path = str(tmp_path / "decode.db")
+    with DatabaseManager(db_path) as db:
+        seed_records(db_path, rows)
+        conn = sqlite3.connect(db_path)
+        raw_rows = conn.execute(
+            """
+            SELECT id, title, content, study_time, category, difficulty, created_at, updated_at
+            FROM study_records
+            """
+        ).fetchall()
+        conn.close()
+
+        # 一括投入した記録は作成日時がほぼ同じになるため、実際のデータに近い
+        # 記録ごとに異なる日時に置き換える（5件に1件は更新済みの記録）
+        base = datetime(2025, 1, 1)
+        raw_rows = [
+            row[:6]
+            + (
+                str(base + timedelta(seconds=row[0] * 37)),
+                str(base + timedelta(seconds=row[0] * (37 if row[0] % 5 else 41))),
+            )
+            for row in raw_rows
+        ]
+
+        def legacy_decode(row):
+            # 導入前の実装と同じく、コンストラクタで時計を参照してから上書きする
+            record = StudyRecord(
+                id=row[0],
+                title=row[1],
+                content=row[2],
+                study_time=row[3],
+                category=row[4],
+                difficulty=row[5],
+            )
+            record.created_at = (
+                datetime.fromisoformat(row[6]) if row[6] else datetime.now()
+            )
+            record.updated_at = (
+                datetime.fromisoformat(row[7]) if row[7] else datetime.now()
+            )
+            return record
+
+        start = time.perf_counter()
+        before = [legacy_decode(row) for row in raw_rows]
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        after = [db._row_to_study_record(row) for row in raw_rows]
+        fast = time.perf_counter() - start
+
+    print(
+        f"\n[decode rows={rows}] 導入前: {rows / legacy:,.0f} rows/s, "
+        f"高速化後: {rows / fast:,.0f} rows/s ({legacy / fast:.1f}x)"
+    )
+    # 実行時間は環境によってばらつくため、速度は表示だけにして比較しない
+    assert [r.created_at for r in after] == [r.created_at for r in before]
+    assert [r.updated_at for r in after] == [r.updated_at for r in before]
+
+
+class DictStudyRecord:
+    """__slots__ 導入前と同じ、属性を辞書で保持する学習記録"""
+
+    def __init__(self, *values):
+        (
+            self.id,
+            self.title,
+            self.content,
+            self.study_time,
+            self.category,
+            self.difficulty,
+            self.created_at,
+            self.updated_at,
+        ) = values
+
+
+def traced_memory(build) -> int:
+    """build() の結果を保持するのに必要なメモリ量（バイト）"""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+@pytest.mark.slow
+def test_record_memory_footprint():
+    """記録ごとのオブジェクトと列指向コンテナのメモリ比較（1,000,000件）"""
+    rows = 1_000_000
+    base = datetime(2024, 1, 1)
+    categories = ["プログラミング", "データベース", "インフラ", "英語", None]
+    # 構造の違いだけを比べるため、タイトルと内容の文字列は共有する
+    title, content = "学習記録", "内容"
+
+    def values():
+        for i in range(rows):
+            created_at = base + timedelta(seconds=i)
+            yield (
+                i,
+                title,
+                content,
+                i % 240,
+                categories[i % len(categories)],
+                i % 5 + 1,
+                created_at,
+                created_at + timedelta(minutes=1),
+            )
+
+    def build_batch():
+        batch = RecordBatch()
+        for row in values():
+            batch.append_values(*row)
+        return batch
+
+    dict_backed = traced_memory(lambda: [DictStudyRecord(*row) for row in values()])
+    slotted = traced_memory(
+        lambda: [
+            StudyRecord(r[1], r[2], r[3], r[4], r[5], r[0], r[6], r[7])
+            for r in values()
+        ]
+    )
+    columnar = traced_memory(build_batch)
+
+    print(
+        f"\n[memory rows={rows}] 辞書: {dict_backed / 2**20:.0f}MiB, "
+        f"__slots__: {slotted / 2**20:.0f}MiB, "
+        f"RecordBatch: {columnar / 2**20:.0f}MiB "
+        f"({dict_backed / columnar:.1f}x)"
+    )
+    assert columnar < slotted < dict_backed
+
+
+class BlockingDatabase:
+    """導入前と同じく、イベントループ上で同期的にDBを呼び出すラッパー"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __getattr__(self, name):
+        method = getattr(self.db, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+@pytest.mark.slow
+def test_async_routes_concurrency(tmp_path, monkeypatch):
+    """
+    100件同時リクエスト時のCRUDのレイテンシ比較（統計10件＋詳細取得90件）
+
+    実行時間は環境で揺れるため結果の表示だけを行い、統計の実行中もCRUDが
+    応答することは tests/test_api.py の TestWorkerThreads で確認する。
+    """
+    httpx = pytest.importorskip("httpx")
+    from src.api import routes
+    from src.api.main import app
+
+    rows = 100_000
+    db_path = str(tmp_path / "async.db")
+    with DatabaseManager(db_path) as db:
+        seed_records(db_path, rows)
+        monkeypatch.setattr(routes, "db", db)
+        paths = [
+            (
+                "/api/v1/study-records/stats/summary"
+                if i % 10 == 0
+                else f"/api/v1/study-records/{random.randint(1, rows)}"
+            )
+            for i in range(100)
+        ]
+
+        async def timed_get(client, path, start):
+            # 全リクエストを同時に投げた時刻からの応答時間を計る
+            response = await client.get(path)
+            return path, response.status_code, time.perf_counter() - start
+
+        async def run_requests(facade):
+            monkeypatch.setattr(routes, "async_db", facade)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                start = time.perf_counter()
+                results = await asyncio.gather(
+                    *(timed_get(client, path, start) for path in paths)
+                )
+                return results, time.perf_counter() - start
+
+        def crud_p95(results):
+            latencies = sorted(
+                elapsed for path, _, elapsed in results if "stats" not in path
+            )
+            return latencies[int(len(latencies) * 0.95)]
+
+        blocking_results, blocking_total = asyncio.run(
+            run_requests(BlockingDatabase(db))
+        )
+        async_db = AsyncDatabaseManager(db)
+        try:
+            async_results, async_total = asyncio.run(run_requests(async_db))
+        finally:
+            async_db.close()
+
+    before, after = crud_p95(blocking_results), crud_p95(async_results)
+    print(
+        f"\n[100 in-flight rows={rows}] 同期呼び出し: 全体 {blocking_total * 1000:.0f}ms, "
+        f"CRUD p95 {before * 1000:.0f}ms / ワーカースレッド: 全体 "
+        f"{async_total * 1000:.0f}ms, CRUD p95 {after * 1000:.0f}ms "
+        f"({before / after:.1f}x)"
+    )
+    assert all(status == 200 for _, status, _ in blocking_results + async_results)
+
+
+@pytest.mark.slow
+def test_sqlalchemy_backend_overhead(tmp_path):
+    """sqlite3 版と SQLAlchemy Core 版の比較（100,000件）"""
+    pytest.importorskip("sqlalchemy")
+    from src.database.sqlalchemy_backend import SQLAlchemyDatabaseManager
+
+    rows = 100_000
+    db_path = str(tmp_path / "backend.db")
+    records = [
+        StudyRecord(title=f"学習記録 {i}", study_time=i % 240, difficulty=i % 5 + 1)
+        for i in range(10_000)
+    ]
+    ids = [(random.randint(1, rows),) for _ in range(1000)]
+
+    results = {}
+    with DatabaseManager(db_path) as raw_db:
+        seed_records(db_path, rows)
+        with SQLAlchemyDatabaseManager(f"sqlite:///{db_path}") as sa_db:
+            for name, db in (("sqlite3", raw_db), ("SQLAlchemy", sa_db)):
+                get_ms = per_operation_ms(db.get_study_record, ids)
+                page_ms = per_operation_ms(
+                    db.get_study_records_page, [(20, offset) for offset in range(50)]
+                )
+                start = time.perf_counter()
+                db.add_study_records_many(records)
+                insert_s = time.perf_counter() - start
+                results[name] = (get_ms, page_ms, insert_s)
+
+            assert [r.id for r in sa_db.get_study_records_page(20)[0]] == [
+                r.id for r in raw_db.get_study_records_page(20)[0]
+            ]
+        assert raw_db.count_study_records() == rows + 2 * len(records)
+
+    for name, (get_ms, page_ms, insert_s) in results.items():
+        print(
+            f"\n[{name} rows={rows}] 1件取得: {get_ms:.3f}ms/op, "
+            f"ページ取得: {page_ms:.2f}ms/op, 一括追加10,000件: {insert_s:.3f}s"
+        )
+
+
+@pytest.mark.slow
+def test_group_commit_throughput(tmp_path):
+    """同時書き込み時の個別コミットとグループコミットの比較（8スレッド×250件）"""
+    threads, per_thread = 8, 250
+
+    def run_writers(db) -> float:
+        barrier = threading.Barrier(threads)
+
+        def writer(n):
+            barrier.wait(timeout=10)
+            for i in range(per_thread):
+                db.add_study_record(StudyRecord(title=f"記録 {n}-{i}", study_time=i))
+
+        workers = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        assert db.count_study_records() == threads * per_thread
+        return elapsed
+
+    results = {}
+    for name, enabled in (("個別コミット", False), ("グループコミット", True)):
+        with DatabaseManager(
+            str(tmp_path / f"{enabled}.db"),
+            pool_size=threads,
+            storage_profile="durable",
+            write_coordinator=enabled,
+        ) as db:
+            results[name] = (run_writers(db), db.get_write_metrics())
+
+    total = threads * per_thread
+    for name, (elapsed, metrics) in results.items():
+        batches = metrics["batches"] if metrics else total
+        print(
+            f"\n[{name} writes={total}] {total / elapsed:,.0f} writes/s, "
+            f"コミット回数: {batches}"
+        )
+    assert results["グループコミット"][1]["batches"] < total
+
+
+@pytest.mark.slow
+def test_backup_throughput(tmp_path):
+    """JSONエクスポートとバックアップAPIによるコピーの比較（100,000件）"""
+    from src.cli.main import export_to_json
+
+    rows = 100_000
+    db_path = str(tmp_path / "backup.db")
+    with DatabaseManager(db_path) as db:
+        seed_records(db_path, rows)
+
+        start = time.perf_counter()
+        export_to_json(db.iter_study_records(), str(tmp_path / "export.json"))
+        export_s = time.perf_counter() - start
+
+        results = {
+            name: db.backup(str(tmp_path / filename))
+            for name, filename in (("backup", "copy.db"), ("backup+gzip", "copy.db.gz"))
+        }
+
+    size = os.path.getsize(db_path)
+    print(f"\n[export json rows={rows}] {export_s:.2f}s")
+    for name, result in results.items():
+        print(
+            f"[{name} rows={rows}] {result['seconds']:.2f}s, "
+            f"{size / result['seconds'] / 1024 / 1024:,.0f}MB/s, "
+            f"{result['size'] / 1024 / 1024:.1f}MB"
+        )
+    assert results["backup"]["seconds"] < export_s
+
+
+@pytest.mark.slow
+def test_read_replica_latency(tmp_path):
+    """ディスク上のDBとインメモリレプリカの読み込みレイテンシの比較（100,000件）"""
+    rows = 100_000
+    db_path = str(tmp_path / "replica.db")
+    DatabaseManager(db_path, read_replica=False).close()
+    seed_records(db_path, rows)
+
+    def read_mix(db):
+        db.get_category_totals()
+        db.get_totals()
+        db.get_study_records_page(
+            20, record_filter=RecordFilter(category="データベース")
+        )
+        db.search("学習記録 4242")
+
+    def concurrent_read_mix_ms(db, threads=4, repeat=10):
+        """複数スレッドで同時に読み込んだ場合の1操作あたりの処理時間"""
+        workers = [
+            threading.Thread(target=per_operation_ms, args=(read_mix, [(db,)] * repeat))
+            for _ in range(threads)
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return (time.perf_counter() - start) / (threads * repeat) * 1000
+
+    results = {}
+    concurrent = {}
+    for name, read_replica in (("disk", False), ("replica", True)):
+        with DatabaseManager(db_path, read_replica=read_replica) as db:
+            read_mix(db)
+            results[name] = per_operation_ms(read_mix, [(db,)] * 20)
+            concurrent[name] = concurrent_read_mix_ms(db)
+            if read_replica:
+                # 書き込み後もレプリカから最新の内容が読めること
+                record_id = db.add_study_record(StudyRecord(title="追加の記録"))
+                assert db.get_study_record(record_id).title == "追加の記録"
+                assert db.get_replica_metrics()["reloads"] == 0
+
+    print(
+        f"\n[read mix rows={rows}] ディスク: {results['disk']:.1f}ms, "
+        f"レプリカ: {results['replica']:.1f}ms "
+        f"({results['disk'] / results['replica']:.1f}x), "
+        f"4スレッド同時: ディスク {concurrent['disk']:.1f}ms, "
+        f"レプリカ {concurrent['replica']:.1f}ms"
+    )
+
+
+@pytest.mark.slow
+def test_rollup_stats_latency(tmp_path):
+    """GROUP BY による集計とロールアップの読み込みの比較（100,000件）"""
+    rows = 100_000
+    db_path = str(tmp_path / "rollup.db")
+    with DatabaseManager(db_path) as db:
+        start = time.perf_counter()
+        seed_records(db_path, rows)
+        seed_s = time.perf_counter() - start
+
+        group_by = """
+            SELECT category, COUNT(*), SUM(study_time), SUM(difficulty)
+            FROM study_records
+            WHERE category IS NOT NULL AND category != ''
+            GROUP BY category
+        """
+        with db._connection() as conn:
+            scanned_ms = per_operation_ms(
+                lambda: conn.execute(group_by).fetchall(), [()] * 20
+            )
+        rollup_ms = per_operation_ms(db.get_category_totals, [()] * 20)
+
+        assert set(db.check_rollups().values()) == {0}
+
+    print(
+        f"\n[category stats rows={rows}] GROUP BY: {scanned_ms:.2f}ms, "
+        f"ロールアップ: {rollup_ms:.3f}ms ({scanned_ms / rollup_ms:.0f}x), "
+        f"投入（トリガー込み）: {seed_s:.2f}s"
+    )
+    assert rollup_ms < scanned_ms
+
+
+@pytest.mark.slow
+def test_all_totals_latency(tmp_path):
+    """ダッシュボード1回分の統計の比較（100,000件）
+
+    従来は5つのエンドポイントがそれぞれ全件を読み込んで集計していた。
+    """
+    rows = 100_000
+    db_path = str(tmp_path / "all_totals.db")
+    with DatabaseManager(db_path) as db:
+        seed_records(db_path, rows)
+
+        def reload_per_endpoint():
+            for _ in range(5):
+                db.get_all_study_records()
+
+        def separately():
+            db.get_totals()
+            db.get_category_totals(include_uncategorized=True)
+            db.get_difficulty_totals()
+            db.get_time_distribution()
+            db.get_daily_totals()
+
+        reload_ms = per_operation_ms(reload_per_endpoint, [()] * 2)
+        separate_ms = per_operation_ms(separately, [()] * 10)
+        combined_ms = per_operation_ms(db.get_all_totals, [()] * 10)
+
+    print(
+        f"\n[dashboard stats rows={rows}] 全件読み込み5回: {reload_ms:.0f}ms, "
+        f"個別の集計5回: {separate_ms:.2f}ms, まとめて1回: {combined_ms:.2f}ms "
+        f"({reload_ms / combined_ms:.0f}x)"
+    )
+    assert combined_ms < reload_ms
+
+
+def python_all_totals(batch: RecordBatch) -> dict:
+    """記録ごとのループと辞書の更新による集計（StudyAnalytics と同じ形式）"""
+    categories, difficulties, daily = {}, {}, {}
+    distribution = [0, 0, 0]
+    for study_time, difficulty, code, created_at in zip(
+        batch.study_times, batch.difficulties, batch.category_codes, batch.created_at
+    ):
+        category = batch.categories[code] or None
+        group = categories.setdefault(
+            category,
+            {"category": category, "count": 0, "total_time": 0, "difficulty_sum": 0},
+        )
+        group["count"] += 1
+        group["total_time"] += study_time
+        group["difficulty_sum"] += difficulty
+
+        group = difficulties.setdefault(
+            difficulty, {"difficulty": difficulty, "count": 0, "total_time": 0}
+        )
+        group["count"] += 1
+        group["total_time"] += study_time
+
+        date = (datetime(1970, 1, 1) + timedelta(microseconds=created_at)).strftime(
+            "%Y-%m-%d"
+        )
+        group = daily.setdefault(date, {"date": date, "count": 0, "total_time": 0})
+        group["count"] += 1
+        group["total_time"] += study_time
+
+        distribution[0 if study_time < 30 else 1 if study_time < 120 else 2] += 1
+
+    return {
+        "totals": {
+            "count": len(batch),
+            "total_time": sum(batch.study_times),
+            "difficulty_sum": sum(batch.difficulties),
+        },
+        "categories": list(categories.values()),
+        "difficulties": list(difficulties.values()),
+        "time_distribution": {
+            "short_time": distribution[0],
+            "medium_time": distribution[1],
+            "long_time": distribution[2],
+            "total_records": len(batch),
+        },
+        "daily": [daily[date] for date in sorted(daily)],
+    }
+
+
+@pytest.mark.slow
+def test_numpy_analytics_speedup():
+    """記録ごとのループとNumPyによる集計の比較（1,000,000件）"""
+    pytest.importorskip("numpy")
+    from src.models.analytics import StudyAnalytics
+
+    rows = 1_000_000
+    base = datetime(2024, 1, 1)
+    categories = ["プログラミング", "データベース", "インフラ", "英語", "", None]
+    batch = RecordBatch()
+    # 新しい順（load_record_batch と同じ順）に並べる
+    for i in range(rows, 0, -1):
+        created_at = base + timedelta(seconds=i * 30)
+        batch.append_values(
+            i,
+            "学習記録",
+            None,
+            i % 240,
+            categories[i % len(categories)],
+            i % 5 + 1,
+            created_at,
+            created_at,
+        )
+
+    start = time.perf_counter()
+    expected = python_all_totals(batch)
+    loop_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    analytics = StudyAnalytics.from_batch(batch)
+    load_s = time.perf_counter() - start
+    start = time.perf_counter()
+    result = analytics.get_all_totals()
+    numpy_s = time.perf_counter() - start
+
+    assert result == expected
+    print(
+        f"\n[analytics rows={rows}] ループ: {loop_s * 1000:.0f}ms, "
+        f"NumPy: {numpy_s * 1000:.0f}ms ({loop_s / numpy_s:.0f}x), "
+        f"配列の作成: {load_s * 1000:.1f}ms"
+    )
+    assert loop_s / numpy_s >= 20
+
+
+@pytest.mark.slow
+def test_timeline_range_latency(tmp_path):
+    """全期間の日別の統計と1年分の月別の統計の比較（100,000件・約3年分）"""
+    rows = 100_000
+    db_path = str(tmp_path / "timeline.db")
+    base = datetime(2023, 1, 1)
+    with DatabaseManager(db_path) as db:
+        db.add_study_records_many(
+            (
+                StudyRecord(
+                    title=f"学習記録 {i}",
+                    study_time=i % 240,
+                    created_at=base + timedelta(minutes=i * 15),
+                )
+                for i in range(rows)
+            ),
+            keep_timestamps=True,
+        )
+        year = {
+            "start": datetime(2024, 1, 1).date(),
+            "end": datetime(2024, 12, 31).date(),
+        }
+
+        daily_ms = per_operation_ms(db.get_daily_totals, [()] * 20)
+        monthly = db.get_timeline_totals("month", **year)
+        monthly_ms = per_operation_ms(
+            lambda: db.get_timeline_totals("month", **year), [()] * 20
+        )
+        tokyo_ms = per_operation_ms(
+            lambda: db.get_timeline_totals("month", tz="Asia/Tokyo", **year),
+            [()] * 20,
+        )
+        days = len(db.get_daily_totals())
+
+    print(
+        f"\n[timeline rows={rows}] 全期間の日別（{days}行）: {daily_ms:.2f}ms, "
+        f"1年の月別（{len(monthly)}行・UTC）: {monthly_ms:.2f}ms, "
+        f"1年の月別（Asia/Tokyo・記録の範囲読み込み）: {tokyo_ms:.2f}ms"
+    )
+    assert len(monthly) == 12
+
+
+def sorted_percentiles(conn, percents) -> dict:
+    """全記録の学習時間を並べ替えて分位点（線形補間）を求める（比較用）"""
+    values = [
+        row[0]
+        for row in conn.execute(
+            "SELECT study_time FROM study_records ORDER BY study_time"
+        )
+    ]
+    result = {}
+    for percent in percents:
+        rank = (len(values) - 1) * percent / 100
+        lower = int(rank)
+        upper = min(lower + 1, len(values) - 1)
+        value = values[lower] + (values[upper] - values[lower]) * (rank - lower)
+        result[percent] = round(value, 2)
+    return result
+
+
+@pytest.mark.slow
+def test_percentile_latency(tmp_path):
+    """全記録の並べ替えとヒストグラムによる分位点の比較（10,000件・100,000件）"""
+    db_path = str(tmp_path / "percentiles.db")
+    percents = (50, 90, 99)
+    timings = {}
+    with DatabaseManager(db_path) as db:
+        for rows in (10_000, 100_000):
+            seed_records(db_path, rows - db.get_totals()["count"])
+            with db._connection() as conn:
+                expected = sorted_percentiles(conn, percents)
+                sorted_ms = per_operation_ms(
+                    lambda: sorted_percentiles(conn, percents), [()] * 5
+                )
+            stats = db.get_study_time_percentiles(percents)
+            histogram_ms = per_operation_ms(
+                lambda: db.get_study_time_percentiles(percents), [()] * 20
+            )
+            assert stats == {"count": rows, "percentiles": expected}
+            timings[rows] = (sorted_ms, histogram_ms)
+
+        assert set(db.check_rollups().values()) == {0}
+
+    print(
+        "\n[percentiles] "
+        + ", ".join(
+            f"{rows}件: 並べ替え {sorted_ms:.2f}ms / ヒストグラム {histogram_ms:.3f}ms"
+            for rows, (sorted_ms, histogram_ms) in timings.items()
+        )
+    )
+    sorted_ms, histogram_ms = timings[100_000]
+    assert histogram_ms * 10 < sorted_ms
+
+
+@pytest.mark.slow
+def test_habit_stats_latency(tmp_path):
+    """記録の再集計と連続学習の期間による学習習慣の統計の比較（100,000件・約3年分）"""
+    rows = 100_000
+    base = datetime(2023, 1, 1)
+    with DatabaseManager(str(tmp_path / "habits.db")) as db:
+        # 6日学習して1日休む
+        db.add_study_records_many(
+            (
+                StudyRecord(
+                    title=f"学習記録 {i}",
+                    study_time=i % 240,
+                    created_at=base + timedelta(minutes=i * 15),
+                )
+                for i in range(rows)
+                if (i * 15 // 1440) % 7 != 6
+            ),
+            keep_timestamps=True,
+        )
+        today = (base + timedelta(minutes=rows * 15)).date()
+
+        rescan = """
+            SELECT substr(created_at, 1, 10) AS date, COUNT(*), SUM(study_time)
+            FROM study_records
+            GROUP BY date
+        """
+
+        def rescanned():
+            with db._connection() as conn:
+                daily = [
+                    {"date": day, "count": count, "total_time": total}
+                    for day, count, total in conn.execute(rescan)
+                ]
+            return habit_stats_from_daily(daily, today)
+
+        expected = rescanned()
+        rescan_ms = per_operation_ms(rescanned, [()] * 5)
+        stats = db.get_habit_stats(today)
+        streak_ms = per_operation_ms(lambda: db.get_habit_stats(today), [()] * 20)
+
+        assert stats == expected
+        assert set(db.check_rollups().values()) == {0}
+
+    print(
+        f"\n[habits rows={rows}] 再集計: {rescan_ms:.2f}ms, "
+        f"連続学習の期間: {streak_ms:.3f}ms ({rescan_ms / streak_ms:.0f}x)"
+    )
+    assert streak_ms * 10 < rescan_ms
@@ -0,0 +1,106 @@
+"""
+RecordBatchのテスト
+
+列指向コンテナの変換と集計を検証するテストスイートです。
+"""
+
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from src.models.record_batch import RecordBatch, from_epoch_us, to_epoch_us
+from src.models.study_record import StudyRecord
+
+
+@pytest.fixture
+def records():
+    """サンプル学習記録"""
+    base = datetime(2024, 1, 1, 9, 0, 0, 123456)
+    return [
+        StudyRecord(
+            id=i + 1,
+            title=f"記録{i}",
+            content="内容" if i % 2 else None,
+            study_time=30 * (i + 1),
+            category=["英語", None, "英語", "数学"][i],
+            difficulty=i + 1,
+            created_at=base + timedelta(days=i),
+            updated_at=base + timedelta(days=i, hours=1),
+        )
+        for i in range(4)
+    ]
+
+
+class TestEpochConversion:
+    """UNIX時刻との変換のテスト"""
+
+    def test_round_trip(self):
+        """マイクロ秒まで往復変換できるかのテスト"""
+        value = datetime(2024, 5, 6, 7, 8, 9, 654321)
+        assert from_epoch_us(to_epoch_us(value)) == value
+
+    def test_aware_datetime(self):
+        """タイムゾーン付きはUTCに変換されるかのテスト"""
+        jst = timezone(timedelta(hours=9))
+        value = datetime(2024, 1, 1, 9, 0, 0, tzinfo=jst)
+        assert from_epoch_us(to_epoch_us(value)) == datetime(2024, 1, 1, 0, 0, 0)
+
+
+class TestRecordBatch:
+    """RecordBatchクラスのテストクラス"""
+
+    def test_row_views(self, records):
+        """行として取り出した記録が元の記録と一致するかのテスト"""
+        batch = RecordBatch.from_records(records)
+
+        assert len(batch) == 4
+        for original, row in zip(records, batch):
+            assert isinstance(row, StudyRecord)
+            for field in StudyRecord.__slots__:
+                assert getattr(row, field) == getattr(original, field)
+        assert batch[-1].title == "記録3"
+
+    def test_category_codes(self, records):
+        """カテゴリが初出順のコードで保持されるかのテスト"""
+        batch = RecordBatch.from_records(records)
+
+        assert batch.categories == ["英語", None, "数学"]
+        assert list(batch.category_codes) == [0, 1, 0, 2]
+
+    def test_totals(self, records):
+        """集計のテスト"""
+        batch = RecordBatch.from_records(records)
+
+        assert batch.total_study_time() == 300
+        assert batch.difficulty_sum() == 10
+        assert batch.created_at_range() == (
+            records[0].created_at,
+            records[3].created_at,
+        )
+        assert batch.category_totals() == {
+            "英語": {"count": 2, "total_time": 120, "difficulty_sum": 4},
+            None: {"count": 1, "total_time": 60, "difficulty_sum": 2},
+            "数学": {"count": 1, "total_time": 120, "difficulty_sum": 4},
+        }
+        assert batch.difficulty_totals() == {
+            d: {"count": 1, "total_time": 30 * d} for d in range(1, 5)
+        }
+        assert batch.totals_since(records[2].created_at) == (2, 210)
+
+    def test_empty_batch(self):
+        """空のコンテナのテスト"""
+        batch = RecordBatch()
+
+        assert not batch
+        assert list(batch) == []
+        assert batch.created_at_range() is None
+        assert batch.category_totals() == {}
+        assert batch.difficulty_totals() == {}
+
+    def test_to_numpy(self, records):
+        """NumPy配列として参照できるかのテスト"""
+        numpy = pytest.importorskip("numpy")
+        columns = RecordBatch.from_records(records).to_numpy()
+
+        assert columns["study_time"].sum() == 300
+        assert columns["difficulty"].dtype == numpy.int8
+        assert list(columns["id"]) == [1, 2, 3, 4]
@@ -0,0 +1,185 @@
+"""
+Alembicによるスキーマ管理のテスト
+"""
+
+import sqlite3
+
+import pytest
+
+pytest.importorskip("alembic")
+
+from alembic import command  # noqa: E402
+from alembic.script import ScriptDirectory  # noqa: E402
+
+from src.database import revisions  # noqa: E402
+from src.database.connection import DatabaseManager  # noqa: E402
+from src.database.migrations import LATEST_SCHEMA_VERSION, MIGRATIONS  # noqa: E402
+from src.database.revisions import (  # noqa: E402
+    HEAD_REVISION,
+    REVISIONS,
+    SchemaRevisionError,
+)
+from src.database.sqlalchemy_backend import SQLAlchemyDatabaseManager  # noqa: E402
+from src.models.study_record import StudyRecord  # noqa: E402
+
+
+def sqlite_url(path) -> str:
+    return f"sqlite:///{path}"
+
+
+def describe_schema(path) -> dict:
+    """比較用にテーブルの列・インデックス・トリガーを取得"""
+    conn = sqlite3.connect(str(path))
+    try:
+        columns = [
+            (row[1], row[2], row[3], row[4])
+            for row in conn.execute("PRAGMA table_info(study_records)")
+        ]
+        objects = sorted(
+            conn.execute(
+                "SELECT type, name FROM sqlite_master "
+                "WHERE type IN ('index', 'trigger') AND name NOT LIKE 'sqlite_%'"
+            ).fetchall()
+        )
+        versions = [
+            row[0] for row in conn.execute("SELECT version FROM schema_version")
+        ]
+    finally:
+        conn.close()
+    return {"columns": columns, "objects": objects, "versions": versions}
+
+
+def create_legacy_database(path):
+    """Alembic導入前（組み込みマイグレーション 1〜3）のDBを作成"""
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        "CREATE TABLE schema_version (version INTEGER PRIMARY KEY, "
+        "description TEXT NOT NULL, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+    for version, description, statements in MIGRATIONS[:3]:
+        for statement in statements:
+            conn.execute(statement)
+        conn.execute(
+            "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+            (version, description),
+        )
+    conn.execute(
+        "INSERT INTO study_records (title, content) VALUES ('既存の記録', 'Alembic導入前')"
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestRevisionChain:
+    """リビジョンの定義のテストクラス"""
+
+    def test_head_matches_scripts(self, tmp_path):
+        """HEAD_REVISION がマイグレーションスクリプトのheadと一致するかのテスト"""
+        config = revisions.alembic_config(sqlite_url(tmp_path / "test.db"))
+        script = ScriptDirectory.from_config(config)
+
+        assert script.get_current_head() == HEAD_REVISION
+        assert {rev.revision for rev in script.walk_revisions()} == set(REVISIONS)
+        assert REVISIONS[HEAD_REVISION] == LATEST_SCHEMA_VERSION
+
+    def test_upgrade_matches_builtin_schema(self, tmp_path):
+        """Alembicで作成したDBと起動時に作成したDBのスキーマが一致するかのテスト"""
+        alembic_path = tmp_path / "alembic.db"
+        builtin_path = tmp_path / "builtin.db"
+
+        revisions.upgrade(sqlite_url(alembic_path))
+        DatabaseManager(str(builtin_path)).close()
+
+        assert describe_schema(alembic_path) == describe_schema(builtin_path)
+        assert revisions.current_revision(sqlite_url(alembic_path)) == HEAD_REVISION
+        assert revisions.current_revision(sqlite_url(builtin_path)) == HEAD_REVISION
+
+    def test_upgrade_legacy_database(self, tmp_path):
+        """Alembic導入前のDBがデータと全文検索を保ったまま更新されるかのテスト"""
+        db_path = tmp_path / "legacy.db"
+        create_legacy_database(db_path)
+
+        revisions.upgrade(sqlite_url(db_path))
+
+        schema = describe_schema(db_path)
+        assert [column[0] for column in schema["columns"]][-2:] == ["user_id", "tags"]
+        assert schema["versions"] == [1, 2, 3, 4, 5, 6, 7]
+        with DatabaseManager(str(db_path)) as db:
+            hits = db.search("Alembic導入前")
+            assert [hit["record"].title for hit in hits] == ["既存の記録"]
+
+    def test_downgrade_keeps_search_triggers(self, tmp_path):
+        """ダウングレードしても全文検索のトリガーが残るかのテスト"""
+        url = sqlite_url(tmp_path / "test.db")
+        revisions.upgrade(url)
+
+        command.downgrade(revisions.alembic_config(url), "0001")
+
+        schema = describe_schema(tmp_path / "test.db")
+        assert "user_id" not in [column[0] for column in schema["columns"]]
+        assert ("trigger", "study_records_fts_insert") in schema["objects"]
+        assert schema["versions"] == [1, 2, 3]
+
+    def test_downgrade_to_base_drops_schema(self, tmp_path):
+        """初期リビジョンより前に戻すとテーブルがすべて削除されるかのテスト"""
+        url = sqlite_url(tmp_path / "test.db")
+        revisions.upgrade(url)
+        command.downgrade(revisions.alembic_config(url), "0001")
+
+        command.downgrade(revisions.alembic_config(url), "base")
+
+        conn = sqlite3.connect(str(tmp_path / "test.db"))
+        try:
+            names = {
+                row[0]
+                for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"
+                )
+            }
+        finally:
+            conn.close()
+        assert names <= {"alembic_version"}
+
+
+class TestStartupCheck:
+    """起動時のリビジョン確認のテストクラス"""
+
+    def test_current_database_skips_ddl(self, tmp_path, monkeypatch):
+        """最新のDBではマイグレーションを実行しないかのテスト"""
+        db_path = str(tmp_path / "test.db")
+        revisions.upgrade(sqlite_url(db_path))
+
+        def fail(*args, **kwargs):
+            raise AssertionError("起動時にマイグレーションが実行されました")
+
+        monkeypatch.setattr("src.database.connection.apply_migrations", fail)
+        with DatabaseManager(db_path) as db:
+            record_id = db.add_study_record(StudyRecord(title="テスト"))
+            assert db.get_study_record(record_id).title == "テスト"
+
+    @pytest.mark.parametrize(
+        "manager_class, make_target",
+        [
+            (DatabaseManager, str),
+            (SQLAlchemyDatabaseManager, sqlite_url),
+        ],
+    )
+    def test_outdated_revision_is_rejected(self, tmp_path, manager_class, make_target):
+        """リビジョンが古いDBでは起動せず、更新方法を案内するかのテスト"""
+        db_path = tmp_path / "test.db"
+        revisions.upgrade(sqlite_url(db_path), "0001")
+
+        with pytest.raises(SchemaRevisionError, match="db upgrade"):
+            manager_class(make_target(db_path))
+
+    def test_unknown_revision_is_rejected(self, tmp_path):
+        """コードより新しいリビジョンのDBでは起動しないかのテスト"""
+        db_path = str(tmp_path / "test.db")
+        DatabaseManager(db_path).close()
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE alembic_version SET version_num = '9999'")
+        conn.commit()
+        conn.close()
+
+        with pytest.raises(SchemaRevisionError, match="9999"):
+            DatabaseManager(db_path)
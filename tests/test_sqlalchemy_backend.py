@@ -0,0 +1,305 @@
+"""
+SQLAlchemy版データベースマネージャーのテスト
+
+sqlite3 版の DatabaseManager と同じ結果になることを検証するテストスイートです。
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from src.database.backends import (  # noqa: E402
+    DATABASE_URL_ENV,
+    UnsupportedBackendError,
+    create_database_manager,
+)
+from src.database.connection import DatabaseManager  # noqa: E402
+from src.database.filters import RecordFilter  # noqa: E402
+from src.database.migrations import LATEST_SCHEMA_VERSION  # noqa: E402
+from src.database.sqlalchemy_backend import SQLAlchemyDatabaseManager  # noqa: E402
+from src.models.study_record import StudyRecord  # noqa: E402
+
+
+def sample_records():
+    """カテゴリ・難易度・作成日時がばらけたサンプル記録"""
+    samples = [
+        ("Python", "プログラミング", 45, 3, datetime(2025, 7, 1, 9, 0)),
+        ("SQL", "データベース", 120, 4, datetime(2025, 7, 1, 9, 0)),
+        ("英単語", "英語", 20, 1, datetime(2025, 7, 2, 21, 30)),
+        ("FastAPI", "プログラミング", 90, 2, datetime(2025, 7, 3, 10, 0)),
+        ("メモ", None, 10, 1, datetime(2025, 7, 3, 10, 0)),
+        ("空カテゴリ", "", 200, 5, datetime(2025, 7, 4, 8, 15)),
+        ("インデックス", "データベース", 33, 3, datetime(2025, 7, 4, 8, 15)),
+    ]
+    records = []
+    for title, category, study_time, difficulty, created_at in samples:
+        record = StudyRecord(
+            title=title,
+            content=f"{title}の学習内容",
+            category=category,
+            study_time=study_time,
+            difficulty=difficulty,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+        records.append(record)
+    return records
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """サンプル記録を投入したデータベースファイル"""
+    path = str(tmp_path / "backend.db")
+    with SQLAlchemyDatabaseManager(f"sqlite:///{path}") as manager:
+        manager.add_study_records_many(sample_records(), keep_timestamps=True)
+    return path
+
+
+@pytest.fixture
+def sa_db(db_path):
+    """SQLAlchemy版のデータベースマネージャー"""
+    manager = SQLAlchemyDatabaseManager(f"sqlite:///{db_path}", pool_size=2)
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def raw_db(db_path):
+    """同じファイルを開いた sqlite3 版のデータベースマネージャー"""
+    manager = DatabaseManager(db_path, pool_size=2)
+    yield manager
+    manager.close()
+
+
+def as_tuples(records):
+    """比較用に記録をタプルに変換"""
+    return [
+        (
+            r.id,
+            r.title,
+            r.content,
+            r.study_time,
+            r.category,
+            r.difficulty,
+            r.created_at,
+            r.updated_at,
+        )
+        for r in records
+    ]
+
+
+class TestSQLAlchemyDatabaseManager:
+    """SQLAlchemy版データベースマネージャーのテストクラス"""
+
+    def test_schema_is_shared(self, sa_db, raw_db):
+        """sqlite3 版と同じスキーマ・バージョンになるかのテスト"""
+        assert sa_db.get_schema_version() == LATEST_SCHEMA_VERSION
+        assert raw_db.get_schema_version() == LATEST_SCHEMA_VERSION
+        assert sa_db.get_storage_info() == raw_db.get_storage_info()
+
+    def test_listing_matches(self, sa_db, raw_db):
+        """一覧・ページ・検索条件の結果が sqlite3 版と一致するかのテスト"""
+        assert as_tuples(sa_db.get_all_study_records()) == as_tuples(
+            raw_db.get_all_study_records()
+        )
+
+        record_filter = RecordFilter(category_contains="データ", min_time=30)
+        assert as_tuples(sa_db.find_study_records(record_filter)) == as_tuples(
+            raw_db.find_study_records(record_filter)
+        )
+        assert sa_db.count_study_records(record_filter) == 2
+
+        records, total = sa_db.get_study_records_page(limit=3, offset=2)
+        expected, expected_total = raw_db.get_study_records_page(limit=3, offset=2)
+        assert as_tuples(records) == as_tuples(expected)
+        assert total == expected_total
+
+    def test_cursor_pagination_matches(self, sa_db, raw_db):
+        """カーソルが両方の実装で互換かのテスト"""
+        first, cursor = sa_db.list_after(limit=3)
+        expected, expected_cursor = raw_db.list_after(limit=3)
+        assert as_tuples(first) == as_tuples(expected)
+        assert cursor == expected_cursor
+
+        second, _ = sa_db.list_after(cursor, limit=3)
+        assert as_tuples(second) == as_tuples(raw_db.list_after(cursor, limit=3)[0])
+
+    def test_streaming_matches(self, sa_db, raw_db):
+        """逐次読み込み・列指向読み込みの結果が一致するかのテスト"""
+        expected = as_tuples(raw_db.get_all_study_records())
+
+        assert as_tuples(sa_db.iter_study_records(batch_size=2)) == expected
+        assert as_tuples(sa_db.load_record_batch(batch_size=2)) == expected
+
+    @pytest.mark.parametrize(
+        "method, kwargs",
+        [
+            ("get_totals", {}),
+            ("get_totals_since", {"since": datetime(2025, 7, 3, 10, 0)}),
+            ("get_totals_since", {"since": datetime(2025, 7, 3, 10, 1)}),
+            ("get_category_totals", {}),
+            ("get_category_totals", {"include_uncategorized": True}),
+            ("get_difficulty_totals", {}),
+            ("get_time_distribution", {}),
+            ("get_daily_totals", {}),
+            ("get_all_totals", {}),
+            ("get_timeline_totals", {}),
+            ("get_timeline_totals", {"bucket": "week", "tz": "Asia/Tokyo"}),
+            (
+                "get_timeline_totals",
+                {
+                    "bucket": "month",
+                    "start": date(2025, 5, 20),
+                    "end": date(2025, 8, 1),
+                },
+            ),
+            ("get_timeline_totals", {"bucket": "day", "tz": "-05:00"}),
+            ("get_study_time_percentiles", {}),
+            (
+                "get_study_time_percentiles",
+                {"percents": (10, 50, 95), "category": "データベース"},
+            ),
+            (
+                "get_study_time_percentiles",
+                {"start": date(2025, 7, 2), "end": date(2025, 7, 3)},
+            ),
+            ("get_habit_stats", {"today": date(2025, 7, 4)}),
+            ("get_habit_stats", {"today": date(2025, 7, 10), "windows": (3, 14)}),
+        ],
+    )
+    def test_aggregates_match(self, sa_db, raw_db, method, kwargs):
+        """集計結果（並び順を含む）が一致するかのテスト"""
+        assert getattr(sa_db, method)(**kwargs) == getattr(raw_db, method)(**kwargs)
+
+    def test_rollups_follow_writes(self, sa_db, raw_db):
+        """SQLAlchemy版の書き込みでも sqlite3 版のロールアップが更新されるかのテスト"""
+        record_id = sa_db.add_study_record(
+            StudyRecord(title="追加", study_time=15, category="英語")
+        )
+        sa_db.update_study_record(record_id, category="データベース")
+        sa_db.delete_study_record(1)
+
+        assert sa_db.check_rollups() == raw_db.check_rollups()
+        assert set(raw_db.check_rollups().values()) == {0}
+        assert raw_db.get_category_totals() == sa_db.get_category_totals()
+
+    def test_data_version_follows_writes(self, sa_db):
+        """SQLAlchemy版でも書き込みのたびにデータのバージョンが進むかのテスト"""
+        before = sa_db.data_version
+        sa_db.get_totals()
+        assert sa_db.data_version == before
+
+        record_id = sa_db.add_study_record(StudyRecord(title="追加", study_time=15))
+        after_add = sa_db.data_version
+        sa_db.update_study_record(record_id, study_time=30)
+        after_update = sa_db.data_version
+        sa_db.delete_study_record(record_id)
+
+        assert len({before, after_add, after_update, sa_db.data_version}) == 4
+
+    def test_data_version_follows_other_processes(self, sa_db, raw_db):
+        """他のコネクションの書き込みでもデータのバージョンが進むかのテスト"""
+        before = sa_db.data_version
+        assert sa_db.tracks_external_writes
+
+        raw_db.add_study_record(StudyRecord(title="別プロセスから"))
+
+        assert sa_db.data_version != before
+
+    def test_crud(self, sa_db, raw_db):
+        """追加・更新・削除のテスト"""
+        record_id = sa_db.add_study_record(StudyRecord(title="追加", study_time=15))
+
+        assert raw_db.get_study_record(record_id).title == "追加"
+        assert sa_db.update_study_record(record_id, title="更新", unknown="無視")
+        assert raw_db.get_study_record(record_id).title == "更新"
+        assert not sa_db.update_study_record(record_id, unknown="無視")
+        assert sa_db.delete_study_record(record_id)
+        assert not sa_db.delete_study_record(record_id)
+        assert sa_db.get_study_record(record_id) is None
+
+    def test_bulk_insert_skip_invalid(self, sa_db):
+        """一括追加で不正な行をスキップできるかのテスト"""
+        record_ids = sa_db.add_study_records_many(
+            [StudyRecord(title="A"), StudyRecord(title=None), StudyRecord(title="B")],
+            chunk_size=2,
+            skip_invalid=True,
+        )
+
+        assert record_ids[1] is None
+        assert [sa_db.get_study_record(i).title for i in record_ids[::2]] == [
+            "A",
+            "B",
+        ]
+
+    def test_bulk_insert_rolls_back(self, sa_db):
+        """一括追加で不正な行があれば全件ロールバックされるかのテスト"""
+        before = sa_db.count_study_records()
+
+        with pytest.raises(Exception):
+            sa_db.add_study_records_many(
+                [StudyRecord(title="A"), StudyRecord(title=None)], chunk_size=1
+            )
+
+        assert sa_db.count_study_records() == before
+
+    def test_search(self, sa_db):
+        """部分一致検索と強調表示のテスト"""
+        results = sa_db.search("sql")
+
+        assert [r["record"].title for r in results] == ["SQL"]
+        assert results[0]["title_highlight"] == "【SQL】"
+        assert sa_db.search("sql", case_sensitive=True) == []
+        with pytest.raises(ValueError):
+            sa_db.search("SQL", fields=["category"])
+
+    def test_backup_and_restore(self, sa_db, raw_db, tmp_path):
+        """SQLAlchemy版のバックアップを sqlite3 版でも復元できるかのテスト"""
+        dest = tmp_path / "backup.db.gz"
+        sa_db.backup(str(dest))
+        sa_db.delete_study_record(1)
+
+        raw_db.restore(str(dest))
+
+        assert sa_db.count_study_records() == len(sample_records())
+        assert as_tuples(sa_db.get_all_study_records()) == as_tuples(
+            raw_db.get_all_study_records()
+        )
+
+    def test_sqlite_only_features(self, sa_db, tmp_path, monkeypatch):
+        """SQLite以外ではバックアップ・ロールアップの保守がエラーになるかのテスト"""
+        monkeypatch.setattr(sa_db, "dialect_name", "postgresql")
+
+        with pytest.raises(UnsupportedBackendError):
+            sa_db.backup(str(tmp_path / "backup.db"))
+        with pytest.raises(UnsupportedBackendError):
+            sa_db.restore(str(tmp_path / "backup.db"))
+        with pytest.raises(UnsupportedBackendError):
+            sa_db.rebuild_rollups()
+        with pytest.raises(UnsupportedBackendError):
+            sa_db.check_rollups()
+
+    def test_in_memory_database(self):
+        """インメモリDBで接続が共有されるかのテスト"""
+        with SQLAlchemyDatabaseManager("sqlite://") as manager:
+            record_id = manager.add_study_record(StudyRecord(title="メモリ"))
+            assert manager.get_study_record(record_id).title == "メモリ"
+
+
+class TestCreateDatabaseManager:
+    """バックエンド選択のテストクラス"""
+
+    def test_default_is_sqlite3(self, tmp_path, monkeypatch):
+        """URL未指定なら sqlite3 版になるかのテスト"""
+        monkeypatch.delenv(DATABASE_URL_ENV, raising=False)
+        with create_database_manager(db_path=str(tmp_path / "raw.db")) as manager:
+            assert isinstance(manager, DatabaseManager)
+
+    def test_url_from_environment(self, tmp_path, monkeypatch):
+        """環境変数のURLで SQLAlchemy 版になるかのテスト"""
+        monkeypatch.setenv(DATABASE_URL_ENV, f"sqlite:///{tmp_path / 'env.db'}")
+        with create_database_manager(pool_size=1) as manager:
+            assert isinstance(manager, SQLAlchemyDatabaseManager)
+            assert manager.dialect_name == "sqlite"
@@ -6,6 +6,7 @@ StudyRecordモデルのテスト
 
 import pytest
 from datetime import datetime
+from unittest.mock import patch
 
 from src.models.study_record import StudyRecord
 
@@ -129,6 +130,20 @@ class TestStudyRecord:
         assert record.id == 123
         assert str(record) == "StudyRecord(id=123, title='テスト', time=0分)"
 
+    def test_record_with_timestamps(self):
+        """作成日時・更新日時を指定した場合は時計を参照しないかのテスト"""
+        created_at = datetime(2024, 1, 1, 9, 0, 0)
+        updated_at = datetime(2024, 1, 2, 9, 0, 0)
+
+        with patch("src.models.study_record.datetime") as mock_datetime:
+            record = StudyRecord(
+                title="テスト", created_at=created_at, updated_at=updated_at
+            )
+
+        mock_datetime.now.assert_not_called()
+        assert record.created_at == created_at
+        assert record.updated_at == updated_at
+
 
 class TestStudyRecordEdgeCases:
     """StudyRecordのエッジケーステスト"""